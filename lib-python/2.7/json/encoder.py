@@ -206,6 +206,15 @@ class JSONEncoder(object):
         '{"foo": ["bar", "baz"]}'
 
         """
+        if (_pypyjson_dumps is not None and self.ensure_ascii and
+                self.encoding == 'utf-8' and
+                (self.indent is None or type(self.indent) is int) and
+                type(self.item_separator) is str and
+                type(self.key_separator) is str):
+            return _pypyjson_dumps(o, self.skipkeys, self.check_circular,
+                                   self.allow_nan, self.indent,
+                                   (self.item_separator, self.key_separator),
+                                   self.default, self.sort_keys)
         if self.check_circular:
             markers = {}
         else:
@@ -294,10 +303,6 @@ class JSONEncoder(object):
             items = d.iteritems()
 
         for key, v in items:
-            if first:
-                first = False
-            else:
-                builder.append(separator)
             if isinstance(key, basestring):
                 pass
             # JavaScript is weakly typed for these, so it makes sense to
@@ -316,6 +321,10 @@ class JSONEncoder(object):
                 continue
             else:
                 raise TypeError("key " + repr(key) + " is not a string")
+            if first:
+                first = False
+            else:
+                builder.append(separator)
             builder.append('"')
             builder.append(self.__encoder(key))
             builder.append('"')
@@ -536,3 +545,7 @@ try:
     from _pypyjson import raw_encode_basestring_ascii
 except ImportError:
     pass
+try:
+    from _pypyjson import dumps as _pypyjson_dumps
+except ImportError:
+    _pypyjson_dumps = None
@@ -174,13 +174,13 @@ testmap = [
     RegrTest('test_cookielib.py'),
     RegrTest('test_copy.py', core=True),
     RegrTest('test_copy_reg.py', core=True),
-    RegrTest('test_cpickle.py', core=True),
+    RegrTest('test_cpickle.py', core=True, usemodules='_pickle'),
     RegrTest('test_cprofile.py'),
     RegrTest('test_crypt.py', usemodules='crypt'),
     RegrTest('test_csv.py', usemodules='_csv'),
     RegrTest('test_ctypes.py', usemodules="_rawffi thread cpyext"),
     RegrTest('test_curses.py'),
-    RegrTest('test_datetime.py', usemodules='binascii struct'),
+    RegrTest('test_datetime.py', usemodules='binascii struct _datetime'),
     RegrTest('test_dbm.py'),
     RegrTest('test_decimal.py'),
     RegrTest('test_decorators.py', core=True),
@@ -255,7 +255,7 @@ testmap = [
     RegrTest('test_gzip.py', usemodules='zlib'),
     RegrTest('test_hash.py', core=True),
     RegrTest('test_hashlib.py', core=True),
-    RegrTest('test_heapq.py', core=True),
+    RegrTest('test_heapq.py', core=True, usemodules='_heapq'),
     RegrTest('test_hmac.py'),
     RegrTest('test_hotshot.py', skip="unsupported extension module"),
     RegrTest('test_htmllib.py'),
@@ -281,7 +281,7 @@ testmap = [
     RegrTest('test_iter.py', core=True),
     RegrTest('test_iterlen.py', core=True, usemodules="_collections itertools"),
     RegrTest('test_itertools.py', core=True, usemodules="itertools struct"),
-    RegrTest('test_json.py'),
+    RegrTest('test_json.py', usemodules='_pypyjson struct binascii'),
     RegrTest('test_kqueue.py'),
     RegrTest('test_largefile.py'),
     RegrTest('test_lib2to3.py'),
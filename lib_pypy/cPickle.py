@@ -608,3 +608,13 @@ def load(f):
 def loads(str):
     f = StringIO(str)
     return Unpickler(f).load()
+
+# The interp-level versions from the _pickle module are much faster.  The
+# app-level ones above are still used on top of CPython, and kept as
+# AppPickler and AppUnpickler.
+AppPickler = Pickler
+AppUnpickler = Unpickler
+try:
+    from _pickle import Pickler, Unpickler, dump, dumps, load, loads
+except ImportError:
+    pass
@@ -181,6 +181,9 @@ def _build_struct_time(y, m, d, hh, mm, ss, dstflag):
     dnum = _days_before_month(y, m) + d
     return _time.struct_time((y, m, d, hh, mm, ss, wday, dnum, dstflag))
 
+def _format_date(y, m, d):
+    return "%04d-%02d-%02d" % (y, m, d)
+
 def _format_time(hh, mm, ss, us):
     # Skip trailing microseconds when us==0.
     result = "%02d:%02d:%02d" % (hh, mm, ss)
@@ -188,6 +191,38 @@ def _format_time(hh, mm, ss, us):
         result += ".%06d" % us
     return result
 
+def _format_datetime(y, m, d, hh, mm, ss, us, sep):
+    return "%04d-%02d-%02d%c" % (y, m, d, sep) + _format_time(hh, mm, ss, us)
+
+_strptime_numeric = None
+
+def _unbox_slots(cls):
+    return cls
+
+try:
+    import _datetime
+except ImportError:
+    pass
+else:
+    # On PyPy, use the interp-level versions of the helpers above.  They
+    # expect ints, which is what the callers below pass.
+    _ymd2ord = _datetime.ymd2ord
+    _ord2ymd = _datetime.ord2ymd
+    _format_date = _datetime.format_date
+    _format_time = _datetime.format_time
+
+    def _format_datetime(y, m, d, hh, mm, ss, us, sep,
+                         _app_format_datetime=_format_datetime):
+        if type(sep) is str and len(sep) == 1:
+            return _datetime.format_datetime(y, m, d, hh, mm, ss, us, sep)
+        return _app_format_datetime(y, m, d, hh, mm, ss, us, sep)
+
+    # returns None for the formats that need the _strptime module
+    _strptime_numeric = _datetime.strptime
+
+    # the int fields of the classes below are stored unboxed
+    _unbox_slots = _datetime.unbox_slots
+
 # Correctly substitute for %z and %Z escapes in strftime formats.
 def _wrap_strftime(object, format, timetuple):
     year = timetuple[0]
@@ -433,6 +468,7 @@ def _accum(tag, sofar, num, factor, leftover):
     raise TypeError("unsupported type for timedelta %s component: %s" %
                     (tag, type(num)))
 
+@_unbox_slots
 class timedelta(object):
     """Represent the difference between two datetime objects.
 
@@ -667,6 +703,7 @@ timedelta.min = timedelta(-_MAX_DELTA_DAYS)
 timedelta.max = timedelta(_MAX_DELTA_DAYS, 24*3600-1, 1000000-1)
 timedelta.resolution = timedelta(microseconds=1)
 
+@_unbox_slots
 class date(object):
     """Concrete date type.
 
@@ -796,7 +833,7 @@ class date(object):
         - http://www.w3.org/TR/NOTE-datetime
         - http://www.cl.cam.ac.uk/~mgk25/iso-time.html
         """
-        return "%04d-%02d-%02d" % (self._year, self._month, self._day)
+        return _format_date(self._year, self._month, self._day)
 
     __str__ = isoformat
 
@@ -1061,6 +1098,7 @@ class tzinfo(object):
 
 _tzinfo_class = tzinfo
 
+@_unbox_slots
 class time(object):
     """Time with time zone.
 
@@ -1395,6 +1433,7 @@ time.min = time(0, 0, 0)
 time.max = time(23, 59, 59, 999999)
 time.resolution = timedelta(microseconds=1)
 
+@_unbox_slots
 class datetime(date):
     """datetime(year, month, day[, hour[, minute[, second[, microsecond[,tzinfo]]]]])
 
@@ -1615,9 +1654,9 @@ class datetime(date):
         Optional argument sep specifies the separator between date and
         time, default 'T'.
         """
-        s = ("%04d-%02d-%02d%c" % (self._year, self._month, self._day, sep) +
-             _format_time(self._hour, self._minute, self._second,
-                          self._microsecond))
+        s = _format_datetime(self._year, self._month, self._day,
+                             self._hour, self._minute, self._second,
+                             self._microsecond, sep)
         off = self._utcoffset()
         if off is not None:
             if off < 0:
@@ -1652,6 +1691,11 @@ class datetime(date):
     @classmethod
     def strptime(cls, date_string, format):
         'string, format -> new datetime parsed from a string (like time.strptime()).'
+        if (_strptime_numeric is not None and
+                type(date_string) is str and type(format) is str):
+            fields = _strptime_numeric(date_string, format)
+            if fields is not None:
+                return cls(*fields)
         from _strptime import _strptime
         # _strptime._strptime returns a two-element tuple.  The first
         # element is a time.struct_time object.  The second is the
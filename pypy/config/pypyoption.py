@@ -36,7 +36,8 @@ working_modules.update([
     "cStringIO", "thread", "itertools", "pyexpat", "_ssl", "cpyext", "array",
     "binascii", "_multiprocessing", '_warnings', "_collections",
     "_multibytecodec", "micronumpy", "_continuation", "_cffi_backend",
-    "_csv", "cppyy", "_pypyjson", "_jitlog"
+    "_csv", "cppyy", "_pypyjson", "_jitlog", "_heapq", "_bisect",
+    "_pickle", "_datetime"
 ])
 
 from rpython.jit.backend import detect_cpu
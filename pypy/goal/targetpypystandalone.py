@@ -210,6 +210,7 @@ class PyPyTarget(object):
     usage = SUPPRESS_USAGE
 
     take_options = True
+    space = None
 
     def opt_parser(self, config):
         parser = to_optparse(config, useoptions=["objspace.*"],
@@ -353,8 +354,14 @@ class PyPyTarget(object):
         from pypy.module.pypyjit.hooks import pypy_hooks
         return PyPyJitPolicy(pypy_hooks)
 
+    def get_gchooks(self, driver):
+        from pypy.module.gc.hook import LowLevelGcHooks
+        if self.space is None:
+            raise Exception("get_gchooks must be called after get_entry_point")
+        return self.space.fromcache(LowLevelGcHooks)
+
     def get_entry_point(self, config):
-        space = make_objspace(config)
+        self.space = space = make_objspace(config)
 
         # manually imports app_main.py
         filename = os.path.join(pypydir, 'interpreter', 'app_main.py')
@@ -368,7 +375,7 @@ class PyPyTarget(object):
     def interface(self, ns):
         for name in ['take_options', 'handle_config', 'print_help', 'target',
                      'jitpolicy', 'get_entry_point',
-                     'get_additional_config_options']:
+                     'get_additional_config_options', 'get_gchooks']:
             ns[name] = getattr(self, name)
 
 
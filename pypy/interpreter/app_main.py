@@ -242,6 +242,12 @@ def run_faulthandler():
         except ValueError:
             pass      # ignore "2 is not a valid file descriptor"
 
+def load_jit_profile():
+    # importing pypyjit loads the profile, and saves it at exit:
+    # see pypy/module/pypyjit/hotness.py
+    if 'pypyjit' in sys.builtin_module_names:
+        import pypyjit
+
 def set_runtime_options(options, Xparam, *args):
     if Xparam == 'track-resources':
         sys.pypy_set_track_resources(True)
@@ -544,6 +550,8 @@ def parse_command_line(argv):
 
     if os.getenv('PYTHONFAULTHANDLER'):
         run_faulthandler()
+    if os.getenv('PYPY_JIT_PROFILE'):
+        load_jit_profile()
 
 ##    if not we_are_translated():
 ##        for key in sorted(options):
@@ -0,0 +1,163 @@
+"""Interp-level version of bisect.py.
+
+If the sequence is a plain list using the integer, float or bytes
+strategy and the item has the same type, the search is done directly on
+the unwrapped storage of the list, and insort() inserts the unwrapped
+item in it.  Otherwise, the items are read with space.getitem() and
+compared with '<', exactly like bisect.py does.
+"""
+
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.floatobject import W_FloatObject
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.listobject import (
+    W_ListObject, IntegerListStrategy, FloatListStrategy, BytesListStrategy)
+from rpython.rlib.objectmodel import specialize
+from rpython.rlib.unroll import unrolling_iterable
+
+
+def make_unboxed_bisect(strategycls, itemcls):
+
+    class UnboxedBisect(object):
+        @staticmethod
+        def get_storage(space, w_list, w_x, hi):
+            """Return the list of unwrapped items of 'w_list', or None if
+            it does not use this strategy, if 'w_x' is not of the right
+            type, or if 'hi' is out of bounds."""
+            if (w_list.strategy is space.fromcache(strategycls) and
+                    type(w_x) is itemcls):
+                items = strategycls.unerase(w_list.lstorage)
+                if hi <= len(items):
+                    return items
+            return None
+
+        @staticmethod
+        def unwrap(space, w_x):
+            return space.fromcache(strategycls).unwrap(w_x)
+
+        @staticmethod
+        def bisect_left(a, x, lo, hi):
+            while lo < hi:
+                mid = (lo + hi) >> 1
+                if a[mid] < x:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+
+        @staticmethod
+        def bisect_right(a, x, lo, hi):
+            while lo < hi:
+                mid = (lo + hi) >> 1
+                if x < a[mid]:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            return lo
+
+    UnboxedBisect.__name__ = 'UnboxedBisect_' + itemcls.__name__
+    return UnboxedBisect
+
+IntBisect = make_unboxed_bisect(IntegerListStrategy, W_IntObject)
+FloatBisect = make_unboxed_bisect(FloatListStrategy, W_FloatObject)
+BytesBisect = make_unboxed_bisect(BytesListStrategy, W_BytesObject)
+unrolling_bisects = unrolling_iterable([IntBisect, FloatBisect, BytesBisect])
+
+
+def _get_bounds(space, w_a, lo, w_hi):
+    if lo < 0:
+        raise oefmt(space.w_ValueError, "lo must be non-negative")
+    if space.is_none(w_hi):
+        hi = -1
+    else:
+        hi = space.int_w(w_hi)
+    if hi == -1:
+        hi = space.len_w(w_a)
+    return hi
+
+@specialize.arg(5)
+def _generic_bisect(space, w_a, w_x, lo, hi, right):
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        w_item = space.getitem(w_a, space.wrap(mid))
+        if right:
+            if space.is_true(space.lt(w_x, w_item)):
+                hi = mid
+            else:
+                lo = mid + 1
+        else:
+            if space.is_true(space.lt(w_item, w_x)):
+                lo = mid + 1
+            else:
+                hi = mid
+    return lo
+
+@specialize.arg(5, 6)
+def _bisect(space, w_a, w_x, lo, w_hi, right, insert):
+    hi = _get_bounds(space, w_a, lo, w_hi)
+    if type(w_a) is W_ListObject:
+        for Bisect in unrolling_bisects:
+            items = Bisect.get_storage(space, w_a, w_x, hi)
+            if items is not None:
+                x = Bisect.unwrap(space, w_x)
+                if right:
+                    index = Bisect.bisect_right(items, x, lo, hi)
+                else:
+                    index = Bisect.bisect_left(items, x, lo, hi)
+                if insert:
+                    # like list.insert(), an index past the end appends
+                    items.insert(min(index, len(items)), x)
+                return index
+    index = _generic_bisect(space, w_a, w_x, lo, hi, right)
+    if insert:
+        space.call_method(w_a, 'insert', space.wrap(index), w_x)
+    return index
+
+
+@unwrap_spec(lo=int)
+def bisect_left(space, w_a, w_x, lo=0, w_hi=None):
+    """Return the index where to insert item x in list a, assuming a is sorted.
+
+The return value i is such that all e in a[:i] have e < x, and all e in
+a[i:] have e >= x.  So if x already appears in the list, i points just
+before the leftmost x already there.
+
+Optional args lo (default 0) and hi (default len(a)) bound the
+slice of a to be searched."""
+    index = _bisect(space, w_a, w_x, lo, w_hi, False, False)
+    return space.wrap(index)
+
+@unwrap_spec(lo=int)
+def bisect_right(space, w_a, w_x, lo=0, w_hi=None):
+    """Return the index where to insert item x in list a, assuming a is sorted.
+
+The return value i is such that all e in a[:i] have e <= x, and all e in
+a[i:] have e > x.  So if x already appears in the list, i points just
+beyond the rightmost x already there
+
+Optional args lo (default 0) and hi (default len(a)) bound the
+slice of a to be searched."""
+    index = _bisect(space, w_a, w_x, lo, w_hi, True, False)
+    return space.wrap(index)
+
+@unwrap_spec(lo=int)
+def insort_left(space, w_a, w_x, lo=0, w_hi=None):
+    """Insert item x in list a, and keep it sorted assuming a is sorted.
+
+If x is already in a, insert it to the left of the leftmost x.
+
+Optional args lo (default 0) and hi (default len(a)) bound the
+slice of a to be searched."""
+    _bisect(space, w_a, w_x, lo, w_hi, False, True)
+
+@unwrap_spec(lo=int)
+def insort_right(space, w_a, w_x, lo=0, w_hi=None):
+    """Insert item x in list a, and keep it sorted assuming a is sorted.
+
+If x is already in a, insert it to the right of the rightmost x.
+
+Optional args lo (default 0) and hi (default len(a)) bound the
+slice of a to be searched."""
+    _bisect(space, w_a, w_x, lo, w_hi, True, True)
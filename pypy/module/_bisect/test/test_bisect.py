@@ -0,0 +1,103 @@
+class AppTestBisect:
+    spaceconfig = {"usemodules": ['_bisect', '__pypy__']}
+
+    def test_dict(self):
+        import _bisect
+        _bisect.__dict__  # crashes if entries in __init__.py can't be resolved
+
+    def test_bisect_left(self):
+        from _bisect import bisect_left
+        for a in [[], [5, 6, 7, 8], [5.5, 6.5, 7.5, 8.5], ['a', 'b', 'c'],
+                  [(1,), (2,), (2,), (3,)], [1, 2, 2, 3, 3, 3, 4]]:
+            for x in a + [min(a + [0]), 'z']:
+                expected = len([y for y in a if y < x])
+                assert bisect_left(a, x) == expected
+        a = [0, 5, 6, 7, 7, 10]
+        assert bisect_left(a, 7) == 3
+        assert bisect_left(a, 6.5) == 3
+        assert bisect_left(a, 7, 4) == 4
+        assert bisect_left(a, 7, 0, 2) == 2
+        assert bisect_left(a, 7, hi=3) == 3
+        assert bisect_left(a, 7, lo=5, hi=4) == 5
+        assert bisect_left(a, 7, 0, -1) == 3
+        assert bisect_left(a, 7, 0, None) == 3
+        raises(ValueError, bisect_left, a, 7, -1)
+        raises(IndexError, bisect_left, a, 7, 0, 20)
+
+    def test_bisect_right(self):
+        from _bisect import bisect_right, bisect
+        assert bisect is bisect_right
+        for a in [[], [5, 6, 7, 8], [5.5, 6.5, 7.5, 8.5], ['a', 'b', 'c'],
+                  [(1,), (2,), (2,), (3,)], [1, 2, 2, 3, 3, 3, 4]]:
+            for x in a + [min(a + [0]), 'z']:
+                expected = len([y for y in a if y <= x])
+                assert bisect_right(a, x) == expected
+        a = ['a', 'b', 'c', 'c', 'f']
+        assert bisect_right(a, 'c') == 4
+        assert bisect_right(a, 'c', 0, 3) == 3
+        assert bisect_right(a, u'c') == 4
+        assert bisect_right([1.5, 2.5, 2.5], 2.5) == 3
+        assert bisect_right([1.5, 2.5, 2.5], 2) == 1
+
+    def test_insort(self):
+        from _bisect import insort_left, insort_right, insort
+        from __pypy__ import strategy
+        assert insort is insort_right
+        a = [1, 3, 5]
+        insort_left(a, 4)
+        insort_right(a, 0)
+        insort(a, 6)
+        insort(a, 3)
+        assert a == [0, 1, 3, 3, 4, 5, 6]
+        assert strategy(a) == "IntegerListStrategy"
+        #
+        a = [1.5, 3.5]
+        insort(a, 2.5)
+        assert a == [1.5, 2.5, 3.5]
+        assert strategy(a) == "FloatListStrategy"
+        insort(a, 3)
+        assert a == [1.5, 2.5, 3, 3.5]
+        #
+        a = ['b', 'd']
+        insort(a, 'c')
+        assert a == ['b', 'c', 'd']
+        assert strategy(a) == "BytesListStrategy"
+        #
+        a = [1, 2]
+        insort(a, 5, 10)
+        assert a == [1, 2, 5]
+        #
+        a = []
+        for x in [5, 1, 4, 2, 3]:
+            insort_left(a, x)
+        assert a == [1, 2, 3, 4, 5]
+
+    def test_insort_left_right(self):
+        from _bisect import insort_left, insort_right
+        a = [1, 2]
+        insort_left(a, 1.0)
+        assert a == [1, 1, 2]
+        assert type(a[0]) is float
+        a = [1, 2]
+        insort_right(a, 1.0)
+        assert type(a[1]) is float
+
+    def test_not_a_list(self):
+        from _bisect import bisect_left, insort_right
+        assert bisect_left((1, 3, 5), 4) == 2
+        assert bisect_left(range(10), 5) == 5
+        raises(TypeError, bisect_left, 10, 10)
+        class MyList(list):
+            def __getitem__(self, index):
+                return -list.__getitem__(self, index)
+            def insert(self, index, item):
+                self.inserted = (index, item)
+        a = MyList([3, 2, 1])
+        assert bisect_left(a, -2) == 1
+        insort_right(a, -2)
+        assert a.inserted == (2, -2)
+
+    def test_bisect_module_uses_it(self):
+        import bisect, _bisect
+        assert bisect.bisect_left is _bisect.bisect_left
+        assert bisect.insort_right is _bisect.insort_right
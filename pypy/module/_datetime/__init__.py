@@ -0,0 +1,16 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """Interp-level helpers for the pure Python datetime module."""
+
+    appleveldefs = {}
+
+    interpleveldefs = {
+        'ymd2ord'         : 'interp_datetime.ymd2ord',
+        'ord2ymd'         : 'interp_datetime.ord2ymd',
+        'format_date'     : 'interp_datetime.format_date',
+        'format_time'     : 'interp_datetime.format_time',
+        'format_datetime' : 'interp_datetime.format_datetime',
+        'strptime'        : 'interp_datetime.strptime',
+        'unbox_slots'     : 'interp_datetime.unbox_slots',
+    }
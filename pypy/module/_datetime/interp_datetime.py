@@ -0,0 +1,282 @@
+"""Interp-level helpers for lib_pypy/datetime.py.
+
+The date, time, datetime and timedelta classes stay at app-level, which is
+what cpyext/cdatetime.py and the pickles expect.  Their fields are slots,
+which unbox_slots() asks mapdict to store unboxed when they hold ints.
+This module also provides the parts that dominate the common operations:
+the conversions between (year, month, day) and proleptic Gregorian
+ordinals, isoformat(), and strptime() for the formats using only the
+numeric directives.
+"""
+
+import sys
+
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from rpython.rlib.rstring import StringBuilder
+
+DAYS_IN_MONTH = [-1, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+DAYS_BEFORE_MONTH = [-1, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304,
+                     334]
+
+def is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def days_before_year(year):
+    y = year - 1
+    return y * 365 + y // 4 - y // 100 + y // 400
+
+def days_in_month(year, month):
+    if month == 2 and is_leap(year):
+        return 29
+    return DAYS_IN_MONTH[month]
+
+def days_before_month(year, month):
+    result = DAYS_BEFORE_MONTH[month]
+    if month > 2 and is_leap(year):
+        result += 1
+    return result
+
+DI400Y = days_before_year(401)    # number of days in 400 years
+DI100Y = days_before_year(101)    #    "    "   "   " 100   "
+DI4Y = days_before_year(5)        #    "    "   "   "   4   "
+
+# larger years would overflow in days_before_year()
+MAX_YEAR = sys.maxint // 400
+
+
+@unwrap_spec(year=int, month=int, day=int)
+def ymd2ord(space, year, month, day):
+    """ymd2ord(year, month, day) -> ordinal, considering 01-Jan-0001 as
+day 1"""
+    if not 1 <= month <= 12:
+        raise oefmt(space.w_ValueError, "month must be in 1..12")
+    dim = days_in_month(year, month)
+    if not 1 <= day <= dim:
+        raise oefmt(space.w_ValueError, "day must be in 1..%d", dim)
+    if not -MAX_YEAR <= year <= MAX_YEAR:
+        raise oefmt(space.w_OverflowError, "year is out of range")
+    return space.newint(days_before_year(year) +
+                        days_before_month(year, month) + day)
+
+@unwrap_spec(n=int)
+def ord2ymd(space, n):
+    """ord2ymd(ordinal) -> (year, month, day), considering 01-Jan-0001 as
+day 1"""
+    # see _ord2ymd() in datetime.py for the explanations
+    n -= 1
+    n400 = n // DI400Y
+    n = n % DI400Y
+    year = n400 * 400 + 1
+    n100 = n // DI100Y
+    n = n % DI100Y
+    n4 = n // DI4Y
+    n = n % DI4Y
+    n1 = n // 365
+    n = n % 365
+    year += n100 * 100 + n4 * 4 + n1
+    if n1 == 4 or n100 == 4:
+        return space.newtuple([space.newint(year - 1), space.newint(12),
+                               space.newint(31)])
+    leapyear = n1 == 3 and (n4 != 24 or n100 == 3)
+    month = (n + 50) >> 5
+    preceding = DAYS_BEFORE_MONTH[month]
+    if month > 2 and leapyear:
+        preceding += 1
+    if preceding > n:  # estimate is too large
+        month -= 1
+        preceding -= DAYS_IN_MONTH[month]
+        if month == 2 and leapyear:
+            preceding -= 1
+    n -= preceding
+    return space.newtuple([space.newint(year), space.newint(month),
+                           space.newint(n + 1)])
+
+
+def _append_padded(builder, value, width):
+    # like '%0*d' % (width, value)
+    digits = str(value)
+    if value < 0:
+        builder.append('-')
+        digits = digits[1:]
+        width -= 1
+    for i in range(width - len(digits)):
+        builder.append('0')
+    builder.append(digits)
+
+def _append_date(builder, year, month, day):
+    _append_padded(builder, year, 4)
+    builder.append('-')
+    _append_padded(builder, month, 2)
+    builder.append('-')
+    _append_padded(builder, day, 2)
+
+def _append_time(builder, hour, minute, second, microsecond):
+    _append_padded(builder, hour, 2)
+    builder.append(':')
+    _append_padded(builder, minute, 2)
+    builder.append(':')
+    _append_padded(builder, second, 2)
+    if microsecond:
+        builder.append('.')
+        _append_padded(builder, microsecond, 6)
+
+@unwrap_spec(year=int, month=int, day=int)
+def format_date(space, year, month, day):
+    """format_date(year, month, day) -> 'YYYY-MM-DD'"""
+    builder = StringBuilder(10)
+    _append_date(builder, year, month, day)
+    return space.newbytes(builder.build())
+
+@unwrap_spec(hour=int, minute=int, second=int, microsecond=int)
+def format_time(space, hour, minute, second, microsecond):
+    """format_time(hour, minute, second, microsecond) -> 'HH:MM:SS.mmmmmm',
+or 'HH:MM:SS' if microsecond is 0"""
+    builder = StringBuilder(15)
+    _append_time(builder, hour, minute, second, microsecond)
+    return space.newbytes(builder.build())
+
+@unwrap_spec(year=int, month=int, day=int, hour=int, minute=int, second=int,
+             microsecond=int, sep=str)
+def format_datetime(space, year, month, day, hour, minute, second,
+                    microsecond, sep):
+    """format_datetime(year, month, day, hour, minute, second, microsecond,
+sep) -> 'YYYY-MM-DD' + sep + 'HH:MM:SS.mmmmmm'"""
+    builder = StringBuilder(26)
+    _append_date(builder, year, month, day)
+    builder.append(sep)
+    _append_time(builder, hour, minute, second, microsecond)
+    return space.newbytes(builder.build())
+
+
+# ____________________________________________________________
+# strptime()
+#
+# Only the directives %Y, %m, %d, %H, %M, %S, %f and %% are handled here.
+# The parsing follows the regular expressions that _strptime.py builds
+# for them, trying the alternatives in the same order: a field is read as
+# two digits if they form a valid value, and as one digit otherwise.  If
+# this does not match the whole string, None is returned and _strptime.py
+# is used instead, which backtracks if needed or raises the ValueError.
+
+WHITESPACE = ' \t\n\r\f\v'
+
+# directive -> (index in the result, minimal value, maximal value)
+NUMERIC_FIELDS = {
+    'm': (1, 1, 12),
+    'd': (2, 1, 31),
+    'H': (3, 0, 23),
+    'M': (4, 0, 59),
+    'S': (5, 0, 61),
+}
+
+def _digit(s, pos):
+    if pos < len(s) and '0' <= s[pos] <= '9':
+        return ord(s[pos]) - ord('0')
+    return -1
+
+def _same_char(c1, c2):
+    # the regular expression is compiled with re.IGNORECASE
+    return c1 == c2 or (c1.isalpha() and c1.lower() == c2.lower())
+
+def parse_numeric_format(string, format):
+    """Return the list [year, month, day, hour, minute, second, microsecond]
+    parsed from 'string', or None."""
+    fields = [1900, 1, 1, 0, 0, 0, 0]
+    pos = 0
+    i = 0
+    while i < len(format):
+        c = format[i]
+        i += 1
+        if c in WHITESPACE:
+            # a run of whitespace in the format matches '\s+'
+            while i < len(format) and format[i] in WHITESPACE:
+                i += 1
+            if pos >= len(string) or string[pos] not in WHITESPACE:
+                return None
+            while pos < len(string) and string[pos] in WHITESPACE:
+                pos += 1
+            continue
+        if c != '%':
+            if pos >= len(string) or not _same_char(c, string[pos]):
+                return None
+            pos += 1
+            continue
+        if i == len(format):
+            return None
+        c = format[i]
+        i += 1
+        if c == '%':
+            if pos >= len(string) or string[pos] != '%':
+                return None
+            pos += 1
+        elif c == 'Y':
+            value = 0
+            for k in range(4):
+                digit = _digit(string, pos)
+                if digit < 0:
+                    return None
+                value = value * 10 + digit
+                pos += 1
+            fields[0] = value
+        elif c == 'f':
+            value = 0
+            count = 0
+            while count < 6:
+                digit = _digit(string, pos)
+                if digit < 0:
+                    break
+                value = value * 10 + digit
+                pos += 1
+                count += 1
+            if count == 0:
+                return None
+            while count < 6:
+                value *= 10
+                count += 1
+            fields[6] = value
+        elif c in NUMERIC_FIELDS:
+            index, minvalue, maxvalue = NUMERIC_FIELDS[c]
+            digit = _digit(string, pos)
+            if digit < 0:
+                return None
+            digit2 = _digit(string, pos + 1)
+            if digit2 >= 0 and minvalue <= digit * 10 + digit2 <= maxvalue:
+                fields[index] = digit * 10 + digit2
+                pos += 2
+            elif digit >= minvalue:
+                fields[index] = digit
+                pos += 1
+            else:
+                return None
+        else:
+            return None
+    if pos != len(string):
+        return None
+    return fields
+
+@unwrap_spec(string=str, format=str)
+def strptime(space, string, format):
+    """strptime(string, format) -> (year, month, day, hour, minute, second,
+microsecond), or None if the format is not one of the simple numeric ones
+or if the string does not match it.  In the latter cases, _strptime must
+be used."""
+    fields = parse_numeric_format(string, format)
+    if fields is None:
+        return space.w_None
+    return space.newtuple([space.newint(value) for value in fields])
+
+
+def unbox_slots(space, w_cls):
+    """unbox_slots(cls) -> cls
+
+Store the slots of the instances of 'cls' unboxed when they hold ints or
+floats, like the instance attributes.  Only the instances of 'cls' itself
+are concerned, not the ones of its subclasses.  Meant as a class
+decorator: the instances created before the call keep boxed slots."""
+    from pypy.objspace.std.typeobject import W_TypeObject
+    if not isinstance(w_cls, W_TypeObject):
+        raise oefmt(space.w_TypeError, "expected a new-style class, got %T",
+                    w_cls)
+    w_cls.terminator.unbox_slots = True
+    return w_cls
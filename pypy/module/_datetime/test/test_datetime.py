@@ -0,0 +1,145 @@
+from pypy.objspace.std.mapdict import UnboxedPlainAttribute
+
+
+class AppTestDatetime:
+    spaceconfig = {"usemodules": ['_datetime', 'time', 'binascii', 'struct']}
+
+    def test_dict(self):
+        import _datetime
+        _datetime.__dict__  # crashes if entries in __init__.py can't be resolved
+
+    def test_ordinals(self):
+        import _datetime
+        assert _datetime.ymd2ord(1, 1, 1) == 1
+        assert _datetime.ymd2ord(1970, 1, 1) == 719163
+        assert _datetime.ymd2ord(2000, 12, 31) == 730485
+        assert _datetime.ymd2ord(9999, 12, 31) == 3652059
+        for n in [1, 59, 60, 365, 366, 719163, 730485, 730484, 3652059,
+                  146097, 146096, 36524, 36525, 1461, 1460, 0, -5]:
+            y, m, d = _datetime.ord2ymd(n)
+            assert _datetime.ymd2ord(y, m, d) == n
+        for y in [1, 4, 100, 400, 1900, 2000, 2001, 2004, 9999]:
+            for m in range(1, 13):
+                for d in [1, 28]:
+                    n = _datetime.ymd2ord(y, m, d)
+                    assert _datetime.ord2ymd(n) == (y, m, d)
+        assert _datetime.ord2ymd(_datetime.ymd2ord(2004, 2, 29)) == (2004, 2,
+                                                                       29)
+        raises(ValueError, _datetime.ymd2ord, 2001, 2, 29)
+        raises(ValueError, _datetime.ymd2ord, 2001, 13, 1)
+
+    def test_format(self):
+        import _datetime
+        assert _datetime.format_date(2017, 1, 5) == '2017-01-05'
+        assert _datetime.format_date(1, 12, 31) == '0001-12-31'
+        assert _datetime.format_time(1, 2, 3, 0) == '01:02:03'
+        assert _datetime.format_time(23, 59, 59, 42) == '23:59:59.000042'
+        assert _datetime.format_datetime(2017, 1, 5, 1, 2, 3, 0,
+                                         'T') == '2017-01-05T01:02:03'
+        assert _datetime.format_datetime(2017, 1, 5, 1, 2, 3, 999999,
+                                         ' ') == '2017-01-05 01:02:03.999999'
+        assert _datetime.format_date(-1, 2, 3) == '%04d-%02d-%02d' % (-1, 2, 3)
+
+    def test_strptime(self):
+        import _datetime
+        strptime = _datetime.strptime
+        assert strptime('2004-12-01 13:02:47', '%Y-%m-%d %H:%M:%S') == (
+            2004, 12, 1, 13, 2, 47, 0)
+        assert strptime('2004-12-01T13:02:47.123', '%Y-%m-%dT%H:%M:%S.%f') == (
+            2004, 12, 1, 13, 2, 47, 123000)
+        assert strptime('20041201130247', '%Y%m%d%H%M%S') == (
+            2004, 12, 1, 13, 2, 47, 0)
+        assert strptime('3/7', '%m/%d') == (1900, 3, 7, 0, 0, 0, 0)
+        assert strptime('12 \t 5', '%m %d') == (1900, 12, 5, 0, 0, 0, 0)
+        assert strptime('2004t01', '%YT%m') == (2004, 1, 1, 0, 0, 0, 0)
+        assert strptime('10%', '%S%%') == (1900, 1, 1, 0, 0, 10, 0)
+        # not handled here
+        assert strptime('Dec 2004', '%b %Y') is None
+        assert strptime('2004', '%y') is None
+        assert strptime('2004-12', '%Y') is None
+        assert strptime('04', '%Y') is None
+        assert strptime('13', '%m') is None
+        assert strptime(' 5', '%d') is None
+        assert strptime('1', '%') is None
+
+    def test_same_as_strptime_module(self):
+        import _datetime, _strptime
+        for string, format in [
+                ('2004-12-01 13:02:47', '%Y-%m-%d %H:%M:%S'),
+                ('2004-2-1 3:2:7', '%Y-%m-%d %H:%M:%S'),
+                ('2004-02-29', '%Y-%m-%d'),
+                ('13:02:47.5', '%H:%M:%S.%f'),
+                ('1231', '%m%d'),
+                ('123', '%m%d'),
+                ('2359', '%H%M'),
+                ('240', '%H%M'),
+                ('0101', '%m%d'),
+                ('61', '%S'),
+                ('7', '%M'),
+                ]:
+            fields = _datetime.strptime(string, format)
+            struct, micros = _strptime._strptime(string, format)
+            assert fields == tuple(struct[0:6]) + (micros,)
+
+    def test_datetime_module(self):
+        import datetime
+        dt = datetime.datetime.strptime('2004-12-01 13:02:47',
+                                        '%Y-%m-%d %H:%M:%S')
+        assert dt == datetime.datetime(2004, 12, 1, 13, 2, 47)
+        assert dt.isoformat() == '2004-12-01T13:02:47'
+        assert str(dt.replace(microsecond=5)) == '2004-12-01 13:02:47.000005'
+        assert dt.isoformat(u'x') == u'2004-12-01x13:02:47'
+        assert dt.date().isoformat() == '2004-12-01'
+        assert dt.time().isoformat() == '13:02:47'
+        assert dt + datetime.timedelta(days=40) == datetime.datetime(
+            2005, 1, 10, 13, 2, 47)
+        assert datetime.date.fromordinal(dt.toordinal()) == dt.date()
+        class sub(datetime.datetime):
+            pass
+        assert type(sub.strptime('2004', '%Y')) is sub
+        raises(ValueError, datetime.datetime.strptime, '2004-13', '%Y-%m')
+        raises(ValueError, datetime.datetime.strptime, '2001-02-29',
+               '%Y-%m-%d')
+
+    def test_unbox_slots(self):
+        import _datetime
+        @_datetime.unbox_slots
+        class A(object):
+            __slots__ = ('x', 'y', 'z')
+        a = A()
+        a.x = 3
+        a.y = 4.5
+        assert (a.x, a.y) == (3, 4.5)
+        assert type(a.x) is int
+        assert not hasattr(a, 'z')
+        a.x += 1
+        a.y = "y"
+        assert (a.x, a.y) == (4, "y")
+        del a.x
+        assert not hasattr(a, 'x')
+        a.z = -1
+        a.x = 2.5
+        assert (a.x, a.y, a.z) == (2.5, "y", -1)
+        raises(TypeError, _datetime.unbox_slots, 42)
+
+
+class TestUnboxedDatetime:
+    spaceconfig = {"usemodules": ['_datetime', 'time', 'binascii', 'struct']}
+
+    def test_fields_are_unboxed(self):
+        space = self.space
+        w_d, w_sub = space.fixedview(space.appexec([], """():
+            import datetime
+            class sub(datetime.date):
+                pass
+            return datetime.date(2017, 1, 5), sub(2017, 1, 5)
+        """))
+        map = w_d._get_mapdict_map()
+        assert isinstance(map, UnboxedPlainAttribute)
+        # _year, _month, _day and _hashcode share one UnboxedValues
+        assert map.length() == 1
+        assert space.int_w(space.getattr(w_d, space.wrap('year'))) == 2017
+        # the subclasses don't unbox their slots
+        map = w_sub._get_mapdict_map()
+        assert not isinstance(map, UnboxedPlainAttribute)
+        assert space.int_w(space.getattr(w_sub, space.wrap('day'))) == 5
@@ -0,0 +1,14 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """Heap queue algorithm (a.k.a. priority queue)."""
+
+    appleveldefs = {}
+
+    interpleveldefs = {
+        'heappush'    : 'interp_heapq.heappush',
+        'heappop'     : 'interp_heapq.heappop',
+        'heapreplace' : 'interp_heapq.heapreplace',
+        'heappushpop' : 'interp_heapq.heappushpop',
+        'heapify'     : 'interp_heapq.heapify',
+    }
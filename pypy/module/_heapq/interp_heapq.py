@@ -0,0 +1,256 @@
+"""Interp-level version of the C helpers of heapq.py.
+
+If the heap is a list using the integer or float strategy, and the items
+pushed are of the same type, the heap is sifted directly on the unwrapped
+storage of the list.  Otherwise, the items are compared like heapq.py does
+it, with '<' if the item has a '__lt__' method, else with 'not (y <= x)'.
+"""
+
+from pypy.interpreter.error import oefmt
+from pypy.objspace.std.floatobject import W_FloatObject
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.listobject import (
+    W_ListObject, BaseRangeListStrategy, IntegerListStrategy,
+    FloatListStrategy)
+from rpython.rlib import jit
+from rpython.rlib.unroll import unrolling_iterable
+
+
+def make_unboxed_heap(strategycls, itemcls):
+
+    def _siftdown(heap, startpos, pos):
+        newitem = heap[pos]
+        while pos > startpos:
+            parentpos = (pos - 1) >> 1
+            parent = heap[parentpos]
+            if newitem < parent:
+                heap[pos] = parent
+                pos = parentpos
+                continue
+            break
+        heap[pos] = newitem
+
+    def _siftup(heap, pos):
+        endpos = len(heap)
+        startpos = pos
+        newitem = heap[pos]
+        childpos = 2 * pos + 1
+        while childpos < endpos:
+            rightpos = childpos + 1
+            if rightpos < endpos and not heap[childpos] < heap[rightpos]:
+                childpos = rightpos
+            heap[pos] = heap[childpos]
+            pos = childpos
+            childpos = 2 * pos + 1
+        heap[pos] = newitem
+        _siftdown(heap, startpos, pos)
+
+    class UnboxedHeap(object):
+        @staticmethod
+        def get_storage(space, w_heap):
+            """Return the list of unwrapped items of 'w_heap', or None if
+            it does not use this strategy."""
+            if w_heap.strategy is space.fromcache(strategycls):
+                return strategycls.unerase(w_heap.lstorage)
+            return None
+
+        @staticmethod
+        def is_correct_type(w_item):
+            return type(w_item) is itemcls
+
+        @staticmethod
+        def unwrap(space, w_item):
+            return space.fromcache(strategycls).unwrap(w_item)
+
+        @staticmethod
+        def wrap(space, item):
+            return space.fromcache(strategycls).wrap(item)
+
+        @staticmethod
+        def push(heap, item):
+            heap.append(item)
+            _siftdown(heap, 0, len(heap) - 1)
+
+        @staticmethod
+        def pop(heap):
+            lastelt = heap.pop()
+            if heap:
+                returnitem = heap[0]
+                heap[0] = lastelt
+                _siftup(heap, 0)
+                return returnitem
+            return lastelt
+
+        @staticmethod
+        def replace(heap, item):
+            returnitem = heap[0]
+            heap[0] = item
+            _siftup(heap, 0)
+            return returnitem
+
+        @staticmethod
+        def heapify(heap):
+            for i in range(len(heap) // 2 - 1, -1, -1):
+                _siftup(heap, i)
+
+    UnboxedHeap.__name__ = 'UnboxedHeap_' + itemcls.__name__
+    return UnboxedHeap
+
+IntHeap = make_unboxed_heap(IntegerListStrategy, W_IntObject)
+FloatHeap = make_unboxed_heap(FloatListStrategy, W_FloatObject)
+unrolling_heaps = unrolling_iterable([IntHeap, FloatHeap])
+
+
+siftdown_driver = jit.JitDriver(name='heapq_siftdown',
+                                greens=['w_type'], reds='auto')
+siftup_driver = jit.JitDriver(name='heapq_siftup',
+                              greens=['w_type'], reds='auto')
+
+class ObjectHeap(object):
+    """Heap operations on a list of any strategy."""
+
+    def __init__(self, space, w_heap):
+        self.space = space
+        self.w_heap = w_heap
+
+    def lt(self, w_x, w_y):
+        space = self.space
+        size = self.w_heap.length()
+        if space.lookup(w_x, '__lt__') is not None:
+            result = space.is_true(space.lt(w_x, w_y))
+        else:
+            result = not space.is_true(space.le(w_y, w_x))
+        if self.w_heap.length() != size:
+            raise oefmt(space.w_RuntimeError,
+                        "list changed size during iteration")
+        return result
+
+    def siftdown(self, startpos, pos):
+        w_heap = self.w_heap
+        w_newitem = w_heap.getitem(pos)
+        w_type = self.space.type(w_newitem)
+        while pos > startpos:
+            siftdown_driver.jit_merge_point(w_type=w_type)
+            parentpos = (pos - 1) >> 1
+            w_parent = w_heap.getitem(parentpos)
+            if self.lt(w_newitem, w_parent):
+                w_heap.setitem(pos, w_parent)
+                pos = parentpos
+                continue
+            break
+        w_heap.setitem(pos, w_newitem)
+
+    def siftup(self, pos):
+        w_heap = self.w_heap
+        endpos = w_heap.length()
+        startpos = pos
+        w_newitem = w_heap.getitem(pos)
+        w_type = self.space.type(w_newitem)
+        childpos = 2 * pos + 1
+        while childpos < endpos:
+            siftup_driver.jit_merge_point(w_type=w_type)
+            rightpos = childpos + 1
+            if rightpos < endpos and not self.lt(w_heap.getitem(childpos),
+                                                 w_heap.getitem(rightpos)):
+                childpos = rightpos
+            w_heap.setitem(pos, w_heap.getitem(childpos))
+            pos = childpos
+            childpos = 2 * pos + 1
+        w_heap.setitem(pos, w_newitem)
+        self.siftdown(startpos, pos)
+
+
+def _check_heap(space, w_heap):
+    if not isinstance(w_heap, W_ListObject):
+        raise oefmt(space.w_TypeError, "heap argument must be a list")
+    if isinstance(w_heap.strategy, BaseRangeListStrategy):
+        # the heap is going to be modified anyway
+        w_heap.strategy.switch_to_integer_strategy(w_heap)
+    return w_heap
+
+
+def heappush(space, w_heap, w_item):
+    """Push item onto heap, maintaining the heap invariant."""
+    w_heap = _check_heap(space, w_heap)
+    for Heap in unrolling_heaps:
+        heap = Heap.get_storage(space, w_heap)
+        if heap is not None and Heap.is_correct_type(w_item):
+            Heap.push(heap, Heap.unwrap(space, w_item))
+            return
+    w_heap.append(w_item)
+    ObjectHeap(space, w_heap).siftdown(0, w_heap.length() - 1)
+
+def heappop(space, w_heap):
+    """Pop the smallest item off the heap, maintaining the heap invariant."""
+    w_heap = _check_heap(space, w_heap)
+    if w_heap.length() == 0:
+        raise oefmt(space.w_IndexError, "index out of range")
+    for Heap in unrolling_heaps:
+        heap = Heap.get_storage(space, w_heap)
+        if heap is not None:
+            return Heap.wrap(space, Heap.pop(heap))
+    w_lastelt = w_heap.pop_end()
+    if w_heap.length() == 0:
+        return w_lastelt
+    w_returnitem = w_heap.getitem(0)
+    w_heap.setitem(0, w_lastelt)
+    ObjectHeap(space, w_heap).siftup(0)
+    return w_returnitem
+
+def heapreplace(space, w_heap, w_item):
+    """Pop and return the current smallest value, and add the new item.
+
+This is more efficient than heappop() followed by heappush(), and can be
+more appropriate when using a fixed-size heap.  Note that the value
+returned may be larger than item!  That constrains reasonable uses of
+this routine unless written as part of a conditional replacement:
+
+        if item > heap[0]:
+            item = heapreplace(heap, item)
+"""
+    w_heap = _check_heap(space, w_heap)
+    if w_heap.length() == 0:
+        raise oefmt(space.w_IndexError, "index out of range")
+    for Heap in unrolling_heaps:
+        heap = Heap.get_storage(space, w_heap)
+        if heap is not None and Heap.is_correct_type(w_item):
+            return Heap.wrap(space, Heap.replace(heap,
+                                                 Heap.unwrap(space, w_item)))
+    w_returnitem = w_heap.getitem(0)
+    w_heap.setitem(0, w_item)
+    ObjectHeap(space, w_heap).siftup(0)
+    return w_returnitem
+
+def heappushpop(space, w_heap, w_item):
+    """Push item on the heap, then pop and return the smallest item
+from the heap. The combined action runs more efficiently than
+heappush() followed by a separate call to heappop()."""
+    w_heap = _check_heap(space, w_heap)
+    for Heap in unrolling_heaps:
+        heap = Heap.get_storage(space, w_heap)
+        if heap is not None and Heap.is_correct_type(w_item):
+            item = Heap.unwrap(space, w_item)
+            if heap and heap[0] < item:
+                return Heap.wrap(space, Heap.replace(heap, item))
+            return w_item
+    if w_heap.length() == 0:
+        return w_item
+    objheap = ObjectHeap(space, w_heap)
+    w_top = w_heap.getitem(0)
+    if not objheap.lt(w_top, w_item):
+        return w_item
+    w_heap.setitem(0, w_item)
+    objheap.siftup(0)
+    return w_top
+
+def heapify(space, w_heap):
+    """Transform list into a heap, in-place, in O(len(heap)) time."""
+    w_heap = _check_heap(space, w_heap)
+    for Heap in unrolling_heaps:
+        heap = Heap.get_storage(space, w_heap)
+        if heap is not None:
+            Heap.heapify(heap)
+            return
+    objheap = ObjectHeap(space, w_heap)
+    for i in range(w_heap.length() // 2 - 1, -1, -1):
+        objheap.siftup(i)
@@ -0,0 +1,175 @@
+class AppTestHeapq:
+    spaceconfig = {"usemodules": ['_heapq', '__pypy__']}
+
+    def test_dict(self):
+        import _heapq
+        _heapq.__dict__  # crashes if entries in __init__.py can't be resolved
+
+    def test_push_pop_ints(self):
+        import _heapq
+        from __pypy__ import strategy
+        data = [17, 3, 45, 2, 99, -5, 3, 0, 12, 8]
+        heap = []
+        for x in data:
+            _heapq.heappush(heap, x)
+        assert strategy(heap) == "IntegerListStrategy"
+        assert heap[0] == -5
+        result = [_heapq.heappop(heap) for i in range(len(data))]
+        assert result == sorted(data)
+        assert heap == []
+        raises(IndexError, _heapq.heappop, heap)
+
+    def test_push_pop_floats(self):
+        import _heapq
+        from __pypy__ import strategy
+        data = [1.5, -2.25, 1e300, 0.0, -0.0, 7.5, 3.25]
+        heap = []
+        for x in data:
+            _heapq.heappush(heap, x)
+        assert strategy(heap) == "FloatListStrategy"
+        result = [_heapq.heappop(heap) for i in range(len(data))]
+        assert result == sorted(data)
+
+    def test_push_pop_objects(self):
+        import _heapq
+        data = ["foo", "bar", "baz", "spam", "eggs", "a"]
+        heap = []
+        for x in data:
+            _heapq.heappush(heap, x)
+        result = [_heapq.heappop(heap) for i in range(len(data))]
+        assert result == sorted(data)
+        #
+        data = [(3, 'c'), (1, 'a'), (2, 'b'), (0, 'z')]
+        heap = []
+        for x in data:
+            _heapq.heappush(heap, x)
+        assert _heapq.heappop(heap) == (0, 'z')
+        assert _heapq.heappop(heap) == (1, 'a')
+
+    def test_switch_strategy(self):
+        import _heapq
+        from __pypy__ import strategy
+        heap = [5, 1, 3]
+        _heapq.heapify(heap)
+        assert strategy(heap) == "IntegerListStrategy"
+        _heapq.heappush(heap, 2.5)
+        assert strategy(heap) != "IntegerListStrategy"
+        _heapq.heappush(heap, 0)
+        result = [_heapq.heappop(heap) for i in range(5)]
+        assert result == [0, 1, 2.5, 3, 5]
+        #
+        heap = [0.5, 1.5]
+        _heapq.heappush(heap, True)
+        assert strategy(heap) != "FloatListStrategy"
+        assert heap[0] == 0.5
+
+    def test_heapify(self):
+        import _heapq
+        ints = [(i * 7919) % 1009 for i in range(100)]
+        for data in [range(100), ints, [x / 7.0 for x in ints],
+                     [str(x) for x in ints]]:
+            data = list(data)
+            heap = data[:]
+            _heapq.heapify(heap)
+            for i in range(1, len(heap)):
+                assert heap[(i - 1) // 2] <= heap[i]
+            assert [_heapq.heappop(heap) for x in data] == sorted(data)
+
+    def test_heapify_range(self):
+        import _heapq
+        heap = range(10, 0, -1)
+        _heapq.heapify(heap)
+        assert heap[0] == 1
+        assert _heapq.heappop(heap) == 1
+        assert _heapq.heappop(heap) == 2
+
+    def test_heapreplace(self):
+        import _heapq
+        for heap in [[1, 3, 5], [1.0, 3.0, 5.0], ['1', '3', '5']]:
+            first = heap[0]
+            assert _heapq.heapreplace(heap, heap[1]) == first
+            assert heap[0] == heap[1]
+        raises(IndexError, _heapq.heapreplace, [], 5)
+        heap = [1, 3, 5]
+        assert _heapq.heapreplace(heap, 7.5) == 1
+        assert heap == [3, 7.5, 5]
+
+    def test_heappushpop(self):
+        import _heapq
+        heap = []
+        x = _heapq.heappushpop(heap, 10)
+        assert (heap, x) == ([], 10)
+        heap = [10]
+        x = _heapq.heappushpop(heap, 10.0)
+        assert (heap, x) == ([10], 10.0)
+        assert type(heap[0]) is int
+        assert type(x) is float
+        heap = [10]
+        x = _heapq.heappushpop(heap, 9)
+        assert (heap, x) == ([10], 9)
+        heap = [10]
+        x = _heapq.heappushpop(heap, 11)
+        assert (heap, x) == ([11], 10)
+        heap = [1.5, 2.5]
+        x = _heapq.heappushpop(heap, 2.0)
+        assert (heap, x) == ([2.0, 2.5], 1.5)
+        heap = ["b"]
+        x = _heapq.heappushpop(heap, "a")
+        assert (heap, x) == (["b"], "a")
+        x = _heapq.heappushpop(heap, "c")
+        assert (heap, x) == (["c"], "b")
+
+    def test_non_list(self):
+        import _heapq
+        raises(TypeError, _heapq.heappush, (), 1)
+        raises(TypeError, _heapq.heappop, None)
+        raises(TypeError, _heapq.heapify, (3, 2, 1))
+        raises(TypeError, _heapq.heapreplace, {}, 1)
+        raises(TypeError, _heapq.heappushpop, "abc", 1)
+        class L(list):
+            pass
+        heap = L([3, 1, 2])
+        _heapq.heapify(heap)
+        assert heap[0] == 1
+
+    def test_only_le(self):
+        import _heapq
+        class LE(object):
+            def __init__(self, x):
+                self.x = x
+            def __le__(self, other):
+                return self.x <= other.x
+        heap = []
+        for x in [5, 1, 4, 2]:
+            _heapq.heappush(heap, LE(x))
+        assert [_heapq.heappop(heap).x for i in range(4)] == [1, 2, 4, 5]
+
+    def test_comparison_error(self):
+        import _heapq
+        class Bad(object):
+            def __lt__(self, other):
+                raise ZeroDivisionError
+        heap = [Bad(), Bad()]
+        raises(ZeroDivisionError, _heapq.heapify, heap)
+        raises(ZeroDivisionError, _heapq.heappush, heap, Bad())
+
+    def test_mutating_heap(self):
+        import _heapq
+        heap = []
+        class Evil(object):
+            def __lt__(self, other):
+                del heap[:]
+                return False
+        heap.extend([Evil(), Evil()])
+        raises(RuntimeError, _heapq.heappushpop, heap, Evil())
+        heap.extend([Evil(), Evil()])
+        raises(RuntimeError, _heapq.heappush, heap, Evil())
+
+    def test_heapq_module_uses_it(self):
+        import heapq, _heapq
+        assert heapq.heappush is _heapq.heappush
+        assert heapq.heappop is _heapq.heappop
+        assert heapq.nsmallest(3, [5, 2, 8, 1, 9]) == [1, 2, 5]
+        assert heapq.nlargest(2, [5.5, 2.5, 8.5, 1.5]) == [8.5, 5.5]
+        assert list(heapq.merge([1, 4, 7], [2, 5], [3.5])) == [
+            1, 2, 3.5, 4, 5, 7]
@@ -0,0 +1,15 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """Interp-level Pickler and Unpickler, used by cPickle."""
+
+    appleveldefs = {}
+
+    interpleveldefs = {
+        'Pickler'   : 'interp_pickle.W_Pickler',
+        'Unpickler' : 'interp_pickle.W_Unpickler',
+        'dump'      : 'interp_pickle.dump',
+        'dumps'     : 'interp_pickle.dumps',
+        'load'      : 'interp_pickle.load',
+        'loads'     : 'interp_pickle.loads',
+    }
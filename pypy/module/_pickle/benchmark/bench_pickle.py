@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+""" Compare the speed of the interp-level cPickle (from the _pickle module)
+with the app-level one kept in lib_pypy/cPickle.py as AppPickler and
+AppUnpickler.  Run it with a translated pypy-c:
+
+    pypy-c bench_pickle.py [number of repetitions]
+"""
+
+import sys, time
+import cPickle
+from StringIO import StringIO
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+def make_samples():
+    return [
+        ('ints', range(100000)),
+        ('floats', [i / 7.0 for i in range(100000)]),
+        ('strings', [str(i) * 3 for i in range(50000)]),
+        ('dicts', [{'id': i, 'name': 'item%d' % i, 'price': i * 0.5,
+                    'tags': ['a', 'b']} for i in range(10000)]),
+        ('tuples', [(i, -i, str(i)) for i in range(30000)]),
+        ('instances', [Point(i, i + 0.5) for i in range(10000)]),
+        ('int set', set(range(50000))),
+        ]
+
+def app_dumps(obj, proto):
+    p = cPickle.AppPickler(proto)
+    p.dump(obj)
+    return p.getvalue()
+
+def app_loads(s):
+    return cPickle.AppUnpickler(StringIO(s)).load()
+
+def timeit(func, arg, repeat):
+    best = None
+    for i in range(repeat):
+        t0 = time.time()
+        func(arg)
+        t = time.time() - t0
+        if best is None or t < best:
+            best = t
+    return best
+
+def main(repeat=5):
+    if getattr(cPickle, 'AppPickler', cPickle.Pickler) is cPickle.Pickler:
+        print 'no interp-level _pickle module, nothing to compare'
+        return
+    print '%-10s %5s %10s %10s %7s %10s %10s %7s' % (
+        'sample', 'proto', 'app dump', 'dump', 'ratio',
+        'app load', 'load', 'ratio')
+    for name, obj in make_samples():
+        for proto in [0, 2]:
+            s = cPickle.dumps(obj, proto)
+            assert app_dumps(obj, proto) == s
+            t_app_dump = timeit(lambda x: app_dumps(x, proto), obj, repeat)
+            t_dump = timeit(lambda x: cPickle.dumps(x, proto), obj, repeat)
+            t_app_load = timeit(app_loads, s, repeat)
+            t_load = timeit(cPickle.loads, s, repeat)
+            print '%-10s %5d %10.4f %10.4f %6.1fx %10.4f %10.4f %6.1fx' % (
+                name, proto, t_app_dump, t_dump, t_app_dump / t_dump,
+                t_app_load, t_load, t_app_load / t_load)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
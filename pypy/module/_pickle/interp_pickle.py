@@ -0,0 +1,1506 @@
+"""Interp-level implementation of the pickle protocols 0, 1 and 2.
+
+The output is the same as the one of the app-level Pickler in
+lib_pypy/cPickle.py (which numbers the memo from 1, like CPython's
+cPickle).  Lists, sets and frozensets using the integer, float or bytes
+strategy are written directly from their unwrapped items.  The memo is
+keyed on the identity of the objects as given by id(), which for str
+and unicode objects is the identity of the unwrapped string.  The rarely
+used paths that are mostly calls to app-level code anyway (__reduce__,
+finding globals, __setstate__) are in the app-level helpers below.
+"""
+
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.function import BuiltinFunction, Function
+from pypy.interpreter.gateway import (
+    applevel, interp2app, unwrap_spec, WrappedDefault)
+from pypy.interpreter.typedef import GetSetProperty, TypeDef
+from pypy.interpreter import unicodehelper
+from pypy.module.__builtin__.interp_classobj import (
+    W_ClassObject, W_InstanceObject)
+from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+from pypy.objspace.std.listobject import W_ListObject
+from pypy.objspace.std.floatobject import float2string
+from rpython.rlib.objectmodel import compute_unique_id
+from rpython.rlib.rarithmetic import intmask, string_to_int
+from rpython.rlib.rbigint import rbigint
+from rpython.rlib.rstring import (
+    StringBuilder, ParseStringError, ParseStringOverflowError)
+from rpython.rlib.rstruct import ieee
+from rpython.rlib import runicode
+
+HIGHEST_PROTOCOL = 2
+BATCHSIZE = 1000
+
+MARK            = '('
+STOP            = '.'
+POP             = '0'
+POP_MARK        = '1'
+DUP             = '2'
+FLOAT           = 'F'
+INT             = 'I'
+BININT          = 'J'
+BININT1         = 'K'
+LONG            = 'L'
+BININT2         = 'M'
+NONE            = 'N'
+PERSID          = 'P'
+BINPERSID       = 'Q'
+REDUCE          = 'R'
+STRING          = 'S'
+BINSTRING       = 'T'
+SHORT_BINSTRING = 'U'
+UNICODE         = 'V'
+BINUNICODE      = 'X'
+APPEND          = 'a'
+BUILD           = 'b'
+GLOBAL          = 'c'
+DICT            = 'd'
+EMPTY_DICT      = '}'
+APPENDS         = 'e'
+GET             = 'g'
+BINGET          = 'h'
+INST            = 'i'
+LONG_BINGET     = 'j'
+LIST            = 'l'
+EMPTY_LIST      = ']'
+OBJ             = 'o'
+PUT             = 'p'
+BINPUT          = 'q'
+LONG_BINPUT     = 'r'
+SETITEM         = 's'
+TUPLE           = 't'
+EMPTY_TUPLE     = ')'
+SETITEMS        = 'u'
+BINFLOAT        = 'G'
+TRUE            = 'I01\n'
+FALSE           = 'I00\n'
+
+PROTO           = '\x80'
+NEWOBJ          = '\x81'
+EXT1            = '\x82'
+EXT2            = '\x83'
+EXT4            = '\x84'
+TUPLE1          = '\x85'
+TUPLE2          = '\x86'
+TUPLE3          = '\x87'
+NEWTRUE         = '\x88'
+NEWFALSE        = '\x89'
+LONG1           = '\x8a'
+LONG4           = '\x8b'
+
+TUPLESIZE2CODE = [EMPTY_TUPLE, TUPLE1, TUPLE2, TUPLE3]
+
+
+app = applevel(r'''
+def pickling_error(msg):
+    from pickle import PicklingError
+    return PicklingError(msg)
+
+def unpickling_error(msg):
+    from pickle import UnpicklingError
+    return UnpicklingError(msg)
+
+def get_reduce_value(obj, proto):
+    """Return the result of obj.__reduce_ex__(proto) or of the
+    copy_reg.dispatch_table entry, after checking it like pickle.py.
+    Return None if obj must be saved as a global."""
+    from copy_reg import dispatch_table
+    from pickle import PicklingError
+    t = type(obj)
+    reduce = dispatch_table.get(t)
+    if reduce:
+        rv = reduce(obj)
+    else:
+        try:
+            issc = issubclass(t, type)
+        except TypeError:
+            issc = 0
+        if issc:
+            return None
+        reduce = getattr(obj, "__reduce_ex__", None)
+        if reduce:
+            rv = reduce(proto)
+        else:
+            reduce = getattr(obj, "__reduce__", None)
+            if reduce:
+                rv = reduce()
+            else:
+                raise PicklingError("Can't pickle %r object: %r" %
+                                    (t.__name__, obj))
+    if type(rv) is str:
+        return rv
+    if type(rv) is not tuple:
+        raise PicklingError("%s must return string or tuple" % reduce)
+    l = len(rv)
+    if not (2 <= l <= 5):
+        raise PicklingError("Tuple returned by %s must have "
+                            "two to five elements" % reduce)
+    return rv + (None,) * (5 - l)
+
+def lookup_global(obj, name, proto):
+    """Return (module, name, extension code or 0) for saving obj as a
+    global, after checking that it can be found again."""
+    import sys
+    from pickle import PicklingError, whichmodule
+    from copy_reg import _extension_registry
+    if name is None:
+        name = obj.__name__
+    module = getattr(obj, "__module__", None)
+    if module is None:
+        module = whichmodule(obj, name)
+    try:
+        __import__(module)
+        mod = sys.modules[module]
+        klass = getattr(mod, name)
+    except (ImportError, KeyError, AttributeError):
+        raise PicklingError(
+            "Can't pickle %r: it's not found as %s.%s" %
+            (obj, module, name))
+    else:
+        if klass is not obj:
+            raise PicklingError(
+                "Can't pickle %r: it's not the same object as %s.%s" %
+                (obj, module, name))
+    code = 0
+    if proto >= 2:
+        code = _extension_registry.get((module, name), 0)
+    return module, name, code
+
+def check_newobj(func, args, obj):
+    """Return True if save_reduce() should use NEWOBJ."""
+    from pickle import PicklingError
+    if getattr(func, "__name__", "") != "__newobj__":
+        return False
+    cls = args[0]
+    if not hasattr(cls, "__new__"):
+        raise PicklingError(
+            "args[0] from __newobj__ args has no __new__")
+    if obj is not None and cls is not obj.__class__:
+        raise PicklingError(
+            "args[0] from __newobj__ args has the wrong class")
+    return True
+
+def module_of_moduledict(obj):
+    """If obj is the __dict__ of a module in sys.modules, return it."""
+    import sys
+    from types import ModuleType
+    try:
+        name = obj['__name__']
+        if type(name) is not str:
+            return None
+        themodule = sys.modules[name]
+        if type(themodule) is not ModuleType:
+            return None
+        if themodule.__dict__ is not obj:
+            return None
+    except (AttributeError, KeyError, TypeError):
+        return None
+    return themodule
+
+def find_class(module, name):
+    import sys
+    __import__(module)
+    mod = sys.modules[module]
+    return getattr(mod, name)
+
+def instantiate(klass, args):
+    from types import ClassType
+    if (not args and
+            type(klass) is ClassType and
+            not hasattr(klass, "__getinitargs__")):
+        class _EmptyClass:
+            pass
+        value = _EmptyClass()
+        value.__class__ = klass
+        return value
+    try:
+        return klass(*args)
+    except TypeError, err:
+        import sys
+        raise TypeError, "in constructor for %s: %s" % (
+            klass.__name__, str(err)), sys.exc_info()[2]
+
+def build(inst, state):
+    setstate = getattr(inst, "__setstate__", None)
+    if setstate:
+        setstate(state)
+        return
+    slotstate = None
+    if isinstance(state, tuple) and len(state) == 2:
+        state, slotstate = state
+    if state:
+        try:
+            d = inst.__dict__
+            try:
+                for k, v in state.iteritems():
+                    d[intern(k)] = v
+            except TypeError:
+                d.update(state)
+        except RuntimeError:
+            for k, v in state.items():
+                setattr(inst, k, v)
+    if slotstate:
+        for k, v in slotstate.items():
+            setattr(inst, k, v)
+
+def get_extension(code):
+    """Return the (module, name) registered for an extension code, or
+    the object itself if it is already in the cache."""
+    from copy_reg import _extension_cache, _inverted_registry
+    nil = []
+    obj = _extension_cache.get(code, nil)
+    if obj is not nil:
+        return obj, None
+    key = _inverted_registry.get(code)
+    if not key:
+        raise ValueError("unregistered extension code %d" % code)
+    return None, key
+
+def cache_extension(code, obj):
+    from copy_reg import _extension_cache
+    _extension_cache[code] = obj
+''', filename=__file__)
+
+pickling_error = app.interphook('pickling_error')
+unpickling_error = app.interphook('unpickling_error')
+get_reduce_value = app.interphook('get_reduce_value')
+lookup_global = app.interphook('lookup_global')
+check_newobj = app.interphook('check_newobj')
+module_of_moduledict = app.interphook('module_of_moduledict')
+app_find_class = app.interphook('find_class')
+instantiate = app.interphook('instantiate')
+build = app.interphook('build')
+get_extension = app.interphook('get_extension')
+cache_extension = app.interphook('cache_extension')
+
+def raise_pickling_error(space, msg):
+    w_exc = pickling_error(space, space.wrap(msg))
+    raise OperationError(space.type(w_exc), w_exc)
+
+def raise_unpickling_error(space, msg):
+    w_exc = unpickling_error(space, space.wrap(msg))
+    raise OperationError(space.type(w_exc), w_exc)
+
+
+def _pack_int32(builder, x):
+    builder.append(chr(x & 0xff))
+    builder.append(chr((x >> 8) & 0xff))
+    builder.append(chr((x >> 16) & 0xff))
+    builder.append(chr((x >> 24) & 0xff))
+
+def _unpack_int32(s):
+    x = (ord(s[0]) | (ord(s[1]) << 8) | (ord(s[2]) << 16) |
+         (ord(s[3]) << 24))
+    if x >= 0x80000000:
+        x -= 0x100000000
+    return intmask(x)
+
+def _fits_in_int32(x):
+    high_bits = x >> 31
+    return high_bits == 0 or high_bits == -1
+
+def _string_uid(s):
+    """Key of the str or unicode 's' in the string memos of the Pickler.
+    Like W_BytesObject.immutable_unique_id(), strings of length <= 1
+    are unique-ified."""
+    if len(s) > 1:
+        return compute_unique_id(s)
+    elif len(s) == 1:
+        return -1 - ord(s[0])
+    else:
+        return -1
+_string_uid._annspecialcase_ = 'specialize:argtype(0)'
+
+def encode_long(bigint):
+    """Encode a long to a two's complement little-endian binary string,
+    using as few bytes as possible, like pickle.encode_long()."""
+    if bigint.sign == 0:
+        return ''
+    if bigint.sign < 0:
+        nbits = bigint.invert().bit_length()
+    else:
+        nbits = bigint.bit_length()
+    return bigint.tobytes(nbits // 8 + 1, 'little', True)
+
+
+def _get_protocol(space, w_protocol):
+    if space.is_none(w_protocol):
+        return 0
+    protocol = space.int_w(w_protocol)
+    if protocol < 0:
+        protocol = HIGHEST_PROTOCOL
+    elif protocol > HIGHEST_PROTOCOL:
+        raise oefmt(space.w_ValueError, "pickle protocol must be <= %d",
+                    HIGHEST_PROTOCOL)
+    return protocol
+
+
+class W_Pickler(W_Root):
+
+    def __init__(self, space, w_file, protocol):
+        self.space = space
+        self.w_file = w_file
+        self.proto = protocol
+        self.bin = protocol >= 1
+        self.fast = False
+        self.memo = {}
+        # the str and unicode objects are memoized separately, see
+        # _string_uid(); the lists keep the keys alive
+        self.bytes_memo = {}
+        self.bytes_memo_keys = []
+        self.unicode_memo = {}
+        self.unicode_memo_keys = []
+        self.memo_next = 1      # cPickle starts counting at one
+        self.builder = StringBuilder()
+        self.w_persistent_id = None
+        self.w_func_persistent_id = None
+        self.w_dispatch_table = None
+
+    # ---------- output ----------
+
+    def write(self, s):
+        self.builder.append(s)
+
+    def flush(self):
+        if self.w_file is not None:
+            s = self.builder.build()
+            self.builder = StringBuilder()
+            self.space.call_method(self.w_file, 'write', self.space.wrap(s))
+
+    def _write_memo_opcode(self, i, shortcode, longcode, textcode):
+        if self.bin:
+            if i < 256:
+                self.write(shortcode)
+                self.write(chr(i))
+            else:
+                self.write(longcode)
+                _pack_int32(self.builder, i)
+        else:
+            self.write(textcode)
+            self.write(str(i))
+            self.write('\n')
+
+    def write_get(self, i):
+        self._write_memo_opcode(i, BINGET, LONG_BINGET, GET)
+
+    def write_put(self, i):
+        self._write_memo_opcode(i, BINPUT, LONG_BINPUT, PUT)
+
+    # ---------- memo ----------
+
+    def memoize(self, w_obj):
+        if self.fast:
+            return
+        self.memo[w_obj] = self._next_memo_index()
+
+    def _next_memo_index(self):
+        i = self.memo_next
+        self.memo_next = i + 1
+        self.write_put(i)
+        return i
+
+    def save_bytes_memoized(self, s):
+        uid = _string_uid(s)
+        i = self.bytes_memo.get(uid, -1)
+        if i >= 0:
+            self.write_get(i)
+            return
+        self.save_string(s)
+        if not self.fast:
+            self.bytes_memo[uid] = self._next_memo_index()
+            self.bytes_memo_keys.append(s)
+
+    def save_unicode_memoized(self, u):
+        uid = _string_uid(u)
+        i = self.unicode_memo.get(uid, -1)
+        if i >= 0:
+            self.write_get(i)
+            return
+        self.save_unicode(u)
+        if not self.fast:
+            self.unicode_memo[uid] = self._next_memo_index()
+            self.unicode_memo_keys.append(u)
+
+    def memoize_anonymous(self):
+        """Like memoize(), for an object that can never be seen again:
+        it still uses a memo index, so that the output is the same."""
+        if self.fast:
+            return
+        self._next_memo_index()
+
+    def memo_get(self, w_obj):
+        return self.memo.get(w_obj, -1)
+
+    def _write_get_from_memo(self, w_obj, popcount, pop_mark):
+        i = self.memo[w_obj]
+        if pop_mark:
+            self.write(POP_MARK)
+        else:
+            for k in range(popcount):
+                self.write(POP)
+        self.write_get(i)
+
+    # ---------- save ----------
+
+    def save(self, w_obj):
+        space = self.space
+        if self.w_func_persistent_id is not None:
+            w_pid = space.call_function(self.w_func_persistent_id, w_obj)
+            if not space.is_none(w_pid):
+                self.save_pers(w_pid)
+                return
+
+        w_type = space.type(w_obj)
+        if w_type is space.w_str:
+            self.save_bytes_memoized(space.str_w(w_obj))
+            return
+        if w_type is space.w_unicode:
+            self.save_unicode_memoized(space.unicode_w(w_obj))
+            return
+
+        if self.memo:
+            i = self.memo_get(w_obj)
+            if i >= 0:
+                self.write_get(i)
+                return
+
+        if w_type is space.w_int:
+            self.save_int(space.int_w(w_obj))
+        elif w_type is space.w_float:
+            self.save_float(space.float_w(w_obj))
+        elif w_type is space.w_tuple:
+            self.save_tuple(w_obj)
+        elif w_type is space.w_list:
+            assert isinstance(w_obj, W_ListObject)
+            self.save_list(w_obj)
+        elif w_type is space.w_dict:
+            assert isinstance(w_obj, W_DictMultiObject)
+            self.save_dict(w_obj)
+        elif space.is_w(w_obj, space.w_None):
+            self.write(NONE)
+        elif w_type is space.w_bool:
+            self.save_bool(space.is_true(w_obj))
+        elif w_type is space.w_long:
+            self.save_long(space.bigint_w(w_obj))
+        elif ((w_type is space.w_set or w_type is space.w_frozenset) and
+              self.save_unboxed_set(w_obj)):
+            pass
+        elif isinstance(w_obj, W_InstanceObject):
+            self.save_inst(w_obj)
+        elif (w_type is space.w_type or isinstance(w_obj, W_ClassObject) or
+              type(w_obj) is Function or type(w_obj) is BuiltinFunction):
+            self.save_global(w_obj, None)
+        else:
+            self.save_other(w_obj)
+
+    def save_other(self, w_obj):
+        space = self.space
+        w_rv = get_reduce_value(space, w_obj, space.wrap(self.proto))
+        if space.is_none(w_rv):
+            self.save_global(w_obj, None)
+        elif space.isinstance_w(w_rv, space.w_str):
+            self.save_global(w_obj, w_rv)
+        else:
+            rv_w = space.fixedview(w_rv, 5)
+            self.save_reduce(rv_w[0], rv_w[1], rv_w[2], rv_w[3], rv_w[4],
+                             w_obj)
+
+    def save_pers(self, w_pid):
+        if self.bin:
+            self.save(w_pid)
+            self.write(BINPERSID)
+        else:
+            self.write(PERSID)
+            self.write(self.space.str_w(self.space.str(w_pid)))
+            self.write('\n')
+
+    def save_reduce(self, w_func, w_args, w_state, w_listitems, w_dictitems,
+                    w_obj):
+        space = self.space
+        if not space.isinstance_w(w_args, space.w_tuple):
+            raise_pickling_error(space, "args from reduce() should be a tuple")
+        if space.findattr(w_func, space.wrap('__call__')) is None:
+            raise_pickling_error(space, "func from reduce should be callable")
+
+        if self.proto >= 2 and space.is_true(
+                check_newobj(space, w_func, w_args, w_obj)):
+            args_w = space.fixedview(w_args)
+            self.save(args_w[0])
+            self.save(space.newtuple(args_w[1:]))
+            self.write(NEWOBJ)
+        else:
+            self.save(w_func)
+            self.save(w_args)
+            self.write(REDUCE)
+
+        if w_obj is not None:
+            if self.memo_get(w_obj) >= 0:
+                self._write_get_from_memo(w_obj, 1, False)
+            else:
+                self.memoize(w_obj)
+
+        if not space.is_none(w_listitems):
+            self.batch_appends(w_listitems)
+        if not space.is_none(w_dictitems):
+            self.batch_setitems(w_dictitems)
+        if not space.is_none(w_state):
+            self.save(w_state)
+            self.write(BUILD)
+
+    def save_bool(self, value):
+        if self.proto >= 2:
+            self.write(NEWTRUE if value else NEWFALSE)
+        else:
+            self.write(TRUE if value else FALSE)
+
+    def save_int(self, x):
+        if self.bin:
+            if x >= 0:
+                if x <= 0xff:
+                    self.write(BININT1)
+                    self.write(chr(x))
+                    return
+                if x <= 0xffff:
+                    self.write(BININT2)
+                    self.write(chr(x & 0xff))
+                    self.write(chr(x >> 8))
+                    return
+            if _fits_in_int32(x):
+                self.write(BININT)
+                _pack_int32(self.builder, x)
+                return
+        self.write(INT)
+        self.write(str(x))
+        self.write('\n')
+
+    def save_long(self, bigint):
+        if self.proto >= 2:
+            data = encode_long(bigint)
+            n = len(data)
+            if n < 256:
+                self.write(LONG1)
+                self.write(chr(n))
+            else:
+                self.write(LONG4)
+                _pack_int32(self.builder, n)
+            self.write(data)
+            return
+        self.write(LONG)
+        self.write(bigint.repr())
+        self.write('\n')
+
+    def save_float(self, x):
+        if self.bin:
+            self.write(BINFLOAT)
+            ieee.pack_float(self.builder, x, 8, True)
+        else:
+            self.write(FLOAT)
+            self.write(float2string(x, 'r', 0))
+            self.write('\n')
+
+    def save_string(self, s):
+        # the caller must memoize
+        if self.bin:
+            n = len(s)
+            if n < 256:
+                self.write(SHORT_BINSTRING)
+                self.write(chr(n))
+            else:
+                self.write(BINSTRING)
+                _pack_int32(self.builder, n)
+            self.write(s)
+        else:
+            self.write(STRING)
+            self.write(self.space.str_w(self.space.repr(self.space.wrap(s))))
+            self.write('\n')
+
+    def save_unicode(self, u):
+        # the caller must memoize
+        if self.bin:
+            data = unicodehelper.encode_utf8(self.space, u)
+            self.write(BINUNICODE)
+            _pack_int32(self.builder, len(data))
+            self.write(data)
+        else:
+            u = u.replace(u"\\", u"\\u005c")
+            u = u.replace(u"\n", u"\\u000a")
+            self.write(UNICODE)
+            self.write(runicode.unicode_encode_raw_unicode_escape(
+                u, len(u), 'strict'))
+            self.write('\n')
+
+    def save_tuple(self, w_tuple):
+        space = self.space
+        items_w = space.fixedview(w_tuple)
+        n = len(items_w)
+        if n == 0:
+            if self.proto:
+                self.write(EMPTY_TUPLE)
+            else:
+                self.write(MARK)
+                self.write(TUPLE)
+            return
+
+        if n <= 3 and self.proto >= 2:
+            for w_item in items_w:
+                self.save(w_item)
+            if self.memo_get(w_tuple) >= 0:
+                self._write_get_from_memo(w_tuple, n, False)
+            else:
+                self.write(TUPLESIZE2CODE[n])
+                self.memoize(w_tuple)
+            return
+
+        self.write(MARK)
+        for w_item in items_w:
+            self.save(w_item)
+        if self.memo_get(w_tuple) >= 0:
+            # the tuple is recursive, see the comment in pickle.py
+            self._write_get_from_memo(w_tuple, n + 1, self.proto > 0)
+            return
+        self.write(TUPLE)
+        self.memoize(w_tuple)
+
+    def save_list(self, w_list):
+        if self.bin:
+            self.write(EMPTY_LIST)
+        else:
+            self.write(MARK)
+            self.write(LIST)
+        self.memoize(w_list)
+        if self.save_unboxed_items(w_list, APPEND, APPENDS):
+            return
+        # same as iter(w_list): re-read the length every time
+        if not self.bin:
+            i = 0
+            while i < w_list.length():
+                self.save(w_list.getitem(i))
+                self.write(APPEND)
+                i += 1
+            return
+        start = 0
+        while start < w_list.length():
+            end = min(start + BATCHSIZE, w_list.length())
+            if end - start > 1:
+                self.write(MARK)
+            for i in range(start, end):
+                if i >= w_list.length():
+                    break
+                self.save(w_list.getitem(i))
+            self.write(APPENDS if end - start > 1 else APPEND)
+            start = end
+
+    def save_unboxed_items(self, w_obj, onecode, manycode):
+        """Write the items of a list or set using the integer, float or
+        bytes strategy, like a sequence of save() and batches of
+        'manycode', without wrapping them.  Return False if w_obj does
+        not use one of these strategies."""
+        space = self.space
+        if self.w_func_persistent_id is not None:
+            return False
+        intlist = space.listview_int(w_obj)
+        if intlist is not None:
+            self._batch_unboxed(intlist, onecode, manycode)
+            return True
+        floatlist = space.listview_float(w_obj)
+        if floatlist is not None:
+            self._batch_unboxed(floatlist, onecode, manycode)
+            return True
+        byteslist = space.listview_bytes(w_obj)
+        if byteslist is not None:
+            self._batch_unboxed(byteslist, onecode, manycode)
+            return True
+        return False
+
+    def _save_unboxed(self, item):
+        if isinstance(item, int):
+            self.save_int(item)
+        elif isinstance(item, float):
+            self.save_float(item)
+        else:
+            self.save_bytes_memoized(item)
+    _save_unboxed._annspecialcase_ = 'specialize:argtype(1)'
+
+    def _batch_unboxed(self, items, onecode, manycode):
+        if not self.bin or manycode is None:
+            for item in items:
+                self._save_unboxed(item)
+                if onecode is not None:
+                    self.write(onecode)
+            return
+        start = 0
+        while start < len(items):
+            end = min(start + BATCHSIZE, len(items))
+            if end - start > 1:
+                self.write(MARK)
+            for i in range(start, end):
+                self._save_unboxed(items[i])
+            self.write(manycode if end - start > 1 else onecode)
+            start = end
+    _batch_unboxed._annspecialcase_ = 'specialize:argtype(1)'
+
+    def save_unboxed_set(self, w_set):
+        """Write exact sets and frozensets using the integer, float or
+        bytes strategy like set.__reduce__() would, without wrapping the
+        items.  Return False if this is not possible."""
+        space = self.space
+        if self.w_func_persistent_id is not None:
+            return False
+        w_type = space.type(w_set)
+        if self.w_dispatch_table is None:
+            w_copyreg = space.call_function(space.builtin.get('__import__'),
+                                            space.wrap('copy_reg'))
+            self.w_dispatch_table = space.getattr(
+                w_copyreg, space.wrap('dispatch_table'))
+        if space.finditem(self.w_dispatch_table, w_type) is not None:
+            return False
+        n = space.len_w(w_set)
+        if n == 0:
+            return False
+        if space.listview_int(w_set) is None:
+            if (space.listview_float(w_set) is None and
+                    space.listview_bytes(w_set) is None):
+                return False
+        # save_reduce(type(w_set), (tuple(w_set),), None)
+        self.save(w_type)
+        if self.proto < 2:
+            self.write(MARK)
+        if n <= 3 and self.proto >= 2:
+            self.save_unboxed_items(w_set, None, None)
+            self.write(TUPLESIZE2CODE[n])
+        else:
+            self.write(MARK)
+            self.save_unboxed_items(w_set, None, None)
+            self.write(TUPLE)
+        self.memoize_anonymous()
+        self.write(TUPLE1 if self.proto >= 2 else TUPLE)
+        self.memoize_anonymous()
+        self.write(REDUCE)
+        self.memoize(w_set)
+        return True
+
+    def batch_appends(self, w_iter):
+        space = self.space
+        if not self.bin:
+            while True:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                self.save(w_item)
+                self.write(APPEND)
+            return
+        done = False
+        while not done:
+            items_w = []
+            while len(items_w) < BATCHSIZE:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    done = True
+                    break
+                items_w.append(w_item)
+            n = len(items_w)
+            if n > 1:
+                self.write(MARK)
+                for w_item in items_w:
+                    self.save(w_item)
+                self.write(APPENDS)
+            elif n:
+                self.save(items_w[0])
+                self.write(APPEND)
+
+    def save_dict(self, w_dict):
+        space = self.space
+        if space.finditem_str(w_dict, '__name__') is not None:
+            w_module = module_of_moduledict(space, w_dict)
+            if not space.is_none(w_module):
+                self.save_reduce(
+                    space.builtin.get('getattr'),
+                    space.newtuple([w_module, space.wrap('__dict__')]),
+                    space.w_None, space.w_None, space.w_None, None)
+                return
+        if self.bin:
+            self.write(EMPTY_DICT)
+        else:
+            self.write(MARK)
+            self.write(DICT)
+        self.memoize(w_dict)
+        self._batch_dict_items(w_dict.iteritems())
+
+    def _batch_dict_items(self, iterator):
+        if not self.bin:
+            while True:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    break
+                self.save(w_key)
+                self.save(w_value)
+                self.write(SETITEM)
+            return
+        done = False
+        while not done:
+            keys_w = []
+            values_w = []
+            while len(keys_w) < BATCHSIZE:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    done = True
+                    break
+                keys_w.append(w_key)
+                values_w.append(w_value)
+            n = len(keys_w)
+            if n > 1:
+                self.write(MARK)
+            for i in range(n):
+                self.save(keys_w[i])
+                self.save(values_w[i])
+            if n > 1:
+                self.write(SETITEMS)
+            elif n:
+                self.write(SETITEM)
+
+    def batch_setitems(self, w_iter):
+        space = self.space
+        done = False
+        while not done:
+            items_w = []
+            while len(items_w) < (BATCHSIZE if self.bin else 1):
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    done = True
+                    break
+                items_w.append(w_item)
+            n = len(items_w)
+            if n > 1:
+                self.write(MARK)
+            for w_item in items_w:
+                w_key, w_value = space.fixedview(w_item, 2)
+                self.save(w_key)
+                self.save(w_value)
+            if n > 1:
+                self.write(SETITEMS)
+            elif n:
+                self.write(SETITEM)
+
+    def save_inst(self, w_obj):
+        space = self.space
+        w_cls = space.getattr(w_obj, space.wrap('__class__'))
+        w_getinitargs = space.findattr(w_obj, space.wrap('__getinitargs__'))
+        if w_getinitargs is not None:
+            w_args = space.call_function(w_getinitargs)
+            space.len_w(w_args)     # XXX Assert it's a sequence
+            self.keep_alive(w_args)
+            args_w = space.listview(w_args)
+        else:
+            args_w = []
+
+        self.write(MARK)
+        if self.bin:
+            self.save(w_cls)
+            for w_arg in args_w:
+                self.save(w_arg)
+            self.write(OBJ)
+        else:
+            for w_arg in args_w:
+                self.save(w_arg)
+            self.write(INST)
+            self.write(space.str_w(space.getattr(w_cls,
+                                                 space.wrap('__module__'))))
+            self.write('\n')
+            self.write(space.str_w(space.getattr(w_cls,
+                                                 space.wrap('__name__'))))
+            self.write('\n')
+        self.memoize(w_obj)
+
+        w_getstate = space.findattr(w_obj, space.wrap('__getstate__'))
+        if w_getstate is None:
+            w_stuff = space.getattr(w_obj, space.wrap('__dict__'))
+        else:
+            w_stuff = space.call_function(w_getstate)
+            self.keep_alive(w_stuff)
+        self.save(w_stuff)
+        self.write(BUILD)
+
+    def keep_alive(self, w_obj):
+        # the memo keeps the keys alive; use an index that never appears
+        # in the output.  An object that is already memoized is alive, and
+        # must keep its index
+        if w_obj not in self.memo:
+            self.memo[w_obj] = -2 - len(self.memo)
+
+    def save_global(self, w_obj, w_name):
+        space = self.space
+        if w_name is None:
+            w_name = space.w_None
+        w_result = lookup_global(space, w_obj, w_name, space.wrap(self.proto))
+        w_module, w_name, w_code = space.fixedview(w_result, 3)
+        code = space.int_w(w_code)
+        if code:
+            if code <= 0xff:
+                self.write(EXT1)
+                self.write(chr(code))
+            elif code <= 0xffff:
+                self.write(EXT2)
+                self.write(chr(code & 0xff))
+                self.write(chr(code >> 8))
+            else:
+                self.write(EXT4)
+                _pack_int32(self.builder, code)
+            return
+        self.write(GLOBAL)
+        self.write(space.str_w(w_module))
+        self.write('\n')
+        self.write(space.str_w(w_name))
+        self.write('\n')
+        self.memoize(w_obj)
+
+    # ---------- app-level interface ----------
+
+    def dump(self, w_obj):
+        """Write a pickled representation of obj to the open file."""
+        space = self.space
+        # either the attribute was set, or a subclass defines a
+        # persistent_id() method
+        self.w_func_persistent_id = space.findattr(
+            self, space.wrap('persistent_id'))
+        if self.proto >= 2:
+            self.write(PROTO)
+            self.write(chr(self.proto))
+        self.save(w_obj)
+        self.write(STOP)
+        self.flush()
+
+    def descr_dump(self, space, w_obj):
+        self.dump(w_obj)
+        return self
+
+    def descr_clear_memo(self, space):
+        """Clears the pickler's "memo"."""
+        self.memo.clear()
+        self.bytes_memo.clear()
+        del self.bytes_memo_keys[:]
+        self.unicode_memo.clear()
+        del self.unicode_memo_keys[:]
+        self.memo_next = 1
+
+    def descr_getvalue(self, space):
+        if self.w_file is not None:
+            return space.w_None
+        return space.wrap(self.builder.build())
+
+    def descr_get_memo(self, space):
+        w_memo = space.newdict()
+        for w_obj, i in self.memo.items():
+            if i >= 0:
+                self._add_to_memo_dict(w_memo, w_obj, i)
+        for s in self.bytes_memo_keys:
+            self._add_to_memo_dict(w_memo, space.newbytes(s),
+                                   self.bytes_memo[_string_uid(s)])
+        for u in self.unicode_memo_keys:
+            self._add_to_memo_dict(w_memo, space.wrap(u),
+                                   self.unicode_memo[_string_uid(u)])
+        return w_memo
+
+    def _add_to_memo_dict(self, w_memo, w_obj, i):
+        space = self.space
+        space.setitem(w_memo, space.id(w_obj),
+                      space.newtuple([space.wrap(i), w_obj]))
+
+    def descr_get_persistent_id(self, space):
+        if self.w_persistent_id is None:
+            raise oefmt(space.w_AttributeError, "persistent_id")
+        return self.w_persistent_id
+
+    def descr_set_persistent_id(self, space, w_value):
+        self.w_persistent_id = w_value
+
+    def descr_get_fast(self, space):
+        return space.newbool(self.fast)
+
+    def descr_set_fast(self, space, w_value):
+        self.fast = space.is_true(w_value)
+
+    def descr_get_binary(self, space):
+        return space.newbool(self.bin)
+
+
+@unwrap_spec(w_file=WrappedDefault(None), w_protocol=WrappedDefault(None))
+def descr_new_pickler(space, w_subtype, w_file, w_protocol):
+    if (space.is_none(w_protocol) and
+            space.isinstance_w(w_file, space.w_int)):
+        # Pickler(protocol): write to an internal buffer
+        w_protocol = w_file
+        w_file = None
+    protocol = _get_protocol(space, w_protocol)
+    if w_file is not None and space.is_none(w_file):
+        w_file = None
+    if w_file is not None and space.findattr(
+            w_file, space.wrap('write')) is None:
+        raise oefmt(space.w_TypeError,
+                    "argument must have 'write' attribute")
+    w_pickler = space.allocate_instance(W_Pickler, w_subtype)
+    W_Pickler.__init__(w_pickler, space, w_file, protocol)
+    return w_pickler
+
+W_Pickler.typedef = TypeDef("_pickle.Pickler",
+    __new__ = interp2app(descr_new_pickler),
+    dump = interp2app(W_Pickler.descr_dump),
+    clear_memo = interp2app(W_Pickler.descr_clear_memo),
+    getvalue = interp2app(W_Pickler.descr_getvalue),
+    memo = GetSetProperty(W_Pickler.descr_get_memo),
+    persistent_id = GetSetProperty(W_Pickler.descr_get_persistent_id,
+                                   W_Pickler.descr_set_persistent_id),
+    fast = GetSetProperty(W_Pickler.descr_get_fast,
+                          W_Pickler.descr_set_fast),
+    binary = GetSetProperty(W_Pickler.descr_get_binary),
+)
+W_Pickler.typedef.acceptable_as_base_class = True
+
+
+@unwrap_spec(w_protocol=WrappedDefault(None))
+def dumps(space, w_obj, w_protocol):
+    """dumps(obj, protocol=0) -- Return a string containing an object in
+pickle format."""
+    pickler = W_Pickler(space, None, _get_protocol(space, w_protocol))
+    pickler.dump(w_obj)
+    return space.wrap(pickler.builder.build())
+
+@unwrap_spec(w_protocol=WrappedDefault(None))
+def dump(space, w_obj, w_file, w_protocol):
+    """dump(obj, file, protocol=0) -- Write an object in pickle format to
+the given file."""
+    pickler = W_Pickler(space, w_file, _get_protocol(space, w_protocol))
+    pickler.dump(w_obj)
+
+
+# ____________________________________________________________
+# Unpickling
+
+
+class W_Unpickler(W_Root):
+
+    def __init__(self, space, w_file, data):
+        self.space = space
+        self.w_file = w_file
+        self.data = data
+        self.pos = 0
+        self.memo = {}
+        self.stack_w = []
+        self.marks = []
+        self.w_persistent_load = None
+        self.w_find_global = None
+
+    # ---------- input ----------
+
+    def read(self, n):
+        if self.w_file is None:
+            pos = self.pos
+            assert pos >= 0
+            if n < 0 or pos + n > len(self.data):
+                raise oefmt(self.space.w_EOFError, "")
+            end = pos + n
+            self.pos = end
+            return self.data[pos:end]
+        space = self.space
+        w_s = space.call_method(self.w_file, 'read', space.wrap(n))
+        s = space.str_w(w_s)
+        if len(s) < n:
+            raise oefmt(space.w_EOFError, "")
+        return s
+
+    def readline(self):
+        """Read a line, and return it without the final newline."""
+        if self.w_file is None:
+            data = self.data
+            pos = self.pos
+            end = data.find('\n', pos)
+            if end < 0:
+                raise_unpickling_error(self.space, "pickle data was truncated")
+            self.pos = end + 1
+            assert pos >= 0
+            return data[pos:end]
+        space = self.space
+        s = space.str_w(space.call_method(self.w_file, 'readline'))
+        if not s.endswith('\n'):
+            raise_unpickling_error(space, "pickle data was truncated")
+        end = len(s) - 1
+        assert end >= 0
+        return s[:end]
+
+    def read_byte(self):
+        if self.w_file is None:
+            pos = self.pos
+            if pos >= len(self.data):
+                raise oefmt(self.space.w_EOFError, "")
+            self.pos = pos + 1
+            return ord(self.data[pos])
+        return ord(self.read(1)[0])
+
+    # ---------- stack ----------
+
+    def push(self, w_obj):
+        self.stack_w.append(w_obj)
+
+    def pop(self):
+        if len(self.stack_w) == 0 or (
+                self.marks and self.marks[-1] == len(self.stack_w)):
+            raise_unpickling_error(self.space, "unpickling stack underflow")
+        return self.stack_w.pop()
+
+    def top(self):
+        if len(self.stack_w) == 0 or (
+                self.marks and self.marks[-1] == len(self.stack_w)):
+            raise_unpickling_error(self.space, "unpickling stack underflow")
+        return self.stack_w[-1]
+
+    def set_top(self, w_obj):
+        self.stack_w[-1] = w_obj
+
+    def marker(self):
+        if not self.marks:
+            raise_unpickling_error(self.space, "could not find MARK")
+        return self.marks.pop()
+
+    def pop_mark(self):
+        """Pop and return the items pushed since the last MARK."""
+        k = self.marker()
+        items_w = self.stack_w[k:]
+        del self.stack_w[k:]
+        return items_w
+
+    # ---------- memo ----------
+
+    def memo_key(self, line):
+        try:
+            return string_to_int(line)
+        except (ParseStringError, ParseStringOverflowError):
+            raise_unpickling_error(self.space, "bad memo key")
+
+    def memo_get(self, i):
+        try:
+            return self.memo[i]
+        except KeyError:
+            raise OperationError(self.space.w_KeyError, self.space.wrap(i))
+
+    # ---------- loading ----------
+
+    def load(self):
+        space = self.space
+        self.stack_w = []
+        self.marks = []
+        while True:
+            key = self.read(1)[0]
+            if key == STOP:
+                return self.pop()
+            self.dispatch(key)
+
+    def dispatch(self, key):
+        space = self.space
+        if key == BININT1:
+            self.push(space.newint(self.read_byte()))
+        elif key == BININT:
+            self.push(space.newint(_unpack_int32(self.read(4))))
+        elif key == BINUNICODE:
+            n = _unpack_int32(self.read(4))
+            self.push(space.wrap(unicodehelper.decode_utf8(space,
+                                                           self.read(n))))
+        elif key == SHORT_BINSTRING:
+            self.push(space.newbytes(self.read(self.read_byte())))
+        elif key == BINPUT:
+            self.memo[self.read_byte()] = self.top()
+        elif key == LONG_BINPUT:
+            self.memo[_unpack_int32(self.read(4))] = self.top()
+        elif key == BINGET:
+            self.push(self.memo_get(self.read_byte()))
+        elif key == LONG_BINGET:
+            self.push(self.memo_get(_unpack_int32(self.read(4))))
+        elif key == MARK:
+            self.marks.append(len(self.stack_w))
+        elif key == APPEND:
+            w_value = self.pop()
+            self.append_items(self.top(), [w_value])
+        elif key == APPENDS:
+            items_w = self.pop_mark()
+            self.append_items(self.top(), items_w)
+        elif key == SETITEM:
+            w_value = self.pop()
+            w_key = self.pop()
+            space.setitem(self.top(), w_key, w_value)
+        elif key == SETITEMS:
+            items_w = self.pop_mark()
+            w_dict = self.top()
+            for i in range(0, len(items_w) - 1, 2):
+                space.setitem(w_dict, items_w[i], items_w[i + 1])
+        elif key == EMPTY_LIST:
+            self.push(space.newlist([]))
+        elif key == EMPTY_DICT:
+            self.push(space.newdict())
+        elif key == EMPTY_TUPLE:
+            self.push(space.newtuple([]))
+        elif key == TUPLE1:
+            self.set_top(space.newtuple([self.top()]))
+        elif key == TUPLE2:
+            w_b = self.pop()
+            w_a = self.top()
+            self.set_top(space.newtuple([w_a, w_b]))
+        elif key == TUPLE3:
+            w_c = self.pop()
+            w_b = self.pop()
+            w_a = self.top()
+            self.set_top(space.newtuple([w_a, w_b, w_c]))
+        elif key == TUPLE:
+            self.push(space.newtuple(self.pop_mark()))
+        elif key == LIST:
+            self.push(space.newlist(self.pop_mark()))
+        elif key == DICT:
+            items_w = self.pop_mark()
+            w_dict = space.newdict()
+            for i in range(0, len(items_w) - 1, 2):
+                space.setitem(w_dict, items_w[i], items_w[i + 1])
+            self.push(w_dict)
+        elif key == BINFLOAT:
+            self.push(space.newfloat(ieee.unpack_float(self.read(8), True)))
+        elif key == NONE:
+            self.push(space.w_None)
+        elif key == NEWTRUE:
+            self.push(space.w_True)
+        elif key == NEWFALSE:
+            self.push(space.w_False)
+        elif key == BININT2:
+            b0 = self.read_byte()
+            self.push(space.newint(b0 | (self.read_byte() << 8)))
+        elif key == BINSTRING:
+            n = _unpack_int32(self.read(4))
+            if n < 0:
+                raise_unpickling_error(space, "BINSTRING pickle has "
+                                       "negative byte count")
+            self.push(space.newbytes(self.read(n)))
+        elif key == LONG1:
+            n = self.read_byte()
+            self.push(space.newlong_from_rbigint(
+                rbigint.frombytes(self.read(n), 'little', True)))
+        elif key == LONG4:
+            n = _unpack_int32(self.read(4))
+            if n < 0:
+                raise_unpickling_error(space, "LONG pickle has negative "
+                                       "byte count")
+            self.push(space.newlong_from_rbigint(
+                rbigint.frombytes(self.read(n), 'little', True)))
+        elif key == PROTO:
+            proto = self.read_byte()
+            if proto > HIGHEST_PROTOCOL:
+                raise oefmt(space.w_ValueError,
+                            "unsupported pickle protocol: %d", proto)
+        elif key == REDUCE:
+            w_args = self.pop()
+            w_func = self.top()
+            self.set_top(space.call(w_func, w_args))
+        elif key == NEWOBJ:
+            w_args = self.pop()
+            w_cls = self.top()
+            args_w = [w_cls] + space.fixedview(w_args)
+            w_new = space.getattr(w_cls, space.wrap('__new__'))
+            self.set_top(space.call(w_new, space.newtuple(args_w)))
+        elif key == BUILD:
+            w_state = self.pop()
+            build(space, self.top(), w_state)
+        elif key == GLOBAL:
+            module = self.readline()
+            name = self.readline()
+            self.push(self.find_class(module, name))
+        elif key == OBJ:
+            items_w = self.pop_mark()
+            if not items_w:
+                raise_unpickling_error(space, "unpickling stack underflow")
+            w_klass = items_w[0]
+            self.push(instantiate(space, w_klass,
+                                  space.newtuple(items_w[1:])))
+        elif key == INST:
+            module = self.readline()
+            name = self.readline()
+            w_klass = self.find_class(module, name)
+            items_w = self.pop_mark()
+            self.push(instantiate(space, w_klass, space.newtuple(items_w)))
+        elif key == POP:
+            if self.marks and self.marks[-1] == len(self.stack_w):
+                self.marks.pop()
+            else:
+                self.pop()
+        elif key == POP_MARK:
+            self.pop_mark()
+        elif key == DUP:
+            self.push(self.top())
+        elif key == INT:
+            line = self.readline()
+            if line == '00':
+                self.push(space.w_False)
+            elif line == '01':
+                self.push(space.w_True)
+            else:
+                self.push(space.call_function(space.w_int,
+                                              space.wrap(line)))
+        elif key == LONG:
+            line = self.readline()
+            self.push(space.call_function(space.w_long, space.wrap(line),
+                                          space.wrap(0)))
+        elif key == FLOAT:
+            line = self.readline()
+            self.push(space.call_function(space.w_float, space.wrap(line)))
+        elif key == STRING:
+            self.push(self.decode_string(self.readline()))
+        elif key == UNICODE:
+            self.push(space.wrap(unicodehelper.decode_raw_unicode_escape(
+                space, self.readline())))
+        elif key == GET:
+            self.push(self.memo_get(self.memo_key(self.readline())))
+        elif key == PUT:
+            self.memo[self.memo_key(self.readline())] = self.top()
+        elif key == PERSID:
+            w_pid = space.wrap(self.readline())
+            self.push(self.persistent_load(w_pid))
+        elif key == BINPERSID:
+            w_pid = self.pop()
+            self.push(self.persistent_load(w_pid))
+        elif key == EXT1:
+            self.push(self.get_extension(self.read_byte()))
+        elif key == EXT2:
+            b0 = self.read_byte()
+            self.push(self.get_extension(b0 | (self.read_byte() << 8)))
+        elif key == EXT4:
+            self.push(self.get_extension(_unpack_int32(self.read(4))))
+        else:
+            raise_unpickling_error(space, "invalid load key, %s." %
+                                   space.str_w(space.repr(space.wrap(key))))
+
+    def append_items(self, w_list, items_w):
+        space = self.space
+        if type(w_list) is W_ListObject:
+            if len(items_w) == 1:
+                w_list.append(items_w[0])
+            else:
+                w_list.extend(space.newlist(items_w))
+        elif len(items_w) == 1:
+            space.call_method(w_list, 'append', items_w[0])
+        else:
+            space.call_method(w_list, 'extend', space.newlist(items_w))
+
+    def decode_string(self, rep):
+        space = self.space
+        if len(rep) < 2:
+            raise oefmt(space.w_ValueError, "insecure string pickle")
+        quote = rep[0]
+        if (quote != "'" and quote != '"') or rep[-1] != quote:
+            raise oefmt(space.w_ValueError, "insecure string pickle")
+        end = len(rep) - 1
+        assert end >= 1
+        return space.call_method(space.wrap(rep[1:end]), 'decode',
+                                 space.wrap('string-escape'))
+
+    def find_class(self, module, name):
+        space = self.space
+        if self.w_find_global is not None:
+            return space.call_function(self.w_find_global, space.wrap(module),
+                                       space.wrap(name))
+        return space.call_method(self, 'find_class', space.wrap(module),
+                                 space.wrap(name))
+
+    def persistent_load(self, w_pid):
+        space = self.space
+        w_persistent_load = space.findattr(self,
+                                           space.wrap('persistent_load'))
+        if w_persistent_load is None:
+            raise_unpickling_error(
+                space, "A load persistent id instruction was "
+                "encountered, but no persistent_load function was "
+                "specified.")
+        return space.call_function(w_persistent_load, w_pid)
+
+    def get_extension(self, code):
+        space = self.space
+        w_result = get_extension(space, space.wrap(code))
+        w_obj, w_key = space.fixedview(w_result, 2)
+        if space.is_none(w_key):
+            return w_obj
+        w_module, w_name = space.fixedview(w_key, 2)
+        w_obj = self.find_class(space.str_w(w_module), space.str_w(w_name))
+        cache_extension(space, space.wrap(code), w_obj)
+        return w_obj
+
+    # ---------- app-level interface ----------
+
+    def descr_load(self, space):
+        """Read a pickled object representation from the open file.
+
+        Return the reconstituted object hierarchy specified in the file."""
+        return self.load()
+
+    def descr_find_class(self, space, w_module, w_name):
+        return app_find_class(space, w_module, w_name)
+
+    def descr_get_memo(self, space):
+        w_memo = space.newdict()
+        for i, w_obj in self.memo.items():
+            space.setitem(w_memo, space.wrap(str(i)), w_obj)
+        return w_memo
+
+    def descr_get_persistent_load(self, space):
+        if self.w_persistent_load is None:
+            raise oefmt(space.w_AttributeError, "persistent_load")
+        return self.w_persistent_load
+
+    def descr_set_persistent_load(self, space, w_value):
+        self.w_persistent_load = w_value
+
+    def descr_get_find_global(self, space):
+        if self.w_find_global is None:
+            return space.w_None
+        return self.w_find_global
+
+    def descr_set_find_global(self, space, w_value):
+        if space.is_none(w_value):
+            self.w_find_global = None
+        else:
+            self.w_find_global = w_value
+
+
+def descr_new_unpickler(space, w_subtype, w_file):
+    for name in ['read', 'readline']:
+        if space.findattr(w_file, space.wrap(name)) is None:
+            raise oefmt(space.w_TypeError,
+                        "argument must have 'read' and 'readline' attributes")
+    w_unpickler = space.allocate_instance(W_Unpickler, w_subtype)
+    W_Unpickler.__init__(w_unpickler, space, w_file, '')
+    return w_unpickler
+
+W_Unpickler.typedef = TypeDef("_pickle.Unpickler",
+    __new__ = interp2app(descr_new_unpickler),
+    load = interp2app(W_Unpickler.descr_load),
+    find_class = interp2app(W_Unpickler.descr_find_class),
+    memo = GetSetProperty(W_Unpickler.descr_get_memo),
+    persistent_load = GetSetProperty(W_Unpickler.descr_get_persistent_load,
+                                     W_Unpickler.descr_set_persistent_load),
+    find_global = GetSetProperty(W_Unpickler.descr_get_find_global,
+                                 W_Unpickler.descr_set_find_global),
+)
+W_Unpickler.typedef.acceptable_as_base_class = True
+
+
+def loads(space, w_data):
+    """loads(string) -- Load a pickle from the given string"""
+    data = space.bufferstr_w(w_data)
+    return W_Unpickler(space, None, data).load()
+
+def load(space, w_file):
+    """load(file) -- Load a pickle from the given file"""
+    return space.call_method(descr_new_unpickler(
+        space, space.gettypeobject(W_Unpickler.typedef), w_file), 'load')
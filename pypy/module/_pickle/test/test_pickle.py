@@ -0,0 +1,273 @@
+class AppTestPickle:
+    spaceconfig = {"usemodules": ['_pickle', '__pypy__', 'struct',
+                                  'binascii']}
+
+    def setup_class(cls):
+        cls.w_samples = cls.space.appexec([], """():
+            class A(object):
+                def __init__(self, x):
+                    self.x = x
+                def __eq__(self, other):
+                    return type(other) is A and self.x == other.x
+            A.__module__ = '__builtin__'
+            import __builtin__
+            __builtin__.PickleTestA = A
+            A.__name__ = 'PickleTestA'
+            lst = [1, 2]
+            return [
+                None, True, False, 0, 1, -1, 255, 256, 65535, 65536,
+                -2**31, 2**31 - 1, 2**31, -2**31 - 1, 2**63, -2**63 - 1,
+                0L, 1L, -1L, 255L, 2**1000, -2**1000,
+                0.0, -0.0, 1.5, 1e300, -1e-300,
+                '', 'abc', 'x' * 300, 'a\\nb\\\\c\\'"',
+                u'', u'abc', u'\\u1234\\n\\\\x', u'\\U00012345',
+                (), (1,), (1, 2), (1, 2, 3), (1, 2, 3, 4), ((),),
+                [], [1, 2, 3], [1.5, 2.5], ['a', 'b', 'a'],
+                [1, 'a', 2.5, None], [lst, lst],
+                {}, {1: 2}, {'a': 1, 'b': 2.5},
+                set(), set([1, 2, 3]), frozenset([1.5, 2.5]),
+                set(['a', 'b']), set(range(10)), set([1, 'a']),
+                len, A, A(5), [A(1), A(2)], int, dict,
+                ]
+        """)
+        # more than BATCHSIZE items
+        cls.w_big_samples = cls.space.appexec([], """():
+            return [range(2500), [x / 3.0 for x in range(1500)],
+                    [str(x) for x in range(1200)],
+                    dict.fromkeys(range(1100))]
+        """)
+
+    def test_dict(self):
+        import _pickle
+        _pickle.__dict__  # crashes if entries in __init__.py can't be resolved
+
+    def test_roundtrip(self):
+        import _pickle
+        for proto in [0, 1, 2]:
+            for x in self.samples + self.big_samples:
+                s = _pickle.dumps(x, proto)
+                y = _pickle.loads(s)
+                assert y == x
+                assert type(y) is type(x)
+
+    def test_same_output_as_app_level(self):
+        import _pickle, cPickle, StringIO
+        assert cPickle.dumps is _pickle.dumps
+        for proto in [0, 1, 2]:
+            for x in self.samples:
+                p = cPickle.AppPickler(proto)
+                p.dump(x)
+                expected = p.getvalue()
+                assert _pickle.dumps(x, proto) == expected
+                assert cPickle.AppUnpickler(
+                    StringIO.StringIO(expected)).load() == x
+        # the app-level version is slow to run here
+        for x in self.big_samples:
+            p = cPickle.AppPickler(2)
+            p.dump(x)
+            assert _pickle.dumps(x, 2) == p.getvalue()
+
+    def test_protocol(self):
+        import _pickle
+        assert _pickle.dumps(1) == 'I1\n.'
+        assert _pickle.dumps(1, None) == 'I1\n.'
+        assert _pickle.dumps(1, -1) == '\x80\x02K\x01.'
+        raises(ValueError, _pickle.dumps, 1, 3)
+        raises(ValueError, _pickle.loads, '\x80\x03K\x01.')
+
+    def test_recursive(self):
+        import _pickle
+        for proto in [0, 1, 2]:
+            l = [1, 2]
+            l.append(l)
+            l2 = _pickle.loads(_pickle.dumps(l, proto))
+            assert l2[:2] == [1, 2]
+            assert l2[2] is l2
+            d = {}
+            d['d'] = d
+            d2 = _pickle.loads(_pickle.dumps(d, proto))
+            assert d2['d'] is d2
+            t = ([],)
+            t[0].append(t)
+            t2 = _pickle.loads(_pickle.dumps(t, proto))
+            assert t2[0][0] is t2
+
+    def test_memo_is_identity_based(self):
+        import _pickle
+        a = [1]
+        b = [1]
+        x = _pickle.loads(_pickle.dumps([a, a, b], 2))
+        assert x[0] is x[1]
+        assert x[0] is not x[2]
+        # strings are memoized like id() sees them, also when they are
+        # stored unwrapped in a list
+        from __pypy__ import strategy
+        s = 'hello' * 10
+        l = [s, 'x', s]
+        assert strategy(l) == "BytesListStrategy"
+        assert _pickle.dumps(l, 2).count(s) == 1
+        p = _pickle.Pickler(2)
+        p.dump(l)
+        assert sorted(p.memo.values()) == [(1, l), (2, s), (3, 'x')]
+
+    def test_file(self):
+        import _pickle, StringIO
+        f = StringIO.StringIO()
+        _pickle.dump([1, 'a'], f, 2)
+        _pickle.dump(5.5, f)
+        f.seek(0)
+        assert _pickle.load(f) == [1, 'a']
+        u = _pickle.Unpickler(f)
+        assert u.load() == 5.5
+        raises(EOFError, u.load)
+
+    def test_pickler_object(self):
+        import _pickle, StringIO
+        f = StringIO.StringIO()
+        p = _pickle.Pickler(f, 2)
+        l = [1, 2]
+        p.dump(l)
+        p.dump(l)
+        p.clear_memo()
+        p.dump(l)
+        f.seek(0)
+        u = _pickle.Unpickler(f)
+        l1 = u.load()
+        l2 = u.load()
+        l3 = u.load()
+        assert l1 == l2 == l3 == [1, 2]
+        assert l1 is l2
+        assert l3 is not l1
+        #
+        p = _pickle.Pickler(1)
+        assert p.binary
+        p.dump('abc')
+        assert p.getvalue() == 'U\x03abcq\x01.'
+        assert p.memo.values() == [(1, 'abc')]
+
+    def test_persistent_id(self):
+        import _pickle, StringIO
+        class MyPickler(_pickle.Pickler):
+            def persistent_id(self, obj):
+                if obj == 42:
+                    return 'the answer'
+        f = StringIO.StringIO()
+        MyPickler(f).dump([1, 42])
+        assert 'Pthe answer\n' in f.getvalue()
+        f.seek(0)
+        u = _pickle.Unpickler(f)
+        u.persistent_load = lambda pid: (pid, 'loaded')
+        assert u.load() == [1, ('the answer', 'loaded')]
+        f.seek(0)
+        raises(Exception, _pickle.Unpickler(f).load)
+        #
+        f = StringIO.StringIO()
+        p = _pickle.Pickler(f, 2)
+        p.persistent_id = lambda obj: 'x' if obj == 'a' else None
+        p.dump(['a', 'b'])
+        f.seek(0)
+        u = _pickle.Unpickler(f)
+        u.persistent_load = lambda pid: pid * 3
+        assert u.load() == ['xxx', 'b']
+
+    def test_find_global(self):
+        import _pickle, StringIO
+        s = _pickle.dumps(len, 2)
+        u = _pickle.Unpickler(StringIO.StringIO(s))
+        u.find_global = lambda module, name: (module, name)
+        assert u.load() == ('__builtin__', 'len')
+        class MyUnpickler(_pickle.Unpickler):
+            def find_class(self, module, name):
+                return name
+        assert MyUnpickler(StringIO.StringIO(s)).load() == 'len'
+
+    def test_reduce(self):
+        import _pickle, copy_reg, collections
+        class B(object):
+            def __reduce__(self):
+                return (complex, (1, 2))
+        for proto in [0, 1, 2]:
+            assert _pickle.loads(_pickle.dumps(B(), proto)) == 1+2j
+        od = collections.OrderedDict([(3, 'a'), (1, 'b')])
+        od2 = _pickle.loads(_pickle.dumps(od, 2))
+        assert type(od2) is collections.OrderedDict
+        assert od2.items() == od.items()
+        dq = collections.deque([1, 2, 3])
+        assert _pickle.loads(_pickle.dumps(dq, 2)) == dq
+        class MySet(set):
+            pass
+        copy_reg.pickle(MySet, lambda s: (frozenset, (list(s),)))
+        try:
+            assert type(_pickle.loads(_pickle.dumps(MySet([1]), 2))) is (
+                frozenset)
+        finally:
+            del copy_reg.dispatch_table[MySet]
+
+    def test_old_style_instance(self):
+        import _pickle, __builtin__
+        class Old:
+            def __init__(self, x):
+                self.x = x
+        Old.__module__ = '__builtin__'
+        Old.__name__ = 'PickleTestOld'
+        __builtin__.PickleTestOld = Old
+        try:
+            for proto in [0, 1, 2]:
+                o = _pickle.loads(_pickle.dumps(Old(5), proto))
+                assert o.__class__ is Old
+                assert o.x == 5
+        finally:
+            del __builtin__.PickleTestOld
+
+    def test_old_style_instance_getstate_memoized(self):
+        import _pickle, __builtin__
+        class Old:
+            def __getstate__(self):
+                return self.state
+            def __setstate__(self, state):
+                self.state = state
+        Old.__module__ = '__builtin__'
+        Old.__name__ = 'PickleTestOld'
+        __builtin__.PickleTestOld = Old
+        try:
+            shared = [1, 2]
+            o = Old()
+            o.state = shared
+            for proto in [0, 1, 2]:
+                x = _pickle.loads(_pickle.dumps([shared, o, shared], proto))
+                assert x[0] == [1, 2]
+                assert x[1].state is x[0]
+                assert x[2] is x[0]
+        finally:
+            del __builtin__.PickleTestOld
+
+    def test_errors(self):
+        import _pickle, pickle
+        raises(pickle.PicklingError, _pickle.dumps, lambda: 5)
+        class Local(object):
+            pass
+        raises(pickle.PicklingError, _pickle.dumps, Local)
+        e = raises(pickle.UnpicklingError, _pickle.loads, 'z')
+        assert str(e.value) == "invalid load key, 'z'."
+        e = raises(pickle.UnpicklingError, _pickle.loads, '.')
+        assert str(e.value) == "unpickling stack underflow"
+        raises(EOFError, _pickle.loads, '')
+        raises(EOFError, _pickle.loads, 'K')
+        raises(ValueError, _pickle.loads, "S'abc\n.")
+        raises(KeyError, _pickle.loads, 'h\x05.')
+
+    def test_unboxed_strategies_are_kept(self):
+        import _pickle
+        from __pypy__ import strategy
+        for proto in [0, 1, 2]:
+            l = _pickle.loads(_pickle.dumps(range(10), proto))
+            assert strategy(l) == "IntegerListStrategy"
+            l = _pickle.loads(_pickle.dumps([1.5, 2.5], proto))
+            assert strategy(l) == "FloatListStrategy"
+
+    def test_cpickle_uses_it(self):
+        import cPickle, _pickle
+        assert cPickle.Pickler is _pickle.Pickler
+        assert cPickle.Unpickler is _pickle.Unpickler
+        assert cPickle.loads is _pickle.loads
+
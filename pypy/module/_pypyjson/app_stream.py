@@ -0,0 +1,27 @@
+from _pypyjson import StreamDecoder
+
+def iterload(f, items=False, chunksize=65536):
+    """Decode the JSON text read from the file 'f' incrementally, and
+yield the top-level values, or the elements of the top-level array if
+'items' is true.  The file is read with readinto() if it has this method,
+and with read() otherwise."""
+    decoder = StreamDecoder(items)
+    readinto = getattr(f, 'readinto', None)
+    if readinto is not None:
+        buf = bytearray(chunksize)
+        view = memoryview(buf)
+        while True:
+            n = readinto(buf)
+            if not n:
+                break
+            for value in decoder.feed(view[:n]):
+                yield value
+    else:
+        while True:
+            data = f.read(chunksize)
+            if not data:
+                break
+            for value in decoder.feed(data):
+                yield value
+    for value in decoder.close():
+        yield value
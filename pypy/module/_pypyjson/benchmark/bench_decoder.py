@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+""" Measure the speed of _pypyjson.loads() on a corpus of documents sharing
+the same few schemas, like the requests and responses of an HTTP API, and
+on the same corpus with all the keys made unique, which defeats the caches
+of keys and object shapes.  Run it with a translated pypy-c:
+
+    pypy-c bench_decoder.py [number of documents] [number of repetitions]
+"""
+
+import sys, time, random
+import json
+import _pypyjson
+
+
+def make_user(rnd, i):
+    return {
+        'id': i,
+        'name': 'user%d' % rnd.randrange(100000),
+        'email': 'user%d@example.com' % rnd.randrange(100000),
+        'active': rnd.random() < 0.9,
+        'score': round(rnd.random() * 100, 2),
+        'roles': rnd.sample(['admin', 'dev', 'ops', 'viewer'], 2),
+        'address': {'street': '%d Main St' % rnd.randrange(1000),
+                    'city': rnd.choice(['Paris', 'Berlin', 'Lyon']),
+                    'zip': '%05d' % rnd.randrange(100000)},
+        }
+
+def make_order(rnd, i):
+    return {
+        'order_id': 'o-%d' % i,
+        'status': rnd.choice(['new', 'paid', 'shipped']),
+        'total': round(rnd.random() * 500, 2),
+        'currency': 'EUR',
+        'items': [{'sku': 'sku-%d' % rnd.randrange(5000),
+                   'qty': rnd.randrange(1, 5),
+                   'price': round(rnd.random() * 100, 2)}
+                  for j in range(rnd.randrange(1, 6))],
+        }
+
+def make_event(rnd, i):
+    return {
+        'ts': 1500000000 + i,
+        'level': rnd.choice(['INFO', 'WARN', 'ERROR']),
+        'service': rnd.choice(['auth', 'billing', 'search']),
+        'latency_ms': rnd.randrange(1, 2000),
+        'tags': {'region': rnd.choice(['eu', 'us']), 'canary': False},
+        }
+
+def make_corpus(n):
+    rnd = random.Random(42)
+    makers = [make_user, make_order, make_event]
+    return [json.dumps(makers[i % 3](rnd, i)) for i in range(n)]
+
+def make_unique_keys(corpus):
+    # every document gets its own set of keys
+    result = []
+    for i, doc in enumerate(corpus):
+        result.append(doc.replace('": ', '_%d": ' % i))
+    return result
+
+def run(corpus, repeat):
+    loads = _pypyjson.loads
+    best = None
+    for i in range(repeat):
+        t0 = time.time()
+        for doc in corpus:
+            loads(doc)
+        t = time.time() - t0
+        if best is None or t < best:
+            best = t
+    return best
+
+def main(n=100000, repeat=5):
+    corpus = make_corpus(n)
+    unique = make_unique_keys(corpus)
+    size = sum(map(len, corpus))
+    t_shared = run(corpus, repeat)
+    t_unique = run(unique, repeat)
+    print '%d documents, %.1f MB' % (n, size / 1e6)
+    print 'repeated schemas: %8.4f s  %7.1f MB/s' % (t_shared,
+                                                       size / 1e6 / t_shared)
+    print 'unique keys:      %8.4f s' % (t_unique,)
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
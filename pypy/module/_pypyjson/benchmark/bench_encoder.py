@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+""" Compare the speed of json.dumps() using the interp-level encoder
+(_pypyjson.dumps) with the app-level one of json/encoder.py, on the
+documents of bench_decoder.py.  Run it with a translated pypy-c:
+
+    pypy-c bench_encoder.py [number of documents] [number of repetitions]
+"""
+
+import sys, time
+import json, json.encoder
+import bench_decoder
+
+
+def run(docs, repeat, **kwds):
+    dumps = json.dumps
+    best = None
+    for i in range(repeat):
+        t0 = time.time()
+        for doc in docs:
+            dumps(doc, **kwds)
+        t = time.time() - t0
+        if best is None or t < best:
+            best = t
+    return best
+
+def main(n=100000, repeat=5):
+    interp_dumps = json.encoder._pypyjson_dumps
+    if interp_dumps is None:
+        print 'no _pypyjson.dumps, nothing to compare'
+        return
+    docs = [json.loads(s) for s in bench_decoder.make_corpus(n)]
+    print '%-28s %10s %10s %7s' % ('options', 'app-level', 'interp', 'ratio')
+    for kwds in [{}, {'sort_keys': True}, {'indent': 2},
+                 {'separators': (',', ':')}]:
+        t_interp = run(docs, repeat, **kwds)
+        json.encoder._pypyjson_dumps = None
+        try:
+            t_app = run(docs, repeat, **kwds)
+        finally:
+            json.encoder._pypyjson_dumps = interp_dumps
+        print '%-28s %10.4f %10.4f %6.1fx' % (kwds, t_app, t_interp,
+                                              t_app / t_interp)
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
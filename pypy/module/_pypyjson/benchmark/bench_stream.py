@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+""" Compare decoding a large newline-delimited JSON file with
+_pypyjson.iterload() and with json.loads() on the whole content, measuring
+the time and the peak memory of the process.  Run it with a translated
+pypy-c:
+
+    pypy-c bench_stream.py [number of documents] [iterload|loads]
+
+Run each mode in its own process, because the peak memory is read from
+getrusage().
+"""
+
+import sys, time, os, tempfile, resource
+import _pypyjson
+from bench_decoder import make_corpus
+
+
+def write_file(n):
+    fd, path = tempfile.mkstemp(suffix='.json')
+    f = os.fdopen(fd, 'wb')
+    try:
+        f.write('\n'.join(make_corpus(n)))
+    finally:
+        f.close()
+    return path
+
+def bench_iterload(path):
+    f = open(path, 'rb')
+    try:
+        count = 0
+        for value in _pypyjson.iterload(f):
+            count += 1
+        return count
+    finally:
+        f.close()
+
+def bench_loads(path):
+    f = open(path, 'rb')
+    try:
+        data = f.read()
+    finally:
+        f.close()
+    # the content is turned into one array, like a program without a
+    # streaming API would have to do
+    values = _pypyjson.loads('[%s]' % data.replace('\n', ','))
+    return len(values)
+
+def main(n=200000, mode='iterload'):
+    path = write_file(n)
+    try:
+        t0 = time.time()
+        if mode == 'iterload':
+            count = bench_iterload(path)
+        else:
+            count = bench_loads(path)
+        t = time.time() - t0
+        size = os.path.getsize(path)
+    finally:
+        os.unlink(path)
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print '%s: %d documents, %.1f MB' % (mode, count, size / 1e6)
+    print 'time:     %8.4f s  %7.1f MB/s' % (t, size / 1e6 / t)
+    print 'max RSS:  %8.1f MB' % (maxrss / 1024.0,)
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    n = int(args[0]) if args else 200000
+    mode = args[1] if len(args) > 1 else 'iterload'
+    main(n, mode)
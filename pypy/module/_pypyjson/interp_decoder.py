@@ -5,6 +5,7 @@ from rpython.rlib import rfloat, runicode
 from rpython.rtyper.lltypesystem import lltype, rffi
 from pypy.interpreter.error import oefmt
 from pypy.interpreter import unicodehelper
+from pypy.objspace.std.dictmultiobject import W_DictObject, UnicodeDictStrategy
 
 OVF_DIGITS = len(str(sys.maxint))
 
@@ -42,6 +43,86 @@ def strslice2unicode_latin1(s, start, end):
         ll_res.chars[i] = cast_primitive(UniChar, ch)
     return hlunicode(ll_res)
 
+# the caches below are bounded: when they grow too large, they are
+# emptied and start learning again
+MAX_CACHED_KEYS = 5000
+MAX_CACHED_KEY_LENGTH = 128
+MAX_SHAPES = 5000
+SMALL_INTS = 256
+
+
+class ObjectShape(object):
+    """ A node in the tree of the sequences of keys seen in JSON objects.
+    The object {"a": 1, "b": 2} has the shape reached from the root by
+    following the transition "a" and then "b".  Every key is decoded only
+    once, when its shape is created, and all the objects of the same shape
+    share the same unicode strings as keys.
+    """
+    def __init__(self, parent, key_bytes, key):
+        self.parent = parent
+        self.key_bytes = key_bytes   # the key as it appears in the JSON text
+        self.key = key               # the decoded key
+        self.transitions = {}        # key_bytes -> ObjectShape
+        # the child that was used last: most of the time it is the one
+        # expected next, which can be checked without allocating anything
+        self.last_child = None
+        self.keys = None
+
+    def get_keys(self):
+        """ The list of keys of the objects with this shape, in order. """
+        if self.keys is None:
+            keys = []
+            shape = self
+            while shape.parent is not None:
+                keys.append(shape.key)
+                shape = shape.parent
+            keys.reverse()
+            self.keys = keys
+        return self.keys
+
+
+class JSONCache(object):
+    """ The caches kept between calls to loads(): the decoded keys and the
+    object shapes, plus the wrapped small ints. """
+    def __init__(self, space):
+        self.keys = {}               # key_bytes -> decoded key
+        self.root_shape = ObjectShape(None, None, None)
+        self.num_shapes = 0
+        self.small_ints_w = [space.newint(i) for i in range(SMALL_INTS)]
+
+    def new_shape(self, parent, key_bytes, key):
+        if self.num_shapes >= MAX_SHAPES:
+            # start again from scratch; the shapes still in use by the
+            # decoders running stay valid
+            self.root_shape = ObjectShape(None, None, None)
+            self.num_shapes = 0
+        shape = ObjectShape(parent, key_bytes, key)
+        parent.transitions[key_bytes] = shape
+        self.num_shapes += 1
+        return shape
+
+    def get_key(self, key_bytes):
+        return self.keys.get(key_bytes, None)
+
+    def add_key(self, key_bytes, key):
+        if len(key_bytes) > MAX_CACHED_KEY_LENGTH:
+            return
+        if len(self.keys) >= MAX_CACHED_KEYS:
+            self.keys = {}
+        self.keys[key_bytes] = key
+
+
+def newdict_unicode_keys(space, keys, values_w):
+    """ Build directly a dict using the unicode strategy. """
+    assert len(keys) == len(values_w)
+    strategy = space.fromcache(UnicodeDictStrategy)
+    storage = strategy.get_empty_storage()
+    d = strategy.unerase(storage)
+    for i in range(len(keys)):
+        d[keys[i]] = values_w[i]
+    return W_DictObject(space, strategy, storage)
+
+
 TYPE_UNKNOWN = 0
 TYPE_STRING = 1
 class JSONDecoder(object):
@@ -168,6 +249,8 @@ class JSONDecoder(object):
             return self.decode_int_slow(start)
 
         self.pos = i
+        if 0 <= intval < SMALL_INTS:
+            return self.space.fromcache(JSONCache).small_ints_w[intval]
         return self.space.wrap(intval)
 
     def decode_float(self, i):
@@ -248,19 +331,27 @@ class JSONDecoder(object):
 
     def decode_object(self, i):
         start = i
-        w_dict = self.space.newdict()
         #
         i = self.skip_whitespace(i)
         if self.ll_chars[i] == '}':
             self.pos = i+1
-            return w_dict
+            return self.space.newdict()
         #
+        shape = self.space.fromcache(JSONCache).root_shape
+        keys = None       # only used once we have left the tree of shapes
+        values_w = []
         while True:
             # parse a key: value
-            self.last_type = TYPE_UNKNOWN
-            w_name = self.decode_any(i)
-            if self.last_type != TYPE_STRING:
+            i = self.skip_whitespace(i)
+            if self.ll_chars[i] != '"':
+                self.decode_any(i)
                 self._raise("Key name must be string for object starting at char %d", start)
+            next_shape, key = self.decode_key(i+1, shape)
+            if next_shape is None and keys is None:
+                keys = shape.get_keys()[:]
+            if keys is not None:
+                keys.append(key)
+            shape = next_shape
             i = self.skip_whitespace(self.pos)
             ch = self.ll_chars[i]
             if ch != ':':
@@ -269,13 +360,15 @@ class JSONDecoder(object):
             i = self.skip_whitespace(i)
             #
             w_value = self.decode_any(i)
-            self.space.setitem(w_dict, w_name, w_value)
+            values_w.append(w_value)
             i = self.skip_whitespace(self.pos)
             ch = self.ll_chars[i]
             i += 1
             if ch == '}':
                 self.pos = i
-                return w_dict
+                if keys is None:
+                    keys = shape.get_keys()
+                return newdict_unicode_keys(self.space, keys, values_w)
             elif ch == ',':
                 pass
             elif ch == '\0':
@@ -285,6 +378,55 @@ class JSONDecoder(object):
                             ch, i-1)
 
 
+    def decode_key(self, i, shape):
+        """ Decode the key of an object, starting just after its opening
+        quote, and return the next shape (or None if 'shape' is None or if
+        the key cannot be cached) together with the decoded key.
+        """
+        if shape is not None:
+            child = shape.last_child
+            if child is not None and self.key_matches(i, child.key_bytes):
+                self.pos = i + len(child.key_bytes) + 1
+                return child, child.key
+        start = i
+        bits = 0
+        while True:
+            ch = self.ll_chars[i]
+            i += 1
+            bits |= ord(ch)
+            if ch == '"':
+                break
+            elif ch == '\\' or ch < '\x20':
+                self.pos = i-1
+                w_key = self.decode_string_escaped(start)
+                return None, self.space.unicode_w(w_key)
+        self.pos = i
+        key_bytes = self.getslice(start, i-1)
+        cache = self.space.fromcache(JSONCache)
+        if shape is not None:
+            child = shape.transitions.get(key_bytes, None)
+            if child is None:
+                key = self.decode_key_bytes(key_bytes, bits)
+                child = cache.new_shape(shape, key_bytes, key)
+            shape.last_child = child
+            return child, child.key
+        key = cache.get_key(key_bytes)
+        if key is None:
+            key = self.decode_key_bytes(key_bytes, bits)
+            cache.add_key(key_bytes, key)
+        return None, key
+
+    def key_matches(self, i, key_bytes):
+        for j in range(len(key_bytes)):
+            if self.ll_chars[i+j] != key_bytes[j]:
+                return False
+        return self.ll_chars[i+len(key_bytes)] == '"'
+
+    def decode_key_bytes(self, key_bytes, bits):
+        if bits & 0x80:
+            return unicodehelper.decode_utf8(self.space, key_bytes)
+        return strslice2unicode_latin1(key_bytes, 0, len(key_bytes))
+
     def decode_string(self, i):
         start = i
         bits = 0
@@ -387,11 +529,9 @@ class JSONDecoder(object):
         lowsurr = int(hexdigits, 16) # the possible ValueError is caugth by the caller
         return 0x10000 + (((highsurr - 0xd800) << 10) | (lowsurr - 0xdc00))
 
-def loads(space, w_s):
-    if space.isinstance_w(w_s, space.w_unicode):
-        raise oefmt(space.w_TypeError,
-                    "Expected utf8-encoded str, got unicode")
-    s = space.str_w(w_s)
+def decode_value(space, s):
+    """Decode the JSON value in the string 's', which must contain nothing
+    else apart from whitespace."""
     decoder = JSONDecoder(space, s)
     try:
         w_res = decoder.decode_any(0)
@@ -404,3 +544,10 @@ def loads(space, w_s):
         return w_res
     finally:
         decoder.close()
+
+def loads(space, w_s):
+    if space.isinstance_w(w_s, space.w_unicode):
+        raise oefmt(space.w_TypeError,
+                    "Expected utf8-encoded str, got unicode")
+    s = space.str_w(w_s)
+    return decode_value(space, s)
@@ -1,6 +1,14 @@
+from rpython.rlib import rfloat
+from rpython.rlib.listsort import make_timsort_class
 from rpython.rlib.rstring import StringBuilder
 from rpython.rlib.runicode import str_decode_utf_8
 from pypy.interpreter import unicodehelper
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.objspace.std.dictmultiobject import W_DictObject
+from pypy.objspace.std.floatobject import float2string
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.listobject import W_ListObject
 
 
 HEX = '0123456789abcdef'
@@ -16,38 +24,34 @@ ESCAPE_BEFORE_SPACE = [ESCAPE_DICT.get(chr(_i), '\\u%04x' % _i)
                        for _i in range(32)]
 
 
-def raw_encode_basestring_ascii(space, w_string):
-    if space.isinstance_w(w_string, space.w_str):
-        s = space.str_w(w_string)
-        for i in range(len(s)):
-            c = s[i]
-            if c >= ' ' and c <= '~' and c != '"' and c != '\\':
-                pass
-            else:
-                first = i
-                break
+def first_special_char(s):
+    """Return the index of the first char of 's' that must be escaped,
+    or -1 if it contains only non-special ascii chars."""
+    for i in range(len(s)):
+        c = s[i]
+        if c >= ' ' and c <= '~' and c != '"' and c != '\\':
+            pass
         else:
-            # the input is a string with only non-special ascii chars
-            return w_string
+            return i
+    return -1
 
-        eh = unicodehelper.decode_error_handler(space)
-        u = str_decode_utf_8(
-                s, len(s), None, final=True, errorhandler=eh,
-                allow_surrogates=True)[0]
-        sb = StringBuilder(len(u))
-        sb.append_slice(s, 0, first)
-    else:
-        # We used to check if 'u' contains only safe characters, and return
-        # 'w_string' directly.  But this requires an extra pass over all
-        # characters, and the expected use case of this function, from
-        # json.encoder, will anyway re-encode a unicode result back to
-        # a string (with the ascii encoding).  This requires two passes
-        # over the characters.  So we may as well directly turn it into a
-        # string here --- only one pass.
-        u = space.unicode_w(w_string)
-        sb = StringBuilder(len(u))
-        first = 0
+def append_encoded_bytes(space, s, sb):
+    """Append to 'sb' the ASCII-only JSON representation of the utf-8
+    string 's', without the quotes."""
+    first = first_special_char(s)
+    if first < 0:
+        sb.append(s)
+        return
+    eh = unicodehelper.decode_error_handler(space)
+    u = str_decode_utf_8(
+            s, len(s), None, final=True, errorhandler=eh,
+            allow_surrogates=True)[0]
+    sb.append_slice(s, 0, first)
+    append_encoded_unicode(u, first, sb)
 
+def append_encoded_unicode(u, first, sb):
+    """Append to 'sb' the ASCII-only JSON representation of u[first:],
+    without the quotes."""
     for i in range(first, len(u)):
         c = u[i]
         if c <= u'~':
@@ -78,5 +82,348 @@ def raw_encode_basestring_ascii(space, w_string):
                 sb.append(HEX[(s2 >> 4) & 0x0f])
                 sb.append(HEX[s2 & 0x0f])
 
+
+def raw_encode_basestring_ascii(space, w_string):
+    if space.isinstance_w(w_string, space.w_str):
+        s = space.str_w(w_string)
+        if first_special_char(s) < 0:
+            # the input is a string with only non-special ascii chars
+            return w_string
+        sb = StringBuilder(len(s))
+        append_encoded_bytes(space, s, sb)
+    else:
+        # We used to check if 'u' contains only safe characters, and return
+        # 'w_string' directly.  But this requires an extra pass over all
+        # characters, and the expected use case of this function, from
+        # json.encoder, will anyway re-encode a unicode result back to
+        # a string (with the ascii encoding).  This requires two passes
+        # over the characters.  So we may as well directly turn it into a
+        # string here --- only one pass.
+        u = space.unicode_w(w_string)
+        sb = StringBuilder(len(u))
+        append_encoded_unicode(u, 0, sb)
+
     res = sb.build()
     return space.wrap(res)
+
+
+# ____________________________________________________________
+# dumps()
+
+class DictItem(object):
+    def __init__(self, w_key, w_value):
+        self.w_key = w_key
+        self.w_value = w_value
+
+ItemBaseTimSort = make_timsort_class()
+
+class ItemSort(ItemBaseTimSort):
+    """Sort the DictItems by key, like sorted(d.items(), key=...)."""
+    def __init__(self, space, list, listlength=None):
+        ItemBaseTimSort.__init__(self, list, listlength)
+        self.space = space
+
+    def lt(self, a, b):
+        space = self.space
+        return space.is_true(space.lt(a.w_key, b.w_key))
+
+
+class JSONEncoder(object):
+    """Produces the same output as json.JSONEncoder.encode() with
+    ensure_ascii=True and encoding='utf-8'.  The lists and dicts are walked
+    directly at interp-level, and the items of the lists using the int,
+    float, bytes or unicode strategy are not wrapped.  Only the objects of
+    other types are passed to 'w_default'.
+    """
+
+    def __init__(self, space, skipkeys, check_circular, allow_nan, indent,
+                 item_separator, key_separator, w_default, sort_keys):
+        self.space = space
+        self.skipkeys = skipkeys
+        self.check_circular = check_circular
+        self.allow_nan = allow_nan
+        self.indent = indent             # -1 for None
+        self.item_separator = item_separator
+        self.key_separator = key_separator
+        self.w_default = w_default
+        self.sort_keys = sort_keys
+        self.markers = {}
+        self.builder = StringBuilder()
+
+    def mark(self, w_obj):
+        if self.check_circular:
+            if w_obj in self.markers:
+                raise oefmt(self.space.w_ValueError,
+                            "Circular reference detected")
+            self.markers[w_obj] = None
+
+    def unmark(self, w_obj):
+        if self.check_circular:
+            del self.markers[w_obj]
+
+    def emit_indent(self, level):
+        """Start a list or a dict, and return the separator to use between
+        its items, together with the new indentation level."""
+        if self.indent < 0:
+            return self.item_separator, level
+        level += 1
+        newline_indent = '\n' + ' ' * (self.indent * level)
+        self.builder.append(newline_indent)
+        return self.item_separator + newline_indent, level
+
+    def emit_unindent(self, level):
+        if self.indent >= 0:
+            self.builder.append('\n')
+            self.builder.append(' ' * (self.indent * (level - 1)))
+
+    def floatstr(self, x):
+        if rfloat.isfinite(x):
+            return float2string(x, 'r', 0)
+        if not self.allow_nan:
+            space = self.space
+            raise oefmt(space.w_ValueError,
+                        "Out of range float values are not JSON compliant: "
+                        "%R", space.newfloat(x))
+        if rfloat.isnan(x):
+            return 'NaN'
+        elif x > 0:
+            return 'Infinity'
+        else:
+            return '-Infinity'
+
+    def intstr(self, w_obj):
+        space = self.space
+        if type(w_obj) is W_IntObject:
+            return str(space.int_w(w_obj))
+        # a long, or a subclass of int or long
+        return space.str_w(space.str(w_obj))
+
+    def append_string(self, w_string):
+        space = self.space
+        self.builder.append('"')
+        if space.isinstance_w(w_string, space.w_str):
+            append_encoded_bytes(space, space.str_w(w_string), self.builder)
+        else:
+            append_encoded_unicode(space.unicode_w(w_string), 0, self.builder)
+        self.builder.append('"')
+
+    def encode(self, w_obj, level):
+        space = self.space
+        if (space.isinstance_w(w_obj, space.w_str) or
+                space.isinstance_w(w_obj, space.w_unicode)):
+            self.append_string(w_obj)
+        elif space.is_w(w_obj, space.w_None):
+            self.builder.append('null')
+        elif space.is_w(w_obj, space.w_True):
+            self.builder.append('true')
+        elif space.is_w(w_obj, space.w_False):
+            self.builder.append('false')
+        elif (space.isinstance_w(w_obj, space.w_int) or
+                space.isinstance_w(w_obj, space.w_long)):
+            self.builder.append(self.intstr(w_obj))
+        elif space.isinstance_w(w_obj, space.w_float):
+            self.builder.append(self.floatstr(space.float_w(w_obj)))
+        elif (space.isinstance_w(w_obj, space.w_list) or
+                space.isinstance_w(w_obj, space.w_tuple)):
+            self.encode_list(w_obj, level)
+        elif space.isinstance_w(w_obj, space.w_dict):
+            self.encode_dict(w_obj, level)
+        else:
+            self.mark(w_obj)
+            if self.w_default is None:
+                raise oefmt(space.w_TypeError, "%R is not JSON serializable",
+                            w_obj)
+            w_res = space.call_function(self.w_default, w_obj)
+            self.encode(w_res, level)
+            self.unmark(w_obj)
+
+    def encode_list(self, w_list, level):
+        space = self.space
+        if not space.is_true(w_list):
+            self.builder.append('[]')
+            return
+        self.mark(w_list)
+        self.builder.append('[')
+        separator, level = self.emit_indent(level)
+        if type(w_list) is W_ListObject:
+            self.encode_list_items(w_list, separator, level)
+        elif space.is_w(space.type(w_list), space.w_tuple):
+            items_w = space.fixedview(w_list)
+            for i in range(len(items_w)):
+                if i > 0:
+                    self.builder.append(separator)
+                self.encode(items_w[i], level)
+        else:
+            w_iter = space.iter(w_list)
+            first = True
+            while True:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                if first:
+                    first = False
+                else:
+                    self.builder.append(separator)
+                self.encode(w_item, level)
+        self.emit_unindent(level)
+        self.builder.append(']')
+        self.unmark(w_list)
+
+    def encode_list_items(self, w_list, separator, level):
+        builder = self.builder
+        intlist = w_list.getitems_int()
+        if intlist is not None:
+            for i in range(len(intlist)):
+                if i > 0:
+                    builder.append(separator)
+                builder.append(str(intlist[i]))
+            return
+        floatlist = w_list.getitems_float()
+        if floatlist is not None:
+            for i in range(len(floatlist)):
+                if i > 0:
+                    builder.append(separator)
+                builder.append(self.floatstr(floatlist[i]))
+            return
+        byteslist = w_list.getitems_bytes()
+        if byteslist is not None:
+            for i in range(len(byteslist)):
+                if i > 0:
+                    builder.append(separator)
+                builder.append('"')
+                append_encoded_bytes(self.space, byteslist[i], builder)
+                builder.append('"')
+            return
+        unicodelist = w_list.getitems_unicode()
+        if unicodelist is not None:
+            for i in range(len(unicodelist)):
+                if i > 0:
+                    builder.append(separator)
+                builder.append('"')
+                append_encoded_unicode(unicodelist[i], 0, builder)
+                builder.append('"')
+            return
+        # w_default may change the list: like the 'for' loop of the
+        # app-level version, look at the length again at each step
+        i = 0
+        while i < w_list.length():
+            if i > 0:
+                builder.append(separator)
+            self.encode(w_list.getitem(i), level)
+            i += 1
+
+    def encode_dict(self, w_dict, level):
+        space = self.space
+        if not space.is_true(w_dict):
+            self.builder.append('{}')
+            return
+        self.mark(w_dict)
+        self.builder.append('{')
+        separator, level = self.emit_indent(level)
+        first = True
+        if self.sort_keys:
+            if type(w_dict) is W_DictObject:
+                w_items = w_dict.descr_items(space)
+            else:
+                w_items = space.call_method(w_dict, 'items')
+            items = []
+            for w_item in space.listview(w_items):
+                w_key, w_value = space.fixedview(w_item, 2)
+                items.append(DictItem(w_key, w_value))
+            ItemSort(space, items).sort()
+            for item in items:
+                first = self.encode_dict_item(item.w_key, item.w_value,
+                                              first, separator, level)
+        elif type(w_dict) is W_DictObject:
+            iterator = w_dict.iteritems()
+            while True:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    break
+                first = self.encode_dict_item(w_key, w_value, first,
+                                              separator, level)
+        else:
+            w_iter = space.call_method(w_dict, 'iteritems')
+            while True:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                w_key, w_value = space.fixedview(w_item, 2)
+                first = self.encode_dict_item(w_key, w_value, first,
+                                              separator, level)
+        self.emit_unindent(level)
+        self.builder.append('}')
+        self.unmark(w_dict)
+
+    def encode_dict_item(self, w_key, w_value, first, separator, level):
+        """Encode a 'key: value' pair, unless the key is skipped.  Returns
+        the new value of 'first'."""
+        space = self.space
+        if (space.isinstance_w(w_key, space.w_str) or
+                space.isinstance_w(w_key, space.w_unicode)):
+            key = None
+        else:
+            # JavaScript is weakly typed for these, so it makes sense to
+            # also allow them.  Many encoders seem to do something like this.
+            if space.isinstance_w(w_key, space.w_float):
+                key = self.floatstr(space.float_w(w_key))
+            elif space.is_w(w_key, space.w_True):
+                key = 'true'
+            elif space.is_w(w_key, space.w_False):
+                key = 'false'
+            elif space.is_w(w_key, space.w_None):
+                key = 'null'
+            elif (space.isinstance_w(w_key, space.w_int) or
+                    space.isinstance_w(w_key, space.w_long)):
+                key = self.intstr(w_key)
+            elif self.skipkeys:
+                return first
+            else:
+                raise oefmt(space.w_TypeError, "key %R is not a string",
+                            w_key)
+        if not first:
+            self.builder.append(separator)
+        if key is None:
+            self.append_string(w_key)
+        else:
+            self.builder.append('"')
+            self.builder.append(key)
+            self.builder.append('"')
+        self.builder.append(self.key_separator)
+        self.encode(w_value, level)
+        return False
+
+
+@unwrap_spec(skipkeys=bool, check_circular=bool, allow_nan=bool,
+             sort_keys=bool)
+def dumps(space, w_obj, skipkeys=False, check_circular=True, allow_nan=True,
+          w_indent=None, w_separators=None, w_default=None, sort_keys=False):
+    """dumps(obj, skipkeys=False, check_circular=True, allow_nan=True,
+indent=None, separators=None, default=None, sort_keys=False)
+
+Serialize 'obj' to a JSON formatted str, like json.dumps() with
+ensure_ascii=True and encoding='utf-8'.  'indent' must be None or an int,
+and 'separators' None or a tuple of two strs."""
+    if space.is_none(w_indent):
+        indent = -1
+    else:
+        indent = max(space.int_w(w_indent), 0)
+    if space.is_none(w_separators):
+        item_separator = ', '
+        key_separator = ': '
+    else:
+        w_item_separator, w_key_separator = space.fixedview(w_separators, 2)
+        item_separator = space.str_w(w_item_separator)
+        key_separator = space.str_w(w_key_separator)
+    if space.is_none(w_default):
+        w_default = None
+    encoder = JSONEncoder(space, skipkeys, check_circular, allow_nan, indent,
+                          item_separator, key_separator, w_default, sort_keys)
+    encoder.encode(w_obj, 0)
+    return space.newbytes(encoder.builder.build())
@@ -0,0 +1,200 @@
+"""Incremental decoding of JSON documents that arrive in chunks.
+
+The chunks are only scanned to find where each value ends: this needs to
+follow the strings and the nesting of the brackets, but nothing else.  As
+soon as a value is complete, its text is decoded by JSONDecoder and then
+forgotten, so that at most one value is kept in memory at a time.  In
+'items' mode, the input is a single array and its elements are the values
+returned one by one.
+"""
+
+from rpython.rlib.rstring import StringBuilder
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
+from pypy.module._pypyjson.interp_decoder import decode_value, is_whitespace
+
+# where we are between values, in 'items' mode
+ARRAY_START = 0       # before the '['
+ARRAY_FIRST = 1       # after the '[': expecting a value or ']'
+ARRAY_NEXT = 2        # after a value: expecting ',' or ']'
+ARRAY_ITEM = 3        # after a ',': expecting a value
+ARRAY_DONE = 4        # after the ']'
+
+def is_scalar_char(ch):
+    # the chars of numbers, 'true', 'false', 'null', 'NaN' and 'Infinity'
+    return ch.isalnum() or ch == '-' or ch == '+' or ch == '.'
+
+
+class W_StreamDecoder(W_Root):
+
+    def __init__(self, space, items):
+        self.space = space
+        self.items = items
+        self.array_state = ARRAY_START
+        self.offset = 0           # number of chars consumed before 'chunk'
+        # the beginning of the current value, if it started in a previous
+        # chunk; None if we are between two values
+        self.parts = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.in_scalar = False
+        self.closed = False
+
+    def check_not_closed(self):
+        if self.closed:
+            raise oefmt(self.space.w_ValueError, "the decoder is closed")
+
+    def syntax_error(self, ch, i):
+        if self.array_state == ARRAY_START:
+            raise oefmt(self.space.w_ValueError,
+                        "Expected '[' at char %d, got '%s'", i, ch)
+        elif self.array_state == ARRAY_DONE:
+            raise oefmt(self.space.w_ValueError, "Extra data at char %d", i)
+        else:
+            raise oefmt(self.space.w_ValueError,
+                        "Unexpected '%s' when decoding array (char %d)",
+                        ch, i)
+
+    def start_value(self, ch):
+        if ch == '"':
+            self.in_string = True
+        elif ch == '[' or ch == '{':
+            self.depth = 1
+        else:
+            self.in_scalar = True
+
+    def value_done(self, s, values_w):
+        values_w.append(decode_value(self.space, s))
+        self.parts = None
+        if self.items:
+            self.array_state = ARRAY_NEXT
+
+    def process(self, chunk, values_w):
+        """Scan 'chunk', appending the values that it completes to
+        'values_w'."""
+        start = -1   # the start of the current value in 'chunk', if any
+        if self.parts is not None:
+            start = 0
+        i = 0
+        while i < len(chunk):
+            ch = chunk[i]
+            if start < 0:
+                # between two values
+                if is_whitespace(ch):
+                    pass
+                elif not self.items:
+                    start = i
+                    self.start_value(ch)
+                elif self.array_state == ARRAY_START and ch == '[':
+                    self.array_state = ARRAY_FIRST
+                elif (self.array_state == ARRAY_FIRST or
+                        self.array_state == ARRAY_NEXT) and ch == ']':
+                    self.array_state = ARRAY_DONE
+                elif self.array_state == ARRAY_NEXT and ch == ',':
+                    self.array_state = ARRAY_ITEM
+                elif (self.array_state == ARRAY_FIRST or
+                        self.array_state == ARRAY_ITEM):
+                    start = i
+                    self.start_value(ch)
+                else:
+                    self.syntax_error(ch, self.offset + i)
+                i += 1
+                continue
+            if self.in_scalar:
+                if is_scalar_char(ch):
+                    i += 1
+                    continue
+                # the scalar ends before 'ch', which is processed again
+                self.in_scalar = False
+                self.value_done(self.collect(chunk, start, i), values_w)
+                start = -1
+                continue
+            i += 1
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        self.value_done(self.collect(chunk, start, i),
+                                        values_w)
+                        start = -1
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '[' or ch == '{':
+                self.depth += 1
+            elif ch == ']' or ch == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.value_done(self.collect(chunk, start, i), values_w)
+                    start = -1
+        if start >= 0:
+            # keep the beginning of the value for the next chunk
+            if self.parts is None:
+                self.parts = []
+            self.parts.append(chunk[start:])
+        self.offset += len(chunk)
+
+    def collect(self, chunk, start, end):
+        """Return the whole text of the value that ends at chunk[end]."""
+        assert start >= 0
+        assert end >= start
+        if self.parts is None:
+            return chunk[start:end]
+        size = end
+        for part in self.parts:
+            size += len(part)
+        builder = StringBuilder(size)
+        for part in self.parts:
+            builder.append(part)
+        builder.append_slice(chunk, 0, end)
+        return builder.build()
+
+    @unwrap_spec(data='bufferstr')
+    def descr_feed(self, space, data):
+        """feed(data) -> list of the values completed by 'data'"""
+        self.check_not_closed()
+        values_w = []
+        self.process(data, values_w)
+        return space.newlist(values_w)
+
+    def descr_close(self, space):
+        """close() -> list of the remaining values.  Raises ValueError if the
+        input ends in the middle of a value, or of the array in 'items'
+        mode."""
+        self.check_not_closed()
+        self.closed = True
+        values_w = []
+        if self.parts is not None:
+            # a number or a constant at the end of the input is complete
+            # now; for anything else, decoding the partial value raises
+            # the appropriate error
+            self.in_scalar = False
+            self.value_done(self.collect('', 0, 0), values_w)
+        if self.items and self.array_state != ARRAY_DONE:
+            raise oefmt(space.w_ValueError, "Unterminated array at char %d",
+                        self.offset)
+        return space.newlist(values_w)
+
+
+@unwrap_spec(items=bool)
+def descr_new_streamdecoder(space, w_subtype, items=False):
+    w_decoder = space.allocate_instance(W_StreamDecoder, w_subtype)
+    W_StreamDecoder.__init__(w_decoder, space, items)
+    return w_decoder
+
+W_StreamDecoder.typedef = TypeDef(
+    '_pypyjson.StreamDecoder',
+    __new__ = interp2app(descr_new_streamdecoder),
+    feed = interp2app(W_StreamDecoder.descr_feed),
+    close = interp2app(W_StreamDecoder.descr_close),
+    __doc__ = """StreamDecoder(items=False)
+
+Decode JSON text given in chunks to feed().  Returns the top-level values,
+which can be separated by whitespace as in newline-delimited JSON, or if
+'items' is true, the elements of the single top-level array.""")
@@ -164,6 +164,48 @@ class AppTest(object):
         raises(ValueError, _pypyjson.loads, '{"key"')
         raises(ValueError, _pypyjson.loads, '{"key": 42')
 
+    def test_decode_object_same_keys(self):
+        import _pypyjson
+        s = ('[{"a": 1, "b": [2.5, 300]}, {"a": {"b": 3}, "b": null},'
+             ' {"a": 4}, {"b": 5, "a": 6}, {"a": 7, "b": 8, "c": 9},'
+             ' {"a": 10, "b": 11}]')
+        res = _pypyjson.loads(s)
+        assert res == [{"a": 1, "b": [2.5, 300]}, {"a": {"b": 3}, "b": None},
+                       {"a": 4}, {"b": 5, "a": 6}, {"a": 7, "b": 8, "c": 9},
+                       {"a": 10, "b": 11}]
+        assert [type(key) for d in res for key in d] == [unicode] * 12
+        # the objects with the same keys share them
+        keys = _pypyjson.loads('{"hello": 1}').keys()
+        assert keys[0] is _pypyjson.loads('[{"hello": 2}]')[0].keys()[0]
+
+    def test_decode_object_special_keys(self):
+        import _pypyjson
+        s = '{"a": 1, "\\u1234b": 2, "c\\n": 3, "d": 4}'
+        for i in range(3):
+            assert _pypyjson.loads(s) == {u"a": 1, u"\u1234b": 2,
+                                          u"c\n": 3, u"d": 4}
+        s = '{"\xc3\xa9": 1, "a": 2}'
+        for i in range(3):
+            assert _pypyjson.loads(s) == {u"\xe9": 1, u"a": 2}
+        s = '{"a": 1, "b": 2, "a": 3}'
+        for i in range(3):
+            assert _pypyjson.loads(s) == {u"a": 3, u"b": 2}
+        raises(ValueError, _pypyjson.loads, '{"a": 1, "b')
+        raises(ValueError, _pypyjson.loads, '{"a": 1, "a')
+        raises(UnicodeDecodeError, _pypyjson.loads, '{"\xc3": 1}')
+
+    def test_decode_object_many_keys(self):
+        import _pypyjson
+        # more than the caches can hold
+        for j in range(3):
+            s = '{%s}' % ', '.join(['"%d": %d' % (i, i) for i in range(6000)])
+            d = _pypyjson.loads(s)
+            assert len(d) == 6000
+            assert d[u"5999"] == 5999
+            l = _pypyjson.loads('[%s]' % ', '.join(
+                ['{"key%d": %d}' % (i, i) for i in range(6000)]))
+            assert l[4321] == {u"key4321": 4321}
+
     def test_decode_object_nonstring_key(self):
         import _pypyjson
         raises(ValueError, "_pypyjson.loads('{42: 43}')")
@@ -215,6 +257,166 @@ class AppTest(object):
         assert check("\\\"\b\f\n\r\t") == '\\\\\\"\\b\\f\\n\\r\\t'
         assert check("\x07") == "\\u0007"
 
+    def test_dumps(self):
+        import _pypyjson
+        dumps = _pypyjson.dumps
+        assert dumps(None) == 'null'
+        assert dumps([True, False, 1, -2L, 2**100, 1.5, 1e100]) == (
+            '[true, false, 1, -2, 1267650600228229401496703205376, 1.5, '
+            '1e+100]')
+        assert dumps('a"\\\n\xc3\xa9') == '"a\\"\\\\\\n\\u00e9"'
+        assert dumps(u'\U00012345') == '"\\ud808\\udf45"'
+        assert dumps((1, [2.5, 'x', u'y'], {})) == '[1, [2.5, "x", "y"], {}]'
+        for key, expected in [('a', 'a'), (u'b', 'b'), (1, '1'), (2L, '2'),
+                              (1.5, '1.5'), (None, 'null'), (True, 'true'),
+                              (False, 'false')]:
+            assert dumps({key: []}) == '{"%s": []}' % expected
+        raises(UnicodeDecodeError, dumps, '\xc3')
+        raises(TypeError, dumps, object())
+        raises(TypeError, dumps, {(1, 2): 3})
+        assert dumps({(1, 2): 3, 'a': 4}, skipkeys=True) == '{"a": 4}'
+        assert dumps(float('nan')) == 'NaN'
+        assert dumps([float('inf'), float('-inf')]) == (
+            '[Infinity, -Infinity]')
+        raises(ValueError, dumps, [float('inf')], allow_nan=False)
+        raises(ValueError, dumps, {float('nan'): 1}, allow_nan=False)
+
+    def test_dumps_options(self):
+        import _pypyjson
+        dumps = _pypyjson.dumps
+        d = {'b': [1, {'c': None}], 'a': 'x'}
+        assert dumps(d, sort_keys=True) == (
+            '{"a": "x", "b": [1, {"c": null}]}')
+        assert dumps(d, sort_keys=True, separators=(',', ':')) == (
+            '{"a":"x","b":[1,{"c":null}]}')
+        assert dumps(d, sort_keys=True, indent=2) == (
+            '{\n  "a": "x", \n  "b": [\n    1, \n    {\n      "c": null\n'
+            '    }\n  ]\n}')
+        assert dumps([[]], indent=0) == '[\n[]\n]'
+        assert dumps(set([5]), default=list) == '[5]'
+        assert dumps([1j], default=lambda z: [z.real, z.imag]) == (
+            '[[0.0, 1.0]]')
+        l = [1]
+        l.append(l)
+        raises(ValueError, dumps, l)
+        d = {}
+        d['d'] = d
+        raises(ValueError, dumps, d)
+        raises(ValueError, dumps, 1j, default=lambda x: [x])
+        assert dumps([l[:1], l[:1]]) == '[[1], [1]]'
+        x = [1]
+        assert dumps([x, x]) == '[[1], [1]]'
+        raises(RuntimeError, dumps, l, check_circular=False)
+
+    def test_dumps_strategies_and_subclasses(self):
+        import _pypyjson
+        dumps = _pypyjson.dumps
+        assert dumps(range(5)) == '[0, 1, 2, 3, 4]'
+        assert dumps([0.5, 1.5]) == '[0.5, 1.5]'
+        assert dumps(['a', 'b"']) == '["a", "b\\""]'
+        assert dumps([u'a', u'\xe9']) == '["a", "\\u00e9"]'
+        assert dumps(dict.fromkeys(range(3))) == (
+            '{"0": null, "1": null, "2": null}')
+        class MyInt(int):
+            def __str__(self):
+                return '42'
+        class MyList(list):
+            def __iter__(self):
+                yield 'iter'
+        class MyTuple(tuple):
+            def __iter__(self):
+                yield 'iter'
+        class MyDict(dict):
+            def iteritems(self):
+                yield 'k', 'v'
+            def items(self):
+                return [('k2', 'v2')]
+        assert dumps([MyInt(5), {MyInt(5): 1}]) == '[42, {"42": 1}]'
+        assert dumps(MyList([1])) == '["iter"]'
+        assert dumps(MyTuple([1])) == '["iter"]'
+        assert dumps(MyDict(a=1)) == '{"k": "v"}'
+        assert dumps(MyDict(a=1), sort_keys=True) == '{"k2": "v2"}'
+        l = []
+        def default(obj):
+            l.append(5)
+            return 7
+        l.append(object())
+        assert dumps(l, default=default) == '[7, 5]'
+
+    def test_stream_decoder(self):
+        import _pypyjson
+        text = ('{"a": [1, "x]}\\"", {}], "b": null} 12 "s" [] -1.5e3\n'
+                'true{"c": 3}[[]]null  ')
+        expected = [{u"a": [1, u"x]}\"", {}], u"b": None}, 12, u"s", [],
+                    -1500.0, True, {u"c": 3}, [[]], None]
+        for size in [1, 2, 3, 7, len(text)]:
+            d = _pypyjson.StreamDecoder()
+            res = []
+            for i in range(0, len(text), size):
+                res += d.feed(text[i:i+size])
+            res += d.close()
+            assert res == expected
+            raises(ValueError, d.feed, '1')
+        d = _pypyjson.StreamDecoder()
+        assert d.feed('1') == []
+        assert d.feed('23 4') == [123]
+        assert d.close() == [4]
+        d = _pypyjson.StreamDecoder()
+        assert d.feed(buffer('[1] [')) == [[1]]
+        assert d.feed(bytearray('2]')) == [[2]]
+        d = _pypyjson.StreamDecoder()
+        assert d.feed('[1, ') == []
+        raises(ValueError, d.close)
+        raises(ValueError, _pypyjson.StreamDecoder().feed, '[1}')
+        assert _pypyjson.StreamDecoder().close() == []
+
+    def test_stream_decoder_items(self):
+        import _pypyjson
+        text = ' [ 1, {"a": [2, "]"]} , "x" ,[], null,-3,"\\"]" ] \n '
+        expected = [1, {u"a": [2, u"]"]}, u"x", [], None, -3, u'"]']
+        for size in [1, 2, 5, len(text)]:
+            d = _pypyjson.StreamDecoder(items=True)
+            res = []
+            for i in range(0, len(text), size):
+                res += d.feed(text[i:i+size])
+            res += d.close()
+            assert res == expected
+        d = _pypyjson.StreamDecoder(items=True)
+        assert d.feed('[1, 2') == [1]
+        assert d.feed('3, 4]') == [23, 4]
+        assert d.close() == []
+        assert _pypyjson.StreamDecoder(True).feed('[]') == []
+        for text in ['{}', '[1 2]', '[1] 2', '[1,, 2]', '[1,]', '[1']:
+            d = _pypyjson.StreamDecoder(items=True)
+            raises(ValueError, "d.feed(text); d.close()")
+        raises(ValueError, _pypyjson.StreamDecoder(items=True).close)
+
+    def test_iterload(self):
+        import _pypyjson
+        class ReadFile(object):
+            def __init__(self, data):
+                self.data = data
+            def read(self, n):
+                result = self.data[:n]
+                self.data = self.data[n:]
+                return result
+        class ReadIntoFile(ReadFile):
+            def readinto(self, buf):
+                data = self.read(len(buf))
+                buf[:len(data)] = data
+                return len(data)
+        lines = ['{"id": %d, "tags": ["a", "b"]}' % i for i in range(100)]
+        expected = [{u"id": i, u"tags": [u"a", u"b"]} for i in range(100)]
+        for cls in [ReadFile, ReadIntoFile]:
+            it = _pypyjson.iterload(cls('\n'.join(lines)), chunksize=16)
+            assert it.next() == expected[0]
+            assert list(it) == expected[1:]
+            it = _pypyjson.iterload(cls('[%s]' % ','.join(lines)), items=True,
+                                    chunksize=7)
+            assert list(it) == expected
+        it = _pypyjson.iterload(ReadFile('[1, 2'), items=True)
+        raises(ValueError, list, it)
+
     def test_error_position(self):
         import _pypyjson
         test_cases = [
@@ -231,3 +433,35 @@ class AppTest(object):
         for inputtext, errmsg in test_cases:
             exc = raises(ValueError, _pypyjson.loads, inputtext)
             assert str(exc.value) == errmsg
+
+
+class AppTestJSONModule(object):
+    spaceconfig = {"usemodules": ['_pypyjson', 'struct', 'binascii']}
+
+    def test_json_module_uses_dumps(self):
+        import json, json.encoder, _pypyjson
+        assert json.encoder._pypyjson_dumps is _pypyjson.dumps
+        samples = [
+            {'a': [1, 2.5, u'\xe9', None, True], 'b': {'c': ('x', {})}},
+            {1: 'x', 2.5: 'y', None: 'z', False: 0},
+            [[], {}, [[1]], 'abc' * 10, -3L],
+            ]
+        options = [{}, {'sort_keys': True}, {'indent': 3},
+                   {'separators': (',', ':'), 'sort_keys': True},
+                   {'indent': 0, 'separators': (',', ': ')}]
+        results = []
+        for sample in samples:
+            for kwds in options:
+                results.append(json.dumps(sample, **kwds))
+        json.encoder._pypyjson_dumps = None
+        try:
+            expected = []
+            for sample in samples:
+                for kwds in options:
+                    expected.append(json.dumps(sample, **kwds))
+        finally:
+            json.encoder._pypyjson_dumps = _pypyjson.dumps
+        assert results == expected
+        assert json.dumps({(1,): 2, 3: 4}, skipkeys=True) == '{"3": 4}'
+        assert json.dumps({'a': 1j}, default=repr) == '{"a": "1j"}'
+        assert json.dumps([u'\xe9'], ensure_ascii=False) == u'["\xe9"]'
@@ -50,14 +50,21 @@ def VMProfError(space, e):
     return OperationError(w_VMProfError, space.wrap(e.msg))
 
 
-@unwrap_spec(fileno=int, period=float)
-def enable(space, fileno, period):
+# the number of bytes allocated between two allocation samples
+MEMORY_SAMPLE_INTERVAL = 512 * 1024
+
+@unwrap_spec(fileno=int, period=float, memory=bool)
+def enable(space, fileno, period, memory=False):
     """Enable vmprof.  Writes go to the given 'fileno', a file descriptor
     opened for writing.  *The file descriptor must remain open at least
     until disable() is called.*
 
     'interval' is a float representing the sampling interval, in seconds.
     Must be smaller than 1.0
+
+    If 'memory' is true, the allocations are sampled too: the stack of
+    the allocation that crosses each new 512KB allocated is written to
+    the profile, with the size and the type of the allocated object.
     """
     w_modules = space.sys.get('modules')
     #if space.contains_w(w_modules, space.wrap('_continuation')):
@@ -65,7 +72,10 @@ def enable(space, fileno, period):
     #                          "with vmprof will crash"),
     #               space.w_RuntimeWarning)
     try:
-        rvmprof.enable(fileno, period)
+        if memory:
+            rvmprof.enable(fileno, period, MEMORY_SAMPLE_INTERVAL)
+        else:
+            rvmprof.enable(fileno, period)
     except rvmprof.VMProfError as e:
         raise VMProfError(space, e)
 
@@ -82,3 +82,11 @@ class AppTestVMProf(object):
         raises(_vmprof.VMProfError, _vmprof.enable, 2, 1e300 * 1e300)
         NaN = (1e300*1e300) / (1e300*1e300)
         raises(_vmprof.VMProfError, _vmprof.enable, 2, NaN)
+
+    def test_enable_memory(self):
+        import _vmprof
+        tmpfile = open(self.tmpfilename, 'wb')
+        _vmprof.enable(tmpfile.fileno(), 0.01, memory=True)
+        raises(_vmprof.VMProfError, _vmprof.enable, tmpfile.fileno(), 0.01)
+        _vmprof.disable()
+        tmpfile.close()
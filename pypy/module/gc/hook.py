@@ -0,0 +1,320 @@
+from rpython.memory.gc.hook import GcHooks
+from rpython.memory.gc import incminimark
+from rpython.rlib import rvmprof
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.executioncontext import AsyncAction
+from pypy.interpreter.gateway import interp2app
+from pypy.interpreter.typedef import (TypeDef, GetSetProperty,
+                                      interp_attrproperty)
+
+
+class LowLevelGcHooks(GcHooks):
+    """The hooks called directly by the GC.  They can only record the
+    events in the counters of the actions below, and fire the actions: the
+    callbacks given at app-level are then called before the next opcode,
+    with the events that occurred in the meantime.
+
+    This is a singleton, made with space.fromcache() and given to the
+    translation by targetpypystandalone.get_gchooks().
+    """
+
+    def __init__(self, space):
+        self.space = space
+        self.w_hooks = space.fromcache(W_AppLevelHooks)
+
+    def is_gc_minor_enabled(self):
+        return self.w_hooks.gc_minor_enabled
+
+    def is_gc_collect_step_enabled(self):
+        return self.w_hooks.gc_collect_step_enabled
+
+    def is_gc_collect_enabled(self):
+        return self.w_hooks.gc_collect_enabled
+
+    def get_alloc_sample_interval(self):
+        # set by _vmprof.enable(..., memory=True)
+        if self.space.config.objspace.usemodules._vmprof:
+            return rvmprof.get_alloc_sample_interval()
+        return 0
+
+    def on_gc_minor(self, duration, total_memory_used, bytes_promoted,
+                    pinned_objects):
+        action = self.w_hooks.gc_minor
+        action.add_duration(duration)
+        action.total_memory_used = total_memory_used
+        action.bytes_promoted += bytes_promoted
+        action.pinned_objects = pinned_objects
+        action.fire()
+
+    def on_gc_collect_step(self, duration, oldstate, newstate):
+        action = self.w_hooks.gc_collect_step
+        action.add_duration(duration)
+        if action.count == 1:
+            action.oldstate = oldstate
+        action.newstate = newstate
+        action.fire()
+
+    def on_gc_collect(self, num_major_collects,
+                      arena_bytes_before, arena_bytes_after,
+                      rawmalloc_bytes_before, rawmalloc_bytes_after):
+        action = self.w_hooks.gc_collect
+        action.count += 1
+        action.num_major_collects = num_major_collects
+        action.arena_bytes_before = arena_bytes_before
+        action.arena_bytes_after = arena_bytes_after
+        action.rawmalloc_bytes_before = rawmalloc_bytes_before
+        action.rawmalloc_bytes_after = rawmalloc_bytes_after
+        action.fire()
+
+    def on_gc_alloc_sample(self, typeid, size):
+        if self.space.config.objspace.usemodules._vmprof:
+            rvmprof.record_allocation(typeid, size)
+
+
+class GcHookAction(AsyncAction):
+    """Accumulates the events since the last call to the app-level
+    callback, and calls it with a stats object."""
+    w_callable = None
+
+    def __init__(self, space):
+        AsyncAction.__init__(self, space)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+
+    def add_duration(self, duration):
+        if self.count == 0 or duration < self.duration_min:
+            self.duration_min = duration
+        if self.count == 0 or duration > self.duration_max:
+            self.duration_max = duration
+        if self.count == 0:
+            self.duration = duration
+        else:
+            self.duration += duration
+        self.count += 1
+
+    def make_stats(self):
+        raise NotImplementedError
+
+    def perform(self, ec, frame):
+        w_callable = self.w_callable
+        if self.count == 0 or w_callable is None:
+            return
+        w_stats = self.make_stats()
+        self.reset()
+        self.space.call_function(w_callable, w_stats)
+
+
+class GcMinorHookAction(GcHookAction):
+
+    def reset(self):
+        self.count = 0
+        self.duration = 0.0
+        self.duration_min = 0.0
+        self.duration_max = 0.0
+        self.total_memory_used = 0
+        self.bytes_promoted = 0
+        self.pinned_objects = 0
+
+    def make_stats(self):
+        return W_GcMinorStats(self.count, self.duration, self.duration_min,
+                              self.duration_max, self.total_memory_used,
+                              self.bytes_promoted, self.pinned_objects)
+
+
+class GcCollectStepHookAction(GcHookAction):
+
+    def reset(self):
+        self.count = 0
+        self.duration = 0.0
+        self.duration_min = 0.0
+        self.duration_max = 0.0
+        self.oldstate = 0
+        self.newstate = 0
+
+    def make_stats(self):
+        return W_GcCollectStepStats(self.count, self.duration,
+                                    self.duration_min, self.duration_max,
+                                    self.oldstate, self.newstate)
+
+
+class GcCollectHookAction(GcHookAction):
+
+    def reset(self):
+        self.count = 0
+        self.num_major_collects = 0
+        self.arena_bytes_before = 0
+        self.arena_bytes_after = 0
+        self.rawmalloc_bytes_before = 0
+        self.rawmalloc_bytes_after = 0
+
+    def make_stats(self):
+        return W_GcCollectStats(self.count, self.num_major_collects,
+                                self.arena_bytes_before,
+                                self.arena_bytes_after,
+                                self.rawmalloc_bytes_before,
+                                self.rawmalloc_bytes_after)
+
+
+class W_AppLevelHooks(W_Root):
+
+    def __init__(self, space):
+        self.space = space
+        self.gc_minor_enabled = False
+        self.gc_collect_step_enabled = False
+        self.gc_collect_enabled = False
+        self.gc_minor = GcMinorHookAction(space)
+        self.gc_collect_step = GcCollectStepHookAction(space)
+        self.gc_collect = GcCollectHookAction(space)
+
+    def descr_get_on_gc_minor(self, space):
+        return self.gc_minor.w_callable or space.w_None
+
+    def descr_set_on_gc_minor(self, space, w_callable):
+        if space.is_none(w_callable):
+            w_callable = None
+        self.gc_minor_enabled = w_callable is not None
+        self.gc_minor.w_callable = w_callable
+        self.gc_minor.reset()
+
+    def descr_get_on_gc_collect_step(self, space):
+        return self.gc_collect_step.w_callable or space.w_None
+
+    def descr_set_on_gc_collect_step(self, space, w_callable):
+        if space.is_none(w_callable):
+            w_callable = None
+        self.gc_collect_step_enabled = w_callable is not None
+        self.gc_collect_step.w_callable = w_callable
+        self.gc_collect_step.reset()
+
+    def descr_get_on_gc_collect(self, space):
+        return self.gc_collect.w_callable or space.w_None
+
+    def descr_set_on_gc_collect(self, space, w_callable):
+        if space.is_none(w_callable):
+            w_callable = None
+        self.gc_collect_enabled = w_callable is not None
+        self.gc_collect.w_callable = w_callable
+        self.gc_collect.reset()
+
+    def descr_set(self, space, w_obj):
+        """set(obj): set all the hooks at once from the attributes
+        on_gc_minor, on_gc_collect_step and on_gc_collect of 'obj', which
+        can be missing.  Use set(None) to remove all the hooks."""
+        w_none = space.w_None
+        self.descr_set_on_gc_minor(space, space.findattr(
+            w_obj, space.wrap('on_gc_minor')) or w_none)
+        self.descr_set_on_gc_collect_step(space, space.findattr(
+            w_obj, space.wrap('on_gc_collect_step')) or w_none)
+        self.descr_set_on_gc_collect(space, space.findattr(
+            w_obj, space.wrap('on_gc_collect')) or w_none)
+
+    def descr_reset(self, space):
+        """reset(): remove all the hooks"""
+        self.descr_set(space, space.w_None)
+
+
+class W_GcMinorStats(W_Root):
+
+    def __init__(self, count, duration, duration_min, duration_max,
+                 total_memory_used, bytes_promoted, pinned_objects):
+        self.count = count
+        self.duration = duration
+        self.duration_min = duration_min
+        self.duration_max = duration_max
+        self.total_memory_used = total_memory_used
+        self.bytes_promoted = bytes_promoted
+        self.pinned_objects = pinned_objects
+
+
+class W_GcCollectStepStats(W_Root):
+
+    def __init__(self, count, duration, duration_min, duration_max,
+                 oldstate, newstate):
+        self.count = count
+        self.duration = duration
+        self.duration_min = duration_min
+        self.duration_max = duration_max
+        self.oldstate = oldstate
+        self.newstate = newstate
+        # a major collection was finished, and no new one is started yet
+        self.major_is_done = newstate == incminimark.STATE_SCANNING
+
+
+class W_GcCollectStats(W_Root):
+
+    def __init__(self, count, num_major_collects,
+                 arena_bytes_before, arena_bytes_after,
+                 rawmalloc_bytes_before, rawmalloc_bytes_after):
+        self.count = count
+        self.num_major_collects = num_major_collects
+        self.arena_bytes_before = arena_bytes_before
+        self.arena_bytes_after = arena_bytes_after
+        self.rawmalloc_bytes_before = rawmalloc_bytes_before
+        self.rawmalloc_bytes_after = rawmalloc_bytes_after
+
+
+W_AppLevelHooks.typedef = TypeDef(
+    "GcHooks",
+    on_gc_minor = GetSetProperty(
+        W_AppLevelHooks.descr_get_on_gc_minor,
+        W_AppLevelHooks.descr_set_on_gc_minor),
+    on_gc_collect_step = GetSetProperty(
+        W_AppLevelHooks.descr_get_on_gc_collect_step,
+        W_AppLevelHooks.descr_set_on_gc_collect_step),
+    on_gc_collect = GetSetProperty(
+        W_AppLevelHooks.descr_get_on_gc_collect,
+        W_AppLevelHooks.descr_set_on_gc_collect),
+    set = interp2app(W_AppLevelHooks.descr_set),
+    reset = interp2app(W_AppLevelHooks.descr_reset),
+    __doc__ = """Hooks called after the GC did some work.
+
+Each hook is called with a stats object describing all the events of its
+kind since the previous call: it is not called by the GC itself, but
+before the next bytecode, so several events can be batched together.""",
+    )
+
+W_GcMinorStats.typedef = TypeDef(
+    "GcMinorStats",
+    count = interp_attrproperty("count", cls=W_GcMinorStats),
+    duration = interp_attrproperty("duration", cls=W_GcMinorStats),
+    duration_min = interp_attrproperty("duration_min", cls=W_GcMinorStats),
+    duration_max = interp_attrproperty("duration_max", cls=W_GcMinorStats),
+    total_memory_used = interp_attrproperty("total_memory_used",
+                                            cls=W_GcMinorStats),
+    bytes_promoted = interp_attrproperty("bytes_promoted",
+                                         cls=W_GcMinorStats),
+    pinned_objects = interp_attrproperty("pinned_objects",
+                                         cls=W_GcMinorStats),
+    )
+
+W_GcCollectStepStats.typedef = TypeDef(
+    "GcCollectStepStats",
+    GC_STATES = tuple(incminimark.GC_STATES),
+    count = interp_attrproperty("count", cls=W_GcCollectStepStats),
+    duration = interp_attrproperty("duration", cls=W_GcCollectStepStats),
+    duration_min = interp_attrproperty("duration_min",
+                                       cls=W_GcCollectStepStats),
+    duration_max = interp_attrproperty("duration_max",
+                                       cls=W_GcCollectStepStats),
+    oldstate = interp_attrproperty("oldstate", cls=W_GcCollectStepStats),
+    newstate = interp_attrproperty("newstate", cls=W_GcCollectStepStats),
+    major_is_done = interp_attrproperty("major_is_done",
+                                        cls=W_GcCollectStepStats),
+    )
+
+W_GcCollectStats.typedef = TypeDef(
+    "GcCollectStats",
+    count = interp_attrproperty("count", cls=W_GcCollectStats),
+    num_major_collects = interp_attrproperty("num_major_collects",
+                                             cls=W_GcCollectStats),
+    arena_bytes_before = interp_attrproperty("arena_bytes_before",
+                                             cls=W_GcCollectStats),
+    arena_bytes_after = interp_attrproperty("arena_bytes_after",
+                                            cls=W_GcCollectStats),
+    rawmalloc_bytes_before = interp_attrproperty("rawmalloc_bytes_before",
+                                                 cls=W_GcCollectStats),
+    rawmalloc_bytes_after = interp_attrproperty("rawmalloc_bytes_after",
+                                                cls=W_GcCollectStats),
+    )
@@ -1,6 +1,8 @@
+import time
 from pypy.interpreter.gateway import unwrap_spec
 from pypy.interpreter.error import oefmt
 from rpython.rlib import rgc
+from rpython.rlib.objectmodel import we_are_translated
 
 
 @unwrap_spec(generation=int)
@@ -38,6 +40,21 @@ def collect(space, generation=0):
 
     return space.wrap(0)
 
+@unwrap_spec(max_duration=float)
+def collect_step(space, max_duration=0.0):
+    """Do some work of an incremental major collection: one step, or
+    more until 'max_duration' seconds have passed or the collection is
+    finished.  Meant to be called when the program is idle.  Returns a
+    GcCollectStepStats; its attribute 'major_is_done' tells if a major
+    collection was just finished.  If the GC is not incremental, do a
+    full collection."""
+    from pypy.module.gc.hook import W_GcCollectStepStats
+    start = time.time()
+    states = rgc.collect_step(max_duration)
+    duration = time.time() - start
+    return W_GcCollectStepStats(1, duration, duration, duration,
+                                rgc.old_state(states), rgc.new_state(states))
+
 def enable(space):
     """Non-recursive version.  Enable finalizers now.
     If they were already enabled, no-op.
@@ -79,6 +96,45 @@ def disable_finalizers(space):
 
 # ____________________________________________________________
 
+GC_STATS = [
+    ('total_memory', rgc.TOTAL_MEMORY),
+    ('peak_memory', rgc.PEAK_MEMORY),
+    ('total_arena_memory', rgc.TOTAL_ARENA_MEMORY),
+    ('total_arena_memory_used', rgc.TOTAL_ARENA_MEMORY_USED),
+    ('peak_arena_memory', rgc.PEAK_ARENA_MEMORY),
+    ('total_rawmalloced_memory', rgc.TOTAL_RAWMALLOCED_MEMORY),
+    ('peak_rawmalloced_memory', rgc.PEAK_RAWMALLOCED_MEMORY),
+    ('nursery_size', rgc.NURSERY_SIZE),
+    ('pinned_objects', rgc.PINNED_OBJECTS),
+    ('num_minor_collections', rgc.NUM_MINOR_COLLECTIONS),
+    ('num_major_collections', rgc.NUM_MAJOR_COLLECTIONS),
+    ('total_gc_time_ms', rgc.TOTAL_GC_TIME),
+    ('released_arena_memory', rgc.RELEASED_ARENA_MEMORY),
+    ]
+
+def get_stats(space):
+    """Return a dict with the memory used by the GC and the time spent in
+    it, in bytes and milliseconds.  This is cheap: the counters are kept
+    up-to-date by the GC, and the heap is not walked.  A value is -1 if the
+    GC doesn't provide it."""
+    w_stats = space.newdict()
+    for name, stat_no in GC_STATS:
+        space.setitem_str(w_stats, name, space.newint(rgc.get_stats(stat_no)))
+    jit_allocated = -1
+    jit_used = -1
+    if space.config.translation.jit and we_are_translated():
+        from rpython.rlib import jit_hooks
+        from rpython.rlib.rarithmetic import intmask
+        jit_allocated = intmask(jit_hooks.stats_asmmemmgr_allocated(None))
+        jit_used = intmask(jit_hooks.stats_asmmemmgr_used(None))
+    space.setitem_str(w_stats, 'jit_assembler_memory',
+                      space.newint(jit_allocated))
+    space.setitem_str(w_stats, 'jit_assembler_memory_used',
+                      space.newint(jit_used))
+    return w_stats
+
+# ____________________________________________________________
+
 @unwrap_spec(filename='str0')
 def dump_heap_stats(space, filename):
     tb = rgc._heap_stats()
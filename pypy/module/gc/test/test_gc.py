@@ -83,6 +83,30 @@ class AppTestGC(object):
         assert deleted == [1]
         gc.enable()
 
+    def test_get_stats(self):
+        import gc
+        stats = gc.get_stats()
+        assert sorted(stats) == [
+            'jit_assembler_memory', 'jit_assembler_memory_used',
+            'num_major_collections', 'num_minor_collections',
+            'nursery_size', 'peak_arena_memory', 'peak_memory',
+            'peak_rawmalloced_memory', 'pinned_objects',
+            'released_arena_memory', 'total_arena_memory', 'total_arena_memory_used',
+            'total_gc_time_ms', 'total_memory', 'total_rawmalloced_memory']
+        for value in stats.values():
+            assert type(value) is int
+
+    def test_collect_step(self):
+        import gc
+        stats = gc.collect_step()
+        assert stats.count == 1
+        assert stats.duration >= 0.0
+        assert stats.oldstate in range(len(gc.GcCollectStepStats.GC_STATES))
+        assert stats.newstate in range(len(gc.GcCollectStepStats.GC_STATES))
+        # untranslated, this is a full collection
+        stats = gc.collect_step(0.001)
+        assert stats.major_is_done
+
 
 class AppTestGcDumpHeap(object):
     pytestmark = py.test.mark.xfail(run=False)
@@ -0,0 +1,119 @@
+from pypy.module.gc.hook import LowLevelGcHooks
+from pypy.interpreter.baseobjspace import ObjSpace
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+
+
+class AppTestGcHooks(object):
+
+    def setup_class(cls):
+        space = cls.space
+        gchooks = space.fromcache(LowLevelGcHooks)
+
+        @unwrap_spec(duration=float, total_memory_used=int,
+                     bytes_promoted=int, pinned_objects=int)
+        def fire_gc_minor(space, duration, total_memory_used, bytes_promoted,
+                          pinned_objects):
+            gchooks.fire_gc_minor(duration, total_memory_used, bytes_promoted,
+                                  pinned_objects)
+
+        @unwrap_spec(duration=float, oldstate=int, newstate=int)
+        def fire_gc_collect_step(space, duration, oldstate, newstate):
+            gchooks.fire_gc_collect_step(duration, oldstate, newstate)
+
+        @unwrap_spec(a=int, b=int, c=int, d=int, e=int)
+        def fire_gc_collect(space, a, b, c, d, e):
+            gchooks.fire_gc_collect(a, b, c, d, e)
+
+        @unwrap_spec(ObjSpace)
+        def fire_many(space):
+            gchooks.fire_gc_minor(0.5, 0, 0, 0)
+            gchooks.fire_gc_minor(0.25, 0, 0, 0)
+            gchooks.fire_gc_collect_step(0.75, 0, 1)
+            gchooks.fire_gc_collect_step(0.25, 1, 2)
+
+        cls.w_fire_gc_minor = space.wrap(interp2app(fire_gc_minor))
+        cls.w_fire_gc_collect_step = space.wrap(
+            interp2app(fire_gc_collect_step))
+        cls.w_fire_gc_collect = space.wrap(interp2app(fire_gc_collect))
+        cls.w_fire_many = space.wrap(interp2app(fire_many))
+
+    def teardown_method(self, meth):
+        self.space.appexec([], """():
+            import gc
+            gc.hooks.reset()
+        """)
+
+    def test_default(self):
+        import gc
+        assert gc.hooks.on_gc_minor is None
+        assert gc.hooks.on_gc_collect_step is None
+        assert gc.hooks.on_gc_collect is None
+
+    def test_on_gc_minor(self):
+        import gc
+        lst = []
+        def on_gc_minor(stats):
+            lst.append((stats.count, stats.duration, stats.total_memory_used,
+                        stats.bytes_promoted, stats.pinned_objects))
+        gc.hooks.on_gc_minor = on_gc_minor
+        assert gc.hooks.on_gc_minor is on_gc_minor
+        self.fire_gc_minor(10, 20, 30, 40)
+        self.fire_gc_minor(1, 2, 3, 4)
+        assert lst == [(1, 10, 20, 30, 40), (1, 1, 2, 3, 4)]
+        gc.hooks.on_gc_minor = None
+        self.fire_gc_minor(100, 200, 300, 400)
+        assert len(lst) == 2
+
+    def test_on_gc_collect_step(self):
+        import gc
+        from gc import GcCollectStepStats
+        lst = []
+        def on_gc_collect_step(stats):
+            lst.append((stats.count, stats.duration, stats.oldstate,
+                        stats.newstate))
+        gc.hooks.on_gc_collect_step = on_gc_collect_step
+        self.fire_gc_collect_step(10, GcCollectStepStats.GC_STATES.index(
+            'SCANNING'), 1)
+        assert lst == [(1, 10, 0, 1)]
+        assert 'SWEEPING' in GcCollectStepStats.GC_STATES
+
+    def test_on_gc_collect(self):
+        import gc
+        lst = []
+        def on_gc_collect(stats):
+            lst.append((stats.count, stats.num_major_collects,
+                        stats.arena_bytes_before, stats.arena_bytes_after,
+                        stats.rawmalloc_bytes_before,
+                        stats.rawmalloc_bytes_after))
+        gc.hooks.on_gc_collect = on_gc_collect
+        self.fire_gc_collect(1, 2, 3, 4, 5)
+        assert lst == [(1, 1, 2, 3, 4, 5)]
+
+    def test_events_are_batched(self):
+        import gc
+        class MyHooks(object):
+            minors = []
+            steps = []
+            def on_gc_minor(self, stats):
+                self.minors.append((stats.count, stats.duration,
+                                    stats.duration_min, stats.duration_max))
+            def on_gc_collect_step(self, stats):
+                self.steps.append((stats.count, stats.duration,
+                                   stats.oldstate, stats.newstate))
+        hooks = MyHooks()
+        gc.hooks.set(hooks)
+        assert gc.hooks.on_gc_collect is None
+        self.fire_many()
+        assert hooks.minors == [(2, 0.75, 0.25, 0.5)]
+        assert hooks.steps == [(2, 1.0, 0, 2)]
+        gc.hooks.reset()
+        assert gc.hooks.on_gc_minor is None
+        self.fire_many()
+        assert len(hooks.minors) == 1
+
+    def test_exception_in_hook(self):
+        import gc
+        def on_gc_minor(stats):
+            raise ZeroDivisionError
+        gc.hooks.on_gc_minor = on_gc_minor
+        raises(ZeroDivisionError, "self.fire_gc_minor(1, 2, 3, 4); 42")
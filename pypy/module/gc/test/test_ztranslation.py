@@ -1,4 +1,23 @@
 from pypy.objspace.fake.checkmodule import checkmodule
 
 def test_checkmodule():
-    checkmodule('gc')
+    # the hooks are called by the GC and the actions by the action
+    # dispatcher: make sure that they are annotated too
+    from pypy.objspace.fake.objspace import w_some_obj
+    from pypy.module.gc.hook import LowLevelGcHooks
+    def extra_func(space):
+        gchooks = space.fromcache(LowLevelGcHooks)
+        w_hooks = gchooks.w_hooks
+        w_hooks.descr_set(space, w_some_obj())
+        w_hooks.descr_set_on_gc_minor(space, w_some_obj())
+        w_hooks.descr_set_on_gc_collect_step(space, w_some_obj())
+        w_hooks.descr_set_on_gc_collect(space, w_some_obj())
+        gchooks.fire_gc_minor(1.0, 2, 3, 4)
+        gchooks.fire_gc_collect_step(1.0, 2, 3)
+        gchooks.fire_gc_collect(1, 2, 3, 4, 5)
+        gchooks.get_alloc_sample_interval()
+        gchooks.fire_gc_alloc_sample(1, 2)
+        w_hooks.gc_minor.perform(None, None)
+        w_hooks.gc_collect_step.perform(None, None)
+        w_hooks.gc_collect.perform(None, None)
+    checkmodule('gc', extra_func=extra_func)
@@ -12,11 +12,15 @@ class Module(MixedModule):
         'dont_trace_here': 'interp_jit.dont_trace_here',
         'trace_next_iteration': 'interp_jit.trace_next_iteration',
         'trace_next_iteration_hash': 'interp_jit.trace_next_iteration_hash',
+        'load_hotness_profile': 'hotness.load_hotness_profile',
+        'save_hotness_profile': 'hotness.save_hotness_profile',
         'set_compile_hook': 'interp_resop.set_compile_hook',
         'set_abort_hook': 'interp_resop.set_abort_hook',
         'set_trace_too_long_hook': 'interp_resop.set_trace_too_long_hook',
         'get_stats_snapshot': 'interp_resop.get_stats_snapshot',
         'get_stats_asmmemmgr': 'interp_resop.get_stats_asmmemmgr',
+        'get_stats_loop_memory': 'interp_resop.get_stats_loop_memory',
+        'get_guard_stats': 'interp_resop.get_guard_stats',
         # those things are disabled because they have bugs, but if
         # they're found to be useful, fix test_ztranslation_jit_stats
         # in the backend first. get_stats_snapshot still produces
@@ -41,3 +45,11 @@ class Module(MixedModule):
         w_obj = space.wrap(PARAMETERS)
         space.setattr(space.wrap(self), space.wrap('defaults'), w_obj)
         pypy_hooks.space = space
+
+    def startup(self, space):
+        from pypy.module.pypyjit.hotness import HotnessProfile
+        space.fromcache(HotnessProfile).startup()
+
+    def shutdown(self, space):
+        from pypy.module.pypyjit.hotness import HotnessProfile
+        space.fromcache(HotnessProfile).shutdown()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+""" Measure the warm-up with and without a JIT hotness profile.  The
+workload runs twice in a new process with PYPY_JIT_PROFILE set: the
+first run starts without a profile and saves it at exit, the second one
+starts with it.  Run it with a translated pypy-c:
+
+    pypy-c bench_warmup.py [number of rounds]
+
+For each run, it prints the time of the first round, of the first ten
+rounds, and of the whole run.  The rounds all do the same work, so the
+difference between the first rounds and the last ones is the warm-up.
+"""
+
+import sys, os, time, tempfile, subprocess
+
+
+class Vector(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def add(self, other):
+        return Vector(self.x + other.x, self.y + other.y)
+
+def sum_vectors(n):
+    v = Vector(0, 0)
+    for i in range(n):
+        v = v.add(Vector(i, -i))
+    return v.x
+
+def word_counts(n):
+    counts = {}
+    for i in range(n):
+        word = 'w%d' % (i % 97)
+        counts[word] = counts.get(word, 0) + 1
+    return len(counts)
+
+def sieve(n):
+    flags = [True] * n
+    count = 0
+    for i in range(2, n):
+        if flags[i]:
+            count += 1
+            for j in range(i * i, n, i):
+                flags[j] = False
+    return count
+
+def join_lines(n):
+    lines = []
+    for i in range(n):
+        lines.append(str(i * 3).rjust(8))
+    return len('\n'.join(lines))
+
+def float_sum(n):
+    total = 0.0
+    for i in range(n):
+        total += (i % 13) * 0.5 / (i + 1.0)
+    return total
+
+WORKLOAD = [sum_vectors, word_counts, sieve, join_lines, float_sum]
+
+def one_round():
+    for func in WORKLOAD:
+        func(2000)
+
+def run_workload(rounds):
+    times = []
+    for i in range(rounds):
+        t0 = time.time()
+        one_round()
+        times.append(time.time() - t0)
+    print '%.4f %.4f %.4f' % (times[0], sum(times[:10]), sum(times))
+
+def run_child(profile, rounds):
+    env = os.environ.copy()
+    env['PYPY_JIT_PROFILE'] = profile
+    output = subprocess.check_output(
+        [sys.executable, __file__, '--child', str(rounds)], env=env)
+    return [float(x) for x in output.split()]
+
+def main(rounds=50):
+    fd, profile = tempfile.mkstemp(suffix='.profile')
+    os.close(fd)
+    os.unlink(profile)
+    try:
+        print '%-14s %10s %10s %10s' % ('run', 'round 1', 'rounds 1-10',
+                                        'total')
+        for name in ['no profile', 'with profile']:
+            first, first10, total = run_child(profile, rounds)
+            print '%-14s %10.4f %10.4f %10.4f' % (name, first, first10,
+                                                  total)
+    finally:
+        if os.path.exists(profile):
+            os.unlink(profile)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_workload(int(sys.argv[2]))
+    elif len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
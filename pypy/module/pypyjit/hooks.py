@@ -3,6 +3,8 @@ from rpython.rlib import jit_hooks
 from rpython.rlib.jit import JitHookInterface, Counters
 
 from pypy.interpreter.error import OperationError
+from pypy.module.pypyjit.hotness import (HotnessProfile, KIND_LOOP,
+    KIND_NOINLINE)
 from pypy.module.pypyjit.interp_resop import (Cache, wrap_greenkey,
     WrappedOp, W_JitLoopInfo, wrap_oplist)
 
@@ -30,6 +32,8 @@ class PyPyJitIface(JitHookInterface):
 
     def on_trace_too_long(self, jitdriver, greenkey, greenkey_repr):
         space = self.space
+        space.fromcache(HotnessProfile).record_greenkey(KIND_NOINLINE,
+                                                        jitdriver, greenkey)
         cache = space.fromcache(Cache)
         if cache.in_recursion:
             return
@@ -46,6 +50,8 @@ class PyPyJitIface(JitHookInterface):
                 cache.in_recursion = False
 
     def after_compile(self, debug_info):
+        self.space.fromcache(HotnessProfile).record_greenkey(KIND_LOOP,
+            debug_info.get_jitdriver(), debug_info.greenkey)
         self._compile_hook(debug_info, is_bridge=False)
 
     def after_compile_bridge(self, debug_info):
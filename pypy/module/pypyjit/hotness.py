@@ -0,0 +1,238 @@
+"""
+The JIT hotness profile.
+
+The JIT records here the places where it compiled a loop, and the
+functions that it marked as not inlinable because their traces were too
+long.  This list can be saved to a file, and loaded again by the next
+process running the same code: when the code object is created, the
+counters of the recorded loops are set close to the threshold with
+trace_next_iteration(), and the recorded functions are marked with
+dont_trace_here(), which makes the JIT trace them the first time they are
+called.  This cuts the warm-up time after a restart.
+
+The code objects are identified by their co_filename, co_firstlineno and
+a checksum of their co_code, so that an edited file doesn't get the
+profile of its previous version.
+
+If the environment variable PYPY_JIT_PROFILE is set to a file name, the
+profile is loaded from that file at startup (if it exists) and saved
+there at exit.  The functions load_hotness_profile() and
+save_hotness_profile() do the same explicitly, e.g. to save periodically
+a profile from a process that never exits.
+
+Nothing is recorded before the profile is needed, i.e. before one of
+these two functions is called if PYPY_JIT_PROFILE is not set: a process
+that doesn't use the profile pays nothing at each compilation.
+"""
+
+import os
+from rpython.rlib import jit, jit_hooks
+from rpython.rlib.listsort import make_timsort_class
+from rpython.rlib.rarithmetic import intmask, r_uint
+from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rzipfile import crc32
+from rpython.rtyper.annlowlevel import (cast_base_ptr_to_instance,
+                                        cast_instance_to_gcref)
+from rpython.rtyper.lltypesystem import lltype
+from rpython.rtyper.rclass import OBJECT
+from pypy.interpreter.error import wrap_oserror2
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.interpreter.pycode import PyCode
+
+
+HEADER = '# pypy jit hotness profile 1\n'
+
+KIND_LOOP = 'loop'           # a compiled loop
+KIND_NOINLINE = 'noinline'   # a function that the JIT doesn't inline
+
+StringSort = make_timsort_class()
+
+
+class Seed(object):
+    def __init__(self, kind, next_instr, is_being_profiled, checksum):
+        self.kind = kind
+        self.next_instr = next_instr
+        self.is_being_profiled = is_being_profiled
+        self.checksum = checksum
+
+
+def code_checksum(pycode):
+    return intmask(crc32(pycode.co_code))
+
+def _code_key(firstlineno, filename):
+    return '%d %s' % (firstlineno, filename)
+
+
+class HotnessProfile(object):
+
+    def __init__(self, space):
+        self.space = space
+        self.filename = None    # from PYPY_JIT_PROFILE
+        self.recording = False  # see record_greenkey()
+        self.entries = {}       # {line of the file: None}
+        self.seeds = {}         # {_code_key(): [Seed]}
+
+    def record(self, kind, next_instr, is_being_profiled, pycode):
+        filename = pycode.co_filename
+        if '\n' in filename:
+            return
+        line = '%s %d %d %d %d %s\n' % (kind, next_instr, is_being_profiled,
+                                        pycode.co_firstlineno,
+                                        code_checksum(pycode), filename)
+        self.entries[line] = None
+
+    def record_greenkey(self, kind, jitdriver, greenkey):
+        # called by the JIT hooks at each compilation
+        if not self.recording:
+            return
+        if jitdriver.name != 'pypyjit' or greenkey is None:
+            return
+        next_instr = greenkey[0].getint()
+        is_being_profiled = greenkey[1].getint()
+        ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT),
+                                         greenkey[2].getref_base())
+        pycode = cast_base_ptr_to_instance(PyCode, ll_code)
+        self.record(kind, next_instr, is_being_profiled, pycode)
+
+    def add_line(self, line):
+        """Add one line read from a profile file.  Invalid lines are
+        ignored."""
+        words = line.split(' ', 5)
+        if len(words) != 6 or words[0] not in (KIND_LOOP, KIND_NOINLINE):
+            return
+        try:
+            next_instr = int(words[1])
+            is_being_profiled = int(words[2])
+            firstlineno = int(words[3])
+            checksum = int(words[4])
+        except ValueError:
+            return
+        self.entries[line + '\n'] = None
+        seeds = self.seeds.setdefault(_code_key(firstlineno, words[5]), [])
+        for seed in seeds:
+            if (seed.kind == words[0] and seed.next_instr == next_instr and
+                    seed.is_being_profiled == is_being_profiled and
+                    seed.checksum == checksum):
+                return     # already loaded
+        seeds.append(Seed(words[0], next_instr, is_being_profiled, checksum))
+
+    def load(self, filename):
+        data = _read_file(filename)
+        if not data.startswith(HEADER):
+            return
+        for line in data[len(HEADER):].split('\n'):
+            if line:
+                self.add_line(line)
+
+    def save(self, filename):
+        lines = self.entries.keys()
+        StringSort(lines).sort()
+        builder = StringBuilder()
+        builder.append(HEADER)
+        for line in lines:
+            builder.append(line)
+        # write a new file and rename it, so that several processes
+        # saving the same profile don't produce a mixed-up file
+        tmpname = '%s.%d' % (filename, os.getpid())
+        _write_file(tmpname, builder.build())
+        os.rename(tmpname, filename)
+
+    @jit.dont_look_inside
+    def seed(self, pycode):
+        seeds = self.seeds.get(_code_key(pycode.co_firstlineno,
+                                         pycode.co_filename), None)
+        if seeds is None:
+            return
+        checksum = code_checksum(pycode)
+        ll_pycode = cast_instance_to_gcref(pycode)
+        for seed in seeds:
+            if seed.checksum != checksum:
+                continue
+            if seed.kind == KIND_LOOP:
+                jit_hooks.trace_next_iteration('pypyjit',
+                                               r_uint(seed.next_instr),
+                                               seed.is_being_profiled,
+                                               ll_pycode)
+            else:
+                jit_hooks.dont_trace_here('pypyjit', r_uint(seed.next_instr),
+                                          seed.is_being_profiled, ll_pycode)
+
+    def startup(self):
+        filename = os.environ.get('PYPY_JIT_PROFILE')
+        if filename:
+            self.filename = filename
+            self.recording = True
+            try:
+                self.load(filename)
+            except OSError:
+                pass     # e.g. the first run, there is no profile yet
+
+    def shutdown(self):
+        if self.filename is not None:
+            try:
+                self.save(self.filename)
+            except OSError:
+                pass
+
+
+def _init_hotness_profile(pycode):
+    profile = pycode.space.fromcache(HotnessProfile)
+    if profile.seeds:
+        profile.seed(pycode)
+
+PyCode._init_hotness_profile = _init_hotness_profile
+
+
+def _read_file(filename):
+    fd = os.open(filename, os.O_RDONLY, 0)
+    try:
+        builder = StringBuilder()
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            builder.append(data)
+    finally:
+        os.close(fd)
+    return builder.build()
+
+def _write_file(filename, data):
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666)
+    try:
+        while data:
+            count = os.write(fd, data)
+            data = data[count:]
+    finally:
+        os.close(fd)
+
+
+@unwrap_spec(filename='str0')
+def load_hotness_profile(space, filename):
+    """load_hotness_profile(filename)
+
+    Load a JIT hotness profile written by save_hotness_profile().  The
+    loops and functions that it lists are compiled early in the code
+    objects created afterwards, e.g. by importing modules.
+    """
+    profile = space.fromcache(HotnessProfile)
+    profile.recording = True
+    try:
+        profile.load(filename)
+    except OSError as e:
+        raise wrap_oserror2(space, e, space.wrap(filename))
+
+@unwrap_spec(filename='str0')
+def save_hotness_profile(space, filename):
+    """save_hotness_profile(filename)
+
+    Save the JIT hotness profile: where the JIT compiled loops so far,
+    and which functions it doesn't inline, as well as the content of the
+    profiles loaded.  Setting PYPY_JIT_PROFILE=filename in the environment
+    does the same at exit, and loads the profile at startup.
+    """
+    profile = space.fromcache(HotnessProfile)
+    profile.recording = True
+    try:
+        profile.save(filename)
+    except OSError as e:
+        raise wrap_oserror2(space, e, space.wrap(filename))
@@ -384,6 +384,47 @@ def get_stats_asmmemmgr(space):
     m2 = jit_hooks.stats_asmmemmgr_used(None)
     return space.newtuple([space.wrap(m1), space.wrap(m2)])
 
+def get_stats_loop_memory(space):
+    """Returns the state of the 'loop_memory_limit' JIT parameter, as a
+    dict with the keys 'loop_memory' (the estimated memory used by the
+    machine code and resume data of the loops kept alive), 'limit' (both
+    in bytes, the limit is 0 if there is none) and 'evicted_loops' (the
+    number of loops freed so far because of the limit)."""
+    w_stats = space.newdict()
+    space.setitem_str(w_stats, 'loop_memory',
+                      space.wrap(jit_hooks.stats_memmgr_loop_memory(None)))
+    space.setitem_str(w_stats, 'limit',
+                      space.wrap(jit_hooks.stats_memmgr_max_memory(None)))
+    space.setitem_str(w_stats, 'evicted_loops',
+                      space.wrap(jit_hooks.stats_memmgr_evicted_loops(None)))
+    return w_stats
+
+def get_guard_stats(space):
+    """Returns the guards of the compiled loops, as a dict
+    {loop_number: [(guard_number, fail_count, has_bridge, location)]}.
+    The loops include their bridges.  'fail_count' is the number of times
+    the guard failed, either into the interpreter or, once it has one,
+    into its bridge.  'location' is the bytecode position of the guard,
+    as in the debug_merge_point that precedes it.  The guard_number is the
+    same as the one of the bridge counters in the loop_run_times of
+    get_stats_snapshot().  Only the loops compiled after
+    pypyjit.set_param(guard_stats=1) are reported."""
+    ll_stats = jit_hooks.stats_get_guard_stats(None)
+    w_result = space.newdict()
+    for i in range(len(ll_stats)):
+        item = ll_stats[i]
+        w_loop = space.wrap(item.loop)
+        w_guards = space.finditem(w_result, w_loop)
+        if w_guards is None:
+            w_guards = space.newlist([])
+            space.setitem(w_result, w_loop, w_guards)
+        w_guard = space.newtuple([space.wrap(item.guard),
+                                  space.wrap(item.fail_count),
+                                  space.newbool(item.has_bridge),
+                                  space.wrap(hlstr(item.location))])
+        space.call_method(w_guards, 'append', w_guard)
+    return w_result
+
 def enable_debug(space):
     """ Set the jit debugging - completely necessary for some stats to work,
     most notably assembler counters.
@@ -0,0 +1,154 @@
+from rpython.jit.metainterp.history import ConstInt, ConstPtr
+from rpython.rtyper.annlowlevel import (cast_instance_to_gcref,
+                                        cast_base_ptr_to_instance)
+from rpython.rtyper.lltypesystem import lltype
+from rpython.rtyper.rclass import OBJECT
+from rpython.tool.udir import udir
+from pypy.interpreter.pycode import PyCode
+from pypy.module.pypyjit import hotness
+from pypy.module.pypyjit.hotness import HotnessProfile, KIND_LOOP, KIND_NOINLINE
+from pypy.module.pypyjit.interp_jit import pypyjitdriver
+
+
+SOURCE = """if 1:
+    def f(n):
+        i = 0
+        while i < n:
+            i += 1
+        return i
+"""
+
+class FakeJitHooks(object):
+    def __init__(self):
+        self.calls = []
+
+    def _record(self, name, next_instr, is_being_profiled, ll_pycode):
+        ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT), ll_pycode)
+        pycode = cast_base_ptr_to_instance(PyCode, ll_code)
+        self.calls.append((name, int(next_instr), is_being_profiled, pycode))
+
+    def trace_next_iteration(self, jitdriver_name, *greenkey):
+        assert jitdriver_name == 'pypyjit'
+        self._record('trace_next_iteration', *greenkey)
+
+    def dont_trace_here(self, jitdriver_name, *greenkey):
+        assert jitdriver_name == 'pypyjit'
+        self._record('dont_trace_here', *greenkey)
+
+
+class TestHotnessProfile(object):
+    spaceconfig = dict(usemodules=('pypyjit',))
+
+    def make_code(self, source=SOURCE, filename='hotness_test.py'):
+        w_code = self.space.appexec([self.space.wrap(source),
+                                     self.space.wrap(filename)],
+                                    """(source, filename):
+            d = {}
+            exec compile(source, filename, 'exec') in d
+            return d['f'].func_code
+        """)
+        assert isinstance(w_code, PyCode)
+        return w_code
+
+    def test_save_and_load(self):
+        code = self.make_code()
+        profile = HotnessProfile(self.space)
+        profile.record(KIND_LOOP, 17, 0, code)
+        profile.record(KIND_NOINLINE, 0, 1, code)
+        profile.record(KIND_LOOP, 17, 0, code)      # twice
+        filename = str(udir.join('test_hotness_1'))
+        profile.save(filename)
+        content = open(filename).read()
+        assert content.startswith(hotness.HEADER)
+        assert len(content.splitlines()) == 3
+        assert 'hotness_test.py' in content
+        #
+        profile2 = HotnessProfile(self.space)
+        profile2.load(filename)
+        [key] = profile2.seeds.keys()
+        assert key == '%d hotness_test.py' % (code.co_firstlineno,)
+        seeds = profile2.seeds[key]
+        assert sorted([(s.kind, s.next_instr, s.is_being_profiled)
+                       for s in seeds]) == [(KIND_LOOP, 17, 0),
+                                            (KIND_NOINLINE, 0, 1)]
+        # saving again gives the same file
+        profile2.save(filename)
+        assert open(filename).read() == content
+
+    def test_load_ignores_invalid_lines(self):
+        filename = str(udir.join('test_hotness_2'))
+        with open(filename, 'w') as f:
+            f.write(hotness.HEADER)
+            f.write('loop 17 0 2 123 foo.py\n')
+            f.write('loop seventeen 0 2 123 foo.py\n')
+            f.write('unknown 17 0 2 123 foo.py\n')
+            f.write('loop 17 0\n')
+            f.write('noinline 0 0 5 -42 file name with spaces.py\n')
+        profile = HotnessProfile(self.space)
+        profile.load(filename)
+        assert sorted(profile.seeds.keys()) == [
+            '2 foo.py', '5 file name with spaces.py']
+        #
+        with open(filename, 'w') as f:
+            f.write('not a profile\n')
+            f.write('loop 17 0 2 123 foo.py\n')
+        profile = HotnessProfile(self.space)
+        profile.load(filename)
+        assert profile.seeds == {}
+
+    def test_record_greenkey(self):
+        code = self.make_code()
+        profile = HotnessProfile(self.space)
+        greenkey = [ConstInt(17), ConstInt(0),
+                    ConstPtr(cast_instance_to_gcref(code))]
+        # nothing is recorded until the profile is used
+        profile.record_greenkey(KIND_LOOP, pypyjitdriver, greenkey)
+        assert profile.entries == {}
+        profile.recording = True
+        profile.record_greenkey(KIND_LOOP, pypyjitdriver, greenkey)
+        profile.record_greenkey(KIND_LOOP, pypyjitdriver, None)
+        [line] = profile.entries.keys()
+        assert line == 'loop 17 0 %d %d hotness_test.py\n' % (
+            code.co_firstlineno, hotness.code_checksum(code))
+
+    def test_seed_new_code_objects(self, monkeypatch):
+        fake = FakeJitHooks()
+        monkeypatch.setattr(hotness, 'jit_hooks', fake)
+        code = self.make_code()
+        profile = self.space.fromcache(HotnessProfile)
+        monkeypatch.setattr(profile, 'seeds', {})
+        monkeypatch.setattr(profile, 'entries', {})
+        profile.record(KIND_LOOP, 17, 0, code)
+        profile.record(KIND_NOINLINE, 0, 0, code)
+        filename = str(udir.join('test_hotness_3'))
+        profile.save(filename)
+        profile.load(filename)
+        assert fake.calls == []
+        #
+        code2 = self.make_code()
+        assert code2 is not code
+        assert sorted(fake.calls) == [('dont_trace_here', 0, 0, code2),
+                                      ('trace_next_iteration', 17, 0, code2)]
+        # a modified version of the code doesn't match the checksum
+        del fake.calls[:]
+        self.make_code(SOURCE.replace('i += 1', 'i -= 1'))
+        assert fake.calls == []
+        # neither does another file
+        self.make_code(filename='other.py')
+        assert fake.calls == []
+
+
+class AppTestHotnessProfile(object):
+    spaceconfig = dict(usemodules=('pypyjit',))
+
+    def setup_class(cls):
+        cls.w_tmpfilename = cls.space.wrap(str(udir.join('test_hotness_4')))
+
+    def test_save_and_load(self):
+        import pypyjit
+        pypyjit.save_hotness_profile(self.tmpfilename)
+        with open(self.tmpfilename) as f:
+            assert f.readline() == '# pypy jit hotness profile 1\n'
+        pypyjit.load_hotness_profile(self.tmpfilename)
+        raises(OSError, pypyjit.load_hotness_profile,
+               self.tmpfilename + '.does_not_exist')
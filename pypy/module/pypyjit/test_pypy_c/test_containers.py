@@ -130,6 +130,56 @@ class TestOtherContainers(BaseTestPyPyC):
             jump(..., descr=...)
         """)
 
+    def test_list_getitem_no_index_check(self):
+        def main(n):
+            lst = [x * 2 for x in range(n)]
+            flst = [float(x) for x in lst]
+            total = 0
+            ftotal = 0.0
+            i = 0
+            while i < len(lst):
+                total += lst[i]       # ID: getitem
+                ftotal += flst[i]     # ID: fgetitem
+                i += 1
+            return total + int(ftotal)
+
+        log = self.run(main, [1000])
+        assert log.result == main(1000)
+        loop, = log.loops_by_filename(self.filepath)
+        # 'i < len(lst)' already checks the index of 'lst[i]'
+        ops = loop.ops_by_id('getitem')
+        assert 'uint_ge' not in log.opnames(ops)
+        assert 'int_ge' not in log.opnames(ops)
+        # the index check of 'flst[i]' becomes 'len(lst) <= len(flst)',
+        # which is only checked before the loop
+        ops = loop.ops_by_id('fgetitem')
+        opnames = log.opnames(ops)
+        assert 'uint_ge' not in opnames
+        assert 'int_ge' not in opnames
+        assert 'int_le' not in opnames
+        assert 'guard_true' not in opnames
+        assert 'guard_false' not in opnames
+
+    def test_list_getitem_range_no_index_check(self):
+        def main(n):
+            lst = [x * 2 for x in range(n)]
+            total = 0
+            for i in range(len(lst)):
+                total += lst[i]       # ID: getitem
+            return total
+
+        log = self.run(main, [1000])
+        assert log.result == main(1000)
+        loop, = log.loops_by_filename(self.filepath)
+        # the index check of 'lst[i]' becomes 'len(range) <= len(lst)',
+        # which is only checked before the loop
+        ops = loop.ops_by_id('getitem')
+        opnames = log.opnames(ops)
+        assert 'uint_ge' not in opnames
+        assert 'int_le' not in opnames
+        assert 'guard_true' not in opnames
+        assert 'guard_false' not in opnames
+
     def test_floatlist_unpack_without_calls(self):
         def fn(n):
             l = [2.3, 3.4, 4.5]
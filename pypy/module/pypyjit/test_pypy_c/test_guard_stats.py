@@ -0,0 +1,41 @@
+from pypy.module.pypyjit.test_pypy_c.test_00_model import BaseTestPyPyC
+
+
+class TestGuardStats(BaseTestPyPyC):
+
+    def test_get_guard_stats(self):
+        def main(n):
+            import pypyjit
+            i = 0
+            total = 0
+            while i < n:
+                if i % 3 == 0:
+                    total += 1
+                i += 1
+            result = []
+            for loop, guards in pypyjit.get_guard_stats().items():
+                for guard, fail_count, has_bridge, location in guards:
+                    if ' main. ' in location:
+                        result.append((fail_count, has_bridge))
+            return result
+        #
+        log = self.run(main, [3000], threshold=200, trace_eagerness=50,
+                       guard_stats=1)
+        assert log.result
+        # the 'i % 3' guard has a bridge, and its failures are still
+        # counted after that, i.e. about one in three iterations
+        assert (True in [has_bridge for _, has_bridge in log.result])
+        for fail_count, has_bridge in log.result:
+            if has_bridge:
+                assert fail_count >= 500
+
+    def test_get_guard_stats_off_by_default(self):
+        def main(n):
+            import pypyjit
+            i = 0
+            while i < n:
+                i += 1
+            return len(pypyjit.get_guard_stats())
+        #
+        log = self.run(main, [3000])
+        assert log.result == 0
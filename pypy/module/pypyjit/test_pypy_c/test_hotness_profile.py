@@ -0,0 +1,33 @@
+from pypy.module.pypyjit.test_pypy_c.test_00_model import BaseTestPyPyC
+
+
+class TestHotnessProfile(BaseTestPyPyC):
+
+    def test_warm_start(self, monkeypatch):
+        def main(n):
+            i = 0
+            total = 0
+            while i < n:
+                total += i * 3    # ID: loop
+                i += 1
+            return total
+        #
+        # too few iterations to reach the threshold
+        log = self.run(main, [100], threshold=1000)
+        assert log.result == main(100)
+        assert log.loops_by_id('loop') == []
+        #
+        profile = self.tmpdir.join('test_warm_start.profile')
+        if profile.check():
+            profile.remove()
+        monkeypatch.setenv('PYPY_JIT_PROFILE', str(profile))
+        log = self.run(main, [2000], threshold=1000)
+        assert len(log.loops_by_id('loop')) == 1
+        assert profile.check()
+        assert 'test_warm_start.py' in profile.read()
+        #
+        # the next run starts with the profile: the loop is compiled even
+        # though it runs much less than the threshold
+        log = self.run(main, [100], threshold=1000)
+        assert log.result == main(100)
+        assert len(log.loops_by_id('loop')) == 1
@@ -411,3 +411,18 @@ class TestMisc(BaseTestPyPyC):
         # the following assertion fails if the loop was cancelled due
         # to "abort: vable escape"
         assert len(loops) == 1
+
+    def test_get_stats_loop_memory(self):
+        def main(n):
+            import pypyjit
+            i = 0
+            while i < n:
+                i += 1
+            stats = pypyjit.get_stats_loop_memory()
+            return [len(pypyjit.get_stats_asmmemmgr()), sorted(stats),
+                    stats['loop_memory'] > 0, stats['limit'],
+                    stats['evicted_loops']]
+        #
+        log = self.run(main, [3000])
+        assert log.result == [2, ['evicted_loops', 'limit', 'loop_memory'],
+                              True, 0, 0]
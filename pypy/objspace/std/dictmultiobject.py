@@ -2,7 +2,9 @@
 
 from rpython.rlib import jit, rerased, objectmodel
 from rpython.rlib.debug import mark_dict_non_null
+from rpython.rlib.longlong2float import float2longlong
 from rpython.rlib.objectmodel import newlist_hint, r_dict, specialize
+from rpython.rlib.rarithmetic import ovfcheck_float_to_int
 from rpython.tool.sourcetools import func_renamer, func_with_new_name
 
 from pypy.interpreter.baseobjspace import W_Root
@@ -31,6 +33,32 @@ def _never_equal_to_string(space, w_lookup_type):
             space.is_w(w_lookup_type, space.w_float))
 
 
+def float_key_eq(x, y):
+    """Equality of unwrapped float keys.  Like 'is' on W_FloatObjects,
+    two floats with the same bit pattern are the same key, which makes
+    a NaN findable again by itself.  0.0 and -0.0 compare equal."""
+    return x == y or float2longlong(x) == float2longlong(y)
+
+def float_key_hash(x):
+    # 0.0 and -0.0 hash to the same value, and all NaNs hash to 0
+    return objectmodel.compute_hash(x)
+
+def new_float_key_dict():
+    return r_dict(float_key_eq, float_key_hash, force_non_null=True)
+
+def int_as_equal_float(x):
+    """Return the float that compares equal to the int 'x', or raise
+    ValueError if there is none (because 'x' is not exactly representable
+    as a float)."""
+    f = float(x)
+    try:
+        if ovfcheck_float_to_int(f) == x:
+            return f
+    except OverflowError:
+        pass
+    raise ValueError
+
+
 @specialize.call_location()
 def w_dict_unrolling_heuristic(w_dct):
     """In which cases iterating over dict items can be unrolled.
@@ -397,6 +425,7 @@ def _add_indirections():
                     length w_keys values items \
                     iterkeys itervalues iteritems \
                     listview_bytes listview_unicode listview_int \
+                    listview_float \
                     view_as_kwargs".split()
 
     def make_method(method):
@@ -556,6 +585,9 @@ class DictStrategy(object):
     def listview_int(self, w_dict):
         return None
 
+    def listview_float(self, w_dict):
+        return None
+
     def view_as_kwargs(self, w_dict):
         return (None, None)
 
@@ -601,6 +633,8 @@ class EmptyDictStrategy(DictStrategy):
         w_type = self.space.type(w_key)
         if self.space.is_w(w_type, self.space.w_int):
             self.switch_to_int_strategy(w_dict)
+        elif self.space.is_w(w_type, self.space.w_float):
+            self.switch_to_float_strategy(w_dict)
         elif w_type.compares_by_identity():
             self.switch_to_identity_strategy(w_dict)
         else:
@@ -624,6 +658,12 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.set_strategy(strategy)
         w_dict.dstorage = storage
 
+    def switch_to_float_strategy(self, w_dict):
+        strategy = self.space.fromcache(FloatDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = storage
+
     def switch_to_identity_strategy(self, w_dict):
         from pypy.objspace.std.identitydict import IdentityDictStrategy
         strategy = self.space.fromcache(IdentityDictStrategy)
@@ -1215,6 +1255,55 @@ class IntDictStrategy(AbstractTypedStrategy, DictStrategy):
 create_iterator_classes(IntDictStrategy)
 
 
+class FloatDictStrategy(AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, unwrapped):
+        return self.space.newfloat(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.float_w(wrapped)
+
+    def get_empty_storage(self):
+        return self.erase(new_float_key_dict())
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        return space.is_w(space.type(w_obj), space.w_float)
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_str) or
+                space.is_w(w_lookup_type, space.w_unicode)
+                )
+
+    def getitem(self, w_dict, w_key):
+        space = self.space
+        if space.is_w(space.type(w_key), space.w_int):
+            # look up an int without leaving the strategy: it can only be
+            # equal to the float with exactly the same value
+            try:
+                key = int_as_equal_float(space.int_w(w_key))
+            except ValueError:
+                return None
+            return self.unerase(w_dict.dstorage).get(key, None)
+        return AbstractTypedStrategy.getitem(self, w_dict, w_key)
+
+    def listview_float(self, w_dict):
+        return self.unerase(w_dict.dstorage).keys()
+
+    def wrapkey(space, key):
+        return space.newfloat(key)
+
+    def w_keys(self, w_dict):
+        return self.space.newlist_float(self.listview_float(w_dict))
+
+create_iterator_classes(FloatDictStrategy)
+
+
 def update1(space, w_dict, w_data):
     if isinstance(w_data, W_DictMultiObject):    # optimization case only
         update1_dict_dict(space, w_dict, w_data)
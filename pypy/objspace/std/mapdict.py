@@ -1,7 +1,8 @@
 import weakref, sys
 
 from rpython.rlib import jit, objectmodel, debug, rerased
-from rpython.rlib.rarithmetic import intmask, r_uint
+from rpython.rlib.longlong2float import float2longlong, longlong2float
+from rpython.rlib.rarithmetic import intmask, r_longlong, r_uint
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.objspace.std.dictmultiobject import (
@@ -9,6 +10,8 @@ from pypy.objspace.std.dictmultiobject import (
     BaseValueIterator, BaseItemIterator, _never_equal_to_string,
     W_DictObject,
 )
+from pypy.objspace.std.floatobject import W_FloatObject
+from pypy.objspace.std.intobject import W_IntObject
 from pypy.objspace.std.typeobject import MutableCell
 
 
@@ -27,9 +30,10 @@ NUM_DIGITS_POW2 = 1 << NUM_DIGITS
 
 
 class AbstractAttribute(object):
-    _immutable_fields_ = ['terminator']
+    _immutable_fields_ = ['terminator', 'num_attributes']
     cache_attrs = None
     _size_estimate = 0
+    num_attributes = 0
 
     def __init__(self, space, terminator):
         self.space = space
@@ -45,9 +49,10 @@ class AbstractAttribute(object):
             jit.isconstant(obj) and
             not attr.ever_mutated
         ):
-            return self._pure_mapdict_read_storage(obj, attr.storageindex)
+            w_item = self._pure_mapdict_read_storage(obj, attr.storageindex)
+            return attr._value_from_storage_item(w_item)
         else:
-            return obj._mapdict_read_storage(attr.storageindex)
+            return attr._direct_read(obj)
 
     @jit.elidable
     def _pure_mapdict_read_storage(self, obj, storageindex):
@@ -59,7 +64,7 @@ class AbstractAttribute(object):
             return self.terminator._write_terminator(obj, name, index, w_value)
         if not attr.ever_mutated:
             attr.ever_mutated = True
-        obj._mapdict_write_storage(attr.storageindex, w_value)
+        attr._direct_write(obj, w_value)
         return True
 
     def delete(self, obj, name, index):
@@ -129,13 +134,18 @@ class AbstractAttribute(object):
         return None
 
     @jit.elidable
-    def _get_new_attr(self, name, index):
+    def _get_new_attr(self, name, index, unbox_type):
         cache = self.cache_attrs
         if cache is None:
             cache = self.cache_attrs = {}
         attr = cache.get((name, index), None)
         if attr is None:
-            attr = PlainAttribute(name, index, self)
+            if unbox_type is not None and (index == DICT or
+                    (index >= SLOTS_STARTING_FROM and
+                     self.terminator.unbox_slots)):
+                attr = UnboxedPlainAttribute(name, index, self, unbox_type)
+            else:
+                attr = PlainAttribute(name, index, self)
             cache[name, index] = attr
         return attr
 
@@ -146,11 +156,16 @@ class AbstractAttribute(object):
             attr = obj._get_mapdict_map()
             size_est = (oldattr._size_estimate + attr.size_estimate()
                                                - oldattr.size_estimate())
-            assert size_est >= (oldattr.length() * NUM_DIGITS_POW2)
+            # the unboxed attributes share one storage slot, so after
+            # reordering 'attr' can be shorter than 'oldattr'.  The
+            # estimate must still cover the storage of 'oldattr'
+            min_size_est = oldattr.length() * NUM_DIGITS_POW2
+            if size_est < min_size_est:
+                size_est = min_size_est
             oldattr._size_estimate = size_est
 
     def _add_attr_without_reordering(self, obj, name, index, w_value):
-        attr = self._get_new_attr(name, index)
+        attr = self._get_new_attr(name, index, _unbox_type_of(w_value))
         attr._switch_map_and_write_storage(obj, w_value)
 
     @jit.unroll_safe
@@ -169,7 +184,7 @@ class AbstractAttribute(object):
 
 
     @jit.elidable
-    def _find_branch_to_move_into(self, name, index):
+    def _find_branch_to_move_into(self, name, index, unbox_type):
         # walk up the map chain to find an ancestor with lower order that
         # already has the current name as a child inserted
         current_order = sys.maxint
@@ -184,7 +199,7 @@ class AbstractAttribute(object):
                 # we reached the top, so we didn't find it anywhere,
                 # just add it to the top attribute
                 if not isinstance(current, PlainAttribute):
-                    return 0, self._get_new_attr(name, index)
+                    return 0, self._get_new_attr(name, index, unbox_type)
 
             else:
                 return number_to_readd, attr
@@ -221,17 +236,17 @@ class AbstractAttribute(object):
         stack_index = 0
         while True:
             current = self
-            number_to_readd, attr = self._find_branch_to_move_into(name, index)
+            number_to_readd, attr = self._find_branch_to_move_into(
+                    name, index, _unbox_type_of(w_value))
             # we found the attributes further up, need to save the
             # previous values of the attributes we passed
             if number_to_readd:
                 if stack is None:
-                    stack = [erase_map(None)] * (self.length() * 2)
+                    stack = [erase_map(None)] * (self.num_attributes * 2)
                 current = self
                 for i in range(number_to_readd):
                     assert isinstance(current, PlainAttribute)
-                    w_self_value = obj._mapdict_read_storage(
-                            current.storageindex)
+                    w_self_value = current._direct_read(obj)
                     stack[stack_index] = erase_map(current)
                     stack[stack_index + 1] = erase_item(w_self_value)
                     stack_index += 2
@@ -260,7 +275,10 @@ class AbstractAttribute(object):
 
 
 class Terminator(AbstractAttribute):
-    _immutable_fields_ = ['w_cls']
+    _immutable_fields_ = ['w_cls', 'unbox_slots?']
+    # if True, the slots of the instances holding ints or floats are
+    # unboxed too; see _datetime.unbox_slots()
+    unbox_slots = False
 
     def __init__(self, space, w_cls):
         AbstractAttribute.__init__(self, space, self)
@@ -361,6 +379,7 @@ class PlainAttribute(AbstractAttribute):
         self.index = index
         self.storageindex = back.length()
         self.back = back
+        self.num_attributes = back.num_attributes + 1
         self._size_estimate = self.length() * NUM_DIGITS_POW2
         self.ever_mutated = False
         self.order = len(back.cache_attrs) if back.cache_attrs else 0
@@ -369,6 +388,15 @@ class PlainAttribute(AbstractAttribute):
         w_value = self.read(obj, self.name, self.index)
         new_obj._get_mapdict_map().add_attr(new_obj, self.name, self.index, w_value)
 
+    def _value_from_storage_item(self, w_item):
+        return w_item
+
+    def _direct_read(self, obj):
+        return obj._mapdict_read_storage(self.storageindex)
+
+    def _direct_write(self, obj, w_value):
+        obj._mapdict_write_storage(self.storageindex, w_value)
+
     def delete(self, obj, name, index):
         if index == self.index and name == self.name:
             # ok, attribute is deleted
@@ -402,7 +430,7 @@ class PlainAttribute(AbstractAttribute):
         new_obj = self.back.materialize_r_dict(space, obj, dict_w)
         if self.index == DICT:
             w_attr = space.wrap(self.name)
-            dict_w[w_attr] = obj._mapdict_read_storage(self.storageindex)
+            dict_w[w_attr] = self._direct_read(obj)
         else:
             self._copy_attr(obj, new_obj)
         return new_obj
@@ -416,6 +444,167 @@ class PlainAttribute(AbstractAttribute):
     def __repr__(self):
         return "<PlainAttribute %s %s %s %r>" % (self.name, self.index, self.storageindex, self.back)
 
+
+def _unbox_type_of(w_value):
+    if type(w_value) is W_IntObject:
+        return W_IntObject
+    if type(w_value) is W_FloatObject:
+        return W_FloatObject
+    return None
+
+
+class UnboxedValues(W_Root):
+    """ The unboxed values of all the UnboxedPlainAttributes of an object,
+    stored together in one slot of the object's storage.  Ints are stored
+    as the bit pattern of a float.  Like WeakrefLifeline, this is never
+    visible at app-level. """
+    typedef = None
+
+    def __init__(self, size):
+        self.values = [0.0] * size
+
+    def ensure_size(self, size):
+        oldsize = len(self.values)
+        if oldsize < size:
+            # grow geometrically: an object that gets many new unboxed
+            # attributes should not copy the values each time
+            newsize = oldsize * 2
+            if newsize < size:
+                newsize = size
+            values = [0.0] * newsize
+            for i in range(oldsize):
+                values[i] = self.values[i]
+            self.values = values
+
+
+class UnboxedPlainAttribute(PlainAttribute):
+    """ An instance attribute (or a slot, if the class asked for it) whose
+    value is a W_IntObject or a W_FloatObject, stored without its box.  The
+    first such attribute in a map chain allocates an UnboxedValues in the
+    storage; the following ones share that slot and use the next entries
+    of its 'values' list.  Writing a value of another type demotes the
+    attribute to a PlainAttribute. """
+    _immutable_fields_ = ['unbox_type', 'listindex', 'firstunboxed',
+                          'firstattr', 'demoted?']
+    # only on the first unboxed attribute of a map chain: the number of
+    # unboxed attributes that the maps built on it have, at most
+    unboxed_count = 0
+
+    def __init__(self, name, index, back, unbox_type):
+        AbstractAttribute.__init__(self, back.space, back.terminator)
+        self.name = name
+        self.index = index
+        self.back = back
+        self.num_attributes = back.num_attributes + 1
+        self.unbox_type = unbox_type
+        prev = back
+        while isinstance(prev, PlainAttribute):
+            if isinstance(prev, UnboxedPlainAttribute):
+                break
+            prev = prev.back
+        if isinstance(prev, UnboxedPlainAttribute):
+            self.storageindex = prev.storageindex
+            self.listindex = prev.listindex + 1
+            self.firstunboxed = False
+            self.firstattr = prev.firstattr
+            if self.firstattr.unboxed_count <= self.listindex:
+                self.firstattr.unboxed_count = self.listindex + 1
+        else:
+            self.storageindex = back.length()
+            self.listindex = 0
+            self.firstunboxed = True
+            self.firstattr = self
+            self.unboxed_count = 1
+        self._size_estimate = self.length() * NUM_DIGITS_POW2
+        self.ever_mutated = False
+        self.order = len(back.cache_attrs) if back.cache_attrs else 0
+        self.demoted = None
+
+    def length(self):
+        if self.firstunboxed:
+            return self.storageindex + 1
+        return self.back.length()
+
+    @jit.elidable
+    def unboxed_size_estimate(self):
+        return self.firstattr.unboxed_count
+
+    def _get_unboxed_values(self, obj):
+        unboxed = obj._mapdict_read_storage(self.storageindex)
+        assert isinstance(unboxed, UnboxedValues)
+        return unboxed
+
+    def _value_from_storage_item(self, w_item):
+        assert isinstance(w_item, UnboxedValues)
+        value = w_item.values[self.listindex]
+        if self.unbox_type is W_IntObject:
+            return self.space.newint(intmask(float2longlong(value)))
+        return self.space.newfloat(value)
+
+    def _direct_read(self, obj):
+        return self._value_from_storage_item(self._get_unboxed_values(obj))
+
+    def _write_unboxed(self, obj, w_value):
+        if self.unbox_type is W_IntObject:
+            assert isinstance(w_value, W_IntObject)
+            value = longlong2float(r_longlong(w_value.intval))
+        else:
+            assert isinstance(w_value, W_FloatObject)
+            value = w_value.floatval
+        self._get_unboxed_values(obj).values[self.listindex] = value
+
+    def _direct_write(self, obj, w_value):
+        if type(w_value) is self.unbox_type:
+            self._write_unboxed(obj, w_value)
+        else:
+            self._demote_and_write(obj, w_value)
+
+    @jit.dont_look_inside
+    def _demote(self):
+        """ Return the PlainAttribute that replaces this attribute for all
+        objects that get it from now on.  The cache_attrs of 'back' is not
+        changed, because the elidable _get_new_attr() reads it: instead
+        this attribute redirects to the new one.  Objects that already use
+        this attribute as (part of) their map stay valid. """
+        if self.demoted is None:
+            newattr = PlainAttribute(self.name, self.index, self.back)
+            newattr.order = self.order
+            self.demoted = newattr
+        return self.demoted
+
+    @jit.dont_look_inside
+    def _demote_and_write(self, obj, w_value):
+        # the type of the attribute changed: new objects get a boxed
+        # attribute, and 'obj' is rebuilt with the new value stored boxed
+        self._demote()
+        new_obj = obj._get_mapdict_map().delete(obj, self.name, self.index)
+        new_obj._get_mapdict_map().add_attr(new_obj, self.name, self.index,
+                                            w_value)
+        obj._set_mapdict_storage_and_map(new_obj.storage, new_obj.map)
+
+    def _switch_map_and_write_storage(self, obj, w_value):
+        demoted = self.demoted
+        if demoted is None and type(w_value) is not self.unbox_type:
+            demoted = self._demote()
+        if demoted is not None:
+            demoted._switch_map_and_write_storage(obj, w_value)
+            return
+        if self.firstunboxed:
+            # the UnboxedValues gets room for all the unboxed attributes
+            # that objects with this map got so far, so that usually it is
+            # not resized when the next attributes are added
+            unboxed = UnboxedValues(self.unboxed_size_estimate())
+            AbstractAttribute._switch_map_and_write_storage(self, obj, unboxed)
+        else:
+            self._get_unboxed_values(obj).ensure_size(self.listindex + 1)
+            obj._set_mapdict_map(self)
+        self._write_unboxed(obj, w_value)
+
+    def __repr__(self):
+        return "<UnboxedPlainAttribute %s %s %s %s %r>" % (
+            self.name, self.index, self.storageindex, self.listindex,
+            self.back)
+
 class MapAttrCache(object):
     def __init__(self, space):
         SIZE = 1 << space.config.objspace.std.methodcachesizeexp
@@ -916,6 +1105,7 @@ class MapDictIteratorItems(BaseItemIterator):
 class CacheEntry(object):
     version_tag = None
     storageindex = 0
+    attr = None
     w_method = None # for callmethod
     success_counter = 0
     failure_counter = 0
@@ -948,7 +1138,8 @@ def init_mapdict_cache(pycode):
     pycode._mapdict_caches = [INVALID_CACHE_ENTRY] * num_entries
 
 @jit.dont_look_inside
-def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None):
+def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None,
+                attr=None):
     entry = pycode._mapdict_caches[nameindex]
     if entry is INVALID_CACHE_ENTRY:
         entry = CacheEntry()
@@ -957,6 +1148,7 @@ def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None
     entry.version_tag = version_tag
     entry.storageindex = storageindex
     entry.w_method = w_method
+    entry.attr = attr
     if pycode.space.config.objspace.std.withmethodcachecounter:
         entry.failure_counter += 1
 
@@ -967,7 +1159,10 @@ def LOAD_ATTR_caching(pycode, w_obj, nameindex):
     map = w_obj._get_mapdict_map()
     if entry.is_valid_for_map(map) and entry.w_method is None:
         # everything matches, it's incredibly fast
-        return w_obj._mapdict_read_storage(entry.storageindex)
+        w_item = w_obj._mapdict_read_storage(entry.storageindex)
+        if entry.attr is not None:
+            return entry.attr._value_from_storage_item(w_item)
+        return w_item
     return LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map)
 LOAD_ATTR_caching._always_inline_ = True
 
@@ -1013,8 +1208,12 @@ def LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map):
                     # Note that if map.terminator is a DevolvedDictTerminator
                     # or the class provides its own dict, not using mapdict, then:
                     # map.find_map_attr will always return None if index==DICT.
-                    _fill_cache(pycode, nameindex, map, version_tag, attr.storageindex)
-                    return w_obj._mapdict_read_storage(attr.storageindex)
+                    unboxed_attr = None
+                    if isinstance(attr, UnboxedPlainAttribute):
+                        unboxed_attr = attr
+                    _fill_cache(pycode, nameindex, map, version_tag,
+                                attr.storageindex, attr=unboxed_attr)
+                    return attr._direct_read(w_obj)
     if space.config.objspace.std.withmethodcachecounter:
         INVALID_CACHE_ENTRY.failure_counter += 1
     return space.getattr(w_obj, w_name)
@@ -1,6 +1,11 @@
 from pypy.interpreter.error import oefmt
-from pypy.objspace.std.tupleobject import W_AbstractTupleObject
+from pypy.objspace.std.floatobject import W_FloatObject, _hash_float
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.tupleobject import (
+    W_AbstractTupleObject, UNROLL_CUTOFF, _unroll_condition)
 from pypy.objspace.std.util import negate
+from rpython.rlib import jit
+from rpython.rlib.debug import make_sure_not_resized
 from rpython.rlib.objectmodel import compute_hash, specialize
 from rpython.rlib.rarithmetic import intmask
 from rpython.rlib.unroll import unrolling_iterable
@@ -129,12 +134,131 @@ def make_specialised_class(typetuple):
     _specialisations.append(cls)
     return cls
 
+
+def make_unboxed_class(itemtype):
+    """Tuples of any length whose items are all ints or all floats,
+    stored as a list of unwrapped values.  Hashing and comparing two of
+    them does not need to wrap the items."""
+    if itemtype == int:
+        itemclass = W_IntObject
+    else:
+        assert itemtype == float
+        itemclass = W_FloatObject
+
+    def item_eq(x, y):
+        if itemtype == float:
+            # same rule as space.eq_w(): identical objects are equal, and
+            # floats are identical if they have the same bits (NaNs)
+            return x == y or float2longlong(x) == float2longlong(y)
+        return x == y
+
+    class cls(W_AbstractTupleObject):
+        _immutable_fields_ = ['values[*]']
+
+        def __init__(self, space, values):
+            self.space = space
+            make_sure_not_resized(values)
+            self.values = values
+
+        def length(self):
+            return len(self.values)
+
+        def tolist(self):
+            values = self.values
+            list_w = [None] * len(values)
+            for i in range(len(values)):
+                list_w[i] = self.space.wrap(values[i])
+            return list_w
+
+        # same source code, but builds and returns a resizable list
+        getitems_copy = func_with_new_name(tolist, 'getitems_copy')
+
+        def getitem(self, space, index):
+            try:
+                value = self.values[index]
+            except IndexError:
+                raise oefmt(space.w_IndexError, "tuple index out of range")
+            return space.wrap(value)
+
+        @jit.look_inside_iff(lambda self, space: _unroll_condition(self))
+        def descr_hash(self, space):
+            # must give the same result as W_TupleObject.descr_hash()
+            mult = 1000003
+            x = 0x345678
+            z = len(self.values)
+            for value in self.values:
+                if itemtype == int:
+                    y = value
+                else:
+                    y = _hash_float(space, value)
+                y -= (y == -1)
+                x = (x ^ y) * mult
+                z -= 1
+                mult += 82520 + z + z
+            x += 97531
+            return space.wrap(intmask(x))
+
+        def descr_eq(self, space, w_other):
+            if not isinstance(w_other, W_AbstractTupleObject):
+                return space.w_NotImplemented
+            if isinstance(w_other, cls):
+                return space.newbool(self._eq_unboxed(w_other))
+            return self._eq_wrapped(space, w_other)
+
+        @jit.look_inside_iff(lambda self, w_other:
+                             _unroll_condition(self))
+        def _eq_unboxed(self, w_other):
+            values1 = self.values
+            values2 = w_other.values
+            if len(values1) != len(values2):
+                return False
+            for i in range(len(values1)):
+                if not item_eq(values1[i], values2[i]):
+                    return False
+            return True
+
+        @jit.look_inside_iff(lambda self, space, w_other:
+                             _unroll_condition(self))
+        def _eq_wrapped(self, space, w_other):
+            values = self.values
+            if len(values) != w_other.length():
+                return space.w_False
+            for i in range(len(values)):
+                w_item = w_other.getitem(space, i)
+                if not space.eq_w(space.wrap(values[i]), w_item):
+                    return space.w_False
+            return space.w_True
+
+        descr_ne = negate(descr_eq)
+
+        def descr_contains(self, space, w_obj):
+            if type(w_obj) is itemclass:
+                if itemtype == int:
+                    value = space.int_w(w_obj)
+                else:
+                    value = space.float_w(w_obj)
+                return space.newbool(self._contains_unboxed(value))
+            return W_AbstractTupleObject.descr_contains(self, space, w_obj)
+
+        @jit.look_inside_iff(lambda self, value: _unroll_condition(self))
+        def _contains_unboxed(self, value):
+            for item in self.values:
+                if item_eq(item, value):
+                    return True
+            return False
+
+    cls.__name__ = 'W_SpecialisedTupleObject_%sn' % (itemtype.__name__[0],)
+    _specialisations.append(cls)
+    return cls
+
 # ---------- current specialized versions ----------
 
 _specialisations = []
 Cls_ii = make_specialised_class((int, int))
 Cls_oo = make_specialised_class((object, object))
 Cls_ff = make_specialised_class((float, float))
+Cls_in = make_unboxed_class(int)
+Cls_fn = make_unboxed_class(float)
 
 def makespecialisedtuple(space, list_w):
     from pypy.objspace.std.intobject import W_IntObject
@@ -148,9 +272,33 @@ def makespecialisedtuple(space, list_w):
             if type(w_arg2) is W_FloatObject:
                 return Cls_ff(space, w_arg1, w_arg2)
         return Cls_oo(space, w_arg1, w_arg2)
+    elif len(list_w) > 0:
+        return _make_unboxed_tuple(space, list_w)
     else:
         raise NotSpecialised
 
+@jit.look_inside_iff(lambda space, list_w:
+        jit.loop_unrolling_heuristic(list_w, len(list_w), UNROLL_CUTOFF))
+def _make_unboxed_tuple(space, list_w):
+    length = len(list_w)
+    if type(list_w[0]) is W_IntObject:
+        intvalues = [0] * length
+        for i in range(length):
+            w_item = list_w[i]
+            if type(w_item) is not W_IntObject:
+                raise NotSpecialised
+            intvalues[i] = w_item.intval
+        return Cls_in(space, intvalues)
+    elif type(list_w[0]) is W_FloatObject:
+        floatvalues = [0.0] * length
+        for i in range(length):
+            w_item = list_w[i]
+            if type(w_item) is not W_FloatObject:
+                raise NotSpecialised
+            floatvalues[i] = w_item.floatval
+        return Cls_fn(space, floatvalues)
+    raise NotSpecialised
+
 # --------------------------------------------------
 # Special code based on list strategies to implement zip(),
 # here with two list arguments only.  This builds a zipped
@@ -1024,6 +1024,42 @@ class AppTestStrategies(object):
         assert "IntDictStrategy" in self.get_strategy(d)
         assert d[1L] == "hi"
 
+    def test_empty_to_float(self):
+        d = {}
+        d[1.5] = "hi"
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d[1.5] == "hi"
+        d[2.0] = "two"
+        assert d[2] == "two"
+        assert 3 not in d
+        assert None not in d
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert sorted(d.keys()) == [1.5, 2.0]
+        assert type(d.keys()[0]) is float
+        d[3] = "three"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d[3.0] == "three"
+        assert d[1.5] == "hi"
+        assert d[2L] == "two"
+
+    def test_float_keys_nan_and_zero(self):
+        nan = float("nan")
+        d = {nan: 1}
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d[nan] == 1
+        assert float("nan") not in d or d.keys()[0] is float("nan")
+        d[0.0] = "zero"
+        d[-0.0] = "minus zero"
+        assert len(d) == 2
+        assert d[0.0] == "minus zero"
+        assert str(d.keys()[1]) == "0.0"
+        d = {-0.0: 1}
+        d[0.0] = 2
+        assert d.keys() == [-0.0]
+        assert str(d.keys()[0]) == "-0.0"
+        assert d == {0.0: 2}
+        assert "FloatDictStrategy" in self.get_strategy(d)
+
     def test_iter_dict_length_change(self):
         d = {1: 2, 3: 4, 5: 6}
         it = d.iteritems()
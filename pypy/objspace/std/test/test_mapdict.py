@@ -653,6 +653,203 @@ def test_specialized_class():
         assert obj2.getdictvalue(space, "b") is w6
         assert obj2.map is abmap
 
+# ___________________________________________________________
+# unboxed attributes
+
+class TestUnboxedAttributes(object):
+    def make_obj(self, source):
+        return self.space.appexec([], """():
+            class A(object):
+                pass
+            a = A()
+            %s
+            return a
+        """ % (source,))
+
+    def test_int_and_float_are_unboxed(self):
+        space = self.space
+        w_a = self.make_obj("a.x = 1; a.s = 'abc'; a.y = 2.5")
+        map = w_a._get_mapdict_map()
+        assert isinstance(map, UnboxedPlainAttribute)
+        assert map.unbox_type is W_FloatObject
+        assert map.listindex == 1
+        assert not map.firstunboxed
+        assert map.length() == 2
+        xattr = map.back.back
+        assert isinstance(xattr, UnboxedPlainAttribute)
+        assert xattr.unbox_type is W_IntObject
+        assert xattr.firstunboxed
+        assert xattr.storageindex == map.storageindex
+        unboxed = w_a._mapdict_read_storage(map.storageindex)
+        assert isinstance(unboxed, UnboxedValues)
+        assert unboxed.values[1] == 2.5
+        assert space.int_w(w_a.getdictvalue(space, "x")) == 1
+        assert space.float_w(w_a.getdictvalue(space, "y")) == 2.5
+        assert space.str_w(w_a.getdictvalue(space, "s")) == "abc"
+
+    def test_unboxed_values_allocated_once(self):
+        space = self.space
+        w_A = space.appexec([], """():
+            class A(object):
+                pass
+            return A
+        """)
+        w_a = space.call_function(w_A)
+        for name in "xyz":
+            w_a.setdictvalue(space, name, space.newint(1))
+        map = w_a._get_mapdict_map()
+        assert map.unboxed_size_estimate() == 3
+        # the next object gets room for the three values right away
+        w_b = space.call_function(w_A)
+        w_b.setdictvalue(space, "x", space.newint(2))
+        unboxed = w_b._mapdict_read_storage(map.storageindex)
+        assert len(unboxed.values) == 3
+        w_b.setdictvalue(space, "y", space.newint(3))
+        w_b.setdictvalue(space, "z", space.newint(4))
+        assert w_b._mapdict_read_storage(map.storageindex) is unboxed
+        assert space.int_w(w_b.getdictvalue(space, "z")) == 4
+
+    def test_unboxed_values_grow_geometrically(self):
+        unboxed = UnboxedValues(1)
+        unboxed.values[0] = 1.5
+        unboxed.ensure_size(2)
+        assert unboxed.values == [1.5, 0.0]
+        unboxed.ensure_size(3)
+        assert len(unboxed.values) == 4
+        unboxed.ensure_size(4)
+        assert len(unboxed.values) == 4
+        unboxed.ensure_size(9)
+        assert len(unboxed.values) == 9
+        assert unboxed.values[0] == 1.5
+
+    def test_write_same_type_does_not_change_map(self):
+        space = self.space
+        w_a = self.make_obj("a.x = 1; a.y = 2.5")
+        map = w_a._get_mapdict_map()
+        w_a.setdictvalue(space, "x", space.newint(-42))
+        w_a.setdictvalue(space, "y", space.newfloat(-0.0))
+        assert w_a._get_mapdict_map() is map
+        assert space.int_w(w_a.getdictvalue(space, "x")) == -42
+        assert str(space.float_w(w_a.getdictvalue(space, "y"))) == "-0.0"
+
+    def test_demote_on_type_change(self):
+        space = self.space
+        w_A = space.appexec([], """():
+            class A(object):
+                pass
+            return A
+        """)
+        w_a = space.call_function(w_A)
+        w_a.setdictvalue(space, "x", space.newint(1))
+        w_a.setdictvalue(space, "y", space.newint(2))
+        unboxedmap = w_a._get_mapdict_map()
+        w_b = space.call_function(w_A)
+        w_b.setdictvalue(space, "x", space.newint(3))
+        w_b.setdictvalue(space, "y", space.newint(4))
+        assert w_b._get_mapdict_map() is unboxedmap
+        w_b.setdictvalue(space, "x", space.wrap("x"))
+        newmap = w_b._get_mapdict_map()
+        assert newmap is not unboxedmap
+        xattr = newmap.find_map_attr("x", DICT)
+        assert type(xattr) is PlainAttribute
+        assert space.str_w(w_b.getdictvalue(space, "x")) == "x"
+        assert space.int_w(w_b.getdictvalue(space, "y")) == 4
+        # the other object keeps working with the old map
+        assert w_a._get_mapdict_map() is unboxedmap
+        assert space.int_w(w_a.getdictvalue(space, "x")) == 1
+        # new objects get a boxed 'x' right away
+        w_c = space.call_function(w_A)
+        w_c.setdictvalue(space, "x", space.newint(5))
+        assert type(w_c._get_mapdict_map()) is PlainAttribute
+
+    def test_demote_keeps_cache_attrs(self):
+        space = self.space
+        w_a = self.make_obj("a.x = 1")
+        xattr = w_a._get_mapdict_map()
+        terminator = xattr.back
+        assert terminator.cache_attrs[("x", DICT)] is xattr
+        w_a.setdictvalue(space, "x", space.wrap("x"))
+        # the cache that _get_new_attr() reads is unchanged, but the
+        # attribute redirects to its boxed replacement
+        assert terminator.cache_attrs[("x", DICT)] is xattr
+        assert terminator._get_new_attr("x", DICT, W_IntObject) is xattr
+        assert type(xattr.demoted) is PlainAttribute
+        assert xattr.demoted.back is terminator
+        assert w_a._get_mapdict_map() is xattr.demoted
+
+    def test_size_estimate_after_reordering(self):
+        space = self.space
+        w_A = space.appexec([], """():
+            class A(object):
+                pass
+            return A
+        """)
+        orders = [("a", "b", "c", "d"), ("b", "a", "d", "c"),
+                  ("c", "s", "a", "b", "d"), ("d", "c", "b", "a")]
+        maps = []
+        for order, w_value in zip(orders, [space.newint(1),
+                                           space.newfloat(1.5),
+                                           space.newint(2),
+                                           space.newfloat(2.5)]):
+            w_a = space.call_function(w_A)
+            for name in order:
+                if name == "s":
+                    w_a.setdictvalue(space, name, space.wrap("str"))
+                else:
+                    w_a.setdictvalue(space, name, w_value)
+            map = w_a._get_mapdict_map()
+            while map is not None:
+                maps.append(map)
+                map = getattr(map, 'back', None)
+        for map in maps:
+            assert map.size_estimate() >= map.length()
+
+    def test_not_unboxed(self):
+        w_a = self.make_obj("a.x = True; a.y = 2L; a.z = None")
+        map = w_a._get_mapdict_map()
+        while isinstance(map, PlainAttribute):
+            assert not isinstance(map, UnboxedPlainAttribute)
+            map = map.back
+
+    def test_slots_not_unboxed(self):
+        w_a = self.space.appexec([], """():
+            class A(object):
+                __slots__ = ('x', 'y')
+            a = A()
+            a.x = 5
+            a.y = 1.5
+            return a
+        """)
+        map = w_a._get_mapdict_map()
+        while isinstance(map, PlainAttribute):
+            assert not isinstance(map, UnboxedPlainAttribute)
+            map = map.back
+
+    def test_slots_unboxed_if_asked(self):
+        space = self.space
+        w_A = space.appexec([], """():
+            class A(object):
+                __slots__ = ('x', 'y', 's')
+            return A
+        """)
+        w_A.terminator.unbox_slots = True     # as by _datetime.unbox_slots()
+        w_a = space.appexec([w_A], """(A):
+            a = A()
+            a.x = 5
+            a.s = 'abc'
+            a.y = 1.5
+            return a
+        """)
+        # the slots are numbered in alphabetical order
+        map = w_a._get_mapdict_map()
+        assert isinstance(map, UnboxedPlainAttribute)
+        assert map.index == SLOTS_STARTING_FROM + 2
+        assert map.unbox_type is W_FloatObject
+        assert map.length() == 2
+        assert space.str_w(w_a.getslotvalue(0)) == 'abc'
+        assert space.int_w(w_a.getslotvalue(1)) == 5
+        assert space.float_w(w_a.getslotvalue(2)) == 1.5
+
 # ___________________________________________________________
 # integration tests
 
@@ -660,6 +857,86 @@ def test_specialized_class():
 
 class AppTestWithMapDict(object):
 
+    def test_unboxed_attributes(self):
+        class A(object):
+            pass
+        a = A()
+        a.x = 5
+        a.f = 1.5
+        a.s = "abc"
+        a.g = -2.25
+        a.y = -7
+        assert (a.x, a.f, a.s, a.g, a.y) == (5, 1.5, "abc", -2.25, -7)
+        assert type(a.x) is int
+        assert type(a.f) is float
+        assert a.__dict__ == {"x": 5, "f": 1.5, "s": "abc", "g": -2.25,
+                              "y": -7}
+        a.x += 1
+        a.f *= 2
+        assert (a.x, a.f) == (6, 3.0)
+        a.f = 12        # float -> int
+        assert a.f == 12 and type(a.f) is int
+        a.x = 3.5       # int -> float
+        assert a.x == 3.5
+        a.y = "y"
+        assert (a.x, a.f, a.s, a.g, a.y) == (3.5, 12, "abc", -2.25, "y")
+        del a.g
+        assert not hasattr(a, "g")
+        assert a.__dict__ == {"x": 3.5, "f": 12, "s": "abc", "y": "y"}
+        a.g = float("inf")
+        assert a.g == float("inf")
+        import sys
+        a.big = sys.maxint
+        a.small = -sys.maxint - 1
+        assert a.big == sys.maxint
+        assert a.small == -sys.maxint - 1
+        nan = float("nan")
+        a.nan = nan
+        assert a.nan != a.nan
+
+    def test_unboxed_attributes_many_objects(self):
+        class Point(object):
+            def __init__(self, x, y):
+                self.x = x
+                self.y = y
+        points = [Point(i, i * 0.5) for i in range(100)]
+        points[50].x = "fifty"
+        points[60].y = None
+        for i, p in enumerate(points):
+            if i == 50:
+                assert p.x == "fifty"
+            else:
+                assert p.x == i
+            if i == 60:
+                assert p.y is None
+            else:
+                assert p.y == i * 0.5
+        p = Point(1, 2.0)
+        assert (p.x, p.y) == (1, 2.0)
+        p.__dict__["x"] = 17
+        assert p.x == 17
+        p.__class__ = type("Q", (Point,), {})
+        assert (p.x, p.y) == (17, 2.0)
+
+    def test_unboxed_attributes_reordering(self):
+        import itertools
+        orders = [("a", "b", "c", "d"), ("b", "a", "d", "c"),
+                  ("c", "s", "a", "b", "d"), ("d", "c", "b", "a")]
+        for values in itertools.product([1, 1.5], repeat=len(orders)):
+            class A(object):
+                pass
+            objs = []
+            for order, value in zip(orders, values):
+                a = A()
+                for name in order:
+                    setattr(a, name, "str" if name == "s" else value)
+                objs.append((a, order, value))
+            for a, order, value in objs:
+                for name in order:
+                    expected = "str" if name == "s" else value
+                    assert getattr(a, name) == expected
+                    assert type(getattr(a, name)) is type(expected)
+
     def test_simple(self):
         class A(object):
             pass
@@ -81,7 +81,7 @@ class TestW_SetObject:
     def test_create_set_from_list(self):
         from pypy.interpreter.baseobjspace import W_Root
         from pypy.objspace.std.setobject import BytesSetStrategy, ObjectSetStrategy, UnicodeSetStrategy
-        from pypy.objspace.std.floatobject import W_FloatObject
+        from pypy.objspace.std.setobject import FloatSetStrategy
 
         w = self.space.wrap
         wb = self.space.newbytes
@@ -118,9 +118,15 @@ class TestW_SetObject:
         w_list = W_ListObject(self.space, [w(1.0), w(2.0), w(3.0)])
         w_set = W_SetObject(self.space)
         _initialize_set(self.space, w_set, w_list)
+        assert w_set.strategy is self.space.fromcache(FloatSetStrategy)
+        assert sorted(w_set.strategy.unerase(w_set.sstorage)) == [1.0, 2.0, 3.0]
+
+        w_list = W_ListObject(self.space, [w(1.0), w(2), w(3.0)])
+        w_set = W_SetObject(self.space)
+        _initialize_set(self.space, w_set, w_list)
         assert w_set.strategy is self.space.fromcache(ObjectSetStrategy)
         for item in w_set.strategy.unerase(w_set.sstorage):
-            assert isinstance(item, W_FloatObject)
+            assert isinstance(item, W_Root)
 
         # changed cached object, need to change it back for other tests to pass
         intstr.get_storage_from_list = tmp_func
@@ -157,6 +163,28 @@ class AppTestAppSetTest:
             """)
         self.w_FakeInt = w_fakeint
 
+    def test_float_set(self):
+        nan = float("nan")
+        s = set([1.5, nan, 0.0])
+        assert 1.5 in s
+        assert nan in s
+        assert -0.0 in s
+        assert 0 in s
+        assert 1 not in s
+        assert "a" not in s
+        s.add(-0.0)
+        assert len(s) == 3
+        assert str(sorted(x for x in s if x == 0.0)[0]) == "0.0"
+        assert s == set([0, 1.5, nan])
+        assert s - set([0]) == set([1.5, nan])
+        assert set([1.0, 2.0]) == set([1, 2])
+        assert set([1.0, 2.0]) | set([3.0]) == set([1.0, 2.0, 3.0])
+        assert set([1.0, 2.0]) & set(["a", 2]) == set([2])
+        s.remove(0)
+        assert s == set([1.5, nan])
+        s.add("x")
+        assert s == set([1.5, nan, "x"])
+
     def test_fakeint(self):
         f1 = self.FakeInt(4)
         assert f1 == 4
@@ -1,6 +1,7 @@
 from pypy.objspace.std.setobject import W_SetObject
 from pypy.objspace.std.setobject import (
     BytesIteratorImplementation, BytesSetStrategy, EmptySetStrategy,
+    FloatIteratorImplementation, FloatSetStrategy,
     IntegerIteratorImplementation, IntegerSetStrategy, ObjectSetStrategy,
     UnicodeIteratorImplementation, UnicodeSetStrategy)
 from pypy.objspace.std.listobject import W_ListObject
@@ -29,6 +30,9 @@ class TestW_SetStrategies:
         s = W_SetObject(self.space, self.wrapped([u"a", u"b"]))
         assert s.strategy is self.space.fromcache(UnicodeSetStrategy)
 
+        s = W_SetObject(self.space, self.wrapped([1.5, 2.5]))
+        assert s.strategy is self.space.fromcache(FloatSetStrategy)
+
     def test_switch_to_object(self):
         s = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
         s.add(self.space.wrap("six"))
@@ -39,6 +43,24 @@ class TestW_SetStrategies:
         s1.update(s2)
         assert s1.strategy is self.space.fromcache(ObjectSetStrategy)
 
+    def test_float_switch_to_object(self):
+        s = W_SetObject(self.space, self.wrapped([1.5, 2.5]))
+        s.add(self.space.wrap(3))
+        assert s.strategy is self.space.fromcache(ObjectSetStrategy)
+        assert s.has_key(self.space.wrap(3.0))
+        assert s.has_key(self.space.wrap(1.5))
+
+    def test_float_int_lookup(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped([1.0, 2.5, 2.0**60]))
+        assert s.has_key(space.wrap(1))
+        assert not s.has_key(space.wrap(2))
+        assert s.has_key(space.wrap(2**60))
+        assert not s.has_key(space.wrap(2**60 + 1))
+        assert s.remove(space.wrap(1))
+        assert not s.remove(space.wrap(1))
+        assert s.strategy is space.fromcache(FloatSetStrategy)
+
     def test_switch_to_unicode(self):
         s = W_SetObject(self.space, self.wrapped([]))
         s.add(self.space.wrap(u"six"))
@@ -133,6 +155,12 @@ class TestW_SetStrategies:
         assert isinstance(it, UnicodeIteratorImplementation)
         assert space.unwrap(it.next()) == u"a"
         assert space.unwrap(it.next()) == u"b"
+        #
+        s = W_SetObject(space, self.wrapped([1.5, 2.5]))
+        it = s.iter()
+        assert isinstance(it, FloatIteratorImplementation)
+        assert space.unwrap(it.next()) == 1.5
+        assert space.unwrap(it.next()) == 2.5
 
     def test_listview(self):
         space = self.space
@@ -144,3 +172,6 @@ class TestW_SetStrategies:
         #
         s = W_SetObject(space, self.wrapped([u"a", u"b"]))
         assert sorted(space.listview_unicode(s)) == [u"a", u"b"]
+        #
+        s = W_SetObject(space, self.wrapped([1.5, 2.5]))
+        assert sorted(space.listview_float(s)) == [1.5, 2.5]
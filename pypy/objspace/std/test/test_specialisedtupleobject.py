@@ -45,7 +45,40 @@ class TestW_SpecialisedTupleObject():
         hash_test([1, (1, 2)])
         hash_test([1, ('a', 2)])
         hash_test([1, ()])
-        hash_test([1, 2, 3], must_be_specialized=False)
+        hash_test([1, 2, 3])
+        hash_test([-1, -2, -3, -4, 5])
+        hash_test([1.5, 2.0, -1.0, 0.0, -0.0, 1e300])
+        hash_test([float('nan'), float('inf'), -float('inf')])
+        hash_test([7])
+        hash_test([1, 2, 3.5], must_be_specialized=False)
+
+    def test_unboxed_tuples(self):
+        space = self.space
+        w_tuple = space.newtuple([space.wrap(i) for i in range(5)])
+        assert isinstance(w_tuple, W_SpecialisedTupleObject_in)
+        assert w_tuple.values == [0, 1, 2, 3, 4]
+        w_tuple = space.newtuple([space.wrap(i + 0.5) for i in range(7)])
+        assert isinstance(w_tuple, W_SpecialisedTupleObject_fn)
+        assert w_tuple.values == [i + 0.5 for i in range(7)]
+        w_tuple = space.newtuple([space.wrap(1), space.wrap(2.5),
+                                  space.wrap(3)])
+        assert type(w_tuple) is W_TupleObject
+        w_tuple = space.newtuple([space.w_True, space.wrap(2),
+                                  space.wrap(3)])
+        assert type(w_tuple) is W_TupleObject
+
+    def test_unboxed_eq_and_hash_do_not_wrap(self, monkeypatch):
+        space = self.space
+        w_t1 = space.newtuple([space.wrap(i) for i in range(5)])
+        w_t2 = space.newtuple([space.wrap(i) for i in range(5)])
+        def no_wrap(*args):
+            raise AssertionError("should not wrap")
+        monkeypatch.setattr(space, 'wrap', no_wrap)
+        assert w_t1.descr_eq(space, w_t2) is space.w_True
+        assert w_t1._eq_unboxed(w_t2)
+        monkeypatch.undo()
+        assert space.int_w(w_t1.descr_hash(space)) == \
+               space.int_w(w_t2.descr_hash(space))
 
 
 class AppTestW_SpecialisedTupleObject:
@@ -83,8 +116,51 @@ class AppTestW_SpecialisedTupleObject:
         assert len(t) == 2
 
     def test_notspecialisedtuple(self):
-        assert not self.isspecialised((42, 43, 44, 45))
-        assert not self.isspecialised((1.5,))
+        assert not self.isspecialised((42, 43.5, 44, 45))
+        assert not self.isspecialised((1.5, 2, 3.5))
+        assert not self.isspecialised(("a",))
+        assert not self.isspecialised(())
+
+    def test_unboxed_tuples(self):
+        assert self.isspecialised((42, 43, 44, 45), '_in')
+        assert self.isspecialised((1.5,), '_fn')
+        assert self.isspecialised(tuple([1, 2, 3]), '_in')
+        assert self.isspecialised(tuple(range(100)), '_in')
+        t = (1, 2, 3, 4, 5)
+        assert len(t) == 5
+        assert t[0] == 1 and t[-1] == 5
+        assert t[1:3] == (2, 3)
+        raises(IndexError, "t[5]")
+        raises(IndexError, "t[-6]")
+        assert list(t) == [1, 2, 3, 4, 5]
+        assert 3 in t
+        assert 3.0 in t
+        assert 6 not in t
+        assert "a" not in t
+        assert t == (1, 2, 3, 4, 5)
+        assert t == (1, 2, 3, 4, 5.0)
+        assert t != (1, 2, 3, 4, 6)
+        assert t != (1, 2, 3, 4)
+        assert t < (1, 2, 3, 4, 6)
+        assert t.index(4) == 3
+        assert t.count(2) == 1
+        assert hash(t) == hash((1, 2, 3, 4, 5.0)) == hash((1L, 2, 3, 4, 5))
+        assert hash((-1, -1, -1)) == hash((-1L, -1L, -1L))
+        d = {(1, 2, 3): "a", (1.5, 2.5, 3.5): "b"}
+        assert d[1, 2, 3] == "a"
+        assert d[(1.0, 2.0, 3.0)] == "a"
+        assert d[1.5, 2.5, 3.5] == "b"
+        assert (1, 2, 3) in set([(1, 2, 3), (4, 5, 6)])
+
+    def test_unboxed_float_tuples(self):
+        N = float('nan')
+        T = (N, N, N)
+        assert N in T
+        assert T == (N, N, N)
+        assert (0.0, 0.0, 0.0) == (-0.0, -0.0, -0.0)
+        assert hash((0.0, 1.0, 2.0)) == hash((-0.0, 1, 2))
+        assert (1.5, 2.5, 3.5) == (1.5, 2.5, 3.5)
+        assert (1.5, 2.5, 3.5) != (1.5, 2.5, 4.5)
 
     def test_slicing_to_specialised(self):
         t = (1, 2, 3)
@@ -191,7 +267,7 @@ class AppTestW_SpecialisedTupleObject:
         raises(IndexError, "t[-3]")
 
     def test_three_tuples(self):
-        if not self.isspecialised((1, 2, 3)):
+        if not self.isspecialised((1, 2, "3")):
             skip("don't have specialization for 3-tuples")
         b = (1, 2, 3)
         c = (1,)
@@ -208,7 +284,7 @@ class AppTestW_SpecialisedTupleObject:
         assert a == (2.2,) + b
         assert not a != (2.2,) + b
         #
-        if not self.isspecialised((1, 2, 3)):
+        if not self.isspecialised((1, 2, "3")):
             skip("don't have specialization for 3-tuples")
         a = (1, 2.2, '333')
         assert self.isspecialised(a)
@@ -95,6 +95,9 @@ class W_AbstractTupleObject(W_Root):
             return w_sequence
         else:
             tuple_w = space.fixedview(w_sequence)
+            if space.is_w(w_tupletype, space.w_tuple):
+                # may give a specialised tuple
+                return space.newtuple(tuple_w)
         w_obj = space.allocate_instance(W_TupleObject, w_tupletype)
         W_TupleObject.__init__(w_obj, tuple_w)
         return w_obj
@@ -251,7 +254,7 @@ If the argument is a tuple, the return value is the same object.""",
 
     __len__ = interp2app(W_AbstractTupleObject.descr_len),
     __iter__ = interp2app(W_AbstractTupleObject.descr_iter),
-    __contains__ = interp2app(W_AbstractTupleObject.descr_contains),
+    __contains__ = interpindirect2app(W_AbstractTupleObject.descr_contains),
 
     __add__ = interp2app(W_AbstractTupleObject.descr_add),
     __mul__ = interp2app(W_AbstractTupleObject.descr_mul),
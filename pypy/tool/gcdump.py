@@ -1,24 +1,372 @@
 #! /usr/bin/env python
 """
-Prints a human-readable total out of a dumpfile produced
-by gc.dump_rpy_heap(), and optionally a typeids.txt.
+Analyzes a dumpfile produced by gc.dump_rpy_heap(), with optionally a
+typeids.txt.
 
-Syntax:  dump.py  <dumpfile>  [<typeids.txt>]
+Syntax:  gcdump.py  [options]  <dumpfile>  [<typeids.txt>]
 
-By default, typeids.txt is loaded from the same dir as dumpfile.
+By default, typeids.txt is loaded from the same dir as dumpfile.  Without
+options, prints the number of objects and their total size per type.
+
+Options:
+    --retained      also compute the dominator tree of the heap, and print
+                    the retained size per type: the memory that would be
+                    freed if all objects of that type were freed
+    --top=N         only print the N biggest types (default: all)
+    --path=TYPE     print the shortest paths from the roots to the objects
+                    of the given type (a type number, or a part of the
+                    name as in typeids.txt)
+    --max-paths=N   print at most N such paths (default: 10)
+
+The dump file is memory-mapped and read once, in chunks, to build an
+index in flat arrays; the rest works on the index.  There is no dict or
+list per object: the references are turned into object numbers by a
+binary search in the sorted addresses.  It is meant to be run with PyPy,
+where it handles dumps of several GB in a few minutes.
 """
-import sys, array, struct, os
+import sys, array, struct, os, mmap
+from bisect import bisect_left
+
+
+WORD = struct.calcsize('l')
+CHUNK_WORDS = 1024 * 1024
+
+
+class HeapDump(object):
+    """The index of a dump file.  The objects are numbered from 0; the
+    last one, 'self.root', is a fake object that points to all the roots.
+    For each object 'i' there is:
+
+    * self.addrs[i], self.typenums[i], self.sizes[i]: from the dump;
+
+    * its references: self.edges[self.edge_ends[i-1]:self.edge_ends[i]],
+      as object numbers (or -1 if the address was not dumped).
+    """
+
+    def __init__(self, filename):
+        self.addrs = array.array('l')
+        self.typenums = array.array('l')
+        self.sizes = array.array('l')
+        self.edge_ends = array.array('l')
+        self.edges = array.array('l')
+        self.nroots = -1
+        self._load(filename)
+        self._add_root()
+
+    def _load(self, filename):
+        f = open(filename, 'rb')
+        try:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        try:
+            if len(m) % WORD != 0 or len(m) < 2 * WORD:
+                raise ValueError("invalid or truncated dump file "
+                                 "(or 32/64-bit mix)")
+            tail = struct.unpack('ll', m[-2 * WORD:])
+            if tail[1] != -1 or tail[0] == -1:
+                raise ValueError("invalid or truncated dump file "
+                                 "(or 32/64-bit mix)")
+            self._parse(m)
+        finally:
+            m.close()
+
+    def _parse(self, m):
+        addrs = self.addrs
+        typenums = self.typenums
+        sizes = self.sizes
+        edge_ends = self.edge_ends
+        edges = self.edges
+        state = 0
+        addr = typenum = 0
+        chunk_bytes = CHUNK_WORDS * WORD
+        for start in xrange(0, len(m), chunk_bytes):
+            words = array.array('l')
+            words.fromstring(m[start:start + chunk_bytes])
+            for w in words:
+                if state >= 3:
+                    if w != -1:
+                        edges.append(w)
+                        continue
+                    # end of the object
+                    if addr == 0 and typenum == 0:
+                        # the marker written after the roots
+                        if self.nroots < 0:
+                            self.nroots = len(addrs)
+                    else:
+                        addrs.append(addr)
+                        typenums.append(typenum)
+                        sizes.append(w_size)
+                        edge_ends.append(len(edges))
+                    state = 0
+                elif state == 0:
+                    addr = w
+                    state = 1
+                elif state == 1:
+                    typenum = w
+                    state = 2
+                else:
+                    w_size = w
+                    state = 3
+        if self.nroots < 0:
+            self.nroots = len(addrs)
+        self._resolve_edges()
+
+    def _resolve_edges(self):
+        # turn the addresses in 'edges' into object numbers, or -1
+        addrs = self.addrs
+        edges = self.edges
+        n = len(addrs)
+        for i in xrange(1, n):
+            if addrs[i] <= addrs[i - 1]:
+                break
+        else:
+            # already sorted (and unique)
+            for i in xrange(len(edges)):
+                k = bisect_left(addrs, edges[i])
+                if k < n and addrs[k] == edges[i]:
+                    edges[i] = k
+                else:
+                    edges[i] = -1
+            return
+        sorted_addrs = array.array('l', sorted(addrs))
+        numbers = array.array('l', [-1]) * n
+        for j in xrange(n):
+            k = bisect_left(sorted_addrs, addrs[j])
+            while numbers[k] >= 0:    # duplicate address
+                k += 1
+            numbers[k] = j
+        for i in xrange(len(edges)):
+            k = bisect_left(sorted_addrs, edges[i])
+            if k < n and sorted_addrs[k] == edges[i]:
+                edges[i] = numbers[k]
+            else:
+                edges[i] = -1
+
+    def _add_root(self):
+        self.root = len(self.addrs)
+        self.addrs.append(0)
+        self.typenums.append(0)
+        self.sizes.append(0)
+        self.edges.extend(xrange(self.nroots))
+        self.edge_ends.append(len(self.edges))
+
+    def __len__(self):
+        return len(self.addrs)
+
+    def references(self, i):
+        start = self.edge_ends[i - 1] if i > 0 else 0
+        return self.edges[start:self.edge_ends[i]]
+
+    # ----------
+
+    def depth_first_order(self):
+        """Return the array of the objects reachable from the root, in
+        postorder (so the root is last)."""
+        n = len(self)
+        edges = self.edges
+        edge_ends = self.edge_ends
+        seen = array.array('b', [0]) * n
+        order = array.array('l')
+        stack_obj = array.array('l')
+        stack_pos = array.array('l')
+        root = self.root
+        seen[root] = 1
+        stack_obj.append(root)
+        stack_pos.append(edge_ends[root - 1] if root > 0 else 0)
+        while stack_obj:
+            i = stack_obj[-1]
+            pos = stack_pos[-1]
+            end = edge_ends[i]
+            while pos < end:
+                j = edges[pos]
+                pos += 1
+                if j >= 0 and not seen[j]:
+                    break
+            else:
+                order.append(i)
+                stack_obj.pop()
+                stack_pos.pop()
+                continue
+            stack_pos[-1] = pos
+            seen[j] = 1
+            stack_obj.append(j)
+            stack_pos.append(edge_ends[j - 1] if j > 0 else 0)
+        return order
+
+    def predecessors(self, reachable):
+        """Return (pred_ends, preds), the reverse of the references
+        between the 'reachable' objects, in the same format as
+        (edge_ends, edges)."""
+        n = len(self)
+        edges = self.edges
+        edge_ends = self.edge_ends
+        counts = array.array('l', [0]) * (n + 1)
+        for i in reachable:
+            for pos in xrange(edge_ends[i - 1] if i > 0 else 0, edge_ends[i]):
+                j = edges[pos]
+                if j >= 0:
+                    counts[j + 1] += 1
+        for j in xrange(n):
+            counts[j + 1] += counts[j]
+        # now counts[j] is where the predecessors of 'j' start
+        preds = array.array('l', [0]) * counts[n]
+        for i in reachable:
+            for pos in xrange(edge_ends[i - 1] if i > 0 else 0, edge_ends[i]):
+                j = edges[pos]
+                if j >= 0:
+                    preds[counts[j]] = i
+                    counts[j] += 1
+        # now counts[j] is where the predecessors of 'j' end
+        return counts[:n], preds
+
+    def dominators(self):
+        """Compute the immediate dominator of every object reachable from
+        the root: the object closest to it through which all its paths
+        from the root go.  Returns (idom, order), with -1 in 'idom' for
+        the unreachable objects, and 'order' as returned by
+        depth_first_order().
+
+        Uses the iterative algorithm of Cooper, Harvey and Kennedy, "A
+        Simple, Fast Dominance Algorithm" (2001).
+        """
+        n = len(self)
+        order = self.depth_first_order()
+        postnum = array.array('l', [-1]) * n
+        for k in xrange(len(order)):
+            postnum[order[k]] = k
+        pred_ends, preds = self.predecessors(order)
+        root = self.root
+        idom = array.array('l', [-1]) * n
+        idom[root] = root
+        changed = True
+        while changed:
+            changed = False
+            for k in xrange(len(order) - 2, -1, -1):
+                i = order[k]
+                new_idom = -1
+                for pos in xrange(pred_ends[i - 1] if i > 0 else 0,
+                                  pred_ends[i]):
+                    p = preds[pos]
+                    if idom[p] < 0:
+                        continue      # not processed yet
+                    if new_idom < 0:
+                        new_idom = p
+                        continue
+                    # intersect(p, new_idom)
+                    a = p
+                    b = new_idom
+                    while a != b:
+                        while postnum[a] < postnum[b]:
+                            a = idom[a]
+                        while postnum[b] < postnum[a]:
+                            b = idom[b]
+                    new_idom = a
+                if idom[i] != new_idom:
+                    idom[i] = new_idom
+                    changed = True
+        return idom, order
+
+    def retained_sizes(self, idom, order):
+        """Return the retained size of every object: its own size plus
+        the sizes of all the objects that it dominates."""
+        retained = array.array('l', self.sizes)
+        root = self.root
+        for i in order:       # children before their dominators
+            if i != root:
+                retained[idom[i]] += retained[i]
+        return retained
+
+    def retained_by_type(self, idom, order, retained):
+        """Return {typenum: retained size} for all the objects of each
+        type.  An object dominated by another one of the same type is
+        not counted twice."""
+        n = len(self)
+        typenums = self.typenums
+        # the children of each object in the dominator tree
+        child_ends = array.array('l', [0]) * (n + 1)
+        for i in order:
+            if i != self.root:
+                child_ends[idom[i] + 1] += 1
+        for i in xrange(n):
+            child_ends[i + 1] += child_ends[i]
+        children = array.array('l', [0]) * child_ends[n]
+        for i in order:
+            if i != self.root:
+                p = idom[i]
+                children[child_ends[p]] = i
+                child_ends[p] += 1
+        # now child_ends[i] is where the children of 'i' end
+        result = {}
+        onpath = {}     # {typenum: number of such objects on the path}
+        root = self.root
+        stack_obj = array.array('l', [root])
+        stack_pos = array.array('l', [child_ends[root - 1] if root > 0 else 0])
+        while stack_obj:
+            i = stack_obj[-1]
+            pos = stack_pos[-1]
+            if pos < child_ends[i]:
+                stack_pos[-1] = pos + 1
+                j = children[pos]
+                t = typenums[j]
+                count = onpath.get(t, 0)
+                if count == 0:
+                    result[t] = result.get(t, 0) + retained[j]
+                onpath[t] = count + 1
+                stack_obj.append(j)
+                stack_pos.append(child_ends[j - 1] if j > 0 else 0)
+            else:
+                stack_obj.pop()
+                stack_pos.pop()
+                if i != root:
+                    onpath[typenums[i]] -= 1
+        return result
+
+    def shortest_paths(self, typenum, max_paths):
+        """Return up to 'max_paths' lists of objects, each a shortest path
+        from a root to an object of type 'typenum', shortest first."""
+        n = len(self)
+        edges = self.edges
+        edge_ends = self.edge_ends
+        typenums = self.typenums
+        parent = array.array('l', [-1]) * n
+        root = self.root
+        parent[root] = root
+        queue = array.array('l', [root])
+        found = []
+        k = 0
+        while k < len(queue) and len(found) < max_paths:
+            i = queue[k]
+            k += 1
+            if typenums[i] == typenum and i != root:
+                found.append(i)
+            for pos in xrange(edge_ends[i - 1] if i > 0 else 0, edge_ends[i]):
+                j = edges[pos]
+                if j >= 0 and parent[j] < 0:
+                    parent[j] = i
+                    queue.append(j)
+        paths = []
+        for i in found:
+            path = []
+            while i != root:
+                path.append(i)
+                i = parent[i]
+            path.reverse()
+            paths.append(path)
+        return paths
 
 
 class Stat(object):
     summary = {}
     typeids = {0: '<GCROOT>'}
 
-    def summarize(self, filename):
-        a = self.load_dump_file(filename)
+    def summarize(self, heap):
         self.summary = {}     # {typenum: [count, totalsize]}
-        for obj in self.walk(a):
-            self.add_object_summary(obj[2], obj[3])
+        typenums = heap.typenums
+        sizes = heap.sizes
+        for i in xrange(len(heap)):
+            if i != heap.root:
+                self.add_object_summary(typenums[i], sizes[i])
 
     def load_typeids(self, filename_or_iter):
         self.typeids = Stat.typeids.copy()
@@ -41,65 +389,102 @@ class Stat(object):
     def get_type_name(self, num):
         return self.typeids.get(num, '<typenum %d>' % num)
 
-    def print_summary(self):
+    def find_typenum(self, name):
+        if name.isdigit():
+            return int(name)
+        matches = [num for num, typename in self.typeids.items()
+                         if typename == name]
+        if not matches:
+            matches = [num for num, typename in self.typeids.items()
+                             if name in typename]
+        if len(matches) != 1:
+            raise ValueError("%d types match %r" % (len(matches), name))
+        return matches[0]
+
+    def add_object_summary(self, typenum, sizeobj):
+        try:
+            stat = self.summary[typenum]
+        except KeyError:
+            stat = self.summary[typenum] = [0, 0]
+        stat[0] += 1
+        stat[1] += sizeobj
+
+    def print_summary(self, top=None):
         items = self.summary.items()
         items.sort(key=lambda (typenum, stat): stat[1])    # sort by totalsize
         totalsize = 0
         for typenum, stat in items:
             totalsize += stat[1]
+        if top is not None:
+            items = items[-top:]
+        for typenum, stat in items:
             print '%8d %8.2fM  %s' % (stat[0], stat[1] / (1024.0*1024.0),
                                       self.get_type_name(typenum))
         print 'total %.1fM' % (totalsize / (1024.0*1024.0),)
 
-    def load_dump_file(self, filename):
-        f = open(filename, 'rb')
-        f.seek(0, 2)
-        end = f.tell()
-        f.seek(0)
-        a = array.array('l')
-        a.fromfile(f, end / struct.calcsize('l'))
-        f.close()
-        return a
-
-    def add_object_summary(self, typenum, sizeobj):
-        try:
-            stat = self.summary[typenum]
-        except KeyError:
-            stat = self.summary[typenum] = [0, 0]
-        stat[0] += 1
-        stat[1] += sizeobj
+    def print_retained(self, retained_by_type, top=None):
+        items = retained_by_type.items()
+        items.sort(key=lambda (typenum, size): size)
+        if top is not None:
+            items = items[-top:]
+        print '   count     self  retained'
+        for typenum, size in items:
+            count, selfsize = self.summary.get(typenum, (0, 0))
+            print '%8d %7.2fM  %7.2fM  %s' % (count,
+                                              selfsize / (1024.0*1024.0),
+                                              size / (1024.0*1024.0),
+                                              self.get_type_name(typenum))
 
-    def walk(self, a, start=0, stop=None):
-        assert a[-1] == -1, "invalid or truncated dump file (or 32/64-bit mix)"
-        assert a[-2] != -1, "invalid or truncated dump file (or 32/64-bit mix)"
-        print >> sys.stderr, 'walking...',
-        i = start
-        if stop is None:
-            stop = len(a)
-        while i < stop:
-            j = i + 3
-            while a[j] != -1:
-                j += 1
-            yield (i, a[i], a[i+1], a[i+2], a[i+3:j])
-            i = j + 1
-        print >> sys.stderr, 'done'
+    def print_paths(self, heap, paths):
+        for path in paths:
+            print '%d:' % (len(path),),
+            print ' -> '.join(['%s@0x%x' % (
+                                   self.get_type_name(heap.typenums[i]),
+                                   heap.addrs[i])
+                               for i in path])
 
 
-if __name__ == '__main__':
-    if len(sys.argv) <= 1:
+def main(argv):
+    import optparse
+    parser = optparse.OptionParser(usage=__doc__.strip())
+    parser.add_option('--retained', action='store_true', default=False)
+    parser.add_option('--top', type='int', default=None)
+    parser.add_option('--path', default=None)
+    parser.add_option('--max-paths', type='int', default=10)
+    options, args = parser.parse_args(argv)
+    if not 1 <= len(args) <= 2:
         print >> sys.stderr, __doc__
-        sys.exit(2)
+        return 2
     stat = Stat()
-    stat.summarize(sys.argv[1])
-    #
-    if len(sys.argv) > 2:
-        typeid_name = sys.argv[2]
+    if len(args) > 1:
+        typeid_name = args[1]
     else:
-        typeid_name = os.path.join(os.path.dirname(sys.argv[1]), 'typeids.txt')
+        typeid_name = os.path.join(os.path.dirname(args[0]), 'typeids.txt')
     if os.path.isfile(typeid_name):
         stat.load_typeids(typeid_name)
     else:
         import zlib, gc
         stat.load_typeids(zlib.decompress(gc.get_typeids_z()).split("\n"))
     #
-    stat.print_summary()
+    print >> sys.stderr, 'loading...',
+    heap = HeapDump(args[0])
+    print >> sys.stderr, '%d objects' % (len(heap) - 1,)
+    stat.summarize(heap)
+    stat.print_summary(options.top)
+    #
+    if options.retained:
+        print >> sys.stderr, 'computing the dominators...'
+        idom, order = heap.dominators()
+        retained = heap.retained_sizes(idom, order)
+        print
+        stat.print_retained(heap.retained_by_type(idom, order, retained),
+                            options.top)
+    if options.path is not None:
+        typenum = stat.find_typenum(options.path)
+        print
+        stat.print_paths(heap, heap.shortest_paths(typenum, options.max_paths))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
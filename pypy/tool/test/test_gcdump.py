@@ -0,0 +1,113 @@
+import struct
+from rpython.tool.udir import udir
+from pypy.tool import gcdump
+
+
+def write_dump(filename, roots, others):
+    words = []
+    for objs in [roots, [(0, 0, 0, [])], others]:
+        for addr, typenum, size, refs in objs:
+            words += [addr, typenum, size] + refs + [-1]
+    f = open(filename, 'wb')
+    f.write(struct.pack('%dl' % len(words), *words))
+    f.close()
+
+def make_heap():
+    # the roots are A and F; B <- E forms a cycle
+    filename = str(udir.join('test_gcdump.dump'))
+    write_dump(filename,
+               [(0x10, 1, 10, [0x20]),               # A
+                (0x60, 1, 5, [0x40])],               # F
+               [(0x20, 2, 20, [0x30, 0x40]),         # B
+                (0x30, 3, 30, [0x40]),               # C
+                (0x40, 2, 40, [0x50]),               # D
+                (0x50, 3, 50, [0x20, 0x1234])])      # E
+    return gcdump.HeapDump(filename)
+
+def by_addr(heap, values):
+    return dict([(heap.addrs[i], values[i]) for i in range(len(heap))
+                                            if i != heap.root])
+
+def test_load():
+    heap = make_heap()
+    assert len(heap) == 7
+    assert heap.nroots == 2
+    assert list(heap.addrs) == [0x10, 0x60, 0x20, 0x30, 0x40, 0x50, 0]
+    assert list(heap.references(2)) == [3, 4]
+    assert list(heap.references(5)) == [2, -1]     # 0x1234 is unknown
+    assert list(heap.references(heap.root)) == [0, 1]
+
+def test_load_unknown_addresses():
+    # the addresses are sorted in this dump; 0x8 and 0x50 are not dumped
+    filename = str(udir.join('test_gcdump_sorted.dump'))
+    write_dump(filename, [(0x10, 1, 8, [0x30, 0x8])],
+               [(0x20, 1, 8, [0x10, 0x50]), (0x30, 2, 8, [0x20, 0x30])])
+    heap = gcdump.HeapDump(filename)
+    assert list(heap.addrs) == [0x10, 0x20, 0x30, 0]
+    assert list(heap.references(0)) == [2, -1]
+    assert list(heap.references(1)) == [0, -1]
+    assert list(heap.references(2)) == [1, 2]
+
+def test_summary():
+    heap = make_heap()
+    stat = gcdump.Stat()
+    stat.summarize(heap)
+    assert stat.summary == {1: [2, 15], 2: [2, 60], 3: [2, 80]}
+
+def test_dominators():
+    heap = make_heap()
+    idom, order = heap.dominators()
+    assert order[-1] == heap.root
+    names = dict(zip(heap.addrs, 'AFBCDE') + [(0, 'root')])
+    assert by_addr(heap, [names[heap.addrs[i]] for i in idom]) == {
+        0x10: 'root', 0x60: 'root', 0x20: 'root', 0x30: 'B',
+        0x40: 'root', 0x50: 'D'}
+    retained = heap.retained_sizes(idom, order)
+    assert by_addr(heap, retained) == {
+        0x10: 10, 0x60: 5, 0x20: 50, 0x30: 30, 0x40: 90, 0x50: 50}
+    assert retained[heap.root] == 155
+    assert heap.retained_by_type(idom, order, retained) == {
+        1: 15, 2: 140, 3: 80}
+
+def test_retained_by_type_nested():
+    # a linked list: only the head counts for its type
+    filename = str(udir.join('test_gcdump_nested.dump'))
+    write_dump(filename, [(0x10, 1, 8, [0x20])],
+               [(0x20, 1, 8, [0x30]), (0x30, 1, 8, [0x40]),
+                (0x40, 2, 100, [])])
+    heap = gcdump.HeapDump(filename)
+    idom, order = heap.dominators()
+    retained = heap.retained_sizes(idom, order)
+    assert heap.retained_by_type(idom, order, retained) == {1: 124, 2: 100}
+
+def test_shortest_paths():
+    heap = make_heap()
+    paths = heap.shortest_paths(3, 10)
+    assert sorted([[heap.addrs[i] for i in path] for path in paths]) == [
+        [0x10, 0x20, 0x30], [0x60, 0x40, 0x50]]
+    assert len(heap.shortest_paths(3, 1)) == 1
+    assert heap.shortest_paths(4, 10) == []
+
+def test_main(capsys):
+    heap = make_heap()
+    typeids = udir.join('typeids.txt')
+    typeids.write('header\nmember1 GcStruct A\nmember2 GcStruct B\n'
+                  'member3 GcStruct C\n')
+    res = gcdump.main(['--retained', '--path=C',
+                       str(udir.join('test_gcdump.dump')), str(typeids)])
+    assert res == 0
+    out, err = capsys.readouterr()
+    assert 'total 0.0M' in out
+    assert 'A@0x10 -> B@0x20 -> C@0x30' in out
+
+def test_truncated():
+    filename = str(udir.join('test_gcdump_truncated.dump'))
+    f = open(filename, 'wb')
+    f.write(struct.pack('3l', 0x10, 1, 8))
+    f.close()
+    try:
+        gcdump.HeapDump(filename)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
@@ -349,6 +349,12 @@ class ResOpAssembler(BaseAssembler):
         self._emit_guard(op, arglocs[2:])
         return fcond
 
+    def emit_op_guard_always_fails(self, op, locs, regalloc, fcond):
+        # the opposite of AL is AL: the branch to the recovery stub is
+        # unconditional
+        self.guard_success_cc = c.AL
+        return self._emit_guard(op, locs)
+
     def emit_op_guard_not_invalidated(self, op, locs, regalloc, fcond):
         return self._emit_guard(op, locs, is_guard_not_invalidated=True)
 
@@ -155,6 +155,7 @@ class FieldDescr(AbstractDescr):
         self.FIELD = getattr(S, fieldname)
         self.index = heaptracker.get_fielddescr_index_in(S, fieldname)
         self._is_pure = S._immutable_field(fieldname) != False
+        self._is_nonnegative = heaptracker.is_nonnegative_field(S, fieldname)
 
     def is_always_pure(self):
         return self._is_pure
@@ -185,12 +186,15 @@ class FieldDescr(AbstractDescr):
 
     def is_integer_bounded(self):
         return getkind(self.FIELD) == 'int' \
-            and rffi.sizeof(self.FIELD) < symbolic.WORD
+            and (rffi.sizeof(self.FIELD) < symbolic.WORD or
+                 self._is_nonnegative)
 
     def get_integer_min(self):
         if getkind(self.FIELD) != 'int':
             assert False
 
+        if self._is_nonnegative:
+            return 0
         return intbounds.get_integer_min(
             not _is_signed_kind(self.FIELD), rffi.sizeof(self.FIELD))
 
@@ -327,6 +331,7 @@ class LLGraphCPU(model.AbstractCPU):
     supports_longlong = r_uint is not r_ulonglong
     supports_singlefloats = True
     supports_guard_gc_type = True
+    supports_guard_always_fails = True
     translate_support_code = False
     is_llgraph = True
     vector_ext = VectorExt()
@@ -1276,6 +1281,9 @@ class LLFrame(object):
         if self.lltrace.invalid:
             self.fail_guard(descr)
 
+    def execute_guard_always_fails(self, descr):
+        self.fail_guard(descr)
+
     def execute_int_add_ovf(self, _, x, y):
         try:
             z = ovfcheck(x + y)
@@ -149,13 +149,14 @@ class FieldDescr(ArrayOrFieldDescr):
     flag = '\x00'
 
     def __init__(self, name, offset, field_size, flag, index_in_parent=0,
-                 is_pure=False):
+                 is_pure=False, is_nonnegative=False):
         self.name = name
         self.offset = offset
         self.field_size = field_size
         self.flag = flag
         self.index = index_in_parent
         self._is_pure = is_pure
+        self._is_nonnegative = is_nonnegative
 
     def is_always_pure(self):
         return self._is_pure
@@ -182,12 +183,14 @@ class FieldDescr(ArrayOrFieldDescr):
 
     def is_integer_bounded(self):
         return self.flag in (FLAG_SIGNED, FLAG_UNSIGNED) \
-            and self.field_size < symbolic.WORD
+            and (self.field_size < symbolic.WORD or self._is_nonnegative)
 
     def get_integer_min(self):
         if self.flag == FLAG_UNSIGNED:
             return intbounds.get_integer_min(True, self.field_size)
         elif self.flag == FLAG_SIGNED:
+            if self._is_nonnegative:
+                return 0
             return intbounds.get_integer_min(False, self.field_size)
 
         assert False
@@ -226,8 +229,9 @@ def get_field_descr(gccache, STRUCT, fieldname):
         name = '%s.%s' % (STRUCT._name, fieldname)
         index_in_parent = heaptracker.get_fielddescr_index_in(STRUCT, fieldname)
         is_pure = STRUCT._immutable_field(fieldname) != False
+        is_nonnegative = heaptracker.is_nonnegative_field(STRUCT, fieldname)
         fielddescr = FieldDescr(name, offset, size, flag, index_in_parent,
-                                is_pure)
+                                is_pure, is_nonnegative)
         cachedict = cache.setdefault(STRUCT, {})
         cachedict[fieldname] = fielddescr
         if STRUCT is rclass.OBJECT:
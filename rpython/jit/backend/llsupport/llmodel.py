@@ -260,6 +260,14 @@ class AbstractLLCPU(AbstractCPU):
                 if self.HAS_CODEMAP:
                     self.codemap.free_asm_block(rawstart, rawstop)
 
+    def get_loop_memory_usage(self, compiled_loop_token):
+        size = 0
+        blocks = compiled_loop_token.asmmemmgr_blocks
+        if blocks is not None:
+            for rawstart, rawstop in blocks:
+                size += rawstop - rawstart
+        return size
+
     def force(self, addr_of_force_token):
         frame = rffi.cast(jitframe.JITFRAMEPTR, addr_of_force_token)
         frame = frame.resolve()
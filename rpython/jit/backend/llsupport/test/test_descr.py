@@ -463,6 +463,20 @@ def test_descr_get_integer_bounds():
     assert descr.get_integer_min() == -128
     assert descr.get_integer_max() == 127
 
+def test_descr_list_length_bounds():
+    c0 = GcCache(False)
+    LIST = lltype.GcStruct('LIST', ('length', lltype.Signed),
+                           ('items', lltype.Ptr(lltype.GcArray(lltype.Signed))),
+                           hints={'list': True})
+    descr = get_field_descr(c0, LIST, 'length')
+    assert descr.is_integer_bounded()
+    assert descr.get_integer_min() == 0
+    assert descr.get_integer_max() == sys.maxint
+    # only the 'length' of lists is known to be nonnegative
+    S = lltype.GcStruct('S', ('length', lltype.Signed))
+    descr = get_field_descr(c0, S, 'length')
+    assert not descr.is_integer_bounded()
+
 
 def test_size_descr_stack_overflow_bug():
     c0 = GcCache(False)
@@ -16,6 +16,7 @@ class AbstractCPU(object):
     # Boxes and Consts are BoxFloats and ConstFloats.
     supports_singlefloats = False
     supports_guard_gc_type = False
+    supports_guard_always_fails = False    # needed to cut traces in segments
 
     propagate_exception_descr = None
 
@@ -158,6 +159,11 @@ class AbstractCPU(object):
         """
         pass
 
+    def get_loop_memory_usage(self, compiled_loop_token):
+        """Return the number of bytes of machine code and raw data
+        allocated so far for the loop and all bridges attached to it."""
+        return 0
+
     def sizeof(self, S):
         raise NotImplementedError
 
@@ -1739,6 +1739,13 @@ class Assembler386(BaseAssembler, VectorAssemblerMixin):
         guard_token.pos_jump_offset = pos
         self.pending_guard_tokens.append(guard_token)
 
+    def genop_guard_guard_always_fails(self, guard_op, guard_token, locs, ign):
+        # an unconditional jump, patched later like the conditional ones
+        self.mc.JMP_l(0)
+        self.mc.force_frame_size(DEFAULT_FRAME_BYTES)
+        guard_token.pos_jump_offset = self.mc.get_relative_pos() - 4
+        self.pending_guard_tokens.append(guard_token)
+
     def genop_guard_guard_exception(self, guard_op, guard_token, locs, resloc):
         loc = locs[0]
         loc1 = locs[1]
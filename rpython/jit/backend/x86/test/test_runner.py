@@ -463,6 +463,35 @@ class TestX86(LLtypeBackendTest):
                 ops_offset[loop.operations[2]] <=
                 ops_offset[None])
 
+    def test_get_loop_memory_usage(self):
+        looptoken = JitCellToken()
+        targettoken = TargetToken()
+        faildescr = BasicFailDescr(1)
+        loop = parse("""
+        [i0]
+        label(i0, descr=targettoken)
+        i1 = int_add(i0, 1)
+        i2 = int_le(i1, 9)
+        guard_true(i2, descr=faildescr) [i1]
+        jump(i1, descr=targettoken)
+        """, namespace=locals())
+        self.cpu.compile_loop(loop.inputargs, loop.operations, looptoken)
+        clt = looptoken.compiled_loop_token
+        size1 = self.cpu.get_loop_memory_usage(clt)
+        assert size1 > 0
+        bridge = parse("""
+        [i1]
+        i3 = int_le(i1, 19)
+        guard_true(i3) [i1]
+        jump(i1, descr=targettoken)
+        """, namespace=locals())
+        self.cpu.compile_bridge(faildescr, bridge.inputargs,
+                                bridge.operations, looptoken)
+        size2 = self.cpu.get_loop_memory_usage(clt)
+        assert size2 > size1
+        self.cpu.free_loop_and_bridges(clt)
+        assert self.cpu.get_loop_memory_usage(clt) == 0
+
     def test_calling_convention(self, monkeypatch):
         if WORD != 4:
             py.test.skip("32-bit only test")
@@ -807,6 +807,10 @@ class GuardOpAssembler(object):
         self.guard_success_cc = c.LE
         self._emit_guard(op, arglocs[2:])
 
+    def emit_guard_always_fails(self, op, arglocs, regalloc):
+        self.guard_success_cc = c.negate(c.ANY)   # never succeeds
+        self._emit_guard(op, arglocs)
+
     def emit_guard_not_invalidated(self, op, arglocs, regalloc):
         self._emit_guard(op, arglocs, is_guard_not_invalidated=True)
 
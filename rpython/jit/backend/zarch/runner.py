@@ -15,6 +15,7 @@ class AbstractZARCHCPU(AbstractLLCPU):
 class CPU_S390_64(AbstractZARCHCPU):
     dont_keepalive_stuff = True
     supports_floats = True
+    supports_guard_always_fails = True
     from rpython.jit.backend.zarch.registers import JITFRAME_FIXED_SIZE
 
     vector_ext = vector_ext.ZSIMDVectorExt()
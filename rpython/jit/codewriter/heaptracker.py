@@ -23,6 +23,10 @@ def int_signext(value, numbytes):
 def is_immutable_struct(S):
     return isinstance(S, lltype.GcStruct) and S._hints.get('immutable', False)
 
+def is_nonnegative_field(S, fieldname):
+    # the 'length' of a resizable RPython list is never negative
+    return fieldname == 'length' and S._hints.get('list', False)
+
 # ____________________________________________________________
 
 def has_gcstruct_a_vtable(GCSTRUCT):
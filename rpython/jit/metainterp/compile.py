@@ -1,9 +1,9 @@
 import weakref
-from rpython.rtyper.lltypesystem import lltype, llmemory
-from rpython.rtyper.annlowlevel import cast_instance_to_gcref
+from rpython.rtyper.lltypesystem import lltype, llmemory, rffi
+from rpython.rtyper.annlowlevel import cast_instance_to_gcref, llstr
 from rpython.rlib.objectmodel import we_are_translated
 from rpython.rlib.debug import debug_start, debug_stop, debug_print, have_debug_prints
-from rpython.rlib.rarithmetic import r_uint, intmask
+from rpython.rlib.rarithmetic import r_uint, intmask, LONG_BIT
 from rpython.rlib import rstack
 from rpython.rlib.jit import JitDebugInfo, Counters, dont_look_inside
 from rpython.rlib.rjitlog import rjitlog as jl
@@ -22,6 +22,8 @@ from rpython.jit.metainterp.resume import (PENDINGFIELDSP,
 from rpython.jit.metainterp.resumecode import NUMBERING
 from rpython.jit.codewriter import heaptracker, longlong
 
+WORD = LONG_BIT // 8
+
 
 def giveup():
     from rpython.jit.metainterp.pyjitpl import SwitchToBlackhole
@@ -160,8 +162,9 @@ def make_jitcell_token(jitdriver_sd):
     jitcell_token.outermost_jitdriver_sd = jitdriver_sd
     return jitcell_token
 
-def record_loop_or_bridge(metainterp_sd, loop):
-    """Do post-backend recordings and cleanups on 'loop'.
+def record_loop_or_bridge(metainterp_sd, loop, resumekey=None):
+    """Do post-backend recordings and cleanups on 'loop'.  For a bridge,
+    'resumekey' is the guard that it starts from.
     """
     # get the original jitcell token corresponding to jitcell form which
     # this trace starts
@@ -172,11 +175,28 @@ def record_loop_or_bridge(metainterp_sd, loop):
     wref = weakref.ref(original_jitcell_token)
     clt = original_jitcell_token.compiled_loop_token
     clt.loop_token_wref = wref
+    resume_memory_usage = 0
+    jd_index = -1
+    greenkey = None
+    guard_stats = guard_stats_enabled(metainterp_sd)
+    if guard_stats and isinstance(resumekey, AbstractResumeGuardDescr):
+        info = find_guard_info(resumekey)
+        if info is not None:
+            jd_index = info.jd_index
+            greenkey = info.greenkey
     for op in loop.operations:
+        if op.getopnum() == rop.DEBUG_MERGE_POINT:
+            # remember the position, for the guards that follow
+            jd_index = op.getarg(0).getint()
+            greenkey = op.getarglist()[3:]
         descr = op.getdescr()
         # not sure what descr.index is about
         if isinstance(descr, ResumeDescr):
             descr.rd_loop_token = clt   # stick it there
+            resume_memory_usage += descr.estimate_memory_usage()
+            if guard_stats and isinstance(descr, AbstractResumeGuardDescr):
+                record_guard(original_jitcell_token, descr, jd_index,
+                             greenkey)
             #n = descr.index
             #if n >= 0:       # we also record the resumedescr number
             #    original_jitcell_token.compiled_loop_token.record_faildescr_index(n)
@@ -198,6 +218,13 @@ def record_loop_or_bridge(metainterp_sd, loop):
                 op._descr_wref = weakref.ref(op._descr)
             op.cleardescr()    # clear reference to prevent the history.Stats
                                # from keeping the loop alive during tests
+    # record the memory used by the loop and all its bridges so far
+    if metainterp_sd.warmrunnerdesc is not None:    # for tests
+        original_jitcell_token.resume_memory_usage += resume_memory_usage
+        memory_usage = (metainterp_sd.cpu.get_loop_memory_usage(clt) +
+                        original_jitcell_token.resume_memory_usage)
+        metainterp_sd.warmrunnerdesc.memory_manager.set_memory_usage(
+            original_jitcell_token, memory_usage)
     # record this looptoken on the QuasiImmut used in the code
     if loop.quasi_immutable_deps is not None:
         for qmut in loop.quasi_immutable_deps:
@@ -208,6 +235,85 @@ def record_loop_or_bridge(metainterp_sd, loop):
     if not we_are_translated():
         loop._looptoken_number = original_jitcell_token.number
 
+
+class GuardInfo(object):
+    """Where a guard comes from, for get_guard_stats(): the greenkey
+    of the last debug_merge_point before it, if any.  Only recorded
+    when the 'guard_stats' jit parameter is set.
+
+    'fail_counter' is the number of failures of the guard.  It is a raw
+    word, so that once a bridge is attached, the bridge itself can keep
+    incrementing it (see compile_and_attach()).
+    """
+
+    def __init__(self, jd_index, greenkey):
+        self.jd_index = jd_index
+        self.greenkey = greenkey
+        self.has_bridge = False
+        self.fail_counter = lltype.malloc(rffi.CArray(lltype.Signed), 1,
+                                          flavor='raw', zero=True,
+                                          track_allocation=False)
+
+    def __del__(self):
+        lltype.free(self.fail_counter, flavor='raw', track_allocation=False)
+
+    def get_fail_count(self):
+        return self.fail_counter[0]
+
+    def count_failure(self):
+        self.fail_counter[0] += 1
+
+    def make_counter_op(self):
+        c_adr = ConstInt(rffi.cast(lltype.Signed, self.fail_counter))
+        return ResOperation(rop.INCREMENT_DEBUG_COUNTER, [c_adr])
+
+    def get_location_str(self, metainterp_sd):
+        if self.greenkey is None:
+            return ''
+        jitdriver_sd = metainterp_sd.jitdrivers_sd[self.jd_index]
+        return jitdriver_sd.warmstate.get_location_str(self.greenkey)
+
+def guard_stats_enabled(metainterp_sd):
+    warmrunnerdesc = metainterp_sd.warmrunnerdesc
+    return (warmrunnerdesc is not None and           # for tests
+            warmrunnerdesc.memory_manager is not None and
+            warmrunnerdesc.memory_manager.guard_stats)
+
+def record_guard(jitcell_token, descr, jd_index, greenkey):
+    if jitcell_token.guard_infos is None:
+        jitcell_token.guard_infos = {}
+    jitcell_token.guard_infos[descr] = GuardInfo(jd_index, greenkey)
+
+def find_guard_info(descr):
+    """Return the GuardInfo of a compiled guard, or None."""
+    jitcell_token = descr.rd_loop_token.loop_token_wref()
+    if jitcell_token is None or jitcell_token.guard_infos is None:
+        return None
+    return jitcell_token.guard_infos.get(descr, None)
+
+def get_guard_stats(metainterp_sd, jitcell_tokens):
+    """Return the guards of the given loops and their bridges, with the
+    number of times each guard failed, as a GUARD_STATS_CONTAINER."""
+    from rpython.rlib.jit_hooks import GUARD_STATS_CONTAINER
+    count = 0
+    for jitcell_token in jitcell_tokens:
+        if jitcell_token.guard_infos is not None:
+            count += len(jitcell_token.guard_infos)
+    result = lltype.malloc(GUARD_STATS_CONTAINER, count)
+    i = 0
+    for jitcell_token in jitcell_tokens:
+        if jitcell_token.guard_infos is None:
+            continue
+        for descr, info in jitcell_token.guard_infos.iteritems():
+            item = result[i]
+            item.loop = jitcell_token.number
+            item.guard = compute_unique_id(descr)
+            item.fail_count = info.get_fail_count()
+            item.has_bridge = info.has_bridge
+            item.location = llstr(info.get_location_str(metainterp_sd))
+            i += 1
+    return result
+
 # ____________________________________________________________
 
 
@@ -247,6 +353,45 @@ def compile_simple_loop(metainterp, greenkey, trace, runtime_args, enable_opts,
     record_loop_or_bridge(metainterp_sd, loop)
     return target_token
 
+def compile_entry_segment(metainterp, greenkey):
+    """Compile the first segment of a trace that was too long.  It ends
+    with a GUARD_ALWAYS_FAILS, but it starts with a LABEL like a loop, so
+    that the following segments can jump back to it.
+    """
+    from rpython.jit.metainterp.optimizeopt import optimize_trace
+
+    jitdriver_sd = metainterp.jitdriver_sd
+    metainterp_sd = metainterp.staticdata
+    metainterp_sd.jitlog.start_new_trace(metainterp_sd,
+            faildescr=None, entry_bridge=False)
+    jitcell_token = make_jitcell_token(jitdriver_sd)
+    data = SimpleCompileData(metainterp.history.trace,
+                             call_pure_results=metainterp.call_pure_results,
+                             enable_opts=jitdriver_sd.warmstate.enable_opts)
+    try:
+        loop_info, ops = optimize_trace(metainterp_sd, jitdriver_sd,
+                                        data, metainterp.box_names_memo)
+    except InvalidLoop:
+        metainterp_sd.jitlog.trace_aborted()
+        return None
+    loop = create_empty_loop(metainterp)
+    loop.original_jitcell_token = jitcell_token
+    loop.inputargs = loop_info.inputargs
+    if loop_info.quasi_immutable_deps:
+        loop.quasi_immutable_deps = loop_info.quasi_immutable_deps
+    target_token = TargetToken(jitcell_token,
+                               original_jitcell_token=jitcell_token)
+    label = ResOperation(rop.LABEL, loop_info.inputargs[:], descr=target_token)
+    loop.operations = [label] + ops
+    if not we_are_translated():
+        loop.check_consistency()
+    jitcell_token.target_tokens = [target_token]
+    send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, "loop",
+                         metainterp.history.inputargs,
+                         metainterp.box_names_memo)
+    record_loop_or_bridge(metainterp_sd, loop)
+    return target_token
+
 def compile_loop(metainterp, greenkey, start, inputargs, jumpargs,
                  full_preamble_needed=True, try_disabling_unroll=False):
     """Try to compile a new procedure by closing the current history back
@@ -715,6 +860,11 @@ class ResumeDescr(AbstractFailDescr):
     def clone(self):
         return self
 
+    def estimate_memory_usage(self):
+        """Rough estimate of the memory used by this descr and its resume
+        data, in bytes."""
+        return 4 * WORD
+
 class AbstractResumeGuardDescr(ResumeDescr):
     _attrs_ = ('status',)
 
@@ -722,7 +872,8 @@ class AbstractResumeGuardDescr(ResumeDescr):
 
     ST_BUSY_FLAG    = 0x01     # if set, busy tracing from the guard
     ST_TYPE_MASK    = 0x06     # mask for the type (TY_xxx)
-    ST_SHIFT        = 3        # in "status >> ST_SHIFT" is stored:
+    ST_FORCE_FINISH_FLAG = 0x08  # if set, cut the bridge in trace segments
+    ST_SHIFT        = 4        # in "status >> ST_SHIFT" is stored:
                                # - if TY_NONE, the jitcounter hash directly
                                # - otherwise, the guard_value failarg index
     ST_SHIFT_MASK   = -(1 << ST_SHIFT)
@@ -732,6 +883,7 @@ class AbstractResumeGuardDescr(ResumeDescr):
     TY_FLOAT        = 0x06
 
     def handle_fail(self, deadframe, metainterp_sd, jitdriver_sd):
+        self.count_failure()
         if self.must_compile(deadframe, metainterp_sd, jitdriver_sd):
             self.start_compiling()
             try:
@@ -769,8 +921,7 @@ class AbstractResumeGuardDescr(ResumeDescr):
             # common case: this is not a guard_value, and we are not
             # already busy tracing.  The rest of self.status stores a
             # valid per-guard index in the jitcounter.
-            hash = self.status
-            assert hash == (self.status & self.ST_SHIFT_MASK)
+            hash = self.status & self.ST_SHIFT_MASK
         #
         # do we have the BUSY flag?  If so, we're tracing right now, e.g. in an
         # outer invocation of the same function, so don't trace again for now.
@@ -810,6 +961,13 @@ class AbstractResumeGuardDescr(ResumeDescr):
         increment = jitdriver_sd.warmstate.increment_trace_eagerness
         return jitcounter.tick(hash, increment)
 
+    def count_failure(self):
+        # for get_guard_stats(); a no-op unless the guard was compiled
+        # while the 'guard_stats' jit parameter was set
+        info = find_guard_info(self)
+        if info is not None:
+            info.count_failure()
+
     def start_compiling(self):
         # start tracing and compiling from this guard.
         self.status |= self.ST_BUSY_FLAG
@@ -821,6 +979,14 @@ class AbstractResumeGuardDescr(ResumeDescr):
         # incremented at all as long as ST_BUSY_FLAG was set.
         self.status &= ~self.ST_BUSY_FLAG
 
+    def mark_force_finish_tracing(self):
+        # the bridge from this guard was too long: the next time, trace
+        # it in several segments (see MetaInterp.compile_trace_segment())
+        self.status |= self.ST_FORCE_FINISH_FLAG
+
+    def must_force_finish_tracing(self):
+        return (self.status & self.ST_FORCE_FINISH_FLAG) != 0
+
     def compile_and_attach(self, metainterp, new_loop, orig_inputargs):
         # We managed to create a bridge.  Attach the new operations
         # to the corresponding guard_op and compile from there
@@ -831,6 +997,13 @@ class AbstractResumeGuardDescr(ResumeDescr):
             self._debug_subinputargs = new_loop.inputargs
             self._debug_suboperations = new_loop.operations
         propagate_original_jitcell_token(new_loop)
+        info = find_guard_info(self)
+        if info is not None:
+            # from now on, failures of the guard go directly to the
+            # bridge: count them there
+            info.has_bridge = True
+            new_loop.operations = ([info.make_counter_op()] +
+                                   new_loop.operations)
         send_bridge_to_backend(metainterp.jitdriver_sd, metainterp.staticdata,
                                self, inputargs, new_loop.operations,
                                new_loop.original_jitcell_token,
@@ -897,6 +1070,18 @@ class ResumeGuardDescr(AbstractResumeGuardDescr):
         self.rd_count = len(boxes)
         self.store_hash(metainterp_sd)
 
+    def estimate_memory_usage(self):
+        size = 8 * WORD
+        if self.rd_numb:
+            size += 2 * WORD + len(self.rd_numb.code)
+        if self.rd_consts is not None:
+            size += 3 * WORD * len(self.rd_consts)
+        if self.rd_virtuals is not None:
+            size += 8 * WORD * len(self.rd_virtuals)
+        if self.rd_pendingfields:
+            size += 4 * WORD * len(self.rd_pendingfields)
+        return size
+
     def clone(self):
         cloned = ResumeGuardDescr()
         cloned.copy_all_attributes_from(self)
@@ -911,6 +1096,29 @@ class ResumeGuardCopiedExcDescr(ResumeGuardCopiedDescr):
 class ResumeAtPositionDescr(ResumeGuardDescr):
     pass
 
+class ResumeGuardSegmentDescr(ResumeGuardDescr):
+    """The descr of the GUARD_ALWAYS_FAILS at the end of a trace segment.
+    The bridge from it is the next segment, which we trace the first
+    time the guard fails, cutting it in segments again if needed.
+    """
+    segment_traced = False
+
+    def must_compile(self, deadframe, metainterp_sd, jitdriver_sd):
+        if not self.segment_traced:
+            self.segment_traced = True
+            return True
+        # tracing the next segment failed; count normally before retrying
+        return ResumeGuardDescr.must_compile(self, deadframe, metainterp_sd,
+                                             jitdriver_sd)
+
+    def must_force_finish_tracing(self):
+        return True
+
+    def clone(self):
+        cloned = ResumeGuardSegmentDescr()
+        cloned.copy_all_attributes_from(self)
+        return cloned
+
 class CompileLoopVersionDescr(ResumeGuardDescr):
     def handle_fail(self, deadframe, metainterp_sd, jitdriver_sd):
         assert 0, "this guard must never fail"
@@ -948,6 +1156,9 @@ def invent_fail_descr_for_op(opnum, optimizer, copied_guard=False):
         assert not copied_guard
         resumedescr = ResumeGuardForcedDescr()
         resumedescr._init(optimizer.metainterp_sd, optimizer.jitdriver_sd)
+    elif opnum == rop.GUARD_ALWAYS_FAILS:
+        assert not copied_guard
+        resumedescr = ResumeGuardSegmentDescr()
     elif opnum in (rop.GUARD_IS_OBJECT, rop.GUARD_SUBCLASS, rop.GUARD_GC_TYPE):
         # note - this only happens in tests
         resumedescr = ResumeAtPositionDescr()
@@ -975,6 +1186,7 @@ class ResumeGuardForcedDescr(ResumeGuardDescr):
         # the virtualrefs and virtualizable have been forced by
         # handle_async_forcing() just a moment ago.
         from rpython.jit.metainterp.blackhole import resume_in_blackhole
+        self.count_failure()
         hidden_all_virtuals = metainterp_sd.cpu.get_savedata_ref(deadframe)
         obj = AllVirtuals.show(metainterp_sd.cpu, hidden_all_virtuals)
         all_virtuals = obj.cache
@@ -1104,7 +1316,7 @@ def compile_trace(metainterp, resumekey, runtime_boxes):
         new_trace.inputargs = info.inputargs
         target_token = new_trace.operations[-1].getdescr()
         resumekey.compile_and_attach(metainterp, new_trace, inputargs)
-        record_loop_or_bridge(metainterp_sd, new_trace)
+        record_loop_or_bridge(metainterp_sd, new_trace, resumekey)
         return target_token
     new_trace.inputargs = info.renamed_inputargs
     metainterp.retrace_needed(new_trace, info)
@@ -410,6 +410,11 @@ class JitCellToken(AbstractDescr):
     # and more data specified by the backend when the loop is compiled
     number = -1
     generation = r_int64(0)
+    # size of the machine code and resume data, see memmgr.py
+    memory_usage = 0
+    resume_memory_usage = 0
+    # {guard descr: GuardInfo} for the loop and its bridges, see compile.py
+    guard_infos = None
     # one purpose of LoopToken is to keep alive the CompiledLoopToken
     # returned by the backend.  When the LoopToken goes away, the
     # CompiledLoopToken has its __del__ called, which frees the assembler
@@ -2,6 +2,7 @@ import math
 from rpython.rlib.rarithmetic import r_int64
 from rpython.rlib.debug import debug_start, debug_print, debug_stop
 from rpython.rlib.objectmodel import we_are_translated
+from rpython.rlib.listsort import make_timsort_class
 
 #
 # Logic to decide which loops are old and not used any more.
@@ -19,6 +20,16 @@ from rpython.rlib.objectmodel import we_are_translated
 # 'generation' field is much smaller than the current generation, and
 # removed from the set.
 #
+# Additionally, there can be a budget for the memory used by the loops:
+# the machine code of a loop and of its bridges, plus an estimate of the
+# size of their resume data, is recorded in the 'memory_usage' field of
+# the LoopToken.  When the total for the loops in 'alive_loops' exceeds
+# the budget, the loops that were entered least recently (i.e. with the
+# oldest 'generation') are removed, until we are back below 3/4 of the
+# budget.  Note that bridges are freed together with their loop.
+#
+
+LoopTokenSort = make_timsort_class(lt=lambda a, b: a.generation < b.generation)
 
 class MemoryManager(object):
 
@@ -38,6 +49,10 @@ class MemoryManager(object):
         self.current_generation = r_int64(1)
         self.next_check = r_int64(-1)
         self.alive_loops = {}
+        self.max_memory = 0        # in bytes, 0 = no limit
+        self.total_memory = 0      # sum of 'memory_usage' in alive_loops
+        self.evicted_loops = 0     # number of loops removed for the budget
+        self.guard_stats = False   # record GuardInfos, see compile.py
 
     def set_max_age(self, max_age, check_frequency=0):
         if max_age <= 0:
@@ -49,16 +64,40 @@ class MemoryManager(object):
             self.check_frequency = check_frequency
             self.next_check = self.current_generation + 1
 
+    def set_max_memory(self, max_memory):
+        self.max_memory = max(max_memory, 0)
+
     def next_generation(self):
         self.current_generation += 1
         if self.current_generation == self.next_check:
             self._kill_old_loops_now()
             self.next_check = self.current_generation + self.check_frequency
+        if self.max_memory > 0 and self.total_memory > self.max_memory:
+            self._free_memory_now()
 
     def keep_loop_alive(self, looptoken):
         if looptoken.generation != self.current_generation:
             looptoken.generation = self.current_generation
-            self.alive_loops[looptoken] = None
+            if looptoken not in self.alive_loops:
+                self.total_memory += looptoken.memory_usage
+                self.alive_loops[looptoken] = None
+
+    def set_memory_usage(self, looptoken, memory_usage):
+        """Record the size of the machine code and resume data of the
+        loop and its bridges."""
+        if looptoken in self.alive_loops:
+            self.total_memory += memory_usage - looptoken.memory_usage
+        looptoken.memory_usage = memory_usage
+
+    def _forget_loop(self, looptoken):
+        del self.alive_loops[looptoken]
+        self.total_memory -= looptoken.memory_usage
+
+    def _collect_freed_loops(self):
+        if not we_are_translated():
+            from rpython.rlib import rgc
+            # a single one is not enough for all tests :-(
+            rgc.collect(); rgc.collect(); rgc.collect()
 
     def _kill_old_loops_now(self):
         debug_start("jit-mem-collect")
@@ -70,14 +109,37 @@ class MemoryManager(object):
         for looptoken in self.alive_loops.keys():
             if (0 <= looptoken.generation < max_generation or
                 looptoken.invalidated):
-                del self.alive_loops[looptoken]
+                self._forget_loop(looptoken)
         newtotal = len(self.alive_loops)
         debug_print("Loop tokens freed: ", oldtotal - newtotal)
         debug_print("Loop tokens left:  ", newtotal)
         #print self.alive_loops.keys()
-        if not we_are_translated() and oldtotal != newtotal:
+        if oldtotal != newtotal:
             looptoken = None
-            from rpython.rlib import rgc
-            # a single one is not enough for all tests :-(
-            rgc.collect(); rgc.collect(); rgc.collect()
+            self._collect_freed_loops()
         debug_stop("jit-mem-collect")
+
+    def _free_memory_now(self):
+        debug_start("jit-mem-budget")
+        debug_print("Current generation:", self.current_generation)
+        debug_print("Memory before:     ", self.total_memory)
+        # the loops entered since the previous generation are never
+        # removed: we might be about to attach a bridge to one of them
+        max_generation = self.current_generation - 1
+        loops = [looptoken for looptoken in self.alive_loops
+                 if 0 <= looptoken.generation < max_generation]
+        LoopTokenSort(loops).sort()
+        target = self.max_memory - self.max_memory // 4
+        count = 0
+        for looptoken in loops:
+            if self.total_memory <= target:
+                break
+            self._forget_loop(looptoken)
+            count += 1
+        loops = None
+        self.evicted_loops += count
+        debug_print("Loop tokens freed: ", count)
+        debug_print("Memory after:      ", self.total_memory)
+        if count > 0:
+            self._collect_freed_loops()
+        debug_stop("jit-mem-budget")
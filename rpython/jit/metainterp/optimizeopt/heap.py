@@ -498,6 +498,16 @@ class OptHeap(Optimization):
             for index, cf in submap.iteritems():
                 cf.force_lazy_set(self, None)
 
+    def has_lazy_sets(self):
+        for cf in self.cached_fields.itervalues():
+            if cf._lazy_set is not None:
+                return True
+        for submap in self.cached_arrayitems.itervalues():
+            for cf in submap.itervalues():
+                if cf._lazy_set is not None:
+                    return True
+        return False
+
     def force_lazy_sets_for_guard(self):
         pendingfields = []
         items = self.cached_fields.items()
@@ -1,15 +1,17 @@
 import sys
-from rpython.jit.metainterp.history import ConstInt
+from rpython.jit.metainterp.history import ConstInt, Const
 from rpython.jit.metainterp.optimize import InvalidLoop
 from rpython.jit.metainterp.optimizeopt.intutils import (IntBound,
     IntLowerBound, IntUpperBound, ConstIntBound)
 from rpython.jit.metainterp.optimizeopt.optimizer import (Optimization, CONST_1,
     CONST_0)
 from rpython.jit.metainterp.optimizeopt.util import make_dispatcher_method
-from rpython.jit.metainterp.resoperation import rop, AbstractResOp
+from rpython.jit.metainterp.resoperation import (rop, AbstractResOp,
+    ResOperation)
 from rpython.jit.metainterp.optimizeopt import vstring
 from rpython.jit.codewriter.effectinfo import EffectInfo
 from rpython.rlib.rarithmetic import intmask
+from rpython.rtyper.lltypesystem import lltype, rffi
 
 def get_integer_min(is_unsigned, byte_size):
     if is_unsigned:
@@ -43,12 +45,33 @@ class OptIntBounds(Optimization):
     """Keeps track of the bounds placed on integers by guards and remove
        redundant guards"""
 
+    def setup(self):
+        # box -> box, for 'box1 < box2' known from an earlier guard
+        self.known_lt = {}
+        # an index check that is not emitted yet, see strengthen_index_check()
+        self.postponed_index_check = None
+
     def propagate_forward(self, op):
+        check = self.postponed_index_check
+        if check is not None:
+            self.postponed_index_check = None
+            if (op.getopnum() == rop.GUARD_TRUE or
+                    op.getopnum() == rop.GUARD_FALSE):
+                newop = self.strengthen_index_check(op, check)
+                if newop is not None:
+                    return self.emit(newop)
+            self.emit_extra(check, emit=False)
         return dispatch_opt(self, op)
 
     def propagate_postprocess(self, op):
         return dispatch_postprocess(self, op)
 
+    def flush(self):
+        check = self.postponed_index_check
+        if check is not None:
+            self.postponed_index_check = None
+            self.emit_extra(check, emit=False)
+
     def propagate_bounds_backward(self, box):
         # FIXME: This takes care of the instruction where box is the reuslt
         #        but the bounds produced by all instructions where box is
@@ -63,6 +86,94 @@ class OptIntBounds(Optimization):
     def _optimize_guard_true_false_value(self, op):
         return self.emit(op)
 
+    def _index_check_bound(self, check):
+        # for the index check 'check' (one of 'i < length', 'i >= length'
+        # or their mirror forms), returns the box n of an earlier guard
+        # 'i < n', or None
+        opnum = check.getopnum()
+        if opnum == rop.INT_LT or opnum == rop.INT_GE:
+            index, length = check.getarg(0), check.getarg(1)
+        else:
+            index, length = check.getarg(1), check.getarg(0)
+        n = self.known_lt.get(self.get_box_replacement(index), None)
+        if n is None:
+            return None
+        n = self.get_box_replacement(n)
+        length = self.get_box_replacement(length)
+        if n is length or self.getintbound(n).known_gt(
+                self.getintbound(length)):
+            return None
+        return n
+
+    def strengthen_index_check(self, op, check):
+        # An index check 'i < length' after the guard 'i < n', e.g. in
+        # 'for i in range(len(lst)): lst[i]', where n is the length of the
+        # range.  Guard on 'n <= length' instead: it fails in more cases,
+        # but it does not depend on 'i', so when n and length are loop
+        # invariants the unrolling computes it once in the preamble and
+        # the loop has no index check left.  This is only done for index
+        # checks, which are not expected to fail anyway.  The comparison
+        # itself is not emitted at all, unless the guard needs its value
+        # to resume.  Returns the new guard, or None.
+        if self.get_box_replacement(op.getarg(0)) is not check:
+            return None
+        opnum = check.getopnum()
+        if op.getopnum() == rop.GUARD_TRUE:
+            if opnum != rop.INT_LT and opnum != rop.INT_GT:
+                return None
+            checkvalue = 1
+        else:
+            if opnum != rop.INT_GE and opnum != rop.INT_LE:
+                return None
+            checkvalue = 0
+        if (not self._guard_shares_resume_data(op) and
+                self._is_live_in_guard(check, op)):
+            return None
+        n = self._index_check_bound(check)
+        assert n is not None
+        if opnum == rop.INT_LT or opnum == rop.INT_GE:
+            length = check.getarg(1)
+        else:
+            length = check.getarg(0)
+        newop = ResOperation(rop.INT_LE, [n, self.get_box_replacement(length)])
+        self.send_extra_operation(newop)
+        # once the guard passed, the result of the index check is known
+        self.make_constant_int(check, checkvalue)
+        return self.replace_op_with(op, rop.GUARD_TRUE,
+                                    args=[self.get_box_replacement(newop)])
+
+    def _guard_shares_resume_data(self, guard):
+        # see Optimizer.emit_guard_operation(): a guard that follows
+        # another guard with only operations without side effects in
+        # between resumes at that other guard.  The heap optimization
+        # may still emit its lazy setfields just before the guard.
+        optheap = self.optimizer.optheap
+        return (self.optimizer._last_guard_op is not None and
+                guard.getdescr() is None and
+                (optheap is None or not optheap.has_lazy_sets()))
+
+    def _is_live_in_guard(self, box, guard):
+        snapshot_iter = self.optimizer.trace.get_snapshot_iter(
+            guard.rd_resume_position)
+        if self._is_in_snapshot_array(box, snapshot_iter,
+                                      snapshot_iter.vable_array):
+            return True
+        if self._is_in_snapshot_array(box, snapshot_iter,
+                                      snapshot_iter.vref_array):
+            return True
+        for snapshot in snapshot_iter.framestack:
+            if self._is_in_snapshot_array(box, snapshot_iter,
+                                          snapshot.box_array):
+                return True
+        return False
+
+    def _is_in_snapshot_array(self, box, snapshot_iter, arr):
+        for item in arr:
+            livebox = snapshot_iter.get(rffi.cast(lltype.Signed, item))
+            if self.get_box_replacement(livebox) is box:
+                return True
+        return False
+
     def _postprocess_guard_true_false_value(self, op):
         if op.getarg(0).type == 'i':
             self.propagate_bounds_backward(op.getarg(0))
@@ -425,6 +536,36 @@ class OptIntBounds(Optimization):
         else:
             return self.emit(op)
 
+    def _optimize_uint_cmp(self, op, signed_opnum):
+        b1 = self.getintbound(op.getarg(0))
+        b2 = self.getintbound(op.getarg(1))
+        if b1.known_ge(IntBound(0, 0)) and b2.known_ge(IntBound(0, 0)):
+            # on nonnegative integers, the unsigned comparison is the
+            # same as the signed one.  Turn it into the signed one, which
+            # the following optimizations can compare with the previous
+            # guards: e.g. after 'i < len(lst)', the index check of
+            # 'lst[i]' is removed.
+            op = self.replace_op_with(op, signed_opnum)
+            result = dispatch_opt(self, op)
+            if result is not None and self._index_check_bound(op) is not None:
+                # wait for the guard, see strengthen_index_check()
+                self.postponed_index_check = op
+                return None
+            return result
+        return self.emit(op)
+
+    def optimize_UINT_LT(self, op):
+        return self._optimize_uint_cmp(op, rop.INT_LT)
+
+    def optimize_UINT_GT(self, op):
+        return self._optimize_uint_cmp(op, rop.INT_GT)
+
+    def optimize_UINT_LE(self, op):
+        return self._optimize_uint_cmp(op, rop.INT_LE)
+
+    def optimize_UINT_GE(self, op):
+        return self._optimize_uint_cmp(op, rop.INT_GE)
+
     def optimize_INT_FORCE_GE_ZERO(self, op):
         b = self.getintbound(op.getarg(0))
         if b.known_ge(IntBound(0, 0)):
@@ -552,6 +693,10 @@ class OptIntBounds(Optimization):
             v2.getlenbound(vstring.mode_unicode).make_ge(lb)
 
     def make_int_lt(self, box1, box2):
+        box1 = self.get_box_replacement(box1)
+        box2 = self.get_box_replacement(box2)
+        if not isinstance(box1, Const) and not isinstance(box2, Const):
+            self.known_lt[box1] = box2
         b1 = self.getintbound(box1)
         b2 = self.getintbound(box2)
         if b1.make_lt(b2):
@@ -573,6 +718,20 @@ class OptIntBounds(Optimization):
     def make_int_ge(self, box1, box2):
         self.make_int_le(box2, box1)
 
+    def make_uint_lt(self, box1, box2):
+        # if box2 is nonnegative, then 'box1 < box2' as unsigned integers
+        # means that box1 is nonnegative too and smaller than box2
+        if self.getintbound(box2).known_ge(IntBound(0, 0)):
+            if self.getintbound(box1).make_ge(IntLowerBound(0)):
+                self.propagate_bounds_backward(box1)
+            self.make_int_lt(box1, box2)
+
+    def make_uint_le(self, box1, box2):
+        if self.getintbound(box2).known_ge(IntBound(0, 0)):
+            if self.getintbound(box1).make_ge(IntLowerBound(0)):
+                self.propagate_bounds_backward(box1)
+            self.make_int_le(box1, box2)
+
     def propagate_bounds_INT_LT(self, op):
         r = self.getintbound(op)
         if r.is_constant():
@@ -609,6 +768,42 @@ class OptIntBounds(Optimization):
                 assert r.getint() == 0
                 self.make_int_lt(op.getarg(0), op.getarg(1))
 
+    def propagate_bounds_UINT_LT(self, op):
+        r = self.getintbound(op)
+        if r.is_constant():
+            if r.getint() == 1:
+                self.make_uint_lt(op.getarg(0), op.getarg(1))
+            else:
+                assert r.getint() == 0
+                self.make_uint_le(op.getarg(1), op.getarg(0))
+
+    def propagate_bounds_UINT_GT(self, op):
+        r = self.getintbound(op)
+        if r.is_constant():
+            if r.getint() == 1:
+                self.make_uint_lt(op.getarg(1), op.getarg(0))
+            else:
+                assert r.getint() == 0
+                self.make_uint_le(op.getarg(0), op.getarg(1))
+
+    def propagate_bounds_UINT_LE(self, op):
+        r = self.getintbound(op)
+        if r.is_constant():
+            if r.getint() == 1:
+                self.make_uint_le(op.getarg(0), op.getarg(1))
+            else:
+                assert r.getint() == 0
+                self.make_uint_lt(op.getarg(1), op.getarg(0))
+
+    def propagate_bounds_UINT_GE(self, op):
+        r = self.getintbound(op)
+        if r.is_constant():
+            if r.getint() == 1:
+                self.make_uint_le(op.getarg(1), op.getarg(0))
+            else:
+                assert r.getint() == 0
+                self.make_uint_lt(op.getarg(0), op.getarg(1))
+
     def propagate_bounds_INT_EQ(self, op):
         r = self.getintbound(op)
         if r.is_constant():
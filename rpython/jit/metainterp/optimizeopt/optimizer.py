@@ -657,6 +657,10 @@ class Optimizer(Optimization):
                 self._last_guard_op is not None and
                 self._last_guard_op.getopnum() != rop.GUARD_NOT_FORCED):
             self._last_guard_op = None
+        # guard_always_fails ends a trace segment: the next segment must
+        # start exactly there, not at an earlier guard
+        if opnum == rop.GUARD_ALWAYS_FAILS:
+            self._last_guard_op = None
         #
         if (self._last_guard_op and guard_op.getdescr() is None):
             self.metainterp_sd.profiler.count_ops(opnum,
@@ -3264,6 +3264,179 @@ class BaseTestOptimizeBasic(BaseTestBasic):
         """
         self.optimize_strunicode_loop(ops, expected)
 
+    def test_bound_uint_ge_index_check(self):
+        ops = """
+        [i0, p0]
+        i1 = arraylen_gc(p0, descr=arraydescr)
+        i2 = int_lt(i0, i1)
+        guard_true(i2) []
+        i3 = int_ge(i0, 0)
+        guard_true(i3) []
+        i4 = uint_ge(i0, i1)
+        guard_false(i4) []
+        jump(i0, p0)
+        """
+        expected = """
+        [i0, p0]
+        i1 = arraylen_gc(p0, descr=arraydescr)
+        i2 = int_lt(i0, i1)
+        guard_true(i2) []
+        i3 = int_ge(i0, 0)
+        guard_true(i3) []
+        jump(i0, p0)
+        """
+        self.optimize_loop(ops, expected)
+
+    def test_bound_uint_ge_propagate(self):
+        ops = """
+        [i0, p0]
+        i1 = arraylen_gc(p0, descr=arraydescr)
+        i2 = uint_ge(i0, i1)
+        guard_false(i2) []
+        i3 = int_lt(i0, 0)
+        guard_false(i3) []
+        jump(i0, p0)
+        """
+        expected = """
+        [i0, p0]
+        i1 = arraylen_gc(p0, descr=arraydescr)
+        i2 = uint_ge(i0, i1)
+        guard_false(i2) []
+        jump(i0, p0)
+        """
+        self.optimize_loop(ops, expected)
+
+    def test_bound_uint_lt_unknown_sign(self):
+        ops = """
+        [i0, i1]
+        i2 = uint_lt(i0, i1)
+        guard_true(i2) []
+        i3 = int_lt(i0, 0)
+        guard_false(i3) []
+        jump(i0, i1)
+        """
+        self.optimize_loop(ops, ops)
+
+    def test_bound_list_length(self):
+        ops = """
+        [i0, p0]
+        i1 = getfield_gc_i(p0, descr=listlendescr)
+        i2 = int_ge(i1, 0)
+        guard_true(i2) []
+        i3 = int_ge(i0, 0)
+        guard_true(i3) []
+        i4 = uint_lt(i0, i1)
+        guard_true(i4) []
+        i5 = int_lt(i0, i1)
+        guard_true(i5) []
+        jump(i0, p0)
+        """
+        expected = """
+        [i0, p0]
+        i1 = getfield_gc_i(p0, descr=listlendescr)
+        i3 = int_ge(i0, 0)
+        guard_true(i3) []
+        i4 = int_lt(i0, i1)
+        guard_true(i4) []
+        jump(i0, p0)
+        """
+        self.optimize_loop(ops, expected)
+
+    def test_bound_index_check_other_length(self):
+        ops = """
+        [i0, i1, p0]
+        i2 = int_ge(i0, 0)
+        guard_true(i2) []
+        i3 = int_ge(i0, i1)
+        guard_false(i3) []
+        i4 = getfield_gc_i(p0, descr=listlendescr)
+        i5 = uint_ge(i0, i4)
+        guard_false(i5) []
+        i6 = uint_ge(i0, i4)
+        guard_false(i6) []
+        jump(i0, i1, p0)
+        """
+        expected = """
+        [i0, i1, p0]
+        i2 = int_ge(i0, 0)
+        guard_true(i2) []
+        i3 = int_ge(i0, i1)
+        guard_false(i3) []
+        i4 = getfield_gc_i(p0, descr=listlendescr)
+        i7 = int_le(i1, i4)
+        guard_true(i7) []
+        jump(i0, i1, p0)
+        """
+        self.optimize_loop(ops, expected)
+
+    def test_bound_index_check_other_length_shared_resume(self):
+        # the guard resumes at the previous one, where the result of the
+        # index check is not computed yet
+        ops = """
+        [i0, i1, p0]
+        i2 = int_ge(i0, 0)
+        guard_true(i2) [i0]
+        i3 = int_ge(i0, i1)
+        guard_false(i3) [i0]
+        i4 = getfield_gc_i(p0, descr=listlendescr)
+        i5 = uint_ge(i0, i4)
+        guard_false(i5) [i5]
+        jump(i0, i1, p0)
+        """
+        expected = """
+        [i0, i1, p0]
+        i2 = int_ge(i0, 0)
+        guard_true(i2) [i0]
+        i3 = int_ge(i0, i1)
+        guard_false(i3) [i0]
+        i4 = getfield_gc_i(p0, descr=listlendescr)
+        i7 = int_le(i1, i4)
+        guard_true(i7) [i0]
+        jump(i0, i1, p0)
+        """
+        self.optimize_loop(ops, expected)
+
+    def test_bound_index_check_other_length_live(self):
+        # the result of the index check is needed to resume: it stays
+        ops = """
+        [i0, i1, p0]
+        i2 = int_ge(i0, 0)
+        guard_true(i2) []
+        i3 = int_ge(i0, i1)
+        guard_false(i3) []
+        i4 = getfield_gc_i(p0, descr=listlendescr)
+        escape_n(i4)
+        i5 = uint_ge(i0, i4)
+        guard_false(i5) [i5]
+        jump(i0, i1, p0)
+        """
+        expected = """
+        [i0, i1, p0]
+        i2 = int_ge(i0, 0)
+        guard_true(i2) []
+        i3 = int_ge(i0, i1)
+        guard_false(i3) []
+        i4 = getfield_gc_i(p0, descr=listlendescr)
+        escape_n(i4)
+        i5 = int_ge(i0, i4)
+        guard_false(i5) [i5]
+        jump(i0, i1, p0)
+        """
+        self.optimize_loop(ops, expected)
+
+    def test_bound_other_length_not_index_check(self):
+        ops = """
+        [i0, i1, i2]
+        i3 = int_ge(i0, 0)
+        guard_true(i3) []
+        i4 = int_lt(i0, i1)
+        guard_true(i4) []
+        i5 = int_lt(i0, i2)
+        guard_true(i5) []
+        jump(i0, i1, i2)
+        """
+        self.optimize_loop(ops, ops)
+
     def test_addsub_const(self):
         ops = """
         [i0]
@@ -4326,6 +4326,73 @@ class OptimizeOptTest(BaseTestWithUnroll):
 
         self.optimize_loop(ops, expected, preamble)
 
+    def test_bound_index_check_range(self):
+        # 'for i in range(n): lst[i]': the index check becomes 'n <= length',
+        # which is only checked in the preamble
+        ops = """
+        [i0, i1, p0, i10]
+        i2 = int_lt(i0, 0)
+        guard_false(i2) []
+        i3 = int_ge(i0, i1)
+        guard_false(i3) []
+        i4 = getfield_gc_i(p0, descr=listlendescr)
+        i5 = uint_ge(i0, i4)
+        guard_false(i5) []
+        p1 = getfield_gc_r(p0, descr=listitemsdescr)
+        i6 = getarrayitem_gc_i(p1, i0, descr=arraydescr)
+        i11 = int_add(i10, i6)
+        i7 = int_add(i0, 1)
+        jump(i7, i1, p0, i11)
+        """
+        preamble = """
+        [i0, i1, p0, i10]
+        i2 = int_lt(i0, 0)
+        guard_false(i2) []
+        i3 = int_ge(i0, i1)
+        guard_false(i3) []
+        i4 = getfield_gc_i(p0, descr=listlendescr)
+        i8 = int_le(i1, i4)
+        guard_true(i8) []
+        p1 = getfield_gc_r(p0, descr=listitemsdescr)
+        i6 = getarrayitem_gc_i(p1, i0, descr=arraydescr)
+        i11 = int_add(i10, i6)
+        i7 = int_add(i0, 1)
+        jump(i7, i1, p0, i11, p1)
+        """
+        expected = """
+        [i0, i1, p0, i10, p1]
+        i3 = int_ge(i0, i1)
+        guard_false(i3) []
+        i6 = getarrayitem_gc_i(p1, i0, descr=arraydescr)
+        i11 = int_add(i10, i6)
+        i7 = int_add(i0, 1)
+        i9 = arraylen_gc(p1, descr=arraydescr)
+        jump(i7, i1, p0, i11, p1)
+        """
+        # a bridge that jumps to the loop checks 'n <= length' again
+        short = """
+        [i0, i1, p0, i10]
+        guard_nonnull(p0) []
+        guard_gc_type(p0, ConstInt(list_tid)) []
+        i4 = getfield_gc_i(p0, descr=listlendescr)
+        i12 = int_ge(i4, 1)
+        guard_true(i12) []
+        i13 = int_ge(i1, 1)
+        guard_true(i13) []
+        i8 = int_le(i1, i4)
+        guard_value(i8, 1) []
+        guard_nonnull(p0) []
+        guard_gc_type(p0, ConstInt(list_tid)) []
+        p1 = getfield_gc_r(p0, descr=listitemsdescr)
+        guard_nonnull(p1) []
+        guard_gc_type(p1, ConstInt(arraydescr_tid)) []
+        i9 = arraylen_gc(p1, descr=arraydescr)
+        i14 = int_ge(i9, 0)
+        guard_true(i14) []
+        jump(p1)
+        """
+        self.optimize_loop(ops, expected, preamble, expected_short=short)
+
     def test_bound_lt_noguard(self):
         ops = """
         [i0]
@@ -237,6 +237,14 @@ class LLtypeMixin(object):
     gcarrayimmutdescr = cpu.arraydescrof(lltype.GcArray(llmemory.GCREF, hints={"immutable": True}))
     floatarrayimmutdescr = cpu.arraydescrof(lltype.GcArray(lltype.Float, hints={"immutable": True}))
 
+    # a resizable RPython list
+    LIST = lltype.GcStruct('LIST', ('length', lltype.Signed),
+                           ('items', lltype.Ptr(lltype.GcArray(lltype.Signed))),
+                           hints={'list': True})
+    listlendescr = cpu.fielddescrof(LIST, 'length')
+    listitemsdescr = cpu.fielddescrof(LIST, 'items')
+    list_tid = cpu.sizeof(LIST, None).get_type_id()
+
     # a GcStruct not inheriting from OBJECT
     tpl = lltype.malloc(S, zero=True)
     tupleaddr = lltype.cast_opaque_ptr(llmemory.GCREF, tpl)
@@ -1252,6 +1252,17 @@ class MIFrame(object):
                                self.metainterp.call_ids[-1],
                                greenboxes)
 
+        if not self.metainterp.portal_call_depth:
+            length = self.metainterp.history.length()
+            if (self.metainterp.force_finish_trace and
+                    self.metainterp.trace_segment_is_long_enough(length) and
+                    not self.metainterp.get_procedure_token(greenboxes, True)):
+                # end the current trace segment here, unless we can instead
+                # close the loop below
+                self.pc = orgpc
+                self.metainterp.compile_trace_segment()
+            self.metainterp.last_merge_point_length = length
+
         if self.metainterp.seen_loop_header_for_jdindex < 0:
             if not any_operation:
                 return
@@ -1995,6 +2006,8 @@ class MetaInterpGlobalData(object):
 class MetaInterp(object):
     portal_call_depth = 0
     cancel_count = 0
+    force_finish_trace = False
+    last_merge_point_length = 0
     exported_state = None
     last_exc_box = None
     _last_op = None
@@ -2390,8 +2403,68 @@ class MetaInterp(object):
                     jd_sd = self.jitdriver_sd
                     greenkey = self.current_merge_points[0][0][:jd_sd.num_green_args]
                     warmrunnerstate.JitCell.trace_next_iteration(greenkey)
+            elif (self.cpu.supports_guard_always_fails and
+                      not self.force_finish_trace and
+                      self.trace_segment_is_long_enough(
+                          self.last_merge_point_length)):
+                # the trace can be cut at the last jit_merge_point that
+                # we reached (this is not the case if a single iteration
+                # is too long, or if we are already cutting in segments)
+                self.prepare_trace_segmenting()
             raise SwitchToBlackhole(Counters.ABORT_TOO_LONG)
 
+    def prepare_trace_segmenting(self):
+        # The trace is too long because of the outermost function itself.
+        # Trace it again from the same place, but cut it in segments.
+        if isinstance(self.resumekey, compile.AbstractResumeGuardDescr):
+            self.resumekey.mark_force_finish_tracing()
+        elif self.current_merge_points:
+            jd_sd = self.jitdriver_sd
+            greenkey = self.current_merge_points[0][0][:jd_sd.num_green_args]
+            jd_sd.warmstate.mark_force_finish_tracing(greenkey)
+
+    def trace_segment_is_long_enough(self, length):
+        # leave some room below the trace_limit to reach the next
+        # jit_merge_point of the outermost function
+        trace_limit = self.jitdriver_sd.warmstate.trace_limit
+        return length > trace_limit - trace_limit // 5
+
+    def compile_trace_segment(self):
+        """End the trace at the current jit_merge_point of the outermost
+        function with a GUARD_ALWAYS_FAILS, and compile it.  The guard
+        resumes at this jit_merge_point, and the bridge traced from it
+        is the next segment.
+        """
+        self.generate_guard(rop.GUARD_ALWAYS_FAILS)
+        # the FINISH is never reached, the guard always fails before
+        sd = self.staticdata
+        token = sd.loop_tokens_done_with_this_frame_void[0].finishdescr
+        self.history.record(rop.FINISH, [], None, descr=token)
+        self.history.trace.done()
+        resumekey = self.resumekey
+        if isinstance(resumekey, compile.ResumeFromInterpDescr):
+            # the first segment: the next ones jump back to it when
+            # they reach the start of the loop again
+            greenkey = resumekey.original_greenkey
+            target_token = compile.compile_entry_segment(self, greenkey)
+            if target_token is None:
+                compile.giveup()
+            jitcell_token = target_token.targeting_jitcell_token
+            self.jitdriver_sd.warmstate.attach_procedure_to_interp(
+                greenkey, jitcell_token)
+            sd.stats.add_jitcell_token(jitcell_token)
+        else:
+            target_token = compile.compile_trace(self, resumekey, [])
+            if target_token is not token:
+                compile.giveup()
+        sd.profiler.count(Counters.TRACE_SEGMENTS)
+        debug_print('~~~ COMPILED TRACE SEGMENT')
+        # continue in the blackhole interpreter from the jit_merge_point,
+        # which is not an abort
+        from rpython.jit.metainterp.blackhole import convert_and_run_from_pyjitpl
+        convert_and_run_from_pyjitpl(self)
+        assert False    # ^^^ must raise
+
     def _interpret(self):
         # Execute the frames forward until we raise a DoneWithThisFrame,
         # a ExitFrameWithException, or a ContinueRunningNormally exception.
@@ -2474,6 +2547,7 @@ class MetaInterp(object):
     def _handle_guard_failure(self, resumedescr, key, inputargs, deadframe):
         self.current_merge_points = []
         self.resumekey = resumedescr
+        self.force_finish_trace = resumedescr.must_force_finish_tracing()
         self.seen_loop_header_for_jdindex = -1
         if isinstance(key, compile.ResumeAtPositionDescr):
             self.seen_loop_header_for_jdindex = self.jitdriver_sd.index
@@ -3983,6 +3983,46 @@ class BaseLLtypeTests(BasicTests):
             res = self.interp_operations(f, [x])
             assert res == x or isnan(x) and isnan(res)
 
+    def test_trace_too_long_is_cut_in_segments(self):
+        from rpython.jit.metainterp.jitprof import Profiler
+        from rpython.jit.metainterp import pyjitpl
+        from rpython.rlib.jit import Counters
+        myjitdriver = JitDriver(greens=['pc', 'code'], reds=['n', 'acc'])
+        # a loop of 31 bytecodes, which is too long for the trace_limit
+        codes = ['a' * 30 + 'j', 'j']
+        def step(acc, pc, n):
+            acc += pc * n
+            return acc ^ (acc >> 3)
+        def f(n, i):
+            set_param(None, 'threshold', 3)
+            code = codes[i]
+            acc = 0
+            pc = 0
+            while True:
+                myjitdriver.jit_merge_point(pc=pc, code=code, n=n, acc=acc)
+                op = code[pc]
+                if op == 'a':
+                    acc = step(acc, pc, n)
+                    pc += 1
+                elif op == 'j':
+                    n -= 1
+                    if n <= 0:
+                        break
+                    pc = 0
+                    myjitdriver.can_enter_jit(pc=pc, code=code, n=n, acc=acc)
+            return acc
+        res = self.meta_interp(f, [40, 0], trace_limit=50,
+                               ProfilerClass=Profiler)
+        assert res == f(40, 0)
+        profiler = pyjitpl._warmrunnerdesc.metainterp_sd.profiler
+        assert profiler.counters[Counters.ABORT_TOO_LONG] == 1
+        segments = profiler.counters[Counters.TRACE_SEGMENTS]
+        assert segments >= 2
+        # the first segment is a loop, the next ones are bridges that
+        # end in guard_always_fails, and the last bridge jumps back to
+        # the loop; apart from the aborted trace, nothing is traced twice
+        self.check_jitcell_token_count(1)
+        self.check_enter_count(1 + segments + 1)
 
 class TestLLtype(BaseLLtypeTests, LLJitMixin):
     def test_tagged(self):
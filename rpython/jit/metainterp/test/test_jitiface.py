@@ -1,6 +1,7 @@
 
 import py
 from rpython.rlib.jit import JitDriver, JitHookInterface, Counters, dont_look_inside
+from rpython.rlib.jit import set_param
 from rpython.rlib import jit_hooks
 from rpython.jit.metainterp.test.support import LLJitMixin
 from rpython.jit.codewriter.policy import JitPolicy
@@ -157,6 +158,65 @@ class JitHookInterfaceTests(object):
             assert jit_hooks.stats_get_times_value(None, Counters.TRACING) == 0
         self.meta_interp(main, [], ProfilerClass=EmptyProfiler)
 
+    def test_get_guard_stats(self):
+        driver = JitDriver(greens = ['c'], reds = ['i', 's'],
+                           get_printable_location=lambda c: 'pos %d' % c)
+
+        def loop(c, i):
+            s = 0
+            while i > 0:
+                driver.jit_merge_point(i=i, s=s, c=c)
+                if i % 2:
+                    s += 1
+                i -= 1
+                s += 2
+            return s
+
+        def fail_count(guard):
+            # the fail count of 'guard', or if it is -1, of the only
+            # guard that has a bridge
+            l = jit_hooks.stats_get_guard_stats(None)
+            assert len(l) > 0
+            result = -1
+            for i in range(len(l)):
+                assert l[i].loop >= 0
+                assert hlstr(l[i].location) == 'pos 5'
+                if guard == -1 and l[i].has_bridge:
+                    assert result == -1
+                    guard = l[i].guard
+                    result = l[i].fail_count
+                elif l[i].guard == guard:
+                    assert l[i].has_bridge
+                    result = l[i].fail_count
+            return guard, result
+
+        def main(c):
+            set_param(driver, 'guard_stats', 1)
+            loop(c, 30)
+            guard, count1 = fail_count(-1)
+            # the guard failed until its bridge was compiled
+            assert count1 >= 2
+            loop(c, 100)
+            # the failures that go to the bridge are still counted
+            _, count2 = fail_count(guard)
+            assert count2 == count1 + 50
+
+        self.meta_interp(main, [5])
+
+    def test_get_guard_stats_off_by_default(self):
+        driver = JitDriver(greens = [], reds = ['i'])
+
+        def loop(i):
+            while i > 0:
+                driver.jit_merge_point(i=i)
+                i -= 1
+
+        def main():
+            loop(30)
+            assert len(jit_hooks.stats_get_guard_stats(None)) == 0
+
+        self.meta_interp(main, [])
+
     def test_get_jitcell_at_key(self):
         driver = JitDriver(greens = ['s'], reds = ['i'], name='jit')
 
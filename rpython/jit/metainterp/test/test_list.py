@@ -396,6 +396,63 @@ class TestLLtype(ListTests, LLJitMixin):
         assert res == 0
         self.check_resops(call=0, cond_call=2)
 
+    def test_index_check_after_length_check(self):
+        jitdriver = JitDriver(greens = [], reds = ['i', 'total', 'lst'])
+        def f(n, start):
+            lst = [j * 2 for j in range(n)]
+            total = 0
+            i = start
+            while i < len(lst):
+                jitdriver.jit_merge_point(i=i, total=total, lst=lst)
+                try:
+                    total += lst[i]
+                except IndexError:
+                    return -1
+                i += 1
+            return total
+
+        res = self.meta_interp(f, [100, 0])
+        assert res == f(100, 0)
+        # the check 'i < len(lst)' makes the IndexError check of 'lst[i]'
+        # unnecessary
+        self.check_simple_loop(uint_ge=0, guard_false=0)
+
+    def test_index_check_after_range_check(self):
+        class Range(object):
+            _immutable_fields_ = ['length']
+            def __init__(self, length):
+                self.length = length
+            def check(self, i):
+                if i < 0 or i >= self.length:
+                    raise IndexError
+        jitdriver = JitDriver(greens = [], reds = ['i', 'total', 'r', 'lst'])
+        def f(n, m, start):
+            lst = [j * 2 for j in range(n)]
+            r = Range(m)
+            total = 0
+            i = start
+            while True:
+                jitdriver.jit_merge_point(i=i, total=total, r=r, lst=lst)
+                try:
+                    r.check(i)
+                except IndexError:
+                    break
+                try:
+                    total += lst[i]
+                except IndexError:
+                    return -1
+                i += 1
+            return total
+
+        res = self.meta_interp(f, [100, 100, 0])
+        assert res == f(100, 100, 0)
+        # after 'i < r.length', the IndexError check of 'lst[i]' becomes
+        # 'r.length <= len(lst)', which is only checked before the loop
+        self.check_simple_loop(uint_ge=0, int_le=0, guard_false=1,
+                               guard_true=0)
+        res = self.meta_interp(f, [100, 150, 0])
+        assert res == -1
+
     def test_zero_init_resizable(self):
         def f(n):
             l = [0] * n
@@ -21,6 +21,7 @@ from rpython.rlib import rgc
 class FakeLoopToken:
     generation = 0
     invalidated = False
+    memory_usage = 0
 
 
 class _TestMemoryManager:
@@ -78,6 +79,72 @@ class _TestMemoryManager:
             else:
                 assert tokens[i] in memmgr.alive_loops
 
+    def test_memory_limit(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_memory(1000)
+        tokens = [FakeLoopToken() for i in range(10)]
+        for token in tokens:
+            memmgr.keep_loop_alive(token)
+            memmgr.set_memory_usage(token, 200)
+            memmgr.next_generation()
+        # the total is kept below 1000, and when it goes above, the
+        # oldest loops are freed until it is 750 or less
+        assert memmgr.total_memory <= 1000
+        assert memmgr.total_memory == 200 * len(memmgr.alive_loops)
+        assert memmgr.alive_loops == dict.fromkeys(tokens[6:])
+        assert memmgr.evicted_loops == 6
+
+    def test_memory_limit_least_recently_entered(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_memory(1000)
+        tokens = [FakeLoopToken() for i in range(10)]
+        for i in range(len(tokens)):
+            memmgr.keep_loop_alive(tokens[i])
+            memmgr.set_memory_usage(tokens[i], 200)
+            memmgr.keep_loop_alive(tokens[0])     # keep entering tokens[0]
+            memmgr.next_generation()
+        assert tokens[0] in memmgr.alive_loops
+        assert memmgr.total_memory == 200 * len(memmgr.alive_loops)
+        assert memmgr.total_memory <= 1000
+
+    def test_memory_usage_grows(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_memory(1000)
+        token = FakeLoopToken()
+        memmgr.keep_loop_alive(token)
+        memmgr.set_memory_usage(token, 300)
+        memmgr.set_memory_usage(token, 600)      # a bridge was attached
+        assert memmgr.total_memory == 600
+        memmgr.next_generation()
+        memmgr.set_memory_usage(token, 1200)
+        memmgr.keep_loop_alive(token)
+        # a loop entered in the previous generation is not freed
+        memmgr.next_generation()
+        assert memmgr.alive_loops == {token: None}
+        assert memmgr.total_memory == 1200
+        memmgr.next_generation()
+        assert memmgr.alive_loops == {}
+        assert memmgr.total_memory == 0
+        # if it is entered again, it counts again
+        memmgr.keep_loop_alive(token)
+        assert memmgr.total_memory == 1200
+
+    def test_memory_limit_and_max_age(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(4, 1)
+        memmgr.set_max_memory(10000)
+        tokens = [FakeLoopToken() for i in range(10)]
+        for token in tokens:
+            memmgr.keep_loop_alive(token)
+            memmgr.set_memory_usage(token, 100)
+            memmgr.next_generation()
+        assert memmgr.alive_loops == dict.fromkeys(tokens[7:])
+        assert memmgr.total_memory == 300
+        assert memmgr.evicted_loops == 0
+
 
 class _TestIntegration(LLJitMixin):
     # See comments in TestMemoryManager.  To get temporarily the normal
@@ -212,6 +279,39 @@ class _TestIntegration(LLJitMixin):
         assert res == 42
         self.check_enter_count(2 + 10*4)
 
+    def test_loop_memory_limit(self):
+        myjitdriver = JitDriver(greens=['m'], reds=['n'])
+        def g(m):
+            n = 10
+            while n > 0:
+                myjitdriver.can_enter_jit(n=n, m=m)
+                myjitdriver.jit_merge_point(n=n, m=m)
+                n = n - 1
+            return 21
+        def f():
+            for i in range(3):
+                for m in range(2, 14):
+                    g(1)   # g(1) is the most used loop
+                    g(m)
+            return 42
+
+        # case A: no limit, a loop and an entry bridge for each g(m)
+        res = self.meta_interp(f, [])
+        assert res == 42
+        self.check_enter_count(2 * 13)
+        memmgr = get_stats().metainterp_sd.warmrunnerdesc.memory_manager
+        assert memmgr.total_memory > 2048
+        assert memmgr.evicted_loops == 0
+
+        # case B: with a limit of 1KB, only a few of them are kept
+        res = self.meta_interp(f, [], loop_memory_limit=1)
+        assert res == 42
+        memmgr = get_stats().metainterp_sd.warmrunnerdesc.memory_manager
+        assert memmgr.max_memory == 1024
+        assert memmgr.total_memory <= 1024
+        assert memmgr.evicted_loops > 0
+        assert get_stats().enter_count > 2 * 13
+
     def test_call_assembler_keep_alive(self):
         myjitdriver1 = JitDriver(greens=['m'], reds=['n'])
         myjitdriver2 = JitDriver(greens=['m'], reds=['n', 'rec'])
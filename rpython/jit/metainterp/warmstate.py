@@ -137,6 +137,7 @@ JC_TRACING         = 0x01
 JC_DONT_TRACE_HERE = 0x02
 JC_TEMPORARY       = 0x04
 JC_TRACING_OCCURRED= 0x08
+JC_FORCE_FINISH    = 0x10
 
 class BaseJitCell(object):
     """Subclasses of BaseJitCell are used in tandem with the single
@@ -183,6 +184,10 @@ class BaseJitCell(object):
         this particular function.  (We only set this flag when aborting
         due to a trace too long, so we use the same flag as a hint to
         also mean "please trace from here as soon as possible".)
+
+        JC_FORCE_FINISH: the last trace from here was too long, but not
+        because of a function that we could stop inlining.  The next
+        trace from here is cut in several segments.
     """
     flags = 0     # JC_xxx flags
     wref_procedure_token = None
@@ -214,8 +219,8 @@ class BaseJitCell(object):
             return False    # don't remove JitCells with a procedure_token
         if self.flags & JC_TRACING:
             return False    # don't remove JitCells that are being traced
-        if self.flags & JC_DONT_TRACE_HERE:
-            # if we have this flag, and we *had* a procedure_token but
+        if self.flags & (JC_DONT_TRACE_HERE | JC_FORCE_FINISH):
+            # if we have one of these flags, and we *had* a procedure_token but
             # we no longer have one, then remove me.  this prevents this
             # JitCell from being immortal.
             return self.has_seen_a_procedure_token()     # i.e. dead weakref
@@ -288,6 +293,18 @@ class WarmEnterState(object):
             self.warmrunnerdesc.memory_manager is not None):   # all for tests
             self.warmrunnerdesc.memory_manager.set_max_age(value)
 
+    def set_param_loop_memory_limit(self, value):
+        # note: it's a global parameter, not a per-jitdriver one
+        if (self.warmrunnerdesc is not None and
+            self.warmrunnerdesc.memory_manager is not None):   # all for tests
+            self.warmrunnerdesc.memory_manager.set_max_memory(value * 1024)
+
+    def set_param_guard_stats(self, value):
+        # note: it's a global parameter, not a per-jitdriver one
+        if (self.warmrunnerdesc is not None and
+            self.warmrunnerdesc.memory_manager is not None):   # all for tests
+            self.warmrunnerdesc.memory_manager.guard_stats = bool(value)
+
     def set_param_retrace_limit(self, value):
         if self.warmrunnerdesc:
             if self.warmrunnerdesc.memory_manager:
@@ -325,6 +342,11 @@ class WarmEnterState(object):
         debug_print("disabled inlining", loc)
         debug_stop("jit-disableinlining")
 
+    def mark_force_finish_tracing(self, greenkey):
+        cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
+        cell.flags |= JC_FORCE_FINISH
+        self.JitCell.trace_next_iteration(greenkey)
+
     def attach_procedure_to_interp(self, greenkey, procedure_token):
         cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
         old_token = cell.get_procedure_token()
@@ -423,6 +445,8 @@ class WarmEnterState(object):
                 cell = JitCell(*greenargs)
                 jitcounter.install_new_cell(hash, cell)
             cell.flags |= JC_TRACING | JC_TRACING_OCCURRED
+            if cell.flags & JC_FORCE_FINISH:
+                metainterp.force_finish_trace = True
             try:
                 metainterp.compile_and_run_once(jitdriver_sd, *args)
             finally:
@@ -477,6 +501,12 @@ class WarmEnterState(object):
                         if tick:
                             bound_reached(hash, cell, *args)
                         return
+                if cell.flags & JC_FORCE_FINISH:
+                    if not cell.has_seen_a_procedure_token():
+                        # trace again, this time in segments
+                        if jitcounter.tick(hash, increment_threshold):
+                            bound_reached(hash, cell, *args)
+                        return
                 # it was an aborted compilation, or maybe a weakref that
                 # has been freed
                 jitcounter.cleanup_chain(hash)
@@ -59,6 +59,7 @@ abort: compiling:       11
 abort: vable escape:    12
 abort: bad loop:        135
 abort: force quasi-immut: 3
+trace segments:         7
 nvirtuals:              13
 nvholes:                14
 nvreused:               15
@@ -88,6 +89,7 @@ def test_parse():
     assert info.abort.vable_escape == 12
     assert info.abort.bad_loop == 135
     assert info.abort.force_quasiimmut == 3
+    assert info.trace_segments == 7
     assert info.nvirtuals == 13
     assert info.nvholes == 14
     assert info.nvreused == 15
@@ -48,6 +48,29 @@ def read_float_from_env(varname):
         return 0.0
     return value
 
+def read_time_from_env(varname):
+    """Returns a duration in seconds.  Accepts the suffixes s, ms and us;
+    without suffix, the value is in seconds."""
+    value = os.environ.get(varname)
+    if value:
+        factor = 1.0
+        end = len(value)
+        if value[-1] in 'sS':
+            end -= 1
+            if end > 0 and value[end - 1] in 'mM':
+                factor = 0.001
+                end -= 1
+            elif end > 0 and value[end - 1] in 'uU':
+                factor = 0.000001
+                end -= 1
+        assert end >= 0
+        realvalue = value[:end]
+        try:
+            return float(realvalue) * factor
+        except ValueError:
+            pass
+    return 0.0
+
 
 # ____________________________________________________________
 # Get the total amount of RAM installed in a system.
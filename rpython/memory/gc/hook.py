@@ -0,0 +1,111 @@
+from rpython.rlib import rgc
+
+# WARNING: the hooks are only called by incminimark for now.  Please add
+# calls to them in the other GCs if you need it.
+
+class GcHooks(object):
+    """
+    Base class to write your own GC hooks.  An instance is given to the
+    translation by the target's get_gchooks() function.
+
+    Subclasses should override the is_*_enabled() and on_*() methods.  The
+    on_*() methods are called from the middle of the GC: they can only do
+    simple things like updating counters and setting flags.  In particular
+    they must not allocate GC memory or do anything else that can trigger
+    a collection.  The times are in seconds, the sizes in bytes.
+    """
+
+    def is_gc_minor_enabled(self):
+        return False
+
+    def is_gc_collect_step_enabled(self):
+        return False
+
+    def is_gc_collect_enabled(self):
+        return False
+
+    def get_alloc_sample_interval(self):
+        """
+        Return N > 0 to call on_gc_alloc_sample() after every N bytes
+        allocated, or 0.  The GC checks it again after each minor
+        collection.  There is no cost when it is 0.
+        """
+        return 0
+
+    def on_gc_minor(self, duration, total_memory_used, bytes_promoted,
+                    pinned_objects):
+        """
+        Called after each minor collection.  'bytes_promoted' is the size
+        of the objects that were moved out of the nursery, and
+        'total_memory_used' the memory used by the old objects afterwards.
+        """
+
+    def on_gc_collect_step(self, duration, oldstate, newstate):
+        """
+        Called after each step of an incremental major collection.
+        'oldstate' and 'newstate' are the states of the GC before and after
+        the step; for incminimark, see incminimark.STATE_* and GC_STATES.
+        """
+
+    def on_gc_collect(self, num_major_collects,
+                      arena_bytes_before, arena_bytes_after,
+                      rawmalloc_bytes_before, rawmalloc_bytes_after):
+        """
+        Called when a major collection is done, with the memory used by
+        the small objects in the arenas and by the large objects before
+        and after it freed the unreachable objects.
+        """
+
+    def on_gc_alloc_sample(self, typeid, size):
+        """
+        Called from the allocation of the object that crosses the next
+        multiple of get_alloc_sample_interval() bytes, before the object
+        is initialized.  'typeid' is the index of its type in the
+        typeids.txt file written by the translation (0 for the objects
+        allocated by the JIT, which doesn't say), and 'size' its size.
+        """
+
+    # The fire_*() methods are called by the GC and should not be
+    # overridden.
+
+    @rgc.no_collect
+    def fire_gc_minor(self, duration, total_memory_used, bytes_promoted,
+                      pinned_objects):
+        if self.is_gc_minor_enabled():
+            self.on_gc_minor(duration, total_memory_used, bytes_promoted,
+                             pinned_objects)
+
+    @rgc.no_collect
+    def fire_gc_collect_step(self, duration, oldstate, newstate):
+        if self.is_gc_collect_step_enabled():
+            self.on_gc_collect_step(duration, oldstate, newstate)
+
+    @rgc.no_collect
+    def fire_gc_collect(self, num_major_collects,
+                        arena_bytes_before, arena_bytes_after,
+                        rawmalloc_bytes_before, rawmalloc_bytes_after):
+        if self.is_gc_collect_enabled():
+            self.on_gc_collect(num_major_collects,
+                               arena_bytes_before, arena_bytes_after,
+                               rawmalloc_bytes_before, rawmalloc_bytes_after)
+
+    @rgc.no_collect
+    def fire_gc_alloc_sample(self, typeid, size):
+        self.on_gc_alloc_sample(typeid, size)
+
+    def _get_annotation_helper(self):
+        """NOT_RPYTHON: returns a function that calls all the fire_*()
+        methods.  The GC is only annotated after rtyping, so the driver
+        annotates this function together with the program, to make sure
+        that the hooks don't change annotations after rtyping.  It is never
+        called.
+        """
+        hooks = self
+        def call_gc_hooks(n):
+            f = float(n)
+            hooks.fire_gc_minor(f, n, n, n)
+            hooks.fire_gc_collect_step(f, n, n)
+            hooks.fire_gc_collect(n, n, n, n, n)
+            hooks.get_alloc_sample_interval()
+            hooks.fire_gc_alloc_sample(n, n)
+        return call_gc_hooks
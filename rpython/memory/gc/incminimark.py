@@ -9,6 +9,13 @@ Environment variables can be used to fine-tune the following parameters:
  PYPY_GC_NURSERY_DEBUG   If set to non-zero, will fill nursery with garbage,
                          to help debugging.
 
+ PYPY_GC_NURSERY_MIN     Bounds for the size of the nursery, which is then
+ PYPY_GC_NURSERY_MAX     adapted between minor collections: it grows when
+                         many objects survive, and goes back to
+                         PYPY_GC_NURSERY when few do.  It shrinks if the
+                         minor collections take more than PYPY_GC_MAX_PAUSE.
+                         Both default to PYPY_GC_NURSERY, i.e. a fixed size.
+
  PYPY_GC_INCREMENT_STEP  The size of memory marked during the marking step.
                          Default is size of nursery * 2. If you mark it too high
                          your GC is not incremental at all. The minimum is set
@@ -52,6 +59,32 @@ Environment variables can be used to fine-tune the following parameters:
                          in time.  Defaults to a conservative value depending
                          on nursery size and maximum object size inside the
                          nursery.  Useful for debugging by setting it to 0.
+
+ PYPY_GC_MARK_WORKERS    The number of threads that mark objects in parallel
+                         during the major collections, including the thread
+                         that runs the GC.  Defaults to 1.  See
+                         parallelmark.py.
+
+ PYPY_GC_MAX_PAUSE       Target for the duration of each step of the major
+                         collections, like '2ms' or '500us'.  The marking
+                         and sweeping steps are sized from the throughput
+                         measured so far, instead of a fixed amount of
+                         memory.  If the major collection is late, they do
+                         at least as much work as without it.
+
+ PYPY_GC_SWEEP_THREAD    If set to 1, the arenas are swept by a background
+                         thread after each major collection, instead of by
+                         the thread that runs the GC.  Defaults to 0.  See
+                         sweepthread.py.
+
+ PYPY_GC_RELEASE_PAGES   After each major collection, the memory of the free
+                         pages of the arenas is given back to the OS, except
+                         for this fraction of the memory used by the objects
+                         in the arenas.  Defaults to PYPY_GC_MAJOR_COLLECT
+                         minus 1, which is about what the program allocates
+                         again before the next major collection.  0 gives
+                         back all the free pages.  A negative value disables
+                         it, which was the behavior of older versions.
 """
 # XXX Should find a way to bound the major collection threshold by the
 # XXX total addressable size.  Maybe by keeping some minimarkpage arenas
@@ -62,16 +95,19 @@ Environment variables can be used to fine-tune the following parameters:
 # XXX old_objects_pointing_to_young (IRC 2014-10-22, fijal and gregor_w)
 import sys
 import os
+import time
 from rpython.rtyper.lltypesystem import lltype, llmemory, llarena, llgroup
+from rpython.rtyper.lltypesystem import rffi
 from rpython.rtyper.lltypesystem.lloperation import llop
 from rpython.rtyper.lltypesystem.llmemory import raw_malloc_usage
 from rpython.memory.gc.base import GCBase, MovingGCBase
-from rpython.memory.gc import env
+from rpython.memory.gc import env, parallelmark, sweepthread
 from rpython.memory.support import mangle_hash
 from rpython.rlib.rarithmetic import ovfcheck, LONG_BIT, intmask, r_uint
 from rpython.rlib.rarithmetic import LONG_BIT_SHIFT
 from rpython.rlib.debug import ll_assert, debug_print, debug_start, debug_stop
-from rpython.rlib.objectmodel import specialize
+from rpython.rlib.objectmodel import specialize, we_are_translated
+from rpython.rlib import rtime
 from rpython.memory.gc.minimarkpage import out_of_memory
 
 #
@@ -90,6 +126,19 @@ from rpython.memory.gc.minimarkpage import out_of_memory
 #    small).  Collected by regular mark-n-sweep during major collections.
 #
 
+def monotonic_time():
+    """Returns a time in seconds for measuring the durations of the GC
+    steps.  It comes from CLOCK_MONOTONIC where available: unlike
+    time.time(), it does not jump when the system clock is changed,
+    which would throw off the pacing of the incremental steps."""
+    if rtime.HAS_CLOCK_GETTIME:
+        with lltype.scoped_alloc(rtime.TIMESPEC) as a:
+            res = rtime.c_clock_gettime_nowrapper(rtime.CLOCK_MONOTONIC, a)
+            if rffi.cast(lltype.Signed, res) == 0:
+                return (float(rffi.getintfield(a, 'c_tv_sec')) +
+                        float(rffi.getintfield(a, 'c_tv_nsec')) * 0.000000001)
+    return time.time()
+
 WORD = LONG_BIT // 8
 
 first_gcflag = 1 << (LONG_BIT//2)
@@ -287,17 +336,31 @@ class IncrementalMiniMarkGC(MovingGCBase):
                  card_page_indices=0,
                  large_object=8*WORD,
                  ArenaCollectionClass=None,
+                 mark_workers=1,
+                 sweep_thread=False,
+                 max_pause=0.0,
+                 nursery_min_size=0,
+                 nursery_max_size=0,
+                 release_pages=-1.0,
                  **kwds):
         "NOT_RPYTHON"
         MovingGCBase.__init__(self, config, **kwds)
         assert small_request_threshold % WORD == 0
         self.read_from_env = read_from_env
         self.nursery_size = nursery_size
+        self.nursery_min_size = nursery_min_size
+        self.nursery_max_size = nursery_max_size
+        self.mark_workers = mark_workers
+        self.sweep_thread = sweep_thread
+        self.max_pause = max_pause
+        self.release_pages = release_pages
 
         self.small_request_threshold = small_request_threshold
         self.major_collection_threshold = major_collection_threshold
         self.growth_rate_max = growth_rate_max
         self.num_major_collects = 0
+        self.num_minor_collects = 0
+        self.total_gc_time = 0.0     # in seconds
         self.min_heap_size = 0.0
         self.max_heap_size = 0.0
         self.max_heap_size_already_raised = False
@@ -317,6 +380,14 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.nursery      = llmemory.NULL
         self.nursery_free = llmemory.NULL
         self.nursery_top  = llmemory.NULL
+        self.adaptive_nursery = False
+        #
+        # Sampling of the allocations for the GC hooks: see
+        # _alloc_sample_start_area()
+        self.alloc_sample_interval = 0
+        self.alloc_sample_countdown = 0
+        self.alloc_sample_area_start = llmemory.NULL
+        self.alloc_sample_real_top = llmemory.NULL
         self.debug_tiny_nursery = -1
         self.debug_rotating_nurseries = lltype.nullptr(NURSARRAY)
         self.extra_threshold = 0
@@ -363,6 +434,36 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # for more details.
         self.size_objects_made_old = r_uint(0)
         self.threshold_objects_made_old = r_uint(0)
+        #
+        # The memory used before the sweeping phase of the current major
+        # collection, reported to the GC hooks at the end of it
+        self.stat_arena_bytes_before = 0
+        self.stat_rawmalloc_bytes_before = 0
+        #
+        # With PYPY_GC_MAX_PAUSE, the throughput of the marking (in bytes
+        # per second) and of the sweeping (in pages of the ArenaCollection
+        # and in rawmalloced objects per second), measured so far
+        self.mark_rate = 0.0
+        self.sweep_rate = 0.0
+        self.rawsweep_rate = 0.0
+        #
+        # State of the parallel marking, see parallelmark.py
+        self.pm_workers = None
+        self.pm_lock = parallelmark.NULL_LOCK
+        self.pm_threaded = False
+        self.pm_stop = False
+        self.pm_active = 0
+        self.pm_size_to_track = 0
+        self.pm_helpers = 0          # number of helper threads started
+        self.pm_next_helper = None
+        #
+        # State of the background sweeping, see sweepthread.py
+        self.bs_lock = sweepthread.NULL_LOCK
+        self.bs_running = False
+        self.bs_threaded = False
+        self.bs_done = False
+        self.bs_threads = 0
+        self.bs_touched = self.AddressStack()
 
 
     def setup(self):
@@ -377,6 +478,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.old_rawmalloced_objects = self.AddressStack()
         self.raw_malloc_might_sweep = self.AddressStack()
         self.rawmalloced_total_size = r_uint(0)
+        self.peak_rawmalloced_size = r_uint(0)
+        self.peak_memory_used = r_uint(0)
 
         self.gc_state = STATE_SCANNING
         #
@@ -495,11 +598,37 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 self.gc_nursery_debug = True
             else:
                 self.gc_nursery_debug = False
+            #
+            mark_workers = env.read_uint_from_env('PYPY_GC_MARK_WORKERS')
+            if mark_workers > 1:
+                self.mark_workers = intmask(min(
+                    mark_workers, r_uint(parallelmark.MAX_WORKERS)))
+            #
+            max_pause = env.read_time_from_env('PYPY_GC_MAX_PAUSE')
+            if max_pause > 0.0:
+                self.max_pause = max_pause
+            #
+            sweep_thread = env.read_uint_from_env('PYPY_GC_SWEEP_THREAD')
+            if sweep_thread > 0:
+                self.sweep_thread = True
+            #
+            # '0' is a valid value here: release all the free pages
+            if os.environ.get('PYPY_GC_RELEASE_PAGES'):
+                self.release_pages = env.read_float_from_env(
+                    'PYPY_GC_RELEASE_PAGES')
+            else:
+                self.release_pages = self.major_collection_threshold - 1.0
+            #
+            self.nursery_min_size = env.read_from_env('PYPY_GC_NURSERY_MIN')
+            self.nursery_max_size = env.read_from_env('PYPY_GC_NURSERY_MAX')
             self._minor_collection()    # to empty the nursery
             llarena.arena_free(self.nursery)
             self.nursery_size = newsize
             self.allocate_nursery()
         #
+        self.setup_parallel_mark()
+        self.setup_background_sweep()
+        #
         env_max_number_of_pinned_objects = os.environ.get('PYPY_GC_MAX_PINNED')
         if env_max_number_of_pinned_objects:
             try:
@@ -516,7 +645,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
 
     def _nursery_memory_size(self):
         extra = self.nonlarge_max + 1
-        return self.nursery_size + extra
+        return self.nursery_alloc_size + extra
 
     def _alloc_nursery(self):
         # the start of the nursery: we actually allocate a bit more for
@@ -531,11 +660,33 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def allocate_nursery(self):
         debug_start("gc-set-nursery-size")
         debug_print("nursery size:", self.nursery_size)
+        # with PYPY_GC_NURSERY_MAX, allocate the largest nursery that we
+        # may use; the pages after 'nursery_size' are only touched when
+        # the nursery grows.
+        self.nursery_base_size = self.nursery_size
+        self.nursery_alloc_size = self.nursery_size
+        if self.nursery_max_size > self.nursery_size:
+            self.nursery_alloc_size = self.nursery_max_size & ~(WORD - 1)
+        self.nursery_smallest_size = self.nursery_size
+        if (self.nursery_min_size > 0 and
+                self.nursery_min_size < self.nursery_size):
+            self.nursery_smallest_size = max(self.nursery_min_size,
+                                             2 * (self.nonlarge_max + 1))
+        self.nursery_smallest_size &= ~(WORD - 1)
+        self.adaptive_nursery = (self.nursery_smallest_size <
+                                 self.nursery_alloc_size)
+        if self.adaptive_nursery:
+            debug_print("nursery size bounds:", self.nursery_smallest_size,
+                        self.nursery_alloc_size)
         self.nursery = self._alloc_nursery()
         # the current position in the nursery:
         self.nursery_free = self.nursery
         # the end of the nursery:
         self.nursery_top = self.nursery + self.nursery_size
+        # allocation sampling restarts at the next minor collection
+        self.alloc_sample_interval = 0
+        self.alloc_sample_area_start = llmemory.NULL
+        self.alloc_sample_real_top = llmemory.NULL
         # initialize the threshold
         self.min_heap_size = max(self.min_heap_size, self.nursery_size *
                                               self.major_collection_threshold)
@@ -655,7 +806,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             ll_assert(result != llmemory.NULL, "uninitialized nursery")
             self.nursery_free = new_free = result + totalsize
             if new_free > self.nursery_top:
-                result = self.collect_and_reserve(totalsize)
+                result = self.collect_and_reserve(totalsize, typeid)
             #
             # Build the object.
             llarena.arena_reserve(result, totalsize)
@@ -715,7 +866,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             ll_assert(result != llmemory.NULL, "uninitialized nursery")
             self.nursery_free = new_free = result + totalsize
             if new_free > self.nursery_top:
-                result = self.collect_and_reserve(totalsize)
+                result = self.collect_and_reserve(totalsize, typeid)
             #
             # Build the object.
             llarena.arena_reserve(result, totalsize)
@@ -757,6 +908,31 @@ class IncrementalMiniMarkGC(MovingGCBase):
             self.minor_and_major_collection()
         self.rrc_invoke_callback()
 
+    def collect_step(self, max_duration):
+        """Do a minor collection and one step of the major collection,
+        starting one if none is in progress.  Continue with more steps
+        until 'max_duration' seconds have passed, or the major collection
+        is finished.  Meant to be called when the program is idle.
+        Returns the old and the new 'gc_state', as rgc.encode_states()."""
+        from rpython.rlib.rgc import encode_states
+        start = monotonic_time()
+        oldstate = self.gc_state
+        while True:
+            self._minor_collection()
+            if self.bs_running:
+                # we are idle: sweep with the helper thread instead of
+                # waiting for it
+                self._bs_acquire()
+                self._bs_sweep_pages(sweepthread.PAGES_PER_LOCK)
+                self._bs_release()
+            self.major_collection_step()
+            if self.gc_state == STATE_SCANNING:
+                break
+            if monotonic_time() - start >= max_duration:
+                break
+        self.rrc_invoke_callback()
+        return encode_states(oldstate, self.gc_state)
+
 
     def minor_collection_with_major_progress(self, extrasize=0):
         """Do a minor collection.  Then, if there is already a major GC
@@ -795,13 +971,24 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.rrc_invoke_callback()
 
 
-    def collect_and_reserve(self, totalsize):
+    def collect_and_reserve(self, totalsize, typeid):
         """To call when nursery_free overflows nursery_top.
         First check if pinned objects are in front of nursery_top. If so,
         jump over the pinned object and try again to reserve totalsize.
         Otherwise do a minor collection, and possibly some steps of a
         major collection, and finally reserve totalsize bytes.
+        With allocation sampling, nursery_top may also be the next
+        sampling point; 'typeid' is only used to report the sample.
         """
+        if self.alloc_sample_interval > 0:
+            self.nursery_free -= totalsize      # not reserved yet
+            self._alloc_sample_stop_area()
+            result = self.nursery_free
+            if result + totalsize <= self.nursery_top:
+                # we only reached the sampling point
+                self.nursery_free = result + totalsize
+                self._alloc_sample_reserved(totalsize, typeid)
+                return result
 
         minor_collection_count = 0
         while True:
@@ -868,6 +1055,9 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # Tried to do something about nursery_free overflowing
             # nursery_top before this point. Try to reserve totalsize now.
             # If this succeeds break out of loop.
+            if self.alloc_sample_interval > 0:
+                # the minor collection may have lowered nursery_top
+                self._alloc_sample_stop_area()
             result = self.nursery_free
             if self.nursery_free + totalsize <= self.nursery_top:
                 self.nursery_free = result + totalsize
@@ -879,9 +1069,69 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if self.nursery_top - self.nursery_free > self.debug_tiny_nursery:
                 self.nursery_free = self.nursery_top - self.debug_tiny_nursery
         #
+        if self.alloc_sample_interval > 0:
+            self._alloc_sample_reserved(totalsize, typeid)
         return result
     collect_and_reserve._dont_inline_ = True
 
+    # ----------
+    # Allocation sampling
+    #
+    # If the GC hooks return an interval N > 0 from
+    # get_alloc_sample_interval(), we call fire_gc_alloc_sample() for the
+    # object allocated after every N bytes, either in the nursery or with
+    # external_malloc().  The nursery's fast path is not changed: instead,
+    # 'nursery_top' is lowered to the next sampling point, and
+    # collect_and_reserve() checks if the nursery is really full.  The
+    # bytes allocated in the nursery are counted by "areas": from
+    # 'alloc_sample_area_start' to 'nursery_free'.
+
+    def _alloc_sample_start_area(self):
+        # Start counting the bytes allocated from 'nursery_free', and set
+        # 'nursery_top' to the next sampling point if it comes first.
+        self.alloc_sample_area_start = self.nursery_free
+        if self.alloc_sample_countdown < self.nursery_top - self.nursery_free:
+            self.alloc_sample_real_top = self.nursery_top
+            self.nursery_top = self.nursery_free + self.alloc_sample_countdown
+
+    def _alloc_sample_stop_area(self):
+        # Count the bytes allocated in the current area, up to
+        # 'nursery_free', and restore the real 'nursery_top'.
+        if self.alloc_sample_real_top:
+            self.nursery_top = self.alloc_sample_real_top
+            self.alloc_sample_real_top = llmemory.NULL
+        if self.alloc_sample_area_start:
+            self.alloc_sample_countdown -= (self.nursery_free -
+                                            self.alloc_sample_area_start)
+            self.alloc_sample_area_start = llmemory.NULL
+
+    def _alloc_sample_reserved(self, totalsize, typeid):
+        # 'totalsize' bytes were just reserved outside any area.  Count
+        # them, report them if they cross the sampling point, and start a
+        # new area.
+        self.alloc_sample_countdown -= raw_malloc_usage(totalsize)
+        if self.alloc_sample_countdown < 0:
+            self.alloc_sample_countdown = self.alloc_sample_interval
+            if self.combine(typeid, 0):
+                member_index = self.get_member_index(typeid)
+            else:
+                # the JIT's malloc_nursery_slowpath() doesn't give the
+                # type: typeid 0 is not a valid type, report it as 0
+                member_index = 0
+            self.hooks.fire_gc_alloc_sample(member_index,
+                                            raw_malloc_usage(totalsize))
+        self._alloc_sample_start_area()
+
+    def _alloc_sample_refresh(self):
+        # Called at the end of minor collections: the interval given by
+        # the GC hooks may have changed.
+        interval = self.hooks.get_alloc_sample_interval()
+        if interval != self.alloc_sample_interval:
+            self.alloc_sample_interval = interval
+            self.alloc_sample_countdown = interval
+        if interval > 0:
+            self._alloc_sample_start_area()
+
 
     # XXX kill alloc_young and make it always True
     def external_malloc(self, typeid, length, alloc_young):
@@ -939,7 +1189,9 @@ class IncrementalMiniMarkGC(MovingGCBase):
                       "rounding up made totalsize > small_request_threshold")
             #
             # Allocate from the ArenaCollection.  Don't clear it.
+            self._bs_acquire()
             result = self.ac.malloc(totalsize)
+            self._bs_release()
             #
             extra_flags = GCFLAG_TRACK_YOUNG_PTRS
             #
@@ -1002,6 +1254,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # Record the newly allocated object and its full malloced size.
             # The object is young or old depending on the argument.
             self.rawmalloced_total_size += r_uint(allocsize)
+            self.update_peak_rawmalloced_size()
             if alloc_young:
                 if not self.young_rawmalloced_objects:
                     self.young_rawmalloced_objects = self.AddressDict()
@@ -1015,6 +1268,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if self.is_varsize(typeid):
             offset_to_length = self.varsize_offset_to_length(typeid)
             (result + size_gc_header + offset_to_length).signed[0] = length
+        #
+        if self.alloc_sample_interval > 0:
+            self._alloc_sample_stop_area()
+            self._alloc_sample_reserved(totalsize, typeid)
         return result + size_gc_header
 
 
@@ -1037,6 +1294,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if self.next_major_collection_threshold < 0:
             # cannot trigger a full collection now, but we can ensure
             # that one will occur very soon
+            if self.alloc_sample_interval > 0:
+                self._alloc_sample_stop_area()
             self.nursery_free = self.nursery_top
 
     def can_optimize_clean_setarrayitems(self):
@@ -1183,6 +1442,40 @@ class IncrementalMiniMarkGC(MovingGCBase):
             obj = self.get_forwarding_address(obj)
         return self.header(obj).tid
 
+    def update_peak_rawmalloced_size(self):
+        if self.rawmalloced_total_size > self.peak_rawmalloced_size:
+            self.peak_rawmalloced_size = self.rawmalloced_total_size
+
+    def get_stats(self, stat_no):
+        from rpython.rlib import rgc
+        if stat_no == rgc.TOTAL_MEMORY:
+            return intmask(self.get_total_memory_used())
+        elif stat_no == rgc.PEAK_MEMORY:
+            return intmask(self.peak_memory_used)
+        elif stat_no == rgc.TOTAL_ARENA_MEMORY:
+            return intmask(self.ac.total_memory_alloced)
+        elif stat_no == rgc.TOTAL_ARENA_MEMORY_USED:
+            return intmask(self.ac.total_memory_used)
+        elif stat_no == rgc.PEAK_ARENA_MEMORY:
+            return intmask(self.ac.peak_memory_alloced)
+        elif stat_no == rgc.TOTAL_RAWMALLOCED_MEMORY:
+            return intmask(self.rawmalloced_total_size)
+        elif stat_no == rgc.PEAK_RAWMALLOCED_MEMORY:
+            return intmask(self.peak_rawmalloced_size)
+        elif stat_no == rgc.NURSERY_SIZE:
+            return self.nursery_size
+        elif stat_no == rgc.PINNED_OBJECTS:
+            return self.pinned_objects_in_nursery
+        elif stat_no == rgc.NUM_MINOR_COLLECTIONS:
+            return self.num_minor_collects
+        elif stat_no == rgc.NUM_MAJOR_COLLECTIONS:
+            return self.num_major_collects
+        elif stat_no == rgc.TOTAL_GC_TIME:
+            return int(self.total_gc_time * 1000.0)
+        elif stat_no == rgc.RELEASED_ARENA_MEMORY:
+            return intmask(self.ac.total_memory_released)
+        return -1
+
     def get_total_memory_used(self):
         """Return the total memory used, not counting any object in the
         nursery: only objects in the ArenaCollection or raw-malloced.
@@ -1626,6 +1919,14 @@ class IncrementalMiniMarkGC(MovingGCBase):
         that remain alive and move them out."""
         #
         debug_start("gc-minor")
+        start = monotonic_time()
+        if self.alloc_sample_interval > 0:
+            self._alloc_sample_stop_area()
+        if self.nursery_free:
+            nursery_used = self.nursery_free - self.nursery
+        else:       # called from collect_and_reserve(): the nursery is full
+            nursery_used = self.nursery_top - self.nursery
+        self._bs_acquire()
         #
         # All nursery barriers are invalid from this point on.  They
         # are evaluated anew as part of the minor collection.
@@ -1647,6 +1948,15 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if self.young_rawmalloced_objects:
             self.remove_young_arrays_from_old_objects_pointing_to_young()
         #
+        # The mutator may have set a stale GCFLAG_VISITED on these
+        # objects if they are being swept in the background.  The
+        # arrays whose cards were marked are not in the first list.
+        if self.bs_running:
+            self.old_objects_pointing_to_young.foreach(
+                self._bs_record_touched, None)
+            self.old_objects_with_cards_set.foreach(
+                self._bs_record_touched, None)
+        #
         # A special step in the STATE_MARKING phase.
         if self.gc_state == STATE_MARKING:
             # Copy the 'old_objects_pointing_to_young' list so far to
@@ -1787,13 +2097,23 @@ class IncrementalMiniMarkGC(MovingGCBase):
             prev = prev + free_range_size + \
                 (size_gc_header + self.get_size(obj))
         #
+        # With PYPY_GC_NURSERY_MAX, choose the size of the next nursery.
+        # Not done if there are pinned objects, which may be after the end.
+        reset_size = self.nursery_size
+        if self.adaptive_nursery and not nursery_barriers.non_empty():
+            self.nursery_size = self.compute_nursery_size(
+                nursery_used, self.nursery_surviving_size,
+                monotonic_time() - start)
+            if self.nursery_size > reset_size:
+                reset_size = self.nursery_size
+        #
         # reset everything after the last pinned object till the end of the arena
         if self.gc_nursery_debug:
-            llarena.arena_reset(prev, self.nursery + self.nursery_size - prev, 3)
+            llarena.arena_reset(prev, self.nursery + reset_size - prev, 3)
             if not nursery_barriers.non_empty():   # no pinned objects
                 self.debug_rotate_nursery()
         else:
-            llarena.arena_reset(prev, self.nursery + self.nursery_size - prev, 0)
+            llarena.arena_reset(prev, self.nursery + reset_size - prev, 0)
         #
         # always add the end of the nursery to the list
         nursery_barriers.append(self.nursery + self.nursery_size)
@@ -1803,6 +2123,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         #
         self.nursery_free = self.nursery
         self.nursery_top = self.nursery_barriers.popleft()
+        self._alloc_sample_refresh()
         #
         # clear GCFLAG_PINNED_OBJECT_PARENT_KNOWN from all parents in the list.
         self.old_objects_pointing_to_pinned.foreach(
@@ -1812,17 +2133,65 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # from the nursery that we just moved out.
         self.size_objects_made_old += r_uint(self.nursery_surviving_size)
         #
-        debug_print("minor collect, total memory used:",
-                    self.get_total_memory_used())
+        total_memory_used = self.get_total_memory_used()
+        if total_memory_used > self.peak_memory_used:
+            self.peak_memory_used = total_memory_used
+        debug_print("minor collect, total memory used:", total_memory_used)
         debug_print("number of pinned objects:",
                     self.pinned_objects_in_nursery)
         if self.DEBUG >= 2:
             self.debug_check_consistency()     # expensive!
         #
         self.root_walker.finished_minor_collection()
+        self._bs_release()
         #
+        self.num_minor_collects += 1
+        duration = monotonic_time() - start
+        self.total_gc_time += duration
+        self.hooks.fire_gc_minor(duration,
+                                 intmask(total_memory_used),
+                                 self.nursery_surviving_size,
+                                 self.pinned_objects_in_nursery)
         debug_stop("gc-minor")
 
+    # Thresholds on the fraction of the nursery that survives a minor
+    # collection, for compute_nursery_size()
+    NURSERY_GROW_SURVIVAL = 0.10
+    NURSERY_SHRINK_SURVIVAL = 0.02
+
+    def compute_nursery_size(self, used, surviving, duration):
+        """With PYPY_GC_NURSERY_MIN/MAX, returns the size of the nursery
+        to use after a minor collection that found 'surviving' bytes of
+        live objects in 'used' bytes of nursery, in 'duration' seconds.
+        The nursery doubles if many objects survive, because a larger
+        nursery gives more time to the objects to die, and it goes back
+        to its initial size if few do, because a smaller nursery is kinder
+        to the CPU cache.  It is halved if the minor collection took more
+        than PYPY_GC_MAX_PAUSE."""
+        size = self.nursery_size
+        if used < size // 2:
+            # the nursery was not full, e.g. because of gc.collect():
+            # the numbers don't tell much
+            return size
+        survival = float(surviving) / float(used)
+        fast = self.max_pause <= 0.0 or duration * 2.0 <= self.max_pause
+        if self.max_pause > 0.0 and duration > self.max_pause:
+            size = size // 2
+        elif survival > self.NURSERY_GROW_SURVIVAL and fast:
+            size = size * 2
+        elif size > self.nursery_base_size:
+            if survival < self.NURSERY_SHRINK_SURVIVAL:
+                size = max(size // 2, self.nursery_base_size)
+        elif size < self.nursery_base_size and fast:
+            size = min(size * 2, self.nursery_base_size)
+        size = min(size, self.nursery_alloc_size)
+        size = max(size, self.nursery_smallest_size)
+        size &= ~(WORD - 1)
+        if size != self.nursery_size:
+            debug_print("nursery size changed to", size,
+                        "survival:", survival, "duration:", duration)
+        return size
+
     def _reset_flag_old_objects_pointing_to_pinned(self, obj, ignore):
         ll_assert(self.header(obj).tid & GCFLAG_PINNED_OBJECT_PARENT_KNOWN != 0,
                   "!GCFLAG_PINNED_OBJECT_PARENT_KNOWN, but requested to reset.")
@@ -2150,6 +2519,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         #
         size_gc_header = self.gcheaderbuilder.size_gc_header
         self.rawmalloced_total_size += r_uint(raw_malloc_usage(totalsize))
+        self.update_peak_rawmalloced_size()
         self.old_rawmalloced_objects.append(arena + size_gc_header)
         return arena
 
@@ -2198,6 +2568,9 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def gc_step_until(self, state):
         while self.gc_state != state:
             self._minor_collection()
+            if self.bs_running:
+                # don't wait for the background thread
+                self.finish_background_sweep()
             self.major_collection_step()
 
     debug_gc_step_until = gc_step_until   # xxx
@@ -2212,6 +2585,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
     # is done before every major collection step
     def major_collection_step(self, reserving_size=0):
         debug_start("gc-collect-step")
+        start = monotonic_time()
+        oldstate = self.gc_state
         debug_print("starting gc state: ", GC_STATES[self.gc_state])
         # Debugging checks
         if self.pinned_objects_in_nursery == 0:
@@ -2277,7 +2652,17 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if estimate_from_nursery > estimate:
                 estimate = estimate_from_nursery
             estimate = intmask(estimate)
-            remaining = self.visit_all_objects_step(estimate)
+            if self.max_pause > 0.0:
+                estimate = self.paced_step_size(self.mark_rate, estimate,
+                                                estimate_from_nursery)
+                mark_start = monotonic_time()
+                remaining = self.visit_all_objects_step(estimate)
+                mark_duration = monotonic_time() - mark_start
+                self.mark_rate = self.update_rate(self.mark_rate,
+                                                  estimate - remaining,
+                                                  mark_duration)
+            else:
+                remaining = self.visit_all_objects_step(estimate)
             #
             if remaining >= estimate // 2:
                 if self.more_objects_to_trace.non_empty():
@@ -2330,6 +2715,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 if self.old_objects_with_destructors.non_empty():
                     self.deal_with_old_objects_with_destructors()
                 # objects_to_trace processed fully, can move on to sweeping
+                self.stat_arena_bytes_before = intmask(
+                    self.ac.total_memory_used)
+                self.stat_rawmalloc_bytes_before = intmask(
+                    self.rawmalloced_total_size)
                 self.ac.mass_free_prepare()
                 self.start_free_rawmalloc_objects()
                 #
@@ -2348,6 +2737,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 if self.rrc_enabled:
                     self.rrc_major_collection_free()
                 #
+                self.start_background_sweep()
                 self.gc_state = STATE_SWEEPING
             #END MARKING
         elif self.gc_state == STATE_SWEEPING:
@@ -2359,7 +2749,16 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 # a total object size of at least '3 * nursery_size' bytes
                 # is processed.
                 limit = 3 * self.nursery_size // self.small_request_threshold
-                self.free_unvisited_rawmalloc_objects_step(limit)
+                if self.max_pause > 0.0:
+                    limit = self.paced_step_size(self.rawsweep_rate, limit, 1)
+                    sweep_start = monotonic_time()
+                    remaining = self.free_unvisited_rawmalloc_objects_step(
+                        limit)
+                    self.rawsweep_rate = self.update_rate(
+                        self.rawsweep_rate, limit - remaining,
+                        monotonic_time() - sweep_start)
+                else:
+                    self.free_unvisited_rawmalloc_objects_step(limit)
                 done = False    # the 2nd half below must still be done
             else:
                 # Ask the ArenaCollection to visit a fraction of the objects.
@@ -2367,12 +2766,33 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 # GCFLAG_VISITED on the others.  Visit at most '3 *
                 # nursery_size' bytes.
                 limit = 3 * self.nursery_size // self.ac.page_size
-                done = self.ac.mass_free_incremental(self._free_if_unvisited,
-                                                     limit)
+                if self.max_pause > 0.0:
+                    limit = self.paced_step_size(self.sweep_rate, limit, 1)
+                if self.bs_running:
+                    done = self.background_sweep_step(limit)
+                elif self.max_pause > 0.0:
+                    sweep_start = monotonic_time()
+                    done = self.ac.mass_free_incremental(
+                        self._free_if_unvisited, limit)
+                    if not done:    # else, we don't know how many pages
+                        self.sweep_rate = self.update_rate(
+                            self.sweep_rate, limit,
+                            monotonic_time() - sweep_start)
+                else:
+                    done = self.ac.mass_free_incremental(
+                        self._free_if_unvisited, limit)
             # XXX tweak the limits above
             #
             if done:
                 self.num_major_collects += 1
+                self.hooks.fire_gc_collect(
+                    self.num_major_collects,
+                    self.stat_arena_bytes_before,
+                    intmask(self.ac.total_memory_used),
+                    self.stat_rawmalloc_bytes_before,
+                    intmask(self.rawmalloced_total_size))
+                #
+                self.release_free_arena_pages()
                 #
                 # We also need to reset the GCFLAG_VISITED on prebuilt GC objects.
                 self.prebuilt_root_objects.foreach(self._reset_gcflag_visited, None)
@@ -2401,6 +2821,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
                         out_of_memory("using too much memory, aborting")
                     self.max_heap_size_already_raised = True
                     self.gc_state = STATE_SCANNING
+                    self.total_gc_time += monotonic_time() - start
                     raise MemoryError
 
                 self.gc_state = STATE_FINALIZING
@@ -2423,8 +2844,59 @@ class IncrementalMiniMarkGC(MovingGCBase):
             pass #XXX which exception to raise here. Should be unreachable.
 
         debug_print("stopping, now in gc state: ", GC_STATES[self.gc_state])
+        duration = monotonic_time() - start
+        self.total_gc_time += duration
+        self.hooks.fire_gc_collect_step(duration, oldstate, self.gc_state)
         debug_stop("gc-collect-step")
 
+    def paced_step_size(self, rate, default, minimum):
+        """With PYPY_GC_MAX_PAUSE, returns the amount of work that the
+        current step should do to last 'max_pause' seconds, given the
+        'rate' measured so far, and at least 'minimum'.  'default' is the
+        amount of work done without PYPY_GC_MAX_PAUSE; it is used until a
+        rate is known, and it is a lower bound if the major collection is
+        late, i.e. if major_collection_step() is going to be called again
+        just after."""
+        if rate <= 0.0:
+            return default
+        size = rate * self.max_pause
+        if size >= float(sys.maxint):
+            return sys.maxint
+        result = int(size)
+        if result < minimum:
+            result = minimum
+        if result < 1:
+            result = 1
+        if (self.size_objects_made_old > self.threshold_objects_made_old
+                and result < default):
+            result = default
+        return result
+
+    def update_rate(self, rate, amount, duration):
+        # returns the new estimate of a rate, given that 'amount' of work
+        # was done in 'duration' seconds
+        if amount <= 0 or duration <= 0.0:
+            return rate
+        new_rate = amount / duration
+        if rate <= 0.0:
+            return new_rate
+        return (rate + new_rate) * 0.5
+
+    def release_free_arena_pages(self):
+        """Called at the end of a major collection.  Gives back to the OS
+        the memory of the free pages of the arenas, except for
+        'release_pages' times the memory used by the surviving objects:
+        these pages are likely to be used again before the next major
+        collection."""
+        if self.release_pages < 0.0:
+            return
+        keep = float(self.ac.total_memory_used) * self.release_pages
+        if keep >= float(sys.maxint):
+            return
+        released = self.ac.release_free_pages(int(keep))
+        if released > 0:
+            debug_print("released", released, "bytes of free arena pages")
+
     def _sweep_old_objects_pointing_to_pinned(self, obj, new_list):
         if self.header(obj).tid & GCFLAG_VISITED:
             new_list.append(obj)
@@ -2433,7 +2905,12 @@ class IncrementalMiniMarkGC(MovingGCBase):
         size_gc_header = self.gcheaderbuilder.size_gc_header
         obj = hdr + size_gc_header
         if self.header(obj).tid & GCFLAG_VISITED:
-            self.header(obj).tid &= ~GCFLAG_VISITED
+            if self.bs_threaded:
+                # the mutator might be changing the other flags
+                sweepthread.clear_flag_atomically(self.header(obj),
+                                                  GCFLAG_VISITED)
+            else:
+                self.header(obj).tid &= ~GCFLAG_VISITED
             return False     # survives
         return True      # dies
 
@@ -2540,18 +3017,35 @@ class IncrementalMiniMarkGC(MovingGCBase):
             self.visit_all_objects_step(sys.maxint)
 
     TEST_VISIT_SINGLE_STEP = False    # for tests
+    PARALLEL_MARK_MIN_OBJECTS = parallelmark.MIN_OBJECTS
+    PARALLEL_MARK_BATCH_SIZE = parallelmark.BATCH_SIZE
+    TEST_PARALLEL_MARK_QUANTUM = 3    # for tests
 
     def visit_all_objects_step(self, size_to_track):
         # Objects can be added to pending by visit
         pending = self.objects_to_trace
+        # With parallel marking, only start the other workers after having
+        # visited enough objects in this step
+        parallel_after = -1
+        if self.mark_workers > 1 and not self.TEST_VISIT_SINGLE_STEP:
+            parallel_after = self.PARALLEL_MARK_MIN_OBJECTS
         while pending.non_empty():
             obj = pending.pop()
             size_to_track -= self.visit(obj)
             if size_to_track < 0 or self.TEST_VISIT_SINGLE_STEP:
                 return 0
+            if parallel_after >= 0:
+                parallel_after -= 1
+                if parallel_after < 0 and pending.non_empty():
+                    return self.parallel_visit_all_objects_step(
+                        size_to_track)
         return size_to_track
 
     def visit(self, obj):
+        return self._visit(obj, self._collect_ref_rec, None)
+
+    @specialize.arg(2)
+    def _visit(self, obj, callback, arg):
         #
         # 'obj' is a live object.  Check GCFLAG_VISITED to know if we
         # have already seen it before.
@@ -2582,12 +3076,458 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if self.has_gcptr(llop.extract_ushort(llgroup.HALFWORD, hdr.tid)):
             #
             # Trace the content of the object and put all objects it references
-            # into the 'objects_to_trace' list.
-            self.trace(obj, self._collect_ref_rec, None)
+            # into the 'objects_to_trace' list (or into the private stack
+            # of a parallel marking worker).
+            self.trace(obj, callback, arg)
 
         size_gc_header = self.gcheaderbuilder.size_gc_header
         totalsize = size_gc_header + self.get_size(obj)
         return raw_malloc_usage(totalsize)
+    _visit._always_inline_ = True
+
+    # ----------
+    # Parallel marking, see parallelmark.py
+
+    def setup_parallel_mark(self):
+        if self.mark_workers <= 1:
+            self.mark_workers = 1
+            return
+        threaded = we_are_translated()
+        if threaded:
+            self.pm_lock = parallelmark.allocate_lock()
+            if not self.pm_lock:
+                self.mark_workers = 1
+                return
+        workers = None
+        i = 0
+        while i < self.mark_workers:
+            workers = parallelmark.MarkWorker(workers)
+            i += 1
+        self.pm_workers = workers
+        if threaded:
+            # the first worker is the thread that runs the GC, the other
+            # ones are helper threads.  Their 'start_lock' and 'done_lock'
+            # are used as semaphores, and start in the acquired state.
+            worker = self.pm_workers
+            while worker:
+                worker.lock = parallelmark.allocate_lock()
+                if not worker.lock:
+                    self.mark_workers = 1
+                    return
+                if worker is not self.pm_workers:
+                    worker.start_lock = parallelmark.allocate_lock()
+                    worker.done_lock = parallelmark.allocate_lock()
+                    if not worker.start_lock or not worker.done_lock:
+                        self.mark_workers = 1
+                        return
+                    parallelmark.acquire(worker.start_lock)
+                    parallelmark.acquire(worker.done_lock)
+                worker = worker.next
+
+    def _pm_acquire(self):
+        if self.pm_threaded:
+            parallelmark.acquire(self.pm_lock)
+
+    def _pm_release(self):
+        if self.pm_threaded:
+            parallelmark.release(self.pm_lock)
+
+    def _pm_acquire_worker(self, worker):
+        if self.pm_threaded:
+            parallelmark.acquire(worker.lock)
+
+    def _pm_release_worker(self, worker):
+        if self.pm_threaded:
+            parallelmark.release(worker.lock)
+
+    def parallel_visit_all_objects_step(self, size_to_track):
+        ll_assert(not self.pm_threaded, "recursive parallel marking")
+        if we_are_translated() and self.pm_helpers == 0:
+            self._pm_start_helpers()
+        self.pm_size_to_track = size_to_track
+        self.pm_stop = False
+        self.pm_active = self.mark_workers
+        worker = self.pm_workers
+        while worker:
+            worker.idle = False
+            worker = worker.next
+        #
+        if we_are_translated():
+            self.pm_threaded = True
+            # wake up the parked helper threads
+            worker = self.pm_workers.next
+            i = 0
+            while i < self.pm_helpers:
+                parallelmark.release(worker.start_lock)
+                worker = worker.next
+                i += 1
+            self._pm_work(self.pm_workers, -1)
+            # wait for the helpers to finish
+            worker = self.pm_workers.next
+            i = 0
+            while i < self.pm_helpers:
+                parallelmark.acquire(worker.done_lock)
+                worker = worker.next
+                i += 1
+            self.pm_threaded = False
+        else:
+            # untranslated: interleave the workers in the current thread
+            finished = False
+            while not finished:
+                finished = True
+                worker = self.pm_workers
+                while worker:
+                    if not self._pm_work(worker,
+                                         self.TEST_PARALLEL_MARK_QUANTUM):
+                        finished = False
+                    worker = worker.next
+        #
+        # if the budget was exhausted, the deques may still contain objects
+        worker = self.pm_workers
+        while worker:
+            self._pm_flush_shared(worker)
+            worker = worker.next
+        if self.pm_size_to_track < 0:
+            return 0
+        return self.pm_size_to_track
+
+    def _pm_start_helpers(self):
+        # Start the helper threads, the first time or after a fork().
+        # Each one takes the next worker from 'pm_next_helper' and stays
+        # parked on its 'start_lock' between the marking steps.
+        self.pm_next_helper = self.pm_workers.next
+        started = 0
+        worker = self.pm_workers.next
+        while worker:
+            if not parallelmark.start_helper_thread(self):
+                break
+            started += 1
+            worker = worker.next
+        # if a thread could not be started, the remaining workers are
+        # never used
+        self.pm_helpers = started
+        self.mark_workers = 1 + started
+
+    def _pm_helper_thread(self):
+        parallelmark.acquire(self.pm_lock)
+        worker = self.pm_next_helper
+        self.pm_next_helper = worker.next
+        parallelmark.release(self.pm_lock)
+        while True:
+            parallelmark.acquire(worker.start_lock)
+            self._pm_work(worker, -1)
+            parallelmark.release(worker.done_lock)
+
+    def after_fork(self, result_of_fork):
+        # the helper threads don't exist in the child process; start new
+        # ones at the next parallel marking step
+        if result_of_fork == 0:
+            self.pm_helpers = 0
+
+    def _pm_work(self, worker, quantum):
+        """Visit the objects from the private stack of 'worker', refilling
+        it from the deques and 'objects_to_trace'.  Returns True when there
+        is nothing more to do, or False after 'quantum' objects if
+        quantum >= 0.
+        """
+        while True:
+            if worker.count == 0 and not self._pm_refill(worker):
+                break
+            worker.count -= 1
+            obj = worker.items[worker.count]
+            worker.size_marked += self._pm_visit(obj, worker)
+            if worker.size_marked >= self.PARALLEL_MARK_BATCH_SIZE:
+                if not self._pm_report(worker):
+                    break
+            if quantum >= 0:
+                quantum -= 1
+                if quantum < 0:
+                    return False
+        # give back the objects that were not visited, if we stop because
+        # 'size_to_track' is exhausted
+        self._pm_acquire()
+        self._pm_update_size(worker)
+        self._pm_give_back(worker, worker.count)
+        self._pm_release()
+        return True
+
+    def _pm_visit(self, obj, worker):
+        # like _visit(), but only one worker wins the race to set
+        # GCFLAG_VISITED: the other ones don't trace the object again,
+        # and don't count its size
+        hdr = self.header(obj)
+        ll_assert((hdr.tid & GCFLAG_PINNED) == 0,
+                  "pinned object in 'objects_to_trace'")
+        ll_assert(not self.is_in_nursery(obj),
+                  "nursery object in 'objects_to_trace'")
+        if hdr.tid & (GCFLAG_VISITED | GCFLAG_NO_HEAP_PTRS):
+            return 0
+        oldtid = parallelmark.set_flags_atomically(
+            hdr, GCFLAG_VISITED | GCFLAG_TRACK_YOUNG_PTRS)
+        if oldtid & GCFLAG_VISITED:
+            return 0
+        if self.has_gcptr(llop.extract_ushort(llgroup.HALFWORD, hdr.tid)):
+            self.trace(obj, self._pm_collect_ref, worker)
+        size_gc_header = self.gcheaderbuilder.size_gc_header
+        totalsize = size_gc_header + self.get_size(obj)
+        return raw_malloc_usage(totalsize)
+
+    def _pm_collect_ref(self, root, worker):
+        # like _collect_obj(), but for the private stack of 'worker'
+        obj = root.address[0]
+        llop.debug_nonnull_pointer(lltype.Void, obj)
+        if not self.is_in_nursery(obj):
+            if worker.count == parallelmark.LOCAL_SIZE:
+                self._pm_publish(worker, parallelmark.LOCAL_SIZE // 2)
+            worker.items[worker.count] = obj
+            worker.count += 1
+        else:
+            ll_assert(self._is_pinned(obj),
+                      "non-pinned nursery obj in _pm_collect_ref")
+
+    def _pm_give_back(self, worker, n):
+        # move 'n' objects from the private stack of 'worker' to
+        # 'objects_to_trace'.  Must be called with the lock acquired.
+        count = worker.count
+        while n > 0:
+            count -= 1
+            self.objects_to_trace.append(worker.items[count])
+            n -= 1
+        worker.count = count
+
+    def _pm_publish(self, worker, n):
+        # move 'n' objects from the private stack of 'worker' to its deque,
+        # where the other workers can steal them.  If the deque is full,
+        # the rest goes to 'objects_to_trace'.
+        self._pm_acquire_worker(worker)
+        count = worker.count
+        while n > 0 and worker.shared_count < parallelmark.SHARED_SIZE:
+            count -= 1
+            i = worker.shared_start + worker.shared_count
+            worker.shared[i % parallelmark.SHARED_SIZE] = worker.items[count]
+            worker.shared_count += 1
+            n -= 1
+        worker.count = count
+        self._pm_release_worker(worker)
+        if n > 0:
+            self._pm_acquire()
+            self._pm_give_back(worker, n)
+            self._pm_release()
+
+    def _pm_take_own(self, worker):
+        # move up to REFILL_SIZE objects from the top of the deque of
+        # 'worker' to its empty private stack
+        if worker.shared_count == 0:    # read without the lock: a hint
+            return False
+        self._pm_acquire_worker(worker)
+        count = 0
+        while count < parallelmark.REFILL_SIZE and worker.shared_count > 0:
+            worker.shared_count -= 1
+            i = worker.shared_start + worker.shared_count
+            worker.items[count] = worker.shared[i % parallelmark.SHARED_SIZE]
+            count += 1
+        self._pm_release_worker(worker)
+        worker.count = count
+        return count > 0
+
+    def _pm_take_global(self, worker):
+        # move up to REFILL_SIZE objects from 'objects_to_trace' to the
+        # empty private stack of 'worker'
+        pending = self.objects_to_trace
+        if not pending.non_empty():     # read without the lock: a hint
+            return False
+        self._pm_acquire()
+        count = 0
+        while count < parallelmark.REFILL_SIZE and pending.non_empty():
+            worker.items[count] = pending.pop()
+            count += 1
+        self._pm_release()
+        worker.count = count
+        return count > 0
+
+    def _pm_steal(self, worker):
+        # move half of the deque of another worker, from its bottom, to
+        # the empty private stack of 'worker'
+        victim = worker.next or self.pm_workers
+        while victim is not worker:
+            if victim.shared_count > 0:    # read without the lock: a hint
+                self._pm_acquire_worker(victim)
+                n = (victim.shared_count + 1) // 2
+                if n > parallelmark.LOCAL_SIZE:
+                    n = parallelmark.LOCAL_SIZE
+                count = 0
+                while count < n:
+                    i = victim.shared_start % parallelmark.SHARED_SIZE
+                    worker.items[count] = victim.shared[i]
+                    victim.shared_start = i + 1
+                    victim.shared_count -= 1
+                    count += 1
+                self._pm_release_worker(victim)
+                if count > 0:
+                    worker.count = count
+                    return True
+            victim = victim.next or self.pm_workers
+        return False
+
+    def _pm_flush_shared(self, worker):
+        # move the deque of 'worker' to 'objects_to_trace'.  Only called
+        # when the workers are stopped.
+        while worker.shared_count > 0:
+            worker.shared_count -= 1
+            i = worker.shared_start + worker.shared_count
+            self.objects_to_trace.append(
+                worker.shared[i % parallelmark.SHARED_SIZE])
+        worker.shared_start = 0
+
+    def _pm_update_size(self, worker):
+        # Must be called with the lock acquired
+        self.pm_size_to_track -= worker.size_marked
+        worker.size_marked = 0
+        if self.pm_size_to_track < 0:
+            self.pm_stop = True
+
+    def _pm_report(self, worker):
+        """Count the size marked by 'worker', and share half of its
+        private stack if other workers are waiting for work.  Returns
+        False if 'size_to_track' is exhausted."""
+        self._pm_acquire()
+        self._pm_update_size(worker)
+        share = self.pm_active < self.mark_workers
+        result = not self.pm_stop
+        self._pm_release()
+        if share and result and worker.count > 1:
+            self._pm_publish(worker, worker.count // 2)
+        return result
+
+    def _pm_refill(self, worker):
+        """Find more objects for the empty private stack of 'worker': from
+        its own deque, from 'objects_to_trace' or from the deque of another
+        worker.  If there are none, wait until another worker shares some,
+        or until all the workers are waiting.  Returns False if marking is
+        finished."""
+        while not self.pm_stop:
+            if (self._pm_take_own(worker) or self._pm_take_global(worker) or
+                    self._pm_steal(worker)):
+                if worker.idle:
+                    self._pm_acquire()
+                    worker.idle = False
+                    self.pm_active += 1
+                    self._pm_release()
+                return True
+            if not worker.idle:
+                self._pm_acquire()
+                worker.idle = True
+                self.pm_active -= 1
+                self._pm_release()
+            if self.pm_active == 0 or not self.pm_threaded:
+                break
+            # some other workers are still busy: wait for them to share
+            # some objects
+            parallelmark.pause()
+        return False
+
+    # ----------
+    # Background sweeping, see sweepthread.py
+
+    TEST_SWEEP_THREAD_QUANTUM = 2     # for tests
+
+    def setup_background_sweep(self):
+        if not self.sweep_thread:
+            return
+        if we_are_translated():
+            self.bs_lock = sweepthread.allocate_lock()
+            if not self.bs_lock:
+                self.sweep_thread = False
+
+    def _bs_acquire(self):
+        if self.bs_threaded:
+            sweepthread.acquire(self.bs_lock)
+        elif self.bs_running:
+            # untranslated: the helper thread makes some progress every
+            # time we would wait for it
+            self._bs_sweep_pages(self.TEST_SWEEP_THREAD_QUANTUM)
+
+    def _bs_release(self):
+        if self.bs_threaded:
+            sweepthread.release(self.bs_lock)
+
+    def start_background_sweep(self):
+        """Called when entering STATE_SWEEPING.  Starts the helper thread
+        that sweeps the arenas, if enabled."""
+        if not self.sweep_thread:
+            return
+        ll_assert(not self.bs_touched.non_empty(), "bs_touched not empty")
+        self.bs_done = False
+        self.bs_running = True
+        if we_are_translated():
+            self.bs_threads = 1
+            self.bs_threaded = True
+            if not sweepthread.start_helper_thread(self):
+                # sweep in this thread, as usual
+                self.bs_threads = 0
+                self.bs_threaded = False
+                self.bs_running = False
+
+    def _bs_thread(self):
+        # the helper thread: sweep a few pages at a time until all the
+        # arenas are swept
+        while True:
+            sweepthread.acquire(self.bs_lock)
+            done = self._bs_sweep_pages(sweepthread.PAGES_PER_LOCK)
+            if done:
+                self.bs_threads -= 1
+            sweepthread.release(self.bs_lock)
+            if done:
+                break
+            sweepthread.pause()
+
+    def _bs_sweep_pages(self, max_pages):
+        # must be called with 'bs_lock' acquired.  Returns True if all the
+        # arenas are swept.
+        if not self.bs_done:
+            self.bs_done = self.ac.mass_free_incremental(
+                self._free_if_unvisited, max_pages)
+        return self.bs_done
+
+    def background_sweep_step(self, limit):
+        """The part of a sweeping step about the arenas, when they are swept
+        by the helper thread.  We only sweep 'limit' pages ourselves if we
+        are late, i.e. if major_collection_step() is going to be called
+        again just after.  Returns True when the sweeping is finished."""
+        self._bs_acquire()
+        if self.size_objects_made_old > self.threshold_objects_made_old:
+            self._bs_sweep_pages(limit)
+        finished = self.bs_done and self.bs_threads == 0
+        self._bs_release()
+        if finished:
+            self.bs_running = False
+            self.bs_threaded = False
+            # clear the stale GCFLAG_VISITED that the mutator might have
+            # written back, see sweepthread.py
+            while self.bs_touched.non_empty():
+                obj = self.bs_touched.pop()
+                self.header(obj).tid &= ~GCFLAG_VISITED
+        return finished
+
+    def finish_background_sweep(self):
+        """Sweep the rest of the arenas now, and wait for the helper thread
+        to stop."""
+        while True:
+            self._bs_acquire()
+            self._bs_sweep_pages(sys.maxint)
+            threads = self.bs_threads
+            self._bs_release()
+            if threads == 0:
+                break
+            sweepthread.pause()
+
+    def _bs_record_touched(self, obj, ignored):
+        self.bs_touched.append(obj)
+
+    def before_fork(self):
+        # the helper thread would not exist in the child process
+        if self.bs_threaded:
+            self.finish_background_sweep()
 
     # ----------
     # id() and identityhash() support
@@ -2596,8 +3536,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def _allocate_shadow(self, obj, copy=False):
         size_gc_header = self.gcheaderbuilder.size_gc_header
         size = self.get_size(obj)
+        self._bs_acquire()
         shadowhdr = self._malloc_out_of_nursery(size_gc_header +
                                                 size)
+        self._bs_release()
         # Initialize the shadow enough to be considered a
         # valid gc object.  If the original object stays
         # alive at the next minor collection, it will anyway
@@ -2830,6 +3772,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
 
     def ignore_finalizer(self, obj):
         self.header(obj).tid |= GCFLAG_IGNORE_FINALIZER
+        if self.bs_running and not self.is_in_nursery(obj):
+            self.bs_touched.append(obj)
 
 
     # ----------
@@ -16,6 +16,8 @@ assert 1 << WORD_POWER_2 == WORD
 # The actual allocation occurs in whole arenas, which are then subdivided
 # into pages.  For each arena we allocate one of the following structures:
 
+ADDRESS_ARRAY = lltype.Array(llmemory.Address, hints={'nolength': True})
+
 ARENA_PTR = lltype.Ptr(lltype.ForwardReference())
 ARENA = lltype.Struct('ArenaReference',
     # -- The address of the arena, as returned by malloc()
@@ -25,6 +27,12 @@ ARENA = lltype.Struct('ArenaReference',
     ('totalpages', lltype.Signed),
     # -- A chained list of free pages in the arena.  Ends with NULL.
     ('freepages', llmemory.Address),
+    # -- The free pages whose memory was returned to the OS by
+    #    release_free_pages().  They are counted in 'nfreepages' but are
+    #    not in the 'freepages' list, because their content is lost; the
+    #    array is allocated the first time it is needed.
+    ('nreleasedpages', lltype.Signed),
+    ('releasedpages', lltype.Ptr(ADDRESS_ARRAY)),
     # -- A linked list of arenas.  See below.
     ('nextarena', ARENA_PTR),
     )
@@ -53,6 +61,9 @@ ARENA_NULL = lltype.nullptr(ARENA)
 #
 # - free: used to be partially full, and is now free again.  The page is
 #   on the chained list of free pages 'freepages' from its arena.
+#
+# - released: a free page whose memory was given back to the OS.  The page
+#   is in the array 'releasedpages' from its arena.
 
 # Each allocated page contains blocks of a given size, which can again be in
 # one of three states: allocated, free, or uninitialized.  The uninitialized
@@ -140,6 +151,14 @@ class ArenaCollection(object):
         # the total memory used, counting every block in use, without
         # the additional bookkeeping stuff.
         self.total_memory_used = r_uint(0)
+        #
+        # the total memory of the arenas currently allocated from the
+        # system, and the highest value it ever had
+        self.total_memory_alloced = r_uint(0)
+        self.peak_memory_alloced = r_uint(0)
+        #
+        # the part of 'total_memory_alloced' in released pages
+        self.total_memory_released = r_uint(0)
 
 
     def _new_page_ptr_list(self, length):
@@ -201,7 +220,7 @@ class ArenaCollection(object):
         # The result is simply 'current_arena.freepages'.
         arena = self.current_arena
         result = arena.freepages
-        if arena.nfreepages > 0:
+        if arena.nfreepages > arena.nreleasedpages:
             #
             # The 'result' was part of the chained list; read the next.
             arena.nfreepages -= 1
@@ -210,6 +229,16 @@ class ArenaCollection(object):
                                 llmemory.sizeof(llmemory.Address),
                                 0)
             #
+        elif arena.nreleasedpages > 0:
+            #
+            # Reuse a released page.  The OS gives it back to us when we
+            # write the page header.
+            arena.nfreepages -= 1
+            arena.nreleasedpages -= 1
+            result = arena.releasedpages[arena.nreleasedpages]
+            freepages = arena.freepages
+            self.total_memory_released -= r_uint(self.page_size)
+            #
         else:
             # The 'result' is part of the uninitialized pages.
             ll_assert(self.num_uninitialized_pages > 0,
@@ -221,11 +250,9 @@ class ArenaCollection(object):
                 freepages = NULL
         #
         arena.freepages = freepages
-        if freepages == NULL:
+        if freepages == NULL and arena.nfreepages == 0:
             # This was the last page, so put the arena away into
             # arenas_lists[0].
-            ll_assert(arena.nfreepages == 0, 
-                      "freepages == NULL but nfreepages > 0")
             arena.nextarena = self.arenas_lists[0]
             self.arenas_lists[0] = arena
             self.current_arena = ARENA_NULL
@@ -296,6 +323,9 @@ class ArenaCollection(object):
         if not arena_base:
             out_of_memory("out of memory: couldn't allocate the next arena")
         arena_end = arena_base + self.arena_size
+        self.total_memory_alloced += r_uint(self.arena_size)
+        if self.total_memory_alloced > self.peak_memory_alloced:
+            self.peak_memory_alloced = self.total_memory_alloced
         #
         # 'firstpage' points to the first unused page
         firstpage = start_of_page(arena_base + self.page_size - 1,
@@ -309,6 +339,8 @@ class ArenaCollection(object):
         arena.nfreepages = 0        # they are all uninitialized pages
         arena.totalpages = npages
         arena.freepages = firstpage
+        arena.nreleasedpages = 0
+        arena.releasedpages = lltype.nullptr(ADDRESS_ARRAY)
         self.num_uninitialized_pages = npages
         self.current_arena = arena
         #
@@ -397,7 +429,13 @@ class ArenaCollection(object):
                     # The whole arena is empty.  Free it.
                     llarena.arena_reset(arena.base, self.arena_size, 4)
                     llarena.arena_free(arena.base)
+                    if arena.releasedpages:
+                        self.total_memory_released -= r_uint(
+                            arena.nreleasedpages * self.page_size)
+                        lltype.free(arena.releasedpages, flavor='raw',
+                                    track_allocation=False)
                     lltype.free(arena, flavor='raw', track_allocation=False)
+                    self.total_memory_alloced -= r_uint(self.arena_size)
                     #
                 else:
                     # Insert 'arena' in the correct arenas_lists[n]
@@ -413,6 +451,65 @@ class ArenaCollection(object):
         self.min_empty_nfreepages = 1
 
 
+    def release_free_pages(self, max_free_memory):
+        """Give back to the OS the memory of the free pages, except for
+        'max_free_memory' bytes of them.  The pages that are released
+        first are the ones in the arenas with the most free pages, which
+        are the last ones that allocate_new_page() will use.  Must not be
+        called while a mass_free_incremental() is in progress, because
+        'arenas_lists' must be up-to-date.  Returns the number of bytes
+        released.
+        """
+        #
+        # Count the free pages that are not released yet
+        npages = 0
+        if self.current_arena != ARENA_NULL:
+            arena = self.current_arena
+            npages += arena.nfreepages - arena.nreleasedpages
+        i = 1
+        while i < self.max_pages_per_arena:
+            arena = self.arenas_lists[i]
+            while arena != ARENA_NULL:
+                npages += arena.nfreepages - arena.nreleasedpages
+                arena = arena.nextarena
+            i += 1
+        #
+        to_release = npages - max_free_memory // self.page_size
+        if to_release <= 0:
+            return 0
+        npages = to_release
+        i = self.max_pages_per_arena - 1
+        while i >= 1 and to_release > 0:
+            arena = self.arenas_lists[i]
+            while arena != ARENA_NULL and to_release > 0:
+                to_release -= self._release_pages(arena, to_release)
+                arena = arena.nextarena
+            i -= 1
+        if self.current_arena != ARENA_NULL and to_release > 0:
+            to_release -= self._release_pages(self.current_arena, to_release)
+        npages -= to_release
+        self.total_memory_released += r_uint(npages * self.page_size)
+        return npages * self.page_size
+
+
+    def _release_pages(self, arena, max_pages):
+        # Move at most 'max_pages' pages from 'arena.freepages' to
+        # 'arena.releasedpages', giving their memory back to the OS.
+        count = 0
+        while count < max_pages and arena.nfreepages > arena.nreleasedpages:
+            pageaddr = arena.freepages
+            arena.freepages = pageaddr.address[0]
+            llarena.arena_reset(pageaddr, self.page_size, 5)
+            if not arena.releasedpages:
+                arena.releasedpages = lltype.malloc(
+                    ADDRESS_ARRAY, self.max_pages_per_arena, flavor='raw',
+                    track_allocation=False)
+            arena.releasedpages[arena.nreleasedpages] = pageaddr
+            arena.nreleasedpages += 1
+            count += 1
+        return count
+
+
     def mass_free_in_pages(self, size_class, ok_to_free_func, max_pages):
         nblocks = self.nblocks_for_size[size_class]
         block_size = size_class * WORD
@@ -20,6 +20,9 @@ class SimpleArenaCollection(object):
         self.small_request_threshold = small_request_threshold
         self.all_objects = []
         self.total_memory_used = 0
+        self.total_memory_alloced = 0
+        self.peak_memory_alloced = 0
+        self.total_memory_released = 0
 
     def malloc(self, size):
         nsize = raw_malloc_usage(size)
@@ -31,6 +34,9 @@ class SimpleArenaCollection(object):
         llarena.arena_reserve(result, size)
         self.all_objects.append((result, nsize))
         self.total_memory_used += nsize
+        self.total_memory_alloced += nsize
+        if self.total_memory_alloced > self.peak_memory_alloced:
+            self.peak_memory_alloced = self.total_memory_alloced
         return result
 
     def mass_free_prepare(self):
@@ -44,6 +50,7 @@ class SimpleArenaCollection(object):
             rawobj, nsize = old.pop()
             if ok_to_free_func(rawobj):
                 llarena.arena_free(rawobj)
+                self.total_memory_alloced -= nsize
             else:
                 self.all_objects.append((rawobj, nsize))
                 self.total_memory_used += nsize
@@ -56,3 +63,6 @@ class SimpleArenaCollection(object):
         self.mass_free_prepare()
         res = self.mass_free_incremental(ok_to_free_func, sys.maxint)
         assert res
+
+    def release_free_pages(self, max_free_memory):
+        return 0
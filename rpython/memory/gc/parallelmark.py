@@ -0,0 +1,172 @@
+"""
+Support for marking in parallel in incminimark.
+
+If PYPY_GC_MARK_WORKERS is set to N > 1, a marking step of a major
+collection that still has gray objects after visiting MIN_OBJECTS objects
+continues with N workers: the thread that runs the GC, plus N-1 helper
+threads.  The helper threads are started the first time and then stay
+parked between the steps, waiting on their 'start_lock'.  The mutator is
+stopped during the whole step, so the workers only race against each
+other:
+
+* each worker has a private stack of gray objects, 'items', and a deque
+  of gray objects that the other workers can steal from, 'shared', with
+  its own lock.  A worker pushes half of its private stack to its deque
+  when the stack overflows or when other workers are idle.  When its
+  private stack is empty, it takes objects back from its own deque, then
+  from the GC's 'objects_to_trace', then steals half of the deque of
+  another worker.  The GC's 'pm_lock' protects 'objects_to_trace', which
+  is also where a full deque overflows, and the counters below;
+
+* GCFLAG_VISITED is set with an atomic operation.  If two workers see
+  the same object at the same time, only the one that sets the flag
+  traces the object and counts its size;
+
+* the size of objects marked is added to the GC's 'pm_size_to_track'
+  after every BATCH_SIZE bytes, and the step stops when it is exhausted;
+  the private stacks and the deques are then given back to
+  'objects_to_trace'.
+
+The helper threads only run GC code, which never needs the GIL.  After a
+fork(), they don't exist in the child process and are started again the
+next time.  Before translation, the workers are instead interleaved in
+the current thread, which tests everything but the locking.
+"""
+
+import sys
+from rpython.rtyper.lltypesystem import lltype, llmemory, rffi
+from rpython.rtyper.annlowlevel import llhelper
+from rpython.rlib import rthread
+from rpython.rlib.objectmodel import we_are_translated
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+
+
+# The private stack of gray objects of a worker
+LOCAL_SIZE = 1024
+# The deque of gray objects of a worker, which the other workers steal from
+SHARED_SIZE = 4096
+# The number of objects taken at once from 'objects_to_trace'
+REFILL_SIZE = 128
+# The number of bytes marked by a worker between two updates of the budget
+BATCH_SIZE = 65536
+# The number of objects visited by a marking step before starting the
+# helper threads
+MIN_OBJECTS = 4096
+# Upper limit for PYPY_GC_MARK_WORKERS
+MAX_WORKERS = 64
+
+ADDRARRAY = lltype.Array(llmemory.Address, hints={'nolength': True})
+NULL_LOCK = rthread.null_ll_lock
+
+# RPyThreadStart() without the GIL wrapper: the helper threads only run GC
+# code, which runs in parallel with the thread that called the GC
+c_thread_start_nowrapper = rthread.llexternal('RPyThreadStart',
+                                              [rthread.CALLBACK], rffi.LONG,
+                                              _nowrapper=True)
+
+
+class MarkWorker(object):
+    _alloc_flavor_ = "raw"
+
+    def __init__(self, next):
+        self.items = lltype.malloc(ADDRARRAY, LOCAL_SIZE, flavor='raw',
+                                   track_allocation=False)
+        self.count = 0
+        # a ring buffer: the owner pushes and pops at the top, the other
+        # workers steal at the bottom, 'shared_start'
+        self.shared = lltype.malloc(ADDRARRAY, SHARED_SIZE, flavor='raw',
+                                    track_allocation=False)
+        self.shared_start = 0
+        self.shared_count = 0
+        self.size_marked = 0
+        self.idle = False
+        self.lock = NULL_LOCK          # protects 'shared'
+        self.start_lock = NULL_LOCK    # released to start a helper thread
+        self.done_lock = NULL_LOCK     # released by the helper thread
+        self.next = next
+
+
+def allocate_lock():
+    """Like rthread.allocate_ll_lock(), but returns NULL instead of
+    raising, and doesn't add memory pressure to the GC."""
+    ll_lock = lltype.malloc(rthread.TLOCKP.TO, flavor='raw',
+                            track_allocation=False)
+    res = rthread.c_thread_lock_init(ll_lock)
+    if rffi.cast(lltype.Signed, res) <= 0:
+        lltype.free(ll_lock, flavor='raw', track_allocation=False)
+        return NULL_LOCK
+    return ll_lock
+
+def acquire(ll_lock):
+    rthread.c_thread_acquirelock_NOAUTO(ll_lock, rffi.cast(rffi.INT, 1))
+
+def release(ll_lock):
+    rthread.c_thread_releaselock_NOAUTO(ll_lock)
+
+eci = ExternalCompilationInfo(
+    post_include_bits=["""
+RPY_EXTERN Signed pypy_gc_atomic_or(Signed *p, Signed flags);
+"""],
+    separate_module_sources=["""
+#ifdef _MSC_VER
+#include <intrin.h>
+#endif
+RPY_EXTERN Signed pypy_gc_atomic_or(Signed *p, Signed flags)
+{
+#ifdef _MSC_VER
+#  ifdef _WIN64
+    return _InterlockedOr64((__int64 volatile *)p, flags);
+#  else
+    return _InterlockedOr((long volatile *)p, flags);
+#  endif
+#else
+    return __sync_fetch_and_or(p, flags);
+#endif
+}
+"""])
+
+_c_atomic_or = rffi.llexternal('pypy_gc_atomic_or',
+                               [rffi.SIGNEDP, lltype.Signed], lltype.Signed,
+                               compilation_info=eci, _nowrapper=True)
+
+def set_flags_atomically(hdr, flags):
+    """Set 'flags' in hdr.tid and return the previous value of hdr.tid.
+    If two workers set the same flag at the same time, only one of them
+    sees that it was not set before."""
+    if we_are_translated():
+        p = llmemory.cast_adr_to_ptr(llmemory.cast_ptr_to_adr(hdr),
+                                     rffi.SIGNEDP)
+        return _c_atomic_or(p, flags)
+    else:
+        oldtid = hdr.tid
+        hdr.tid |= flags
+        return oldtid
+
+if sys.platform != 'win32':
+    _c_sched_yield = rffi.llexternal(
+        'sched_yield', [], rffi.INT,
+        compilation_info=ExternalCompilationInfo(includes=['sched.h']),
+        _nowrapper=True)
+
+    def pause():
+        # called by the workers waiting for work, between two attempts
+        # to find some
+        _c_sched_yield()
+else:
+    def pause():
+        pass
+
+
+class _State(object):
+    gc = None
+_state = _State()
+
+def _helper_thread_main():
+    # the entry point of the helper threads.  No argument can be passed
+    # to a new thread, so the GC is found in '_state'.
+    _state.gc._pm_helper_thread()
+
+def start_helper_thread(gc):
+    _state.gc = gc
+    func = llhelper(rthread.CALLBACK, _helper_thread_main)
+    return c_thread_start_nowrapper(func) != -1
@@ -0,0 +1,103 @@
+"""
+Support for sweeping the arenas in a background thread in incminimark.
+
+If PYPY_GC_SWEEP_THREAD is set to 1, the major collections don't sweep
+the ArenaCollection in the thread that runs the GC: when the marking is
+done, a helper thread is started and calls mass_free_incremental() on a
+few pages at a time, until all pages are swept.  Meanwhile the mutator
+continues to run.  The helper thread and the GC share the lock
+'bs_lock':
+
+* the helper thread holds it while it sweeps its few pages.  The pages
+  are given back to the ArenaCollection as they are swept, so the freed
+  blocks can be reused at once;
+
+* the GC holds it during the minor collections, when a sweeping step
+  checks if the helper thread is finished, and around the few calls to
+  ac.malloc() done directly by the mutator.  The rest of the GC never
+  changes the ArenaCollection during the sweeping, and the mutator never
+  touches the dead objects;
+
+* the only thing that the mutator and the helper thread can change at
+  the same time is the header of a surviving object: the helper thread
+  clears its GCFLAG_VISITED, and the mutator may clear or set other
+  flags (mostly in the write barrier).  The helper thread clears the
+  flag with an atomic operation, so the mutator's flags are never lost;
+  but the mutator can write back a stale GCFLAG_VISITED.  All such
+  objects are recorded (they are in 'old_objects_pointing_to_young' or,
+  for the card-marking barriers, in 'old_objects_with_cards_set' at the
+  next minor collection) and the flag is cleared again when the sweeping
+  is finished.
+
+The rawmalloced objects are still swept by the GC, incrementally, in
+parallel with the helper thread.  If the mutator makes objects old
+faster than the helper thread sweeps, the GC helps it; a full collection
+also finishes the sweeping directly, and so does fork(), because the
+helper thread would not exist in the child process.
+
+Before translation, there is no helper thread: its work is done in the
+current thread whenever the GC would acquire 'bs_lock'.
+"""
+
+from rpython.rtyper.lltypesystem import lltype, llmemory, rffi
+from rpython.rtyper.annlowlevel import llhelper
+from rpython.rlib import rthread
+from rpython.rlib.objectmodel import we_are_translated
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+from rpython.memory.gc.parallelmark import (allocate_lock, acquire, release,
+    pause, c_thread_start_nowrapper, NULL_LOCK)
+
+
+# The number of pages swept by the helper thread each time it acquires
+# the lock, i.e. the longest that the GC waits for it
+PAGES_PER_LOCK = 4
+
+
+eci = ExternalCompilationInfo(
+    post_include_bits=["""
+RPY_EXTERN void pypy_gc_atomic_and(Signed *p, Signed mask);
+"""],
+    separate_module_sources=["""
+#ifdef _MSC_VER
+#include <intrin.h>
+#endif
+RPY_EXTERN void pypy_gc_atomic_and(Signed *p, Signed mask)
+{
+#ifdef _MSC_VER
+#  ifdef _WIN64
+    _InterlockedAnd64((__int64 volatile *)p, mask);
+#  else
+    _InterlockedAnd((long volatile *)p, mask);
+#  endif
+#else
+    __sync_fetch_and_and(p, mask);
+#endif
+}
+"""])
+
+_c_atomic_and = rffi.llexternal('pypy_gc_atomic_and',
+                                [rffi.SIGNEDP, lltype.Signed], lltype.Void,
+                                compilation_info=eci, _nowrapper=True)
+
+def clear_flag_atomically(hdr, flag):
+    """Clear 'flag' in hdr.tid, without losing the changes made to the
+    other flags by another thread."""
+    if we_are_translated():
+        p = llmemory.cast_adr_to_ptr(llmemory.cast_ptr_to_adr(hdr),
+                                     rffi.SIGNEDP)
+        _c_atomic_and(p, ~flag)
+    else:
+        hdr.tid &= ~flag
+
+
+class _State(object):
+    gc = None
+_state = _State()
+
+def _helper_thread_main():
+    _state.gc._bs_thread()
+
+def start_helper_thread(gc):
+    _state.gc = gc
+    func = llhelper(rthread.CALLBACK, _helper_thread_main)
+    return c_thread_start_nowrapper(func) != -1
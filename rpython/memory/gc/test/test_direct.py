@@ -7,6 +7,7 @@ see as the list of roots (stack and prebuilt objects).
 # XXX VERY INCOMPLETE, low coverage
 
 import py
+import sys
 from rpython.rtyper.lltypesystem import lltype, llmemory
 from rpython.memory.gctypelayout import TypeLayoutBuilder, FIN_HANDLER_ARRAY
 from rpython.rlib.rarithmetic import LONG_BIT, is_valid_int
@@ -671,6 +672,175 @@ class TestIncrementalMiniMarkGCSimple(TestMiniMarkGCSimple):
         self.gc.debug_gc_step_until(incminimark.STATE_SCANNING)
         assert self.stackroots[1].x == 13
 
+    def test_get_stats(self):
+        from rpython.rlib import rgc
+        gc = self.gc
+        assert gc.get_stats(rgc.NURSERY_SIZE) == gc.nursery_size
+        for i in range(10):
+            self.stackroots.append(self.malloc(S))
+        self.stackroots.append(self.malloc(VAR, 1000))   # large object
+        num_minor = gc.get_stats(rgc.NUM_MINOR_COLLECTIONS)
+        num_major = gc.get_stats(rgc.NUM_MAJOR_COLLECTIONS)
+        gc.collect(0)
+        assert gc.get_stats(rgc.NUM_MINOR_COLLECTIONS) == num_minor + 1
+        assert gc.get_stats(rgc.NUM_MAJOR_COLLECTIONS) == num_major
+        raw = gc.get_stats(rgc.TOTAL_RAWMALLOCED_MEMORY)
+        assert raw > 0
+        assert gc.get_stats(rgc.PEAK_RAWMALLOCED_MEMORY) >= raw
+        arena_used = gc.get_stats(rgc.TOTAL_ARENA_MEMORY_USED)
+        assert arena_used > 0
+        assert gc.get_stats(rgc.TOTAL_ARENA_MEMORY) >= arena_used
+        assert gc.get_stats(rgc.TOTAL_MEMORY) == arena_used + raw
+        assert gc.get_stats(rgc.PEAK_MEMORY) >= arena_used + raw
+        #
+        del self.stackroots[:]
+        gc.collect()
+        assert gc.get_stats(rgc.NUM_MAJOR_COLLECTIONS) > num_major
+        assert gc.get_stats(rgc.TOTAL_RAWMALLOCED_MEMORY) == 0
+        assert gc.get_stats(rgc.PEAK_RAWMALLOCED_MEMORY) >= raw
+        assert gc.get_stats(rgc.TOTAL_MEMORY) == 0
+        assert gc.get_stats(rgc.PEAK_MEMORY) >= arena_used + raw
+        assert gc.get_stats(rgc.PEAK_ARENA_MEMORY) >= arena_used
+        assert gc.get_stats(rgc.TOTAL_GC_TIME) >= 0
+        assert gc.get_stats(-1) == -1
+
+    def test_paced_step_size(self):
+        gc = self.gc
+        gc.max_pause = 0.002
+        assert gc.paced_step_size(0.0, 1000, 10) == 1000    # no rate yet
+        assert gc.paced_step_size(1e6, 1000, 10) == 2000
+        assert gc.paced_step_size(1e4, 1000, 10) == 20
+        assert gc.paced_step_size(1e3, 1000, 10) == 10      # minimum
+        # if the major collection is late, do at least the default work
+        gc.size_objects_made_old = gc.threshold_objects_made_old + 1
+        assert gc.paced_step_size(1e4, 1000, 10) == 1000
+        assert gc.paced_step_size(1e6, 1000, 10) == 2000
+
+    def test_update_rate(self):
+        gc = self.gc
+        assert gc.update_rate(0.0, 100, 0.5) == 200.0
+        assert gc.update_rate(200.0, 100, 0.25) == 300.0
+        assert gc.update_rate(200.0, 0, 0.25) == 200.0
+        assert gc.update_rate(200.0, 100, 0.0) == 200.0
+
+    def test_release_pages_from_env(self, monkeypatch):
+        from rpython.config.translationoption import (
+            get_combined_translation_config)
+        config = get_combined_translation_config(translating=True).translation
+        def make_gc():
+            gc = self.GCClass(config, read_from_env=True,
+                              translated_to_c=False)
+            gc.set_root_walker(self.rootwalker)
+            gc.setup()
+            return gc
+        monkeypatch.delenv('PYPY_GC_RELEASE_PAGES', raising=False)
+        monkeypatch.delenv('PYPY_GC_MAJOR_COLLECT', raising=False)
+        gc = make_gc()
+        assert gc.release_pages == gc.major_collection_threshold - 1.0
+        # an explicit 0 means "release all the free pages"
+        monkeypatch.setenv('PYPY_GC_RELEASE_PAGES', '0')
+        assert make_gc().release_pages == 0.0
+        monkeypatch.setenv('PYPY_GC_RELEASE_PAGES', '-1')
+        assert make_gc().release_pages == -1.0
+
+    def test_max_pause(self, monkeypatch):
+        class FakeTime(object):
+            # every call to monotonic_time() takes 1ms
+            now = 0.0
+            def __call__(self):
+                self.now += 0.001
+                return self.now
+        monkeypatch.setattr(incminimark, 'monotonic_time', FakeTime())
+        gc = self.gc
+        gc.max_pause = 0.002
+        steps = []
+        orig_visit_all_objects_step = gc.visit_all_objects_step
+        def visit_all_objects_step(size_to_track):
+            if size_to_track != sys.maxint:
+                steps.append(size_to_track)
+            return orig_visit_all_objects_step(size_to_track)
+        gc.visit_all_objects_step = visit_all_objects_step
+        for i in range(200):
+            self.stackroots.append(self.malloc(S))
+        gc.collect()
+        # the first step is not paced yet; the next ones are sized from
+        # the throughput of the previous ones, to last 2ms instead of 1ms
+        assert len(steps) >= 3
+        assert steps[0] == gc.gc_increment_step
+        assert steps[0] < steps[1] < steps[0] * 3
+        assert gc.mark_rate > 0.0
+        #
+        del self.stackroots[:]
+        gc.collect()
+        if not gc.sweep_thread:     # else, not measured in this thread
+            assert gc.sweep_rate > 0.0
+
+    def test_monotonic_time(self):
+        t1 = incminimark.monotonic_time()
+        t2 = incminimark.monotonic_time()
+        assert 0.0 <= t2 - t1 < 10.0
+
+    def test_collect_step(self):
+        from rpython.rlib import rgc
+        gc = self.gc
+        for i in range(100):
+            self.stackroots.append(self.malloc(S))
+        num_major = gc.num_major_collects
+        states = gc.collect_step(0.0)
+        assert rgc.old_state(states) == incminimark.STATE_SCANNING
+        assert rgc.new_state(states) == incminimark.STATE_MARKING
+        assert gc.gc_state == incminimark.STATE_MARKING
+        states = gc.collect_step(1000.0)
+        assert rgc.old_state(states) == incminimark.STATE_MARKING
+        assert rgc.new_state(states) == incminimark.STATE_SCANNING
+        assert gc.num_major_collects == num_major + 1
+
+    def test_compute_nursery_size(self):
+        gc = self.gc
+        gc.nursery_base_size = 1000
+        gc.nursery_smallest_size = 200
+        gc.nursery_alloc_size = 3000
+        gc.nursery_size = 1000
+        assert gc.compute_nursery_size(1000, 500, 0.001) == 2000
+        assert gc.compute_nursery_size(400, 200, 0.001) == 1000  # not full
+        assert gc.compute_nursery_size(1000, 50, 0.001) == 1000
+        gc.nursery_size = 2000
+        assert gc.compute_nursery_size(2000, 1000, 0.001) == 3000  # bound
+        assert gc.compute_nursery_size(2000, 100, 0.001) == 2000
+        assert gc.compute_nursery_size(2000, 20, 0.001) == 1000
+        gc.nursery_size = 1000
+        assert gc.compute_nursery_size(1000, 10, 0.001) == 1000
+        # with PYPY_GC_MAX_PAUSE, the minor collections that are too slow
+        # make the nursery shrink, and the nursery doesn't grow again
+        # unless they are fast enough
+        gc.max_pause = 0.002
+        assert gc.compute_nursery_size(1000, 10, 0.003) == 496
+        assert gc.compute_nursery_size(1000, 500, 0.0015) == 1000
+        gc.nursery_size = 400
+        assert gc.compute_nursery_size(400, 300, 0.003) == 200
+        assert gc.compute_nursery_size(400, 10, 0.0015) == 400
+        assert gc.compute_nursery_size(400, 10, 0.0005) == 800
+
+    def test_adaptive_nursery(self):
+        from rpython.rlib import rgc
+        gc = self.gc
+        assert gc.adaptive_nursery
+        assert gc.nursery_size == gc.nursery_base_size == 32*WORD
+        # all the objects survive: the nursery grows up to its maximum
+        for i in range(100):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        assert gc.nursery_size == 128*WORD
+        assert gc.get_stats(rgc.NURSERY_SIZE) == 128*WORD
+        for i in range(100):
+            assert self.stackroots[i].x == i
+        # no object survives: it goes back to its initial size
+        for i in range(200):
+            self.malloc(S)
+        assert gc.nursery_size == 32*WORD
+    test_adaptive_nursery.GC_PARAMS = {'nursery_max_size': 128*WORD}
+
 class TestIncrementalMiniMarkGCFull(DirectGCTest):
     from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
     def test_malloc_fixedsize_no_cleanup(self):
@@ -708,6 +878,32 @@ class TestIncrementalMiniMarkGCFull(DirectGCTest):
                 p1[i]._free()
             p1._free()
 
+    def test_release_free_arena_pages(self):
+        from rpython.rlib import rgc
+        for i in range(60):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        self.gc.collect()
+        assert self.gc.get_stats(rgc.RELEASED_ARENA_MEMORY) == 0
+        # keep one object out of ten: most pages become free
+        self.stackroots[:] = self.stackroots[::10]
+        self.gc.collect()
+        released = self.gc.get_stats(rgc.RELEASED_ARENA_MEMORY)
+        assert released > 0
+        assert released % self.gc.ac.page_size == 0
+        assert released <= self.gc.get_stats(rgc.TOTAL_ARENA_MEMORY)
+        # the released pages are used again
+        for i in range(60):
+            p = self.malloc(S)
+            p.x = 1000 + i
+            self.stackroots.append(p)
+        self.gc.collect()
+        assert self.gc.get_stats(rgc.RELEASED_ARENA_MEMORY) < released
+        assert [p.x for p in self.stackroots] == (
+            range(0, 60, 10) + range(1000, 1060))
+    test_release_free_arena_pages.GC_PARAMS = {'release_pages': 0.0}
+
     def test_malloc_struct_of_ptr_struct(self):
         S3 = lltype.GcForwardReference()
         S3.become(lltype.GcStruct('S3',
@@ -0,0 +1,163 @@
+from rpython.rtyper.lltypesystem import lltype, llmemory, llgroup, rffi
+from rpython.memory.gc.hook import GcHooks
+from rpython.memory.gc import incminimark
+from test_direct import BaseDirectGCTest, S
+
+VAR_BIG = lltype.GcArray(lltype.Signed)
+
+class MyGcHooks(GcHooks):
+
+    alloc_sample_interval = 0
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.minors = []
+        self.steps = []
+        self.collects = []
+        self.samples = []
+
+    def is_gc_minor_enabled(self):
+        return True
+
+    def is_gc_collect_step_enabled(self):
+        return True
+
+    def is_gc_collect_enabled(self):
+        return True
+
+    def on_gc_minor(self, duration, total_memory_used, bytes_promoted,
+                    pinned_objects):
+        assert duration >= 0.0
+        self.minors.append({
+            'total_memory_used': total_memory_used,
+            'bytes_promoted': bytes_promoted,
+            'pinned_objects': pinned_objects})
+
+    def on_gc_collect_step(self, duration, oldstate, newstate):
+        assert duration >= 0.0
+        self.steps.append((oldstate, newstate))
+
+    def on_gc_collect(self, num_major_collects,
+                      arena_bytes_before, arena_bytes_after,
+                      rawmalloc_bytes_before, rawmalloc_bytes_after):
+        self.collects.append({
+            'num_major_collects': num_major_collects,
+            'arena_bytes_before': arena_bytes_before,
+            'arena_bytes_after': arena_bytes_after,
+            'rawmalloc_bytes_before': rawmalloc_bytes_before,
+            'rawmalloc_bytes_after': rawmalloc_bytes_after})
+
+    def get_alloc_sample_interval(self):
+        return self.alloc_sample_interval
+
+    def on_gc_alloc_sample(self, typeid, size):
+        self.samples.append((typeid, size))
+
+
+class TestIncMiniMarkHooks(BaseDirectGCTest):
+    from rpython.memory.gc.incminimark import IncrementalMiniMarkGC \
+                                              as GCClass
+
+    def setup_method(self, meth):
+        BaseDirectGCTest.setup_method(self, meth)
+        self.gc.hooks = MyGcHooks()
+
+    def test_default_hooks(self):
+        gc = self.GCClass(self.gc.config, translated_to_c=False)
+        assert type(gc.hooks) is GcHooks
+
+    def test_on_gc_minor(self):
+        self.stackroots.append(self.malloc(S))
+        self.gc._minor_collection()
+        [minor] = self.gc.hooks.minors
+        assert minor['bytes_promoted'] > 0
+        assert minor['total_memory_used'] == self.gc.get_total_memory_used()
+        assert minor['pinned_objects'] == 0
+        #
+        self.gc.hooks.reset()
+        self.gc._minor_collection()
+        [minor] = self.gc.hooks.minors
+        assert minor['bytes_promoted'] == 0
+
+    def test_on_gc_collect(self):
+        self.stackroots.append(self.malloc(S))
+        self.stackroots.append(self.malloc(S))
+        self.stackroots.append(self.malloc(VAR_BIG, 100))
+        self.gc._minor_collection()
+        del self.stackroots[1:]     # now old objects, freed by collect()
+        self.gc.hooks.reset()
+        self.gc.collect()
+        hooks = self.gc.hooks
+        assert len(hooks.minors) >= 1
+        states = [oldstate for (oldstate, newstate) in hooks.steps]
+        assert states[0] == incminimark.STATE_SCANNING
+        for (oldstate, newstate), (next_old, next_new) in zip(hooks.steps,
+                                                            hooks.steps[1:]):
+            assert newstate == next_old
+        assert hooks.steps[-1][1] == incminimark.STATE_SCANNING
+        [collect] = hooks.collects
+        assert collect['num_major_collects'] == self.gc.num_major_collects
+        assert collect['arena_bytes_before'] > collect['arena_bytes_after']
+        assert collect['arena_bytes_after'] > 0
+        assert collect['rawmalloc_bytes_before'] > 0
+        assert collect['rawmalloc_bytes_after'] == 0
+
+
+    def test_on_gc_alloc_sample(self):
+        gc = self.gc
+        hooks = gc.hooks
+        for i in range(30):
+            self.malloc(S)
+        assert hooks.samples == []      # disabled
+        #
+        interval = 10 * llmemory.raw_malloc_usage(
+            llmemory.sizeof(lltype.Signed))
+        hooks.alloc_sample_interval = interval
+        gc._minor_collection()
+        for i in range(30):
+            self.malloc(S)
+        typeid = self.get_type_id(S)
+        size = llmemory.raw_malloc_usage(gc.gcheaderbuilder.size_gc_header +
+                                         llmemory.sizeof(S))
+        expected = 30 // (interval // size + 1)
+        assert expected > 0
+        assert hooks.samples == [(gc.get_member_index(typeid), size)] * expected
+        #
+        del hooks.samples[:]
+        self.malloc(VAR_BIG, 1000)      # external_malloc()
+        [(typeid, size)] = hooks.samples
+        assert typeid == gc.get_member_index(self.get_type_id(VAR_BIG))
+        assert size > 1000
+        #
+        hooks.alloc_sample_interval = 0
+        gc._minor_collection()
+        del hooks.samples[:]
+        for i in range(30):
+            self.malloc(S)
+        assert hooks.samples == []
+        assert gc.nursery_top == gc.nursery + gc.nursery_size
+
+    def test_on_gc_alloc_sample_jit_typeid_0(self, monkeypatch):
+        # the JIT's malloc_nursery_slowpath() calls malloc_fixedsize()
+        # with a typeid of 0, and writes the real one afterwards
+        gc = self.gc
+        hooks = gc.hooks
+        # untranslated, combine() only accepts real typeids
+        orig_combine = gc.combine
+        def combine(typeid, flags):
+            if isinstance(typeid, llgroup.GroupMemberOffset):
+                return orig_combine(typeid, flags)
+            assert typeid == 0
+            return flags
+        monkeypatch.setattr(gc, 'combine', combine)
+        size = llmemory.raw_malloc_usage(gc.gcheaderbuilder.size_gc_header +
+                                         llmemory.sizeof(S))
+        hooks.alloc_sample_interval = 3 * size
+        gc._minor_collection()
+        typeid = rffi.cast(llgroup.HALFWORD, 0)
+        for i in range(10):
+            gc.malloc_fixedsize(typeid, llmemory.sizeof(S))
+        assert len(hooks.samples) > 0
+        assert hooks.samples == [(0, size)] * len(hooks.samples)
@@ -1,7 +1,7 @@
 import py
 from rpython.memory.gc.minimarkpage import ArenaCollection
 from rpython.memory.gc.minimarkpage import PAGE_HEADER, PAGE_PTR
-from rpython.memory.gc.minimarkpage import PAGE_NULL, WORD
+from rpython.memory.gc.minimarkpage import PAGE_NULL, ARENA_NULL, WORD
 from rpython.memory.gc.minimarkpage import _dummy_size
 from rpython.rtyper.lltypesystem import lltype, llmemory, llarena
 from rpython.rtyper.lltypesystem.llmemory import cast_ptr_to_adr
@@ -174,6 +174,42 @@ def test_simple_arena_collection():
     page = ac.allocate_new_page(7); checkpage(ac, page, 9)
     assert not ac.current_arena and ac.num_uninitialized_pages == 0
 
+def test_release_free_pages():
+    pagesize = hdrsize + 16
+    ac = arena_collection_for_test(pagesize, "##....#   ")
+    #
+    assert ac.release_free_pages(4 * pagesize) == 0
+    assert ac.release_free_pages(pagesize + 5) == 3 * pagesize
+    assert ac.total_memory_released == 3 * pagesize
+    assert ac.current_arena.nfreepages == 4
+    assert ac.current_arena.nreleasedpages == 3
+    assert freepages(ac) == pagenum(ac, 5)
+    assert ac.release_free_pages(pagesize) == 0
+    #
+    page = ac.allocate_new_page(1); checkpage(ac, page, 5)
+    assert freepages(ac) == pagenum(ac, 7)
+    page = ac.allocate_new_page(2); checkpage(ac, page, 4)
+    page = ac.allocate_new_page(3); checkpage(ac, page, 3)
+    assert ac.total_memory_released == pagesize
+    page = ac.allocate_new_page(4); checkpage(ac, page, 2)
+    assert ac.total_memory_released == 0
+    assert ac.current_arena.nfreepages == 0
+    assert freepages(ac) == pagenum(ac, 7) and ac.num_uninitialized_pages == 3
+    page = ac.allocate_new_page(5); checkpage(ac, page, 7)
+
+def test_release_free_pages_whole_arena():
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "2..", fill_with_objects=2)
+    assert ac.release_free_pages(0) == 2 * pagesize
+    arena = ac.current_arena
+    ac.current_arena = ARENA_NULL
+    arena.nextarena = ARENA_NULL
+    ac.arenas_lists[arena.nfreepages] = arena
+    ac.mass_free(OkToFree(ac, True))
+    # the arena is freed, with its released pages
+    assert ac.total_memory_released == 0
+    assert ac.total_memory_alloced == 0
+
 
 def chkob(ac, num_page, pos_obj, obj):
     pageaddr = pagenum(ac, num_page)
@@ -472,6 +508,12 @@ def test_random(incremental=False):
             assert not (set(live_objects) & set(live_objects_extra))
             live_objects.update(live_objects_extra)
             #
+            # Sometimes give back some free pages to the OS
+            if random.random() < 0.3:
+                ac.release_free_pages(random.randrange(0, 3) * pagesize)
+            released = sum([a.nreleasedpages for a in ac._all_arenas()])
+            assert ac.total_memory_released == released * pagesize
+            #
     except DoneTesting:
         pass
 
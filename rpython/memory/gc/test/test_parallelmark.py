@@ -0,0 +1,177 @@
+from rpython.rtyper.lltypesystem import lltype, llmemory
+from rpython.memory.gc import incminimark, parallelmark
+from test_direct import S, VAR, WORD
+import test_direct, test_object_pinning
+
+
+class ParallelMarkGC(incminimark.IncrementalMiniMarkGC):
+    # start the workers and share the work as soon as possible in the tests
+    PARALLEL_MARK_MIN_OBJECTS = 1
+    PARALLEL_MARK_BATCH_SIZE = 64
+
+
+class TestParallelMark(test_direct.TestIncrementalMiniMarkGCSimple):
+    # runs all the direct tests with the parallel marking, which is
+    # emulated by interleaving the workers
+    GCClass = ParallelMarkGC
+    GC_PARAMS = test_direct.TestIncrementalMiniMarkGCSimple.GC_PARAMS.copy()
+    GC_PARAMS['mark_workers'] = 4
+
+    def setup_method(self, meth):
+        test_direct.TestIncrementalMiniMarkGCSimple.setup_method(self, meth)
+        self.refills = []
+        orig_refill = self.gc._pm_refill
+        def _pm_refill(worker):
+            result = orig_refill(worker)
+            if result:
+                self.refills.append(worker)
+            return result
+        self.gc._pm_refill = _pm_refill
+
+    def make_tree(self, depth):
+        root = self.malloc(S)
+        if depth > 0:
+            self.stackroots.append(root)
+            prev = self.make_tree(depth - 1)
+            root = self.stackroots[-1]
+            self.write(root, 'prev', prev)
+            next = self.make_tree(depth - 1)
+            root = self.stackroots.pop()
+            self.write(root, 'next', next)
+        root.x = depth
+        return root
+
+    def check_tree(self, root, depth):
+        assert root.x == depth
+        count = 1
+        if depth > 0:
+            count += self.check_tree(root.prev, depth - 1)
+            count += self.check_tree(root.next, depth - 1)
+        return count
+
+    def test_setup(self):
+        workers = []
+        worker = self.gc.pm_workers
+        while worker:
+            workers.append(worker)
+            worker = worker.next
+        assert len(workers) == 4
+        assert not self.gc.pm_threaded      # not translated
+
+    def test_tree(self):
+        self.stackroots.append(self.make_tree(8))
+        self.gc.collect()
+        assert self.check_tree(self.stackroots[0], 8) == 511
+        assert len(set(self.refills)) == 4   # all workers got some work
+        worker = self.gc.pm_workers
+        while worker:
+            assert worker.count == 0
+            worker = worker.next
+
+    def test_garbage_freed(self):
+        self.stackroots.append(self.make_tree(6))
+        self.make_tree(6)     # garbage
+        self.gc.collect()
+        used = self.gc.get_total_memory_used()
+        self.stackroots.pop()
+        self.gc.collect()
+        assert self.gc.get_total_memory_used() < used
+        assert self.gc.get_total_memory_used() == 0
+
+    def test_overflow_private_stack(self):
+        n = parallelmark.LOCAL_SIZE + 100
+        a = self.malloc(VAR, n)
+        self.stackroots.append(a)
+        for i in range(n):
+            s = self.malloc(S)
+            s.x = i
+            a = self.stackroots[0]
+            self.writearray(a, i, s)
+        self.gc.collect()
+        a = self.stackroots[0]
+        for i in range(n):
+            assert a[i].x == i
+    test_overflow_private_stack.GC_PARAMS = {'nursery_size': 8192 * WORD}
+
+    def test_step_budget(self):
+        self.stackroots.append(self.make_tree(8))
+        self.gc.debug_gc_step_until(incminimark.STATE_MARKING)
+        gc = self.gc
+        # stop after some objects, which are all flushed back to
+        # 'objects_to_trace'
+        remaining = gc.parallel_visit_all_objects_step(
+            20 * llmemory.raw_malloc_usage(llmemory.sizeof(S)))
+        assert remaining == 0
+        assert gc.objects_to_trace.non_empty()
+        worker = gc.pm_workers
+        while worker:
+            assert worker.count == 0
+            assert worker.shared_count == 0
+            assert worker.size_marked == 0
+            worker = worker.next
+        gc.debug_gc_step_until(incminimark.STATE_SCANNING)
+        assert self.check_tree(self.stackroots[0], 8) == 511
+
+    def test_steal(self):
+        steals = []
+        orig_steal = self.gc._pm_steal
+        def _pm_steal(worker):
+            result = orig_steal(worker)
+            if result:
+                steals.append(worker)
+            return result
+        self.gc._pm_steal = _pm_steal
+        self.stackroots.append(self.make_tree(8))
+        self.gc.collect()
+        assert self.check_tree(self.stackroots[0], 8) == 511
+        # the other workers steal from the deques of the busy ones
+        assert len(steals) > 0
+        worker = self.gc.pm_workers
+        while worker:
+            assert worker.shared_count == 0
+            worker = worker.next
+
+    def test_visited_race_counted_once(self, monkeypatch):
+        # another worker sets GCFLAG_VISITED between the check and the
+        # atomic operation: the object is neither traced nor counted again
+        gc = self.gc
+        root = self.make_tree(1)
+        self.stackroots.append(root)
+        gc.collect()
+        root = self.stackroots[0]
+        obj = llmemory.cast_ptr_to_adr(root)
+        hdr = gc.header(obj)
+        hdr.tid &= ~incminimark.GCFLAG_VISITED
+        def set_flags_atomically(hdr, flags):
+            oldtid = hdr.tid | incminimark.GCFLAG_VISITED
+            hdr.tid |= flags
+            return oldtid
+        monkeypatch.setattr(parallelmark, 'set_flags_atomically',
+                            set_flags_atomically)
+        worker = gc.pm_workers
+        assert gc._pm_visit(obj, worker) == 0
+        assert worker.count == 0
+        monkeypatch.undo()
+        hdr.tid &= ~incminimark.GCFLAG_VISITED
+        assert gc._pm_visit(obj, worker) > 0
+        assert worker.count == 2      # 'prev' and 'next'
+        worker.count = 0
+
+    def test_after_fork(self):
+        self.gc.pm_helpers = 3
+        self.gc.after_fork(1234)      # parent
+        assert self.gc.pm_helpers == 3
+        self.gc.after_fork(0)         # child: no helper thread any more
+        assert self.gc.pm_helpers == 0
+
+    def test_single_worker(self):
+        self.gc.mark_workers = 1
+        self.stackroots.append(self.make_tree(6))
+        self.gc.collect()
+        assert self.check_tree(self.stackroots[0], 6) == 127
+        assert self.refills == []
+
+
+class TestParallelMarkPinning(test_object_pinning.TestIncminimark):
+    GCClass = ParallelMarkGC
+    GC_PARAMS = {'mark_workers': 3}
@@ -0,0 +1,124 @@
+import sys
+from rpython.rtyper.lltypesystem import llmemory
+from rpython.rlib.rarithmetic import r_uint
+from rpython.memory.gc import incminimark
+from test_direct import S, VAR
+import test_direct
+
+
+class TestSweepThread(test_direct.TestIncrementalMiniMarkGCSimple):
+    # runs all the direct tests with the background sweeping, which is
+    # emulated by sweeping a few pages whenever the GC would wait for
+    # the helper thread
+    GC_PARAMS = test_direct.TestIncrementalMiniMarkGCSimple.GC_PARAMS.copy()
+    GC_PARAMS['sweep_thread'] = True
+
+
+class TestSweepThreadFull(test_direct.TestIncrementalMiniMarkGCFull):
+    GC_PARAMS = {'sweep_thread': True}
+
+    def setup_method(self, meth):
+        test_direct.TestIncrementalMiniMarkGCFull.setup_method(self, meth)
+        self.sweeps = []
+        orig_mass_free_incremental = self.gc.ac.mass_free_incremental
+        def mass_free_incremental(ok_to_free_func, max_pages):
+            self.sweeps.append(max_pages)
+            return orig_mass_free_incremental(ok_to_free_func, max_pages)
+        self.gc.ac.mass_free_incremental = mass_free_incremental
+
+    def test_setup(self):
+        assert self.gc.sweep_thread
+        assert not self.gc.bs_lock      # not translated
+        assert not self.gc.bs_running
+
+    def test_sweep_in_background(self):
+        gc = self.gc
+        for i in range(30):
+            self.stackroots.append(self.malloc(S))
+        gc.collect()
+        used = gc.get_total_memory_used()
+        del self.stackroots[10:]
+        gc.debug_gc_step_until(incminimark.STATE_SWEEPING)
+        assert gc.bs_running
+        del self.sweeps[:]
+        while gc.gc_state == incminimark.STATE_SWEEPING:
+            gc.minor_collection_with_major_progress()
+        # all the pages were swept by the "helper thread"
+        assert self.sweeps
+        assert set(self.sweeps) == set([gc.TEST_SWEEP_THREAD_QUANTUM])
+        assert not gc.bs_running
+        assert gc.get_total_memory_used() == used // 3
+
+    def test_help_when_late(self):
+        gc = self.gc
+        for i in range(30):
+            self.stackroots.append(self.malloc(S))
+        gc.collect()
+        del self.stackroots[:]
+        gc.debug_gc_step_until(incminimark.STATE_SWEEPING)
+        del self.sweeps[:]
+        gc._minor_collection()
+        gc.size_objects_made_old = gc.threshold_objects_made_old + r_uint(
+            gc.nursery_size)
+        gc.major_collection_step()
+        limit = 3 * gc.nursery_size // gc.ac.page_size
+        quantum = gc.TEST_SWEEP_THREAD_QUANTUM
+        assert self.sweeps == [quantum, quantum, limit]
+
+    def test_collect_finishes_the_sweeping(self):
+        gc = self.gc
+        for i in range(30):
+            self.stackroots.append(self.malloc(S))
+        gc.collect()
+        del self.stackroots[:]
+        gc.debug_gc_step_until(incminimark.STATE_SWEEPING)
+        del self.sweeps[:]
+        gc.collect()
+        assert sys.maxint in self.sweeps
+        assert gc.get_total_memory_used() == 0
+
+    def test_stale_visited_flag(self):
+        gc = self.gc
+        self.stackroots.append(self.malloc(S))
+        gc.collect()
+        gc.debug_gc_step_until(incminimark.STATE_SWEEPING)
+        gc._bs_sweep_pages(sys.maxint)   # the helper thread sweeps all
+        obj = self.stackroots[0]
+        hdr = gc.header(llmemory.cast_ptr_to_adr(obj))
+        assert hdr.tid & incminimark.GCFLAG_VISITED == 0
+        # the write barrier runs at the same time as the helper thread
+        # clears GCFLAG_VISITED, and writes back the old flags
+        self.write(obj, 'next', self.malloc(S))
+        hdr.tid |= incminimark.GCFLAG_VISITED
+        gc.debug_gc_step_until(incminimark.STATE_SCANNING)
+        assert hdr.tid & incminimark.GCFLAG_VISITED == 0
+        assert not gc.bs_touched.non_empty()
+        #
+        self.stackroots[0].next.x = 42
+        gc.collect()
+        assert self.stackroots[0].next.x == 42
+
+    def test_stale_visited_flag_card_marking(self):
+        gc = self.gc
+        self.stackroots.append(self.malloc(VAR, gc.nonlarge_max + 1))
+        gc.collect()
+        gc.debug_gc_step_until(incminimark.STATE_SWEEPING)
+        gc._bs_sweep_pages(sys.maxint)   # the helper thread sweeps all
+        gc.free_unvisited_rawmalloc_objects_step(sys.maxint)
+        a = self.stackroots[0]
+        hdr = gc.header(llmemory.cast_ptr_to_adr(a))
+        assert hdr.tid & incminimark.GCFLAG_HAS_CARDS
+        assert hdr.tid & incminimark.GCFLAG_VISITED == 0
+        # the card-marking barrier writes back a stale GCFLAG_VISITED;
+        # the array is then only in 'old_objects_with_cards_set'
+        self.writearray(a, 5, self.malloc(S))
+        assert hdr.tid & incminimark.GCFLAG_CARDS_SET
+        hdr.tid |= incminimark.GCFLAG_VISITED
+        gc.debug_gc_step_until(incminimark.STATE_SCANNING)
+        assert hdr.tid & incminimark.GCFLAG_VISITED == 0
+        assert not gc.bs_touched.non_empty()
+        #
+        self.stackroots[0][5].x = 42
+        gc.collect()
+        assert self.stackroots[0][5].x == 42
+    test_stale_visited_flag_card_marking.GC_PARAMS = {"card_page_indices": 4}
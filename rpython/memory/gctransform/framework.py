@@ -162,7 +162,10 @@ class BaseFrameworkGCTransformer(GCTransformer):
         self.finalizer_queue_indexes = {}
         self.finalizer_handlers = []
 
-        gcdata.gc = GCClass(translator.config.translation, **GC_PARAMS)
+        # the GcHooks instance given by the target, if any
+        gchooks = getattr(translator, 'gchooks', None)
+        gcdata.gc = GCClass(translator.config.translation, hooks=gchooks,
+                            **GC_PARAMS)
         root_walker = self.build_root_walker()
         root_walker.finished_minor_collection_func = finished_minor_collection
         self.root_walker = root_walker
@@ -305,6 +308,8 @@ class BaseFrameworkGCTransformer(GCTransformer):
 
         self.collect_ptr = getfn(GCClass.collect.im_func,
             [s_gc, annmodel.SomeInteger()], annmodel.s_None)
+        self.collect_step_ptr = getfn(GCClass.collect_step.im_func,
+            [s_gc, annmodel.SomeFloat()], annmodel.SomeInteger())
         self.can_move_ptr = getfn(GCClass.can_move.im_func,
                                   [s_gc, SomeAddress()],
                                   annmodel.SomeBool())
@@ -458,6 +463,10 @@ class BaseFrameworkGCTransformer(GCTransformer):
                                            lltype.Array(llgroup.HALFWORD))),
                                        minimal_transform=False)
 
+        self.get_stats_ptr = getfn(GCClass.get_stats.im_func,
+                                   [s_gc, annmodel.SomeInteger()],
+                                   annmodel.SomeInteger())
+
         self.set_max_heap_size_ptr = getfn(GCClass.set_max_heap_size.im_func,
                                            [s_gc,
                                             annmodel.SomeInteger(nonneg=True)],
@@ -557,6 +566,16 @@ class BaseFrameworkGCTransformer(GCTransformer):
                                               [s_gc, SomeAddress()],
                                               SomeAddress())
 
+        self.before_fork_ptr = None
+        if hasattr(GCClass, 'before_fork'):
+            self.before_fork_ptr = getfn(GCClass.before_fork.im_func,
+                                         [s_gc], annmodel.s_None)
+        self.after_fork_ptr = None
+        if hasattr(GCClass, 'after_fork'):
+            self.after_fork_ptr = getfn(GCClass.after_fork.im_func,
+                                        [s_gc, annmodel.SomeInteger()],
+                                        annmodel.s_None)
+
 
     def create_custom_trace_funcs(self, gc, rtyper):
         custom_trace_funcs = tuple(rtyper.custom_trace_funcs)
@@ -854,6 +873,15 @@ class BaseFrameworkGCTransformer(GCTransformer):
                   resultvar=op.result)
         self.pop_roots(hop, livevars)
 
+    def gct_gc__collect_step(self, hop):
+        op = hop.spaceop
+        [v_max_duration] = op.args
+        livevars = self.push_roots(hop)
+        hop.genop("direct_call", [self.collect_step_ptr, self.c_const_gc,
+                                  v_max_duration],
+                  resultvar=op.result)
+        self.pop_roots(hop, livevars)
+
     def gct_gc_can_move(self, hop):
         op = hop.spaceop
         v_addr = hop.genop('cast_ptr_to_adr',
@@ -902,6 +930,12 @@ class BaseFrameworkGCTransformer(GCTransformer):
                   resultvar=op.result)
         self.pop_roots(hop, livevars)
 
+    def gct_gc_get_stats(self, hop):
+        [v_stat_no] = hop.spaceop.args
+        hop.genop("direct_call",
+                  [self.get_stats_ptr, self.c_const_gc, v_stat_no],
+                  resultvar=hop.spaceop.result)
+
     def gct_get_member_index(self, hop):
         op = hop.spaceop
         v_typeid = op.args[0]
@@ -1195,6 +1229,8 @@ class BaseFrameworkGCTransformer(GCTransformer):
         hop.rename("gc_thread_die")     # keep it around for c/gc.py
 
     def gct_gc_thread_before_fork(self, hop):
+        if self.before_fork_ptr is not None:
+            hop.genop("direct_call", [self.before_fork_ptr, self.c_const_gc])
         if (self.translator.config.translation.thread
             and hasattr(self.root_walker, 'thread_before_fork_ptr')):
             hop.genop("direct_call", [self.root_walker.thread_before_fork_ptr],
@@ -1205,6 +1241,9 @@ class BaseFrameworkGCTransformer(GCTransformer):
                       resultvar=hop.spaceop.result)
 
     def gct_gc_thread_after_fork(self, hop):
+        if self.after_fork_ptr is not None:
+            hop.genop("direct_call", [self.after_fork_ptr, self.c_const_gc,
+                                      hop.spaceop.args[0]])
         if (self.translator.config.translation.thread
             and hasattr(self.root_walker, 'thread_after_fork_ptr')):
             livevars = self.push_roots(hop)
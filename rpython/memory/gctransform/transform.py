@@ -374,6 +374,17 @@ class BaseGCTransformer(object):
         return hop.cast_result(rmodel.inputconst(lltype.Ptr(ARRAY_TYPEID_MAP),
                                         lltype.nullptr(ARRAY_TYPEID_MAP)))
 
+    def gct_gc_get_stats(self, hop):
+        # not provided by this GC
+        return hop.cast_result(rmodel.inputconst(lltype.Signed, -1))
+
+    def gct_gc__collect_step(self, hop):
+        # this GC is not incremental: do a full collection
+        from rpython.rlib.rgc import encode_states
+        hop.genop('gc__collect', [])
+        return hop.cast_result(rmodel.inputconst(lltype.Signed,
+                                                 encode_states(0, 0)))
+
     def get_prebuilt_hash(self, obj):
         return None
 
@@ -87,6 +87,9 @@ class GCManagedHeap(object):
         if hasattr(self.gc, 'raw_malloc_memory_pressure'):
             self.gc.raw_malloc_memory_pressure(size)
 
+    def get_stats(self, stat_no):
+        return self.gc.get_stats(stat_no)
+
     def shrink_array(self, p, smallersize):
         if hasattr(self.gc, 'shrink_array'):
             addr = llmemory.cast_ptr_to_adr(p)
@@ -135,6 +138,9 @@ class GCManagedHeap(object):
     def collect(self, *gen):
         self.gc.collect(*gen)
 
+    def collect_step(self, max_duration):
+        return self.gc.collect_step(max_duration)
+
     def can_move(self, addr):
         return self.gc.can_move(addr)
 
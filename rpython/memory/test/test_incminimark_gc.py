@@ -91,3 +91,44 @@ class TestIncrementalMiniMarkGC(test_minimark_gc.TestMiniMarkGC):
             return ref() is b
         res = self.interpret(f, [])
         assert res == True
+
+    def test_get_stats(self):
+        class A(object):
+            pass
+        def f():
+            lst = [A() for i in range(100)]
+            llop.gc__collect(lltype.Void)
+            num_minor = rgc.get_stats(rgc.NUM_MINOR_COLLECTIONS)
+            num_major = rgc.get_stats(rgc.NUM_MAJOR_COLLECTIONS)
+            assert num_minor >= 1
+            assert num_major >= 1
+            assert rgc.get_stats(rgc.TOTAL_MEMORY) > 0
+            assert rgc.get_stats(rgc.PEAK_MEMORY) > 0
+            assert rgc.get_stats(rgc.NURSERY_SIZE) > 0
+            assert rgc.get_stats(rgc.PINNED_OBJECTS) == 0
+            assert rgc.get_stats(rgc.TOTAL_GC_TIME) >= 0
+            llop.gc__collect(lltype.Void, 0)
+            assert rgc.get_stats(rgc.NUM_MINOR_COLLECTIONS) == num_minor + 1
+            assert rgc.get_stats(rgc.NUM_MAJOR_COLLECTIONS) == num_major
+            assert rgc.get_stats(12345) == -1
+            return len(lst)
+        res = self.interpret(f, [])
+        assert res == 100
+
+    def test_collect_step(self):
+        from rpython.memory.gc import incminimark
+        class A(object):
+            pass
+        def f():
+            lst = [A() for i in range(100)]
+            llop.gc__collect(lltype.Void)      # no major collection running
+            num_major = rgc.get_stats(rgc.NUM_MAJOR_COLLECTIONS)
+            states = rgc.collect_step()
+            assert rgc.old_state(states) == incminimark.STATE_SCANNING
+            assert rgc.new_state(states) != incminimark.STATE_SCANNING
+            states = rgc.collect_step(1000.0)
+            assert rgc.new_state(states) == incminimark.STATE_SCANNING
+            assert rgc.get_stats(rgc.NUM_MAJOR_COLLECTIONS) == num_major + 1
+            return len(lst)
+        res = self.interpret(f, [])
+        assert res == 100
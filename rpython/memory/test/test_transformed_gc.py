@@ -1438,6 +1438,42 @@ class TestIncrementalMiniMarkGC(TestMiniMarkGC):
         res = run([])
         assert res
 
+    def define_get_stats(cls):
+        S = lltype.GcStruct('S', ('x', lltype.Signed))
+        def f():
+            num_minor = rgc.get_stats(rgc.NUM_MINOR_COLLECTIONS)
+            lst = [lltype.malloc(S) for i in range(50)]
+            llop.gc__collect(lltype.Void, 0)
+            return (rgc.get_stats(rgc.NUM_MINOR_COLLECTIONS) > num_minor and
+                    rgc.get_stats(rgc.TOTAL_MEMORY) > 0 and
+                    rgc.get_stats(rgc.NURSERY_SIZE) == 32*WORD and
+                    len(lst) == 50)
+        return f
+
+    def test_get_stats(self):
+        run = self.runner("get_stats")
+        res = run([])
+        assert res
+
+    def define_collect_step(cls):
+        S = lltype.GcStruct('S', ('x', lltype.Signed))
+        def f():
+            lst = [lltype.malloc(S) for i in range(50)]
+            llop.gc__collect(lltype.Void)      # no major collection running
+            num_major = rgc.get_stats(rgc.NUM_MAJOR_COLLECTIONS)
+            states = rgc.collect_step()
+            started = rgc.old_state(states) == 0 and rgc.new_state(states) != 0
+            states = rgc.collect_step(1000.0)
+            return (started and rgc.new_state(states) == 0 and
+                    rgc.get_stats(rgc.NUM_MAJOR_COLLECTIONS) == num_major + 1
+                    and len(lst) == 50)
+        return f
+
+    def test_collect_step(self):
+        run = self.runner("collect_step")
+        res = run([])
+        assert res
+
 # ________________________________________________________________
 # tagged pointers
 
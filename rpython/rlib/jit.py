@@ -542,9 +542,11 @@ PARAMETER_DOCS = {
     'function_threshold': 'number of times a function must run for it to become traced from start',
     'trace_eagerness': 'number of times a guard has to fail before we start compiling a bridge',
     'decay': 'amount to regularly decay counters by (0=none, 1000=max)',
-    'trace_limit': 'number of recorded operations before we abort tracing with ABORT_TOO_LONG',
+    'trace_limit': 'number of recorded operations before we abort tracing with ABORT_TOO_LONG; a function that is too long by itself is then compiled in several segments',
     'inlining': 'inline python functions or not (1/0)',
     'loop_longevity': 'a parameter controlling how long loops will be kept before being freed, an estimate',
+    'loop_memory_limit': 'maximum memory for the machine code and resume data of the loops, in KB; the least recently used loops are freed above it (0=no limit)',
+    'guard_stats': 'count the failures of each guard of the loops compiled from now on, for get_guard_stats() (0/1)',
     'retrace_limit': 'how many times we can try retracing before giving up',
     'max_retrace_guards': 'number of extra guards a retrace can cause',
     'max_unroll_loops': 'number of extra unrollings a loop can cause',
@@ -566,6 +568,8 @@ PARAMETERS = {'threshold': 1039, # just above 1024, prime
               'trace_limit': 6000,
               'inlining': 1,
               'loop_longevity': 1000,
+              'loop_memory_limit': 0,
+              'guard_stats': 0,
               'retrace_limit': 0,
               'max_retrace_guards': 15,
               'max_unroll_loops': 0,
@@ -1309,6 +1313,7 @@ class Counters(object):
     ABORT_BAD_LOOP
     ABORT_ESCAPE
     ABORT_FORCE_QUASIIMMUT
+    TRACE_SEGMENTS
     NVIRTUALS
     NVHOLES
     NVREUSED
@@ -4,7 +4,7 @@ from rpython.rlib.objectmodel import specialize
 from rpython.rtyper.annlowlevel import (cast_instance_to_base_ptr,
     cast_base_ptr_to_instance, llstr)
 from rpython.rtyper.extregistry import ExtRegistryEntry
-from rpython.rtyper.lltypesystem import llmemory, lltype
+from rpython.rtyper.lltypesystem import llmemory, lltype, rstr
 from rpython.flowspace.model import Constant
 from rpython.rtyper import rclass
 
@@ -129,6 +129,19 @@ LOOP_RUN_CONTAINER = lltype.GcArray(lltype.Struct('elem',
 def stats_get_loop_run_times(warmrunnerdesc):
     return warmrunnerdesc.metainterp_sd.cpu.get_all_loop_runs()
 
+GUARD_STATS_CONTAINER = lltype.GcArray(lltype.Struct('guard_stats',
+                                        ('loop', lltype.Signed),
+                                        ('guard', lltype.Signed),
+                                        ('fail_count', lltype.Signed),
+                                        ('has_bridge', lltype.Bool),
+                                        ('location', lltype.Ptr(rstr.STR))))
+
+@register_helper(lltype.Ptr(GUARD_STATS_CONTAINER))
+def stats_get_guard_stats(warmrunnerdesc):
+    from rpython.jit.metainterp.compile import get_guard_stats
+    return get_guard_stats(warmrunnerdesc.metainterp_sd,
+                           warmrunnerdesc.memory_manager.alive_loops)
+
 @register_helper(annmodel.SomeInteger(unsigned=True))
 def stats_asmmemmgr_allocated(warmrunnerdesc):
     return warmrunnerdesc.metainterp_sd.cpu.asmmemmgr.get_stats()[0]
@@ -137,6 +150,18 @@ def stats_asmmemmgr_allocated(warmrunnerdesc):
 def stats_asmmemmgr_used(warmrunnerdesc):
     return warmrunnerdesc.metainterp_sd.cpu.asmmemmgr.get_stats()[1]
 
+@register_helper(annmodel.SomeInteger())
+def stats_memmgr_loop_memory(warmrunnerdesc):
+    return warmrunnerdesc.memory_manager.total_memory
+
+@register_helper(annmodel.SomeInteger())
+def stats_memmgr_max_memory(warmrunnerdesc):
+    return warmrunnerdesc.memory_manager.max_memory
+
+@register_helper(annmodel.SomeInteger())
+def stats_memmgr_evicted_loops(warmrunnerdesc):
+    return warmrunnerdesc.memory_manager.evicted_loops
+
 # ---------------------- jitcell interface ----------------------
 
 def _new_hook(name, resulttype):
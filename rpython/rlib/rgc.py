@@ -124,6 +124,44 @@ class CollectEntry(ExtRegistryEntry):
             args_v = hop.inputargs(lltype.Signed)
         return hop.genop('gc__collect', args_v, resulttype=hop.r_result)
 
+def collect_step(max_duration=0.0):
+    """If the GC is incremental, do a minor collection and one step of a
+    major collection, starting one if needed; continue with more steps
+    until 'max_duration' seconds have passed or the major collection is
+    finished.  If the GC is not incremental, do a full collection.
+
+    Returns the GC states before and after, encoded in one integer: see
+    old_state() and new_state().  The states are the ones of incminimark,
+    where 0 means that no major collection is in progress.
+    """
+    gc.collect()
+    return encode_states(0, 0)
+
+def encode_states(oldstate, newstate):
+    return (oldstate << 8) | newstate
+
+def old_state(states):
+    return states >> 8
+
+def new_state(states):
+    return states & 0xFF
+
+class CollectStepEntry(ExtRegistryEntry):
+    _about_ = collect_step
+
+    def compute_result_annotation(self, s_max_duration=None):
+        from rpython.annotator import model as annmodel
+        return annmodel.SomeInteger()
+
+    def specialize_call(self, hop):
+        hop.exception_cannot_occur()
+        if len(hop.args_s) == 1:
+            [v_max_duration] = hop.inputargs(lltype.Float)
+        else:
+            v_max_duration = hop.inputconst(lltype.Float, 0.0)
+        return hop.genop('gc__collect_step', [v_max_duration],
+                         resulttype=lltype.Signed)
+
 class SetMaxHeapSizeEntry(ExtRegistryEntry):
     _about_ = set_max_heap_size
 
@@ -616,6 +654,42 @@ class AddMemoryPressureEntry(ExtRegistryEntry):
                          resulttype=lltype.Void)
 
 
+# The statistics returned by get_stats().  All the sizes are in bytes.
+(TOTAL_MEMORY,               # memory used by the objects outside the nursery
+ PEAK_MEMORY,                # highest value of TOTAL_MEMORY
+ TOTAL_ARENA_MEMORY,         # memory of the arenas allocated from the system
+ TOTAL_ARENA_MEMORY_USED,    # part of it used by the small objects
+ PEAK_ARENA_MEMORY,          # highest value of TOTAL_ARENA_MEMORY
+ TOTAL_RAWMALLOCED_MEMORY,   # memory used by the large objects
+ PEAK_RAWMALLOCED_MEMORY,    # highest value of TOTAL_RAWMALLOCED_MEMORY
+ NURSERY_SIZE,
+ PINNED_OBJECTS,             # number of objects pinned in the nursery
+ NUM_MINOR_COLLECTIONS,
+ NUM_MAJOR_COLLECTIONS,      # number of major collections completed
+ TOTAL_GC_TIME,              # in milliseconds, minor and major collections
+ RELEASED_ARENA_MEMORY,      # part of TOTAL_ARENA_MEMORY given back to the OS
+) = range(13)
+
+def get_stats(stat_no):
+    """Return one of the statistics above, in constant time.  Returns -1
+    if the GC doesn't give this statistic, and always when untranslated.
+    """
+    return -1
+
+class GetStatsEntry(ExtRegistryEntry):
+    _about_ = get_stats
+
+    def compute_result_annotation(self, s_stat_no):
+        from rpython.annotator import model as annmodel
+        return annmodel.SomeInteger()
+
+    def specialize_call(self, hop):
+        [v_stat_no] = hop.inputargs(lltype.Signed)
+        hop.exception_cannot_occur()
+        return hop.genop('gc_get_stats', [v_stat_no],
+                         resulttype=lltype.Signed)
+
+
 @not_rpython
 def get_rpy_memory_usage(gcref):
     # approximate implementation using CPython's type info
@@ -805,6 +805,17 @@ if _POSIX:
         def madvise_free(addr, map_size):
             "No madvise() on this platform"
 
+    # Unlike madvise_free(), which lets the kernel take the pages back
+    # lazily, this makes the RSS of the process go down immediately
+    if has_madvise and MADV_DONTNEED is not None:
+        def madvise_dontneed(addr, map_size):
+            c_madvise_safe(rffi.cast(PTR, addr),
+                           rffi.cast(size_t, map_size),
+                           rffi.cast(rffi.INT, MADV_DONTNEED))
+    else:
+        def madvise_dontneed(addr, map_size):
+            "No madvise() on this platform"
+
 elif _MS_WINDOWS:
     def mmap(fileno, length, tagname="", access=_ACCESS_DEFAULT, offset=0):
         # XXX flags is or-ed into access by now.
@@ -965,3 +976,7 @@ elif _MS_WINDOWS:
             rffi.cast(DWORD, PAGE_READWRITE))
         #from rpython.rlib import debug
         #debug.debug_print("madvise_free:", r)
+
+    # XXX MEM_RESET doesn't reduce the working set immediately; we would
+    # need to decommit the pages and recommit them before they are reused
+    madvise_dontneed = madvise_free
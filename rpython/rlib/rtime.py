@@ -203,6 +203,12 @@ if HAS_CLOCK_GETTIME:
                                rffi.INT, releasegil=False,
                                save_err=rffi.RFFI_SAVE_ERRNO,
                                compilation_info=eciclock)
+    # for the GC, which measures its pauses with CLOCK_MONOTONIC: like
+    # c_gettimeofday above, it must not allocate GC memory
+    c_clock_gettime_nowrapper = external('clock_gettime',
+                               [lltype.Signed, lltype.Ptr(TIMESPEC)],
+                               rffi.INT, _nowrapper=True, releasegil=False,
+                               compilation_info=eciclock)
     # Note: there is no higher-level functions here to access
     # clock_gettime().  The issue is that we'd need a way that keeps
     # nanosecond precision, depending on the usage, so we can't have a
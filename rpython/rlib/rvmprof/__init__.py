@@ -32,8 +32,29 @@ def get_unique_id(code):
         return code._vmprof_unique_id
     return 0
 
-def enable(fileno, interval):
-    _get_vmprof().enable(fileno, interval)
+def enable(fileno, interval, alloc_interval=0):
+    _get_vmprof().enable(fileno, interval, alloc_interval)
 
 def disable():
     _get_vmprof().disable()
+
+@specialize.memo()
+def _vmprof_supported():
+    try:
+        _get_vmprof()
+    except VMProfPlatformUnsupported:
+        return False
+    return True
+
+def get_alloc_sample_interval():
+    """Number of bytes between two allocation samples, or 0 if vmprof
+    is not enabled with 'alloc_interval'.  For the GC hooks."""
+    if not _vmprof_supported():
+        return 0
+    return _get_vmprof().alloc_sample_interval
+
+def record_allocation(typeid, size):
+    """Called by the GC hooks when get_alloc_sample_interval() bytes
+    have been allocated.  Cannot allocate or raise."""
+    if _vmprof_supported():
+        _get_vmprof().record_allocation(typeid, size)
@@ -49,6 +49,10 @@ def setup():
                                            "vmprof_register_virtual_function",
                                            [rffi.CCHARP, rffi.LONG, rffi.INT],
                                            rffi.INT, compilation_info=eci)
+    vmprof_report_allocation = rffi.llexternal("vmprof_report_allocation",
+                                               [lltype.Signed] * 3, rffi.INT,
+                                               compilation_info=eci,
+                                               _nowrapper=True)
     vmprof_ignore_signals = rffi.llexternal("vmprof_ignore_signals",
                                             [rffi.INT], lltype.Void,
                                             compilation_info=eci,
@@ -48,6 +48,7 @@ class VMProf(object):
 
     def _cleanup_(self):
         self.is_enabled = False
+        self.alloc_sample_interval = 0
 
     @jit.dont_look_inside
     @specialize.argtype(1)
@@ -122,10 +123,12 @@ class VMProf(object):
         self._gather_all_code_objs = gather_all_code_objs
 
     @jit.dont_look_inside
-    def enable(self, fileno, interval):
+    def enable(self, fileno, interval, alloc_interval=0):
         """Enable vmprof.  Writes go to the given 'fileno'.
         The sampling interval is given by 'interval' as a number of
         seconds, as a float which must be smaller than 1.0.
+        If 'alloc_interval' is > 0, the allocations are sampled too,
+        once every 'alloc_interval' bytes: see record_allocation().
         Raises VMProfError if something goes wrong.
         """
         assert fileno >= 0
@@ -141,6 +144,7 @@ class VMProf(object):
         if res < 0:
             raise VMProfError(os.strerror(rposix.get_saved_errno()))
         self.is_enabled = True
+        self.alloc_sample_interval = alloc_interval
 
     @jit.dont_look_inside
     def disable(self):
@@ -150,10 +154,22 @@ class VMProf(object):
         if not self.is_enabled:
             raise VMProfError("vmprof is not enabled")
         self.is_enabled = False
+        self.alloc_sample_interval = 0
         res = self.cintf.vmprof_disable()
         if res < 0:
             raise VMProfError(os.strerror(rposix.get_saved_errno()))
 
+    def record_allocation(self, typeid, size):
+        """Write an allocation sample, with the current stack trace.
+        Called by the GC hooks, once every 'alloc_sample_interval' bytes
+        allocated; the sample has got that many bytes as its weight.
+        Must not allocate or raise: samples that cannot be written (all
+        buffers full) are dropped.
+        """
+        interval = self.alloc_sample_interval
+        if self.is_enabled and interval > 0:
+            self.cintf.vmprof_report_allocation(typeid, size, interval)
+
     def _write_code_registration(self, uid, name):
         assert name.count(':') == 3 and len(name) <= MAX_FUNC_NAME, (
             "the name must be 'class:func_name:func_line:filename' "
@@ -12,6 +12,7 @@ static int opened_profile(char *interp_name);
 #define MARKER_TRAILER '\x03'
 #define MARKER_INTERP_NAME '\x04'   /* deprecated */
 #define MARKER_HEADER '\x05'
+#define MARKER_ALLOCATION '\x09'
 
 #define VERSION_BASE '\x00'
 #define VERSION_THREAD_ID '\x01'
@@ -378,6 +378,42 @@ int vmprof_register_virtual_function(char *code_name, long code_uid,
     return 0;
 }
 
+/* An allocation record is written like a stack trace, with the marker
+   MARKER_ALLOCATION, 'count' set to the weight of the sample, and the
+   typeid and the size of the allocated object following the thread id.
+   It is written from the thread that allocates, not from a signal
+   handler. */
+RPY_EXTERN
+int vmprof_report_allocation(long typeid, long size, long weight)
+{
+    struct profbuf_s *p;
+    struct prof_stacktrace_s *st;
+    int depth, fd = profile_file;
+
+    if (fd < 0 || profile_interval_usec == 0)
+        return 0;   /* not enabled */
+
+    p = reserve_buffer(fd);
+    if (p == NULL)
+        return -1;  /* no free buffer right now, drop this sample */
+
+    st = (struct prof_stacktrace_s *)p->data;
+    st->marker = MARKER_ALLOCATION;
+    st->count = weight;
+    depth = get_stack_trace(get_vmprof_stack(), st->stack,
+                            MAX_STACK_DEPTH-4, 0);
+    st->depth = depth;
+    st->stack[depth++] = get_current_thread_id();
+    st->stack[depth++] = typeid;
+    st->stack[depth++] = size;
+    p->data_offset = offsetof(struct prof_stacktrace_s, marker);
+    p->data_size = (depth * sizeof(void *) +
+                    sizeof(struct prof_stacktrace_s) -
+                    offsetof(struct prof_stacktrace_s, marker));
+    commit_buffer(fd, p);
+    return 0;
+}
+
 static void flush_codes(void)
 {
     struct profbuf_s *p = current_codes;
@@ -172,3 +172,31 @@ RPY_EXTERN
 void vmprof_ignore_signals(int ignored)
 {
 }
+
+RPY_EXTERN
+int vmprof_report_allocation(long typeid, long size, long weight)
+{
+    prof_stacktrace_s *stack;
+    long depth;
+    int res;
+
+    if (!enabled)
+        return 0;
+    stack = (prof_stacktrace_s*)malloc(SINGLE_BUF_SIZE);
+    if (stack == NULL)
+        return -1;
+    stack->marker = MARKER_ALLOCATION;
+    stack->count = weight;
+    depth = get_stack_trace(get_vmprof_stack(), stack->stack,
+                            MAX_STACK_DEPTH-4, 0);
+    stack->depth = depth;
+    stack->stack[depth++] = GetCurrentThreadId();
+    stack->stack[depth++] = typeid;
+    stack->stack[depth++] = size;
+    res = _write_all((char*)stack + offsetof(prof_stacktrace_s, marker),
+                     depth * sizeof(void *) +
+                     sizeof(struct prof_stacktrace_s) -
+                     offsetof(struct prof_stacktrace_s, marker));
+    free(stack);
+    return res;
+}
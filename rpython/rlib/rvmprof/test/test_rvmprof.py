@@ -147,3 +147,60 @@ def test_enable():
     finally:
         assert os.path.exists(tmpfilename)
         os.unlink(tmpfilename)
+
+
+def test_record_allocation():
+    import struct
+
+    class MyCode:
+        pass
+    def get_name(code):
+        return 'py:code:52:x'
+    try:
+        rvmprof.register_code_object_class(MyCode, get_name)
+    except rvmprof.VMProfPlatformUnsupported as e:
+        py.test.skip(str(e))
+
+    @rvmprof.vmprof_execute_code("xcode1", lambda code: code)
+    def main(code):
+        assert rvmprof.get_alloc_sample_interval() == 12345
+        rvmprof.record_allocation(42, 100)
+        return 0
+
+    tmpfilename = str(udir.join('test_rvmprof_alloc'))
+
+    def f():
+        code = MyCode()
+        rvmprof.register_code(code, get_name)
+        fd = os.open(tmpfilename, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0666)
+        assert rvmprof.get_alloc_sample_interval() == 0
+        rvmprof.enable(fd, 0.5, 12345)
+        main(code)
+        rvmprof.disable()
+        assert rvmprof.get_alloc_sample_interval() == 0
+        rvmprof.record_allocation(43, 100)      # ignored
+        os.close(fd)
+        return 0
+
+    def check_profile(filename, code_in_stack):
+        data = open(filename, 'rb').read()
+        marker = '\x09' + struct.pack('l', 12345)
+        start = data.index(marker)
+        words = data[start + 1:]
+        count, depth = struct.unpack('ll', words[:2 * WORD])
+        assert count == 12345
+        stack = struct.unpack('%dl' % (depth + 3),
+                              words[2 * WORD:(depth + 5) * WORD])
+        if code_in_stack:
+            assert depth == 2
+            assert stack[0] == 1        # VMPROF_CODE_TAG, then the unique id
+        assert stack[-2:] == (42, 100)
+        assert data.count(marker) == 1
+
+    WORD = struct.calcsize('l')
+    assert f() == 0
+    check_profile(tmpfilename, False)     # no stack before translation
+    fn = compile(f, [], gcpolicy="minimark")
+    assert fn() == 0
+    check_profile(tmpfilename, True)
+    os.unlink(tmpfilename)
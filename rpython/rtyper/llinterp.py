@@ -727,6 +727,9 @@ class LLFrame(object):
     def op_gc_add_memory_pressure(self, size):
         self.heap.add_memory_pressure(size)
 
+    def op_gc_get_stats(self, stat_no):
+        return self.heap.get_stats(stat_no)
+
     def op_gc_fq_next_dead(self, fq_tag):
         return self.heap.gc_fq_next_dead(fq_tag)
 
@@ -816,6 +819,9 @@ class LLFrame(object):
     def op_gc__collect(self, *gen):
         self.heap.collect(*gen)
 
+    def op_gc__collect_step(self, max_duration):
+        return self.heap.collect_step(max_duration)
+
     def op_gc_heap_stats(self):
         raise NotImplementedError
 
@@ -337,6 +337,8 @@ def arena_reset(arena_addr, size, zero):
       * 3: fill with garbage
       * 4: large area of memory that can benefit from MADV_FREE
              (i.e. contains garbage, may be zero-filled or not)
+      * 5: like 4, but the memory is returned to the OS immediately
+             (MADV_DONTNEED), so that the RSS of the process goes down
     """
     arena_addr = getfakearenaaddress(arena_addr)
     arena_addr.arena.reset(zero, arena_addr.offset, size)
@@ -454,7 +456,7 @@ else:
             return rmmap.PAGESIZE
     posixpagesize = PosixPageSize()
 
-def madvise_arena_free(baseaddr, size):
+def madvise_arena_free(baseaddr, size, dontneed=False):
     from rpython.rlib import rmmap
 
     pagesize = posixpagesize.get()
@@ -462,8 +464,12 @@ def madvise_arena_free(baseaddr, size):
     aligned_addr = (baseaddr + pagesize - 1) & ~(pagesize - 1)
     size -= (aligned_addr - baseaddr)
     if size >= pagesize:
-        rmmap.madvise_free(rffi.cast(rmmap.PTR, aligned_addr),
-                           size & ~(pagesize - 1))
+        if dontneed:
+            rmmap.madvise_dontneed(rffi.cast(rmmap.PTR, aligned_addr),
+                                   size & ~(pagesize - 1))
+        else:
+            rmmap.madvise_free(rffi.cast(rmmap.PTR, aligned_addr),
+                               size & ~(pagesize - 1))
 
 
 if os.name == "posix":
@@ -538,6 +544,8 @@ def llimpl_arena_reset(arena_addr, size, zero):
             llop.raw_memset(lltype.Void, arena_addr, ord('#'), size)
         elif zero == 4:
             madvise_arena_free(arena_addr, size)
+        elif zero == 5:
+            madvise_arena_free(arena_addr, size, dontneed=True)
         else:
             llmemory.raw_memclear(arena_addr, size)
 llimpl_arena_reset._always_inline_ = True
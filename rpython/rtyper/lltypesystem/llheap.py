@@ -6,6 +6,8 @@ from rpython.rtyper.lltypesystem.llmemory import weakref_create, weakref_deref
 setfield = setattr
 from operator import setitem as setarrayitem
 from rpython.rlib.rgc import can_move, collect, add_memory_pressure
+from rpython.rlib.rgc import collect_step
+from rpython.rlib.rgc import get_stats
 
 def setinterior(toplevelcontainer, inneraddr, INNERTYPE, newvalue,
                 offsets=None):
@@ -322,6 +322,29 @@ def test_madvise_arena_free():
     assert rffi.cast(lltype.Signed, addr) == 124 * pagesize
     assert size == pagesize * 5
 
+def test_madvise_arena_dontneed():
+    from rpython.rlib import rmmap
+
+    if os.name != 'posix':
+        py.test.skip("posix only")
+    pagesize = llarena.posixpagesize.get()
+    prev = rmmap.madvise_dontneed
+    try:
+        seen = []
+        def my_madvise_dontneed(addr, size):
+            assert lltype.typeOf(addr) == rmmap.PTR
+            seen.append((addr, size))
+        rmmap.madvise_dontneed = my_madvise_dontneed
+        llarena.madvise_arena_free(
+            rffi.cast(llmemory.Address, 123 * pagesize + 1),
+            pagesize * 7 - 2, dontneed=True)
+    finally:
+        rmmap.madvise_dontneed = prev
+    assert len(seen) == 1
+    addr, size = seen[0]
+    assert rffi.cast(lltype.Signed, addr) == 124 * pagesize
+    assert size == pagesize * 5
+
 
 class TestStandalone(test_standalone.StandaloneTests):
     def test_compiled_arena_protect(self):
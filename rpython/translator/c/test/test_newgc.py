@@ -1737,6 +1737,194 @@ class TestIncrementalMiniMarkGC(TestMiniMarkGC):
         res = self.run("ignore_finalizer")
         assert res == 1    # translated: x1 is removed from the list
 
+    def define_parallel_mark(cls):
+        class Node(object):
+            def __init__(self, value, left, right):
+                self.value = value
+                self.left = left
+                self.right = right
+                self.items = [None] * (value & 7)
+        def make(depth, value):
+            if depth == 0:
+                return Node(value, None, None)
+            return Node(value, make(depth - 1, value * 2),
+                        make(depth - 1, value * 2 + 1))
+        def total(node):
+            if node is None:
+                return 0
+            return node.value + total(node.left) + total(node.right)
+        def f():
+            keep = make(15, 1)
+            expected = total(keep)
+            for i in range(10):
+                make(13, i)     # garbage
+                rgc.collect()
+                if total(keep) != expected:
+                    return i
+            return -1
+        return f
+
+    def test_parallel_mark(self):
+        def myrunner(args):
+            env = os.environ.copy()
+            env['PYPY_GC_MARK_WORKERS'] = '4'
+            return subprocess.check_output(args, env=env)
+        res = self.run("parallel_mark", runner=myrunner)
+        assert res == -1
+
+    def define_adaptive_nursery(cls):
+        class A(object):
+            def __init__(self, next):
+                self.next = next
+        def f():
+            initial = rgc.get_stats(rgc.NURSERY_SIZE)
+            keep = None
+            for i in range(200000):
+                keep = A(keep)      # everything survives
+            grown = rgc.get_stats(rgc.NURSERY_SIZE)
+            for i in range(1000000):
+                A(None)             # nothing survives
+            final = rgc.get_stats(rgc.NURSERY_SIZE)
+            n = 0
+            while keep is not None:
+                n += 1
+                keep = keep.next
+            if n != 200000:
+                return 1
+            if grown != 4 * 1024 * 1024:
+                return 2
+            if final != initial:
+                return 3
+            return 0
+        return f
+
+    def test_adaptive_nursery(self):
+        def myrunner(args):
+            env = os.environ.copy()
+            env['PYPY_GC_NURSERY'] = '256KB'
+            env['PYPY_GC_NURSERY_MAX'] = '4MB'
+            return subprocess.check_output(args, env=env)
+        res = self.run("adaptive_nursery", runner=myrunner)
+        assert res == 0
+
+    def define_collect_step(cls):
+        class A(object):
+            def __init__(self, next):
+                self.next = next
+        def f():
+            keep = None
+            for i in range(100000):
+                keep = A(keep)
+            rgc.collect()
+            num_major = rgc.get_stats(rgc.NUM_MAJOR_COLLECTIONS)
+            steps = 0
+            while True:
+                states = rgc.collect_step(0.0001)
+                steps += 1
+                if rgc.new_state(states) == 0:
+                    break
+            if rgc.get_stats(rgc.NUM_MAJOR_COLLECTIONS) != num_major + 1:
+                return -1
+            return steps
+        return f
+
+    def test_collect_step(self):
+        res = self.run("collect_step")
+        assert res >= 1
+        def myrunner(args):
+            env = os.environ.copy()
+            env['PYPY_GC_SWEEP_THREAD'] = '1'
+            return subprocess.check_output(args, env=env)
+        res = self.run("collect_step", runner=myrunner)
+        assert res >= 1
+
+    def define_release_pages(cls):
+        class A(object):
+            def __init__(self, next):
+                self.next = next
+        def f():
+            keep = None
+            for i in range(200000):
+                keep = A(keep)
+            rgc.collect()
+            if rgc.get_stats(rgc.RELEASED_ARENA_MEMORY) != 0:
+                return 1
+            # keep one object out of 5000: most pages become free
+            a = keep
+            while a is not None:
+                b = a
+                for j in range(5000):
+                    b = b.next
+                    if b is None:
+                        break
+                a.next = b
+                a = b
+            rgc.collect()
+            released = rgc.get_stats(rgc.RELEASED_ARENA_MEMORY)
+            if released <= 0:
+                return 2
+            for i in range(200000):
+                keep = A(keep)
+            rgc.collect()
+            if rgc.get_stats(rgc.RELEASED_ARENA_MEMORY) >= released:
+                return 3
+            n = 0
+            while keep is not None:
+                n += 1
+                keep = keep.next
+            if n != 200000 + 40:
+                return 4
+            return 0
+        return f
+
+    def test_release_pages(self):
+        res = self.run("release_pages")
+        assert res == 0
+
+    def test_max_pause(self):
+        def myrunner(args):
+            env = os.environ.copy()
+            env['PYPY_GC_MAX_PAUSE'] = '1ms'
+            return subprocess.check_output(args, env=env)
+        res = self.run("parallel_mark", runner=myrunner)
+        assert res == -1
+
+    def define_sweep_thread(cls):
+        class Node(object):
+            def __init__(self, value, next):
+                self.value = value
+                self.next = next
+        def f():
+            keep = [Node(i, None) for i in range(20000)]
+            hashes = [compute_identity_hash(node) for node in keep]
+            for j in range(50):
+                # no rgc.collect(): the major collections are started by
+                # the allocations, and the arenas are swept while we
+                # continue to run and to write into old objects
+                for i in range(len(keep)):
+                    keep[i].next = Node(i + j, Node(j, None))
+                for i in range(len(keep)):
+                    node = keep[i]
+                    if node.value != i or node.next.value != i + j:
+                        return j
+                    if node.next.next.value != j:
+                        return j
+                    if compute_identity_hash(node) != hashes[i]:
+                        return j
+            return -1
+        return f
+
+    def test_sweep_thread(self):
+        def myrunner(args):
+            env = os.environ.copy()
+            env['PYPY_GC_SWEEP_THREAD'] = '1'
+            # small enough for several major collections
+            env['PYPY_GC_NURSERY'] = '65536'
+            env['PYPY_GC_MIN'] = '1000000'
+            return subprocess.check_output(args, env=env)
+        res = self.run("sweep_thread", runner=myrunner)
+        assert res == -1
+
 
 # ____________________________________________________________________
 
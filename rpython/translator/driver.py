@@ -209,6 +209,12 @@ class TranslationDriver(SimpleTaskEngine):
 
         self.translator.driver_instrument_result = self.instrument_result
 
+        # the GcHooks instance, if the target provides one; it is read by
+        # the GC transformer (see rpython/memory/gc/hook.py)
+        get_gchooks = self.extra.get('get_gchooks', None)
+        if get_gchooks is not None:
+            self.translator.gchooks = get_gchooks(self)
+
     def setup_library(self, libdef, policy=None, extra={}, empty_translator=None):
         """ Used by carbon python only. """
         self.setup(None, None, policy, extra, empty_translator)
@@ -317,6 +323,11 @@ class TranslationDriver(SimpleTaskEngine):
         else:
             s = None
 
+        gchooks = getattr(translator, 'gchooks', None)
+        if gchooks is not None:
+            annotator.build_types(gchooks._get_annotation_helper(), [int],
+                                  False)
+
         self.sanity_check_annotation()
         if self.entry_point and self.standalone and s.knowntype != int:
             raise Exception("stand-alone program entry point must return an "